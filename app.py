@@ -14,6 +14,7 @@ A clean, simple interface for AI image generation with:
 
 import streamlit as st
 import requests
+from urllib.parse import urljoin
 import json
 from typing import Optional, Dict
 import time
@@ -153,6 +154,7 @@ def main():
                 # 5. Result Image
                 st.subheader("🖼️ Generated Image")
                 image_url = result.get("image_url", "")
+                image_url = urljoin(API_BASE_URL, image_url) if image_url else ""  # backend returns relative /static URLs
                 if image_url:
                     st.image(image_url, caption="Generated Image", use_container_width=True)
                 else:
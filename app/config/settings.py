@@ -3,15 +3,29 @@ Configuration settings for the PhotoeAI backend application.
 Loads environment variables and JSON configuration files with validation.
 """
 
+import hashlib
 import json
+import threading
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from loguru import logger
 from pydantic import BaseModel, Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 # Get the directory where this settings file is located
 SETTINGS_DIR = Path(__file__).parent.parent.parent  # Go up to photoeai-backend root
 ENV_FILE_PATH = SETTINGS_DIR / ".env"
+SYSTEM_PROMPT_DIR = SETTINGS_DIR / "system-prompt"
+
+# Config section name -> JSON file inside SYSTEM_PROMPT_DIR
+CONFIG_FILES = {
+    "system_prompt_template": "system_prompt_template.json",
+    "enhancement_template": "enhancement_template.json",
+    "quality_rules": "quality_rules.json",
+    "stopping_power_rules": "stopping_power_rules.json",
+    "anti_anomaly_rules": "anti_anomaly_rules.json",
+    "defaults": "defaults.json"
+}
 
 
 class SystemPromptConfig(BaseModel):
@@ -67,6 +81,13 @@ class Settings(BaseSettings):
     # OpenAI Configuration
     openai_api_key: str = Field(..., description="OpenAI API key", alias="OPENAI_API_KEY")
     openai_model: str = Field(default="gpt-4o", description="OpenAI model to use", alias="OPENAI_MODEL")
+    openai_base_url: str = Field(default="https://api.openai.com/v1", description="OpenAI API base URL for chat, vision, image edits and batches (point at mock_openai_server.py for offline runs)", alias="OPENAI_BASE_URL")
+
+    # Model routing (task -> tier -> model, see app/services/model_router.py)
+    model_tier_fast: str = Field(default="gpt-4o-mini", description="Model for the fast tier (structured extraction, compression)", alias="MODEL_TIER_FAST")
+    model_tier_standard: str = Field(default="", description="Model for the standard tier (empty uses OPENAI_MODEL)", alias="MODEL_TIER_STANDARD")
+    model_tier_premium: str = Field(default="", description="Optional top tier used only as a fallback or when routed explicitly", alias="MODEL_TIER_PREMIUM")
+    model_routes: str = Field(default="", description="Comma-separated task=tier overrides, e.g. 'extract=standard,vision=premium'", alias="MODEL_ROUTES")
 
     # --- NEW ---
     # Image Generation Service Configuration
@@ -80,58 +101,200 @@ class Settings(BaseSettings):
     port: int = Field(default=8002, description="Server port", alias="PORT")
     debug: bool = Field(default=False, description="Debug mode flag", alias="DEBUG")
     
+    # Hot-reload of system-prompt/*.json (0 disables the watcher)
+    config_watch_interval: float = Field(default=2.0, description="Seconds between system-prompt config change checks (0 disables)", alias="CONFIG_WATCH_INTERVAL")
+
+    # Generated image storage
+    image_store_backend: str = Field(default="local", description="Storage backend for generated images", alias="IMAGE_STORE_BACKEND")
+    image_public_base_url: str = Field(default="", description="Public/CDN origin prefixed to image URLs (empty returns relative URLs)", alias="IMAGE_PUBLIC_BASE_URL")
+    image_sweep_interval: float = Field(default=300.0, description="Seconds between static/images garbage-collection sweeps (0 disables)", alias="IMAGE_SWEEP_INTERVAL")
+    image_max_age_hours: float = Field(default=2.0, description="Evict generated images not accessed for this many hours", alias="IMAGE_MAX_AGE_HOURS")
+    upload_max_age_hours: float = Field(default=24.0, description="Evict uploaded images not accessed for this many hours", alias="UPLOAD_MAX_AGE_HOURS")
+    image_store_max_mb: float = Field(default=1024.0, description="Size quota for static/images; least recently used files are evicted above it", alias="IMAGE_STORE_MAX_MB")
+    image_output_formats: str = Field(default="avif,webp,jpeg", description="Comma-separated derivative formats in preference order (avif, webp, jpeg)", alias="IMAGE_OUTPUT_FORMATS")
+    image_encode_quality: int = Field(default=80, description="Encoder quality for image derivatives (1-100)", alias="IMAGE_ENCODE_QUALITY")
+    image_encode_workers: int = Field(default=2, description="Worker threads encoding image derivatives", alias="IMAGE_ENCODE_WORKERS")
+
+    # Telemetry (pipeline spans, /metrics)
+    telemetry_window_size: int = Field(default=1024, description="Latency samples kept per stage for p50/p95/p99", alias="TELEMETRY_WINDOW_SIZE")
+    telemetry_span_buffer: int = Field(default=2048, description="Finished spans kept for /api/v1/traces and OTLP export", alias="TELEMETRY_SPAN_BUFFER")
+    otel_exporter_otlp_endpoint: str = Field(default="", description="OTLP/HTTP collector base URL to push spans to (empty disables)", alias="OTEL_EXPORTER_OTLP_ENDPOINT")
+    telemetry_export_interval: float = Field(default=5.0, description="Seconds between OTLP span export batches", alias="TELEMETRY_EXPORT_INTERVAL")
+
+    # Upstream retries (exponential full-jitter backoff, Retry-After aware)
+    retry_max_delay: float = Field(default=30.0, description="Give up instead of honoring a Retry-After longer than this (seconds)", alias="RETRY_MAX_DELAY")
+    retry_budget_ratio: float = Field(default=0.2, description="Retries allowed per upstream as a fraction of requests in the budget window", alias="RETRY_BUDGET_RATIO")
+    retry_budget_min_per_second: float = Field(default=0.5, description="Retry budget floor for low-traffic periods (retries per second)", alias="RETRY_BUDGET_MIN_PER_SECOND")
+    retry_budget_window: float = Field(default=10.0, description="Retry budget sliding window (seconds)", alias="RETRY_BUDGET_WINDOW")
+
+    # Upstream circuit breakers
+    circuit_failure_threshold: int = Field(default=5, description="Consecutive upstream failures that open a circuit breaker", alias="CIRCUIT_FAILURE_THRESHOLD")
+    circuit_open_seconds: float = Field(default=30.0, description="Seconds a circuit stays open before a half-open probe", alias="CIRCUIT_OPEN_SECONDS")
+
+    # Images API timeouts (a hung upstream counts as a timeout failure instead of holding the request)
+    image_api_connect_timeout: float = Field(default=5.0, description="Seconds to establish a connection to the images API", alias="IMAGE_API_CONNECT_TIMEOUT")
+    image_api_read_timeout: float = Field(default=120.0, description="Seconds the images API may stay silent while rendering before the attempt fails", alias="IMAGE_API_READ_TIMEOUT")
+
+    # Upstream admission control (token buckets + fair queuing per client)
+    rate_limit_enabled: bool = Field(default=True, description="Queue upstream calls against RPM/TPM budgets", alias="RATE_LIMIT_ENABLED")
+    openai_rate_tier: int = Field(default=2, description="OpenAI usage tier (1-5) the default RPM/TPM budgets are taken from", alias="OPENAI_RATE_TIER")
+    rate_limit_chat_rpm: Optional[int] = Field(default=None, description="Override chat/vision requests per minute", alias="RATE_LIMIT_CHAT_RPM")
+    rate_limit_chat_tpm: Optional[int] = Field(default=None, description="Override chat/vision tokens per minute", alias="RATE_LIMIT_CHAT_TPM")
+    rate_limit_images_per_minute: Optional[int] = Field(default=None, description="Override images generated/edited per minute", alias="RATE_LIMIT_IMAGES_PER_MINUTE")
+    rate_limit_key_share: float = Field(default=0.25, description="Fraction of a pool's RPM/TPM one client may use", alias="RATE_LIMIT_KEY_SHARE")
+    upstream_max_concurrency: int = Field(default=16, description="Concurrent upstream calls per pool on this node", alias="UPSTREAM_MAX_CONCURRENCY")
+    key_max_concurrency: int = Field(default=4, description="Concurrent upstream calls per client", alias="KEY_MAX_CONCURRENCY")
+    rate_limit_batch_weight: float = Field(default=0.25, description="Fair-queuing weight of batch-job flows relative to interactive clients (1.0)", alias="RATE_LIMIT_BATCH_WEIGHT")
+    rate_limit_queue_timeout: float = Field(default=60.0, description="Seconds a call may wait for admission before failing with 503", alias="RATE_LIMIT_QUEUE_TIMEOUT")
+
+    # Bulk catalog jobs (app/services/batch_runner.py, batch_briefs.py)
+    batch_dir: str = Field(default="batches", description="Directory holding batch job inputs, checkpoints and results", alias="BATCH_DIR")
+    batch_concurrency: int = Field(default=4, description="Items processed concurrently by a direct-mode batch job", alias="BATCH_CONCURRENCY")
+    batch_backend: str = Field(default="openai", description="Batch-API backend for batch mode (openai, or local to run request files in-process)", alias="BATCH_BACKEND")
+    batch_max_requests: int = Field(default=1000, description="Requests per submitted batch file (also the default items in flight in batch mode)", alias="BATCH_MAX_REQUESTS")
+    batch_flush_seconds: float = Field(default=5.0, description="Seconds pending requests are collected before a batch file is submitted", alias="BATCH_FLUSH_SECONDS")
+    batch_poll_interval: float = Field(default=30.0, description="Seconds between Batch API status checks", alias="BATCH_POLL_INTERVAL")
+
+    # Rule-based extraction fast path (app/services/rule_extractor.py)
+    rule_extraction_enabled: bool = Field(default=True, description="Fill wizard fields from labeled values, camera specs and the defaults.json vocabulary before asking the LLM", alias="RULE_EXTRACTION_ENABLED")
+    rule_extraction_skip_confidence: float = Field(default=0.9, description="Skip the extraction LLM call when rule confidence over the required fields reaches this (above 1 never skips)", alias="RULE_EXTRACTION_SKIP_CONFIDENCE")
+
+    # Brief compression (over-long briefs shortened before image generation)
+    brief_compressor: str = Field(default="extractive", description="How over-long briefs are shortened: extractive (local, deterministic) or llm", alias="BRIEF_COMPRESSOR")
+
+    # Pipeline contexts (brief_id references to extraction/brief/compression artifacts)
+    pipeline_context_ttl: float = Field(default=3600.0, description="Seconds a brief_id keeps its pipeline artifacts", alias="PIPELINE_CONTEXT_TTL")
+    pipeline_context_max: int = Field(default=1000, description="Pipeline contexts kept in memory (least recently used dropped first)", alias="PIPELINE_CONTEXT_MAX")
+
+    # Brief store (gzip-compressed briefs behind brief_id handles)
+    brief_store_dir: str = Field(default="briefs", description="Directory holding stored briefs (<brief_id>.txt.gz)", alias="BRIEF_STORE_DIR")
+    brief_store_max_age_days: float = Field(default=30.0, description="Days a stored brief stays retrievable by its brief_id", alias="BRIEF_STORE_MAX_AGE_DAYS")
+
+    # Logging (queue-backed JSON sink, app/services/log_sink.py)
+    log_dir: str = Field(default="logs", description="Directory for daily JSON-lines logs (empty disables file logging)", alias="LOG_DIR")
+    log_retention_days: int = Field(default=30, description="Days of JSON log files kept (older days are gzipped on rotation)", alias="LOG_RETENTION_DAYS")
+    log_console_format: str = Field(default="text", description="Console log format: text, json or off", alias="LOG_CONSOLE_FORMAT")
+    log_queue_size: int = Field(default=10000, description="Log records queued for the writer thread before new ones are dropped", alias="LOG_QUEUE_SIZE")
+    log_batch_size: int = Field(default=256, description="Queued log records that wake the writer thread early", alias="LOG_BATCH_SIZE")
+    log_flush_interval: float = Field(default=0.5, description="Seconds between log writer batches", alias="LOG_FLUSH_INTERVAL")
+    log_field_max_chars: int = Field(default=1000, description="Cap on a logged message or extra field (longer values are cut)", alias="LOG_FIELD_MAX_CHARS")
+    log_verbose_sample_rate: float = Field(default=0.1, description="Fraction of DEBUG and verbose-marked log events kept (warnings and errors are never sampled)", alias="LOG_VERBOSE_SAMPLE_RATE")
+
+    # Usage ledger (token/image accounting) and admin API
+    usage_ledger_size: int = Field(default=1000, description="Recent per-request usage records kept for the admin API", alias="USAGE_LEDGER_SIZE")
+    admin_token: str = Field(default="", description="Bearer token for /api/v1/admin/* (empty disables the admin API)", alias="ADMIN_TOKEN")
+
     # Centralized System Configuration (initialized after object creation)
     _prompt_config: SystemPromptConfig = None
+    _config_fingerprint: str = ""
+    _file_fingerprints: Dict[str, str] = {}
+    _reload_lock: Any = None
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        self._reload_lock = threading.Lock()
         self._load_and_validate_json_configs()
     
     @property
     def prompt_config(self) -> SystemPromptConfig:
-        """Access to the validated prompt configuration."""
+        """Access to the validated prompt configuration snapshot."""
         return self._prompt_config
     
-    def _load_and_validate_json_configs(self):
-        """Load and validate all JSON configuration files."""
-        system_prompt_dir = SETTINGS_DIR / "system-prompt"
+    @property
+    def config_fingerprint(self) -> str:
+        """Content fingerprint of the active prompt configuration, suitable for cache keys."""
+        return self._config_fingerprint
+    
+    def config_file_fingerprint(self, config_name: str) -> str:
+        """Content fingerprint of a single configuration file (e.g. 'system_prompt_template')."""
+        return self._file_fingerprints.get(config_name, "")
+    
+    def _read_config_file(self, config_name: str) -> Tuple[Dict[str, Any], str]:
+        """Read one JSON configuration file and return its data with a content digest."""
+        filename = CONFIG_FILES[config_name]
+        file_path = SYSTEM_PROMPT_DIR / filename
+        
+        if not file_path.exists():
+            raise FileNotFoundError(f"Required configuration file '{filename}' not found in {SYSTEM_PROMPT_DIR}")
         
-        if not system_prompt_dir.exists():
-            raise FileNotFoundError(f"Configuration directory '{system_prompt_dir}' not found")
+        try:
+            raw = file_path.read_bytes()
+            return json.loads(raw.decode("utf-8")), hashlib.sha256(raw).hexdigest()
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON in {filename}: {e}")
+        except Exception as e:
+            raise RuntimeError(f"Failed to load {filename}: {e}")
+    
+    def _activate_snapshot(self, config: SystemPromptConfig, file_fingerprints: Dict[str, str]):
+        """Swap in a validated configuration snapshot together with its fingerprints."""
+        combined = hashlib.sha256()
+        for config_name in sorted(file_fingerprints):
+            combined.update(f"{config_name}:{file_fingerprints[config_name]}".encode("utf-8"))
         
-        json_files = {
-            "system_prompt_template": "system_prompt_template.json",
-            "enhancement_template": "enhancement_template.json",
-            "quality_rules": "quality_rules.json",
-            "stopping_power_rules": "stopping_power_rules.json",
-            "anti_anomaly_rules": "anti_anomaly_rules.json",
-            "defaults": "defaults.json"
-        }
+        # Readers never see a half-updated state: each attribute is replaced in one assignment
+        self._file_fingerprints = dict(file_fingerprints)
+        self._prompt_config = config
+        self._config_fingerprint = combined.hexdigest()[:16]
+    
+    def _load_and_validate_json_configs(self):
+        """Load and validate all JSON configuration files."""
+        if not SYSTEM_PROMPT_DIR.exists():
+            raise FileNotFoundError(f"Configuration directory '{SYSTEM_PROMPT_DIR}' not found")
         
         config_data = {}
+        file_fingerprints = {}
         
         # Load each JSON file with error handling
-        for config_name, filename in json_files.items():
-            file_path = system_prompt_dir / filename
-            
-            if not file_path.exists():
-                raise FileNotFoundError(f"Required configuration file '{filename}' not found in {system_prompt_dir}")
-            
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    config_data[config_name] = json.load(f)
-                print(f"✅ Loaded {filename}")
-            except json.JSONDecodeError as e:
-                raise ValueError(f"Invalid JSON in {filename}: {e}")
-            except Exception as e:
-                raise RuntimeError(f"Failed to load {filename}: {e}")
+        for config_name, filename in CONFIG_FILES.items():
+            config_data[config_name], file_fingerprints[config_name] = self._read_config_file(config_name)
+            logger.debug(f"✅ Loaded {filename}")
         
         # Validate configuration using Pydantic model
         try:
-            self._prompt_config = SystemPromptConfig(**config_data)
-            print("✅ All configuration files validated successfully")
+            config = SystemPromptConfig(**config_data)
         except Exception as e:
             raise ValueError(f"Configuration validation failed: {e}")
+        
+        self._activate_snapshot(config, file_fingerprints)
+        logger.debug(f"✅ All configuration files validated successfully (fingerprint {self._config_fingerprint})")
+    
+    def reload_prompt_config(self) -> List[str]:
+        """
+        Re-read the system-prompt JSON files and atomically swap in a new validated snapshot.
+        
+        Unchanged files are reused from the current snapshot. If any file fails to parse or the
+        combined configuration fails validation, the active snapshot is left untouched.
+        
+        Returns:
+            Names of the configuration sections that changed (empty if nothing changed)
+            
+        Raises:
+            ValueError/RuntimeError/FileNotFoundError: If the new configuration is invalid
+        """
+        with self._reload_lock:
+            current = self._prompt_config.model_dump()
+            file_fingerprints = dict(self._file_fingerprints)
+            changed = []
+            
+            for config_name in CONFIG_FILES:
+                data, digest = self._read_config_file(config_name)
+                if digest != file_fingerprints.get(config_name):
+                    current[config_name] = data
+                    file_fingerprints[config_name] = digest
+                    changed.append(config_name)
+            
+            if not changed:
+                return []
+            
+            try:
+                config = SystemPromptConfig(**current)
+            except Exception as e:
+                raise ValueError(f"Configuration validation failed: {e}")
+            
+            self._activate_snapshot(config, file_fingerprints)
+        
+        logger.info(f"🔄 Prompt configuration reloaded: {', '.join(changed)} (fingerprint {self._config_fingerprint})")
+        return changed
     
     @property
     def system_prompt_template(self) -> Dict[str, Any]:
@@ -167,7 +330,7 @@ class Settings(BaseSettings):
 # Global settings instance - will fail fast if configuration is invalid
 try:
     settings = Settings()
-    print("🎯 MISSION 2: Centralized configuration system initialized successfully")
+    logger.debug("🎯 MISSION 2: Centralized configuration system initialized successfully")
 except Exception as e:
-    print(f"💥 CRITICAL ERROR: Configuration system failed to initialize: {e}")
+    logger.critical(f"💥 CRITICAL ERROR: Configuration system failed to initialize: {e}")
     raise
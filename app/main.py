@@ -3,59 +3,45 @@ Main FastAPI application for the PhotoeAI backend.
 Initializes the app, configures CORS, includes routers, and sets up structured logging.
 """
 
+import time
+_import_started = time.perf_counter()
+
+import asyncio
+import math
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from typing import Optional
+from fastapi import FastAPI, Header, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from loguru import logger
-import sys
 import os
 from app.config.settings import settings
 from app.routers.generator import router as generator_router
 from app.routers.image_upload import router as image_upload_router
 from app.routers.image_analysis import router as image_analysis_router
+from app.routers.images import router as images_router
+from app.routers.metrics import router as metrics_router
+from app.routers.admin import router as admin_router, require_admin
+from app.routers.batch import router as batch_router
+from app.routers.briefs import router as briefs_router
+from app.services.batch_runner import batch_runner
+from app.services.config_watcher import config_watcher
+from app.services.correlation import correlation_scope, current_request_id, REQUEST_ID_HEADER
+from app.services.image_sweeper import image_sweeper
+from app.services.log_sink import log_sink
+from app.services.telemetry import telemetry
+from app.services.usage_ledger import usage_ledger
+from app.services.resilience import UpstreamError
+from app.services.rate_limiter import rate_limiter
+from app.static_files import CachedStaticFiles
+from app.startup_report import startup_timings, loaded_heavy_modules, profile_cold_import
 
-# Configure structured logging with Loguru
-logger.remove()  # Remove default handler
-logger.add(
-    sys.stdout,
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> | <level>{message}</level>",
-    level="DEBUG" if settings.debug else "INFO",
-    colorize=True
-)
-
-# Add file logging for production
-logger.add(
-    "logs/photoeai_{time:YYYY-MM-DD}.log",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} | {message}",
-    level="INFO",
-    rotation="1 day",
-    retention="30 days",
-    compression="zip"
-)
+# Configure structured logging with Loguru: one queue-backed sink writes JSON lines to
+# logs/photoeai_YYYY-MM-DD.jsonl and text to stdout from a background thread
+log_sink.install(level="DEBUG" if settings.debug else "INFO")
 
 logger.info("🚀 MISSION 3: Structured logging system initialized")
 
-def cleanup_old_images():
-    """Clean up image files older than 2 hours"""
-    import time
-    import glob
-    
-    image_dir = "static/images"
-    if not os.path.exists(image_dir):
-        return
-        
-    current_time = time.time()
-    max_age = 2 * 3600  # 2 hours in seconds
-    
-    for image_file in glob.glob(os.path.join(image_dir, "img_*.png")):
-        if os.path.getmtime(image_file) < (current_time - max_age):
-            try:
-                os.remove(image_file)
-                logger.info(f"🗑️ Cleaned up old image: {image_file}")
-            except Exception as e:
-                logger.warning(f"⚠️ Failed to cleanup {image_file}: {e}")
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -63,20 +49,32 @@ async def lifespan(app: FastAPI):
     Replaces the deprecated @app.on_event decorators.
     """
     # Startup
-    print("🚀 PhotoeAI Backend starting up...")
-    print(f"📍 Environment: {'Development' if settings.debug else 'Production'}")
-    print(f"🤖 OpenAI Model: {settings.openai_model}")
+    logger.info("🚀 PhotoeAI Backend starting up...")
+    logger.info(f"📍 Environment: {'Development' if settings.debug else 'Production'}")
+    logger.info(f"🤖 OpenAI Model: {settings.openai_model}")
+    
+    # Periodic age/size-quota sweeps of static/images (first sweep runs immediately)
+    image_sweeper.start()
+    
+    # Hot-reload system-prompt/*.json without restarting in-flight generations
+    config_watcher.start()
     
-    # Cleanup old images on startup
-    cleanup_old_images()
+    # Push pipeline spans to an OpenTelemetry collector when OTEL_EXPORTER_OTLP_ENDPOINT is set
+    telemetry.start_exporter()
     
-    print("✅ Startup completed successfully")
+    startup_timings["ready_seconds"] = round(time.perf_counter() - _import_started, 4)
+    logger.info(f"✅ Startup completed successfully ({startup_timings['ready_seconds']}s since import)")
     
     yield  # Application runs here
     
     # Shutdown
-    print("🛑 PhotoeAI Backend shutting down...")
-    print("✅ Shutdown completed successfully")
+    logger.info("🛑 PhotoeAI Backend shutting down...")
+    await batch_runner.stop()  # running batch jobs are checkpointed and can be resumed
+    await config_watcher.stop()
+    await image_sweeper.stop()
+    await telemetry.stop_exporter()
+    logger.info("✅ Shutdown completed successfully")
+    log_sink.drain()  # write queued log lines (including the one above) before the process exits
 
 # Create FastAPI application instance
 app = FastAPI(
@@ -103,13 +101,122 @@ upload_dir = "static/images/uploads"
 os.makedirs(static_dir, exist_ok=True)
 os.makedirs(upload_dir, exist_ok=True)
 
-# Mount static files for serving generated images
-app.mount("/static", StaticFiles(directory="static"), name="static")
+
+@app.middleware("http")
+async def track_image_access(request: Request, call_next):
+    """Record reads of /static/images/* so the sweeper evicts least recently used files first."""
+    if request.method == "GET" and request.url.path.startswith("/static/images/"):
+        image_sweeper.touch(request.url.path[len("/static/images/"):])
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Wrap every request in a root span so pipeline stages nest under their endpoint."""
+    with telemetry.span("http.request", method=request.method, request_id=current_request_id()) as span:
+        response = await call_next(request)
+        endpoint = request.scope.get("endpoint")
+        span.name = f"http.{endpoint.__name__}" if endpoint else "http.static"
+        span.set_attribute("status_code", response.status_code)
+        return response
+
+
+@app.middleware("http")
+async def account_usage(request: Request, call_next):
+    """
+    Attribute OpenAI usage made while serving an API request to that request and endpoint,
+    identify the client for fair queuing of calls made with the server key, and write the
+    request's access log line.
+    """
+    if not request.url.path.startswith("/api/"):
+        return await call_next(request)
+    client_address = request.client.host if request.client else None
+    with usage_ledger.request_scope() as usage, rate_limiter.client_scope(client_address):
+        started = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            # One access line per API request (route template, status, time to response headers);
+            # monitor_logs_enhanced.py derives per-endpoint rates, error rates and latency from it
+            route = request.scope.get("route")
+            endpoint = getattr(route, "path", request.url.path)
+            # Usage is booked per route template (bounded), never per raw path with ids in it
+            usage.endpoint = getattr(route, "path", "unmatched")
+            duration_ms = (time.perf_counter() - started) * 1000
+            # bind() rather than extra=: loguru would str.format() the message, and route templates contain braces
+            logger.bind(endpoint=endpoint, method=request.method, status_code=status_code, duration_ms=round(duration_ms, 1)).info(
+                f"🌐 {request.method} {endpoint} → {status_code} in {duration_ms:.0f}ms [ID: {usage.request_id}]"
+            )
+
+
+
+@app.middleware("http")
+async def correlate_requests(request: Request, call_next):
+    """
+    Give every request one correlation ID (the client's X-Request-ID when well-formed):
+    services tag their log lines with it, log records carry it as request_id, OpenAI calls
+    forward it, and the response returns it. Registered last, so it wraps all other middleware.
+    """
+    with correlation_scope(request.headers.get(REQUEST_ID_HEADER)) as request_id:
+        response = await call_next(request)
+        response.headers[REQUEST_ID_HEADER] = request_id
+        return response
+
+
+@app.exception_handler(UpstreamError)
+async def upstream_error_handler(request: Request, exc: UpstreamError):
+    """Transient upstream failures (open circuit, rate limit, outage) → 503 + Retry-After; permanent ones → 502."""
+    headers = {}
+    if exc.retry_after is not None:
+        headers["Retry-After"] = str(max(1, math.ceil(exc.retry_after)))
+    return JSONResponse(
+        status_code=503 if exc.transient else 502,
+        content={"detail": str(exc), "upstream": exc.upstream, "error_class": exc.error_class},
+        headers=headers
+    )
+
+
+# Mount static files for serving generated images (strong ETags, 304/206, immutable image URLs)
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 
 # Include API routers
 app.include_router(generator_router)
 app.include_router(image_upload_router)
 app.include_router(image_analysis_router)
+app.include_router(images_router)
+app.include_router(metrics_router)
+app.include_router(admin_router)
+app.include_router(batch_router)
+app.include_router(briefs_router)
+
+
+startup_timings["import_seconds"] = round(time.perf_counter() - _import_started, 4)
+
+
+@app.get("/api/v1/startup-report", tags=["diagnostics"])
+async def startup_report(profile: bool = False, authorization: Optional[str] = Header(None),
+                         x_admin_token: Optional[str] = Header(None)):
+    """
+    Report how long this worker took to import and become ready.
+    
+    Args:
+        profile: If True, also run a fresh `-X importtime` profile of app.main (takes ~1s).
+            Spawns a subprocess, so it requires the admin token (see routers/admin.py)
+        
+    Returns:
+        Dictionary with import/ready timings, heavy modules currently loaded and optional profile
+    """
+    report = {
+        **startup_timings,
+        "heavy_modules_loaded": loaded_heavy_modules()
+    }
+    if profile:
+        require_admin(authorization, x_admin_token)
+        report["cold_import_profile"] = await asyncio.to_thread(profile_cold_import)
+    return report
 
 
 @app.get("/")
@@ -0,0 +1,56 @@
+"""
+Admin Router
+Operator-only endpoints guarded by ADMIN_TOKEN: OpenAI usage and estimated cost
+per endpoint, per hashed API key and per model.
+"""
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+
+from app.config.settings import settings
+from app.services.usage_ledger import usage_ledger, GROUPS
+
+
+def require_admin(authorization: Optional[str] = Header(None), x_admin_token: Optional[str] = Header(None)):
+    """Accept `Authorization: Bearer <ADMIN_TOKEN>` or `X-Admin-Token: <ADMIN_TOKEN>`."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=503, detail="Admin API disabled (set ADMIN_TOKEN)")
+    token = x_admin_token
+    if authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:].strip()
+    if not token or not secrets.compare_digest(token.encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
+
+
+router = APIRouter(prefix="/api/v1/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/usage")
+async def usage_summary(group_by: Optional[str] = Query(None, description="endpoint, key or model")):
+    """
+    Aggregated token usage, image calls and estimated cost.
+
+    Args:
+        group_by: Restrict the summary to one grouping (all groupings when omitted)
+
+    Returns:
+        Totals per endpoint / hashed key / model
+    """
+    if group_by is not None and group_by not in GROUPS:
+        raise HTTPException(status_code=400, detail=f"Unknown group '{group_by}' (use {', '.join(GROUPS)})")
+    return usage_ledger.summary(group_by)
+
+
+@router.get("/usage/requests")
+async def usage_requests(
+    limit: int = Query(50, ge=1, le=1000),
+    endpoint: Optional[str] = Query(None, description="Filter by route template (e.g. /api/v1/generate-image)"),
+    key: Optional[str] = Query(None, description="Filter by hashed API key (key_...)")
+):
+    """
+    Most recent per-request usage records, each with its individual OpenAI calls.
+
+    Returns:
+        List of request records, newest first
+    """
+    return {"requests": usage_ledger.recent_requests(limit=limit, endpoint=endpoint, key=key)}
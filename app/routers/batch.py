@@ -0,0 +1,78 @@
+"""
+Batch Router
+Bulk brief generation for product catalogs (CSV or JSONL upload). Jobs run in the
+background with checkpointing; results stream back as JSONL while they complete.
+Guarded by ADMIN_TOKEN like the other operator endpoints, since jobs spend the server key.
+"""
+from typing import Optional
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
+
+from app.routers.admin import require_admin
+from app.services.batch_runner import batch_runner, parse_items
+
+router = APIRouter(prefix="/api/v1/batch", tags=["batch"], dependencies=[Depends(require_admin)])
+
+
+def _job_or_404(job_id: str):
+    try:
+        return batch_runner.get_job(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Batch job '{job_id}' not found")
+
+
+@router.post("/jobs", status_code=202)
+async def create_batch_job(
+    file: UploadFile = File(..., description="CSV (user_request/prompt column, optional id/sku) or JSONL"),
+    mode: str = Form("direct", description="direct, or batch to submit through the Batch API"),
+    concurrency: Optional[int] = Form(None, ge=1, le=50000)
+):
+    """
+    Create a bulk brief job and start it.
+
+    Args:
+        file: Catalog of product requests
+        mode: "direct" (regular API calls) or "batch" (Batch-API request files)
+        concurrency: Items in flight (defaults from settings)
+
+    Returns:
+        Job metadata; poll /jobs/{job_id} or stream /jobs/{job_id}/results
+    """
+    try:
+        content = (await file.read()).decode("utf-8-sig")
+        items = parse_items(content, file.filename or "")
+        job = batch_runner.create_job(items, mode=mode, concurrency=concurrency)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch input: {e}")
+    return batch_runner.start(job["job_id"])
+
+
+@router.get("/jobs")
+async def list_batch_jobs():
+    """All batch jobs, newest first, with progress counts."""
+    return {"jobs": batch_runner.list_jobs()}
+
+
+@router.get("/jobs/{job_id}")
+async def get_batch_job(job_id: str):
+    """Status and progress (completed/failed/total) of one job."""
+    return _job_or_404(job_id)
+
+
+@router.post("/jobs/{job_id}/resume", status_code=202)
+async def resume_batch_job(job_id: str):
+    """Resume an interrupted job: completed items are skipped, failed ones retried."""
+    _job_or_404(job_id)
+    try:
+        return batch_runner.start(job_id)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/jobs/{job_id}/results")
+async def stream_batch_results(job_id: str, follow: bool = Query(True, description="Keep streaming until the job finishes")):
+    """
+    Result records as JSONL, one per finished item (a retried item appears again; the last record wins).
+    """
+    _job_or_404(job_id)
+    return StreamingResponse(batch_runner.follow_results(job_id, follow=follow), media_type="application/x-ndjson")
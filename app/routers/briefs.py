@@ -0,0 +1,90 @@
+"""
+Brief Router
+Stores briefs server-side and serves them by brief_id. A stored brief never changes, so
+GET responses carry a strong ETag (one per content-coding) and immutable caching, and
+clients that accept gzip receive the stored .txt.gz file as-is.
+"""
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from app.schemas.models import BriefUploadRequest
+from app.services.brief_store import brief_store, BRIEF_ID_PATTERN
+from app.static_files import _etag_matches, accepts_encoding
+
+router = APIRouter(prefix="/api/v1", tags=["Briefs"])
+
+# Briefs are write-once but belong to one client, so shared caches must not keep them
+BRIEF_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+def brief_file_response(request: Request, brief_id: str, download: bool = False) -> Response:
+    """
+    Response serving a stored brief: 304 on a matching If-None-Match, the gzip file when
+    the client accepts gzip, otherwise the decompressed text streamed in chunks.
+
+    Args:
+        request: Incoming request (for If-None-Match and Accept-Encoding)
+        brief_id: Stored brief to serve
+        download: Add Content-Disposition so browsers save it as photography_brief.txt
+
+    Returns:
+        200 or 304 response
+
+    Raises:
+        HTTPException: 400 for a malformed id, 404 for an unknown or expired one
+    """
+    if not BRIEF_ID_PATTERN.match(brief_id):
+        raise HTTPException(status_code=400, detail="Invalid brief id")
+    path = brief_store.compressed_path(brief_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired brief_id '{brief_id}'")
+
+    gzipped = accepts_encoding(request.headers.get("accept-encoding"), "gzip")
+    # Strong validators must differ per content-coding, or a cache could answer a 304 with the other bytes
+    etag = f'"{brief_id}-gz"' if gzipped else f'"{brief_id}"'
+    headers = {"etag": etag, "cache-control": BRIEF_CACHE_CONTROL, "vary": "Accept-Encoding"}
+    if download:
+        headers["content-disposition"] = "attachment; filename=photography_brief.txt"
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    media_type = "text/plain; charset=utf-8"
+    if gzipped:
+        response = FileResponse(path, media_type=media_type, headers={**headers, "content-encoding": "gzip"})
+        response.headers["etag"] = etag  # FileResponse overwrites it with a stat-based tag
+        return response
+    return StreamingResponse(brief_store.iter_text(brief_id), media_type=media_type, headers=headers)
+
+
+@router.post("/briefs")
+async def store_brief(request: BriefUploadRequest):
+    """
+    Store brief text and return its brief_id (identical text always gets the same id).
+
+    The id can then be sent to /generate-image, /enhance-image and /download-brief
+    instead of the text.
+    """
+    brief_id = await brief_store.put(request.text)
+    path = brief_store.compressed_path(brief_id)
+    return {
+        "brief_id": brief_id,
+        "chars": len(request.text),
+        "stored_bytes": path.stat().st_size if path else None,
+    }
+
+
+@router.get("/briefs/{brief_id}")
+async def get_brief(request: Request, brief_id: str, download: bool = Query(False, description="Serve as a photography_brief.txt attachment")):
+    """
+    Serve a stored brief as text/plain (gzip-encoded when the client accepts it).
+
+    Args:
+        brief_id: Id returned by a brief endpoint or POST /briefs
+        download: Serve as an attachment
+
+    Returns:
+        The brief text, or 304 when the client's cached copy is current
+    """
+    return brief_file_response(request, brief_id, download)
@@ -3,10 +3,12 @@ API Router for the PhotoeAI backend.
 Defines the REST API endpoints for brief generation functionality.
 """
 
-from fastapi import APIRouter, HTTPException
+from typing import Any, Dict, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse  # MISSION 2: Added for download endpoint
 from loguru import logger
 import io  # MISSION 2: Added for download endpoint
+import json
 import os
 import base64
 # Models to import (add the new ones)
@@ -21,6 +23,21 @@ from app.services.image_generator import ImageGenerationService
 from app.services.multi_provider_image_generator import OpenAIImageService
 from app.services.ai_client import AIClient
 from app.services.progress_tracker import progress_tracker
+from app.services.image_sweeper import image_sweeper
+from app.services.log_sink import log_sink
+from app.services.circuit_breaker import circuit_breakers
+from app.services.extractive_compressor import extractive_compressor
+from app.services.model_router import model_router
+from app.services.rule_extractor import rule_extractor
+from app.services.extraction_retries import extraction_retries
+from app.routers.briefs import brief_file_response
+from app.services.brief_store import brief_store
+from app.services.pipeline_context import pipeline_contexts, PipelineContext, STAGES
+from app.services.rate_limiter import rate_limiter
+from app.services.resilience import resilience, UpstreamError
+from app.services.telemetry import telemetry
+from app.services.token_budget import token_budget
+from app.config.settings import settings
 
 # Create router instance and orchestrator (existing)
 router = APIRouter(prefix="/api/v1", tags=["generator"])
@@ -58,6 +75,7 @@ def load_image_from_filename(filename: str) -> str:
             image_data = image_file.read()
             base64_string = base64.b64encode(image_data).decode('utf-8')
             
+        image_sweeper.touch(f"uploads/{filename}")
         logger.info(f"✅ Loaded image from file: {filename} ({len(image_data)} bytes)")
         return base64_string
         
@@ -96,7 +114,7 @@ async def extract_and_fill(request: InitialUserRequest) -> WizardInput:
         HTTPException: If the extraction process fails
     """
     try:
-        logger.info(f"🌟 [FRONTEND REQUEST] Extract and fill: '{request.user_request[:100]}...'")
+        logger.info(f"🌟 [FRONTEND REQUEST] Extract and fill ({len(request.user_request)} chars): '{request.user_request[:100]}...'")
         
         if not request.user_request or not request.user_request.strip():
             logger.warning("❌ [FRONTEND REQUEST] Empty user request received")
@@ -109,7 +127,7 @@ async def extract_and_fill(request: InitialUserRequest) -> WizardInput:
         logger.info(f"✅ [FRONTEND RESPONSE] Extract and fill completed successfully")
         return wizard_input
         
-    except HTTPException:
+    except (HTTPException, UpstreamError):
         raise
     except Exception as e:
         logger.error(f"💥 [FRONTEND ERROR] Extract and fill failed: {e}")
@@ -147,7 +165,7 @@ async def generate_brief(wizard_input: WizardInput) -> BriefOutput:
         HTTPException: If the brief generation process fails
     """
     try:
-        logger.info(f"🌟 [FRONTEND REQUEST] Generate brief for product: '{wizard_input.product_name}'")
+        logger.info(f"🌟 [FRONTEND REQUEST] Generate brief for product: '{wizard_input.product_name}' ({len(wizard_input.user_request or '')} chars)")
         
         # Basic validation - ensure at least product name or user request exists
         if not wizard_input.product_name and not wizard_input.user_request:
@@ -166,10 +184,15 @@ async def generate_brief(wizard_input: WizardInput) -> BriefOutput:
                 detail="Generated brief is empty. Please try again."
             )
         
+        context = pipeline_contexts.create(wizard_input.user_request or "")
+        context.wizard_input = wizard_input
+        await pipeline_contexts.set_brief(context, brief_output.final_prompt)
+        brief_output.brief_id = context.brief_id
+        
         logger.info(f"✅ [FRONTEND RESPONSE] Brief generated successfully ({len(brief_output.final_prompt)} chars)")
         return brief_output
         
-    except HTTPException:
+    except (HTTPException, UpstreamError):
         raise
     except Exception as e:
         logger.error(f"💥 [FRONTEND ERROR] Brief generation failed: {e}")
@@ -221,14 +244,68 @@ async def health_check():
         Dictionary with service status
     """
     return {
-        "status": "healthy",
+        "status": "degraded" if circuit_breakers.any_open() else "healthy",
         "service": "PhotoeAI Backend",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "config_fingerprint": settings.config_fingerprint,
+        "image_storage": image_sweeper.stats(),
+        "circuit_breakers": circuit_breakers.snapshot(),
+        "rate_limits": rate_limiter.stats(),
+        "model_routing": model_router.snapshot(),
+        "rule_extraction": rule_extractor.stats(),
+        "extraction_retries": extraction_retries.stats(),
+        "pipeline_contexts": pipeline_contexts.stats(),
+        "brief_store": brief_store.stats(),
+        "token_budget": token_budget.stats(),
+        "logging": log_sink.stats()
     }
 
 
 # --- NEW ENDPOINTS ---
 
+async def _build_brief_context(request: InitialUserRequest) -> PipelineContext:
+    """
+    Run extraction and brief enhancement once, recording both artifacts under a new brief_id.
+    
+    Args:
+        request: Simple user prompt
+        
+    Returns:
+        The pipeline context holding the WizardInput and the enhanced brief
+    """
+    context = pipeline_contexts.create(request.user_request)
+    
+    # Step 1: Extract structured data from user prompt
+    context.wizard_input = await orchestrator.extract_and_autofill(request)
+    
+    # Step 2: Generate comprehensive enhanced brief
+    brief_result = await orchestrator.generate_final_brief(context.wizard_input)
+    await pipeline_contexts.set_brief(context, brief_result.final_prompt)
+    return context
+
+
+async def _context_or_404(brief_id: str) -> PipelineContext:
+    """Pipeline context holding a finished brief for `brief_id`."""
+    context = await pipeline_contexts.get(brief_id)
+    if context is None or context.brief is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired brief_id '{brief_id}'")
+    return context
+
+
+async def _prompts_from_context(context: PipelineContext) -> Tuple[str, str]:
+    """Generation prompts for a context's finished brief; extraction and enhancement are never rerun, compression at most once."""
+    if context.generation_prompt is not None:
+        pipeline_contexts.record_skip(context, *STAGES)
+    else:
+        pipeline_contexts.record_skip(context, "extract", "brief")
+        if not token_budget.needs_compression(context.brief):
+            context.generation_prompt = context.brief
+        else:
+            logger.info("📦 Brief too long, applying smart compression")
+            context.generation_prompt = await _create_smart_compressed_prompt(context.brief)
+    return context.brief, context.generation_prompt
+
+
 @router.post("/generate-brief-from-prompt", response_model=BriefOutput)
 async def generate_brief_from_prompt(request: InitialUserRequest) -> BriefOutput:
     """
@@ -239,18 +316,16 @@ async def generate_brief_from_prompt(request: InitialUserRequest) -> BriefOutput
         if not request.user_request or not request.user_request.strip():
             raise HTTPException(status_code=400, detail="User request cannot be empty.")
         
-        logger.info(f"📝 Creating comprehensive brief from simple prompt: {request.user_request[:100]}...")
+        logger.info(f"📝 Creating comprehensive brief from simple prompt ({len(request.user_request)} chars): {request.user_request[:100]}...")
         
-        # Step 1: Extract structured data from user prompt
-        wizard_input = await orchestrator.extract_and_autofill(request)
-        
-        # Step 2: Generate comprehensive enhanced brief
-        brief_result = await orchestrator.generate_final_brief(wizard_input)
+        context = await _build_brief_context(request)
         
-        logger.info(f"✅ Generated comprehensive brief ({len(brief_result.final_prompt)} characters)")
+        logger.info(f"✅ Generated comprehensive brief ({len(context.brief)} characters) [{context.brief_id}]")
         
-        return brief_result
+        return BriefOutput(final_prompt=context.brief, brief_id=context.brief_id)
         
+    except UpstreamError:
+        raise  # mapped to 503/502 with Retry-After by the app-level handler
     except Exception as e:
         logger.error(f"Error in /generate-brief-from-prompt endpoint: {e}")
         raise HTTPException(status_code=500, detail=f"Brief generation failed: {str(e)}")
@@ -284,6 +359,8 @@ async def generate_text_advanced(request: TextGenerationRequest) -> TextOutput:
             }
         )
         
+    except UpstreamError:
+        raise  # mapped to 503/502 with Retry-After by the app-level handler
     except Exception as e:
         logger.error(f"💥 Advanced text generation failed: {e}")
         raise HTTPException(status_code=500, detail=f"Text generation failed: {str(e)}")
@@ -336,11 +413,123 @@ async def generate_text(request: InitialUserRequest) -> BriefOutput:
             }
         )
         
+    except UpstreamError:
+        raise  # mapped to 503/502 with Retry-After by the app-level handler
     except Exception as e:
         logger.error(f"💥 Text generation failed: {e}")
         raise HTTPException(status_code=500, detail=f"Text generation failed: {str(e)}")
 
 
+async def _prepare_generation_prompts(request: ImageGenerationRequest,
+                                      context: Optional[PipelineContext] = None) -> Tuple[str, str]:
+    """
+    Turn the request's brief prompt into the prompts used for image generation.
+    
+    Args:
+        request: Image generation request (brief_prompt, use_raw_prompt)
+        context: Pipeline context of request.brief_id, whose artifacts are reused
+        
+    Returns:
+        (comprehensive_prompt shown to the user, generation_prompt sent to the image API)
+    """
+    if context is not None:
+        return await _prompts_from_context(context)
+    
+    # If user explicitly requests raw prompt, use it directly
+    if request.use_raw_prompt:
+        logger.info("🔧 Raw prompt mode activated - using prompt as-is")
+        generation_prompt = request.brief_prompt
+        comprehensive_prompt = request.brief_prompt
+    else:
+        # ⚡ OPTIMIZED WORKFLOW: Single extraction, efficient processing
+        logger.info("🎯 Starting optimized brief processing workflow")
+        
+        try:
+            # Step 1: Extract wizard data ONCE (efficient approach)
+            initial_request = InitialUserRequest(user_request=request.brief_prompt)
+            wizard_input = await orchestrator.extract_and_autofill(initial_request)
+            logger.info("✅ Wizard data extracted successfully")
+            
+            # Step 2: Always use comprehensive enhancement that integrates user prompt + wizard
+            # Detect if the prompt is comprehensive to determine enhancement method
+            is_comprehensive_brief = token_budget.is_comprehensive(request.brief_prompt)
+            
+            if is_comprehensive_brief:
+                logger.info("📋 Comprehensive prompt detected - applying comprehensive enhancement")
+                
+                try:
+                    # Use comprehensive enhancement that preserves user prompt & combines with wizard data
+                    enhanced_brief = await _create_comprehensive_enhanced_brief(
+                        original_prompt=request.brief_prompt,
+                        wizard_input=wizard_input
+                    )
+                    
+                    comprehensive_prompt = enhanced_brief
+                    generation_prompt = enhanced_brief
+                    logger.info(f"📄 Comprehensive enhanced brief ready: {len(enhanced_brief)} chars")
+                    
+                except Exception as enhancement_error:
+                    logger.warning(f"⚠️ Enhancement failed, using original comprehensive prompt: {enhancement_error}")
+                    # Fallback: Use original comprehensive prompt
+                    comprehensive_prompt = request.brief_prompt
+                    generation_prompt = request.brief_prompt
+            
+            else:
+                # Simpler prompt but still using optimized enhancement that integrates user prompt
+                logger.info("🔧 Simpler prompt detected - applying optimized enhancement")
+                
+                try:
+                    # Use _create_optimized_enhanced_brief to integrate user prompt with wizard data
+                    enhanced_brief = await _create_optimized_enhanced_brief(
+                        original_prompt=request.brief_prompt,
+                        wizard_input=wizard_input,
+                        skip_extraction=True  # Skip re-extraction since we already have wizard data
+                    )
+                    
+                    comprehensive_prompt = enhanced_brief
+                    
+                    # Smart length optimization for generation
+                    if not token_budget.needs_compression(enhanced_brief):
+                        logger.info("📄 Using full enhanced brief (within the image prompt limit)")
+                        generation_prompt = enhanced_brief
+                    else:
+                        logger.info("📦 Brief too long, applying smart compression")
+                        generation_prompt = await _create_smart_compressed_prompt(enhanced_brief)
+                        
+                except Exception as brief_generation_error:
+                    logger.warning(f"⚠️ Brief generation failed, using enhanced original: {brief_generation_error}")
+                    # Fallback: Create basic enhanced version from original prompt
+                    comprehensive_prompt = f"High-quality, professional, realistic photograph: {request.brief_prompt}. Ultra-detailed, HD quality, cinematic lighting, sharp focus."
+                    generation_prompt = comprehensive_prompt
+                    
+        except Exception as wizard_extraction_error:
+            logger.error(f"💥 Wizard extraction failed: {wizard_extraction_error}")
+            # Ultimate fallback: Use original prompt with basic enhancement
+            logger.info("🚨 Using emergency fallback - basic prompt enhancement")
+            comprehensive_prompt = f"Professional photography, high quality, realistic: {request.brief_prompt}. Ultra-detailed, HD, sharp focus."
+            generation_prompt = comprehensive_prompt
+    
+    return comprehensive_prompt, generation_prompt
+
+
+def _resolve_uploaded_image(request: ImageGenerationRequest) -> Optional[str]:
+    """Base64 of the request's uploaded image (by filename or inline base64), or None."""
+    if request.uploaded_image_filename:
+        # NEW: Load from filename (lighter requests!)
+        logger.info(f"📁 Loading image from file: {request.uploaded_image_filename}")
+        return load_image_from_filename(request.uploaded_image_filename)
+    if request.uploaded_image_base64:
+        # OLD: Use base64 directly (backward compatibility)
+        logger.info("📊 Using provided base64 image data")
+        return request.uploaded_image_base64
+    return None
+
+
+def _variant_summary(output: ImageOutput) -> Dict[str, Any]:
+    """Compact description of an extra variant (listed in ImageOutput.variant_images)."""
+    return {"image_url": output.image_url, "generation_id": output.generation_id, "derivatives": output.derivatives}
+
+
 @router.post("/generate-image", response_model=ImageOutput)
 async def generate_image(request: ImageGenerationRequest) -> ImageOutput:
     """
@@ -356,9 +545,9 @@ async def generate_image(request: ImageGenerationRequest) -> ImageOutput:
         logger.info(f"🌟 [FRONTEND REQUEST] Generate image - Prompt length: {len(request.brief_prompt)} chars")
         logger.info(f"🔑 [FRONTEND REQUEST] Provider: {request.provider or 'Auto-detect'}")
         
-        if not request.brief_prompt or not request.brief_prompt.strip():
+        if not request.brief_id and (not request.brief_prompt or not request.brief_prompt.strip()):
             logger.warning("❌ [FRONTEND REQUEST] Empty brief prompt received")
-            raise HTTPException(status_code=400, detail="Brief prompt cannot be empty.")
+            raise HTTPException(status_code=400, detail="Brief prompt or brief_id is required.")
         
         if not request.user_api_key or not request.user_api_key.strip():
             logger.warning("❌ [FRONTEND REQUEST] Missing API key")
@@ -369,96 +558,18 @@ async def generate_image(request: ImageGenerationRequest) -> ImageOutput:
             logger.warning("❌ [FRONTEND REQUEST] Invalid API key format")
             raise HTTPException(status_code=400, detail="Invalid API key format. Please check your OpenAI API key.")
         
+        # Fail fast before spending LLM tokens on a brief the image API cannot render right now
+        resilience.ensure_available("images.generate")
+        
         logger.info(f"🎨 [PROCESSING] Generating image from prompt ({len(request.brief_prompt)} characters)")
         
-        # If user explicitly requests raw prompt, use it directly
-        if request.use_raw_prompt:
-            logger.info("🔧 Raw prompt mode activated - using prompt as-is")
-            generation_prompt = request.brief_prompt
-            comprehensive_prompt = request.brief_prompt
-        else:
-            # ⚡ OPTIMIZED WORKFLOW: Single extraction, efficient processing
-            logger.info("🎯 Starting optimized brief processing workflow")
-            
-            try:
-                # Step 1: Extract wizard data ONCE (efficient approach)
-                initial_request = InitialUserRequest(user_request=request.brief_prompt)
-                wizard_input = await orchestrator.extract_and_autofill(initial_request)
-                logger.info("✅ Wizard data extracted successfully")
-                
-                # Step 2: Always use comprehensive enhancement that integrates user prompt + wizard
-                # Detect if the prompt is comprehensive to determine enhancement method
-                is_comprehensive_brief = len(request.brief_prompt) > 300  # Consider longer prompts as comprehensive
-                
-                if is_comprehensive_brief:
-                    logger.info("📋 Comprehensive prompt detected - applying comprehensive enhancement")
-                    
-                    try:
-                        # Use comprehensive enhancement that preserves user prompt & combines with wizard data
-                        enhanced_brief = await _create_comprehensive_enhanced_brief(
-                            original_prompt=request.brief_prompt,
-                            wizard_input=wizard_input
-                        )
-                        
-                        comprehensive_prompt = enhanced_brief
-                        generation_prompt = enhanced_brief
-                        logger.info(f"📄 Comprehensive enhanced brief ready: {len(enhanced_brief)} chars")
-                        
-                    except Exception as enhancement_error:
-                        logger.warning(f"⚠️ Enhancement failed, using original comprehensive prompt: {enhancement_error}")
-                        # Fallback: Use original comprehensive prompt
-                        comprehensive_prompt = request.brief_prompt
-                        generation_prompt = request.brief_prompt
-                
-                else:
-                    # Simpler prompt but still using optimized enhancement that integrates user prompt
-                    logger.info("🔧 Simpler prompt detected - applying optimized enhancement")
-                    
-                    try:
-                        # Use _create_optimized_enhanced_brief to integrate user prompt with wizard data
-                        enhanced_brief = await _create_optimized_enhanced_brief(
-                            original_prompt=request.brief_prompt,
-                            wizard_input=wizard_input,
-                            skip_extraction=True  # Skip re-extraction since we already have wizard data
-                        )
-                        
-                        comprehensive_prompt = enhanced_brief
-                        
-                        # Smart length optimization for generation
-                        if len(enhanced_brief) <= 20000:  # Increased limit to 20K
-                            logger.info("📄 Using full enhanced brief (within 20K limit)")
-                            generation_prompt = enhanced_brief
-                        else:
-                            logger.info("📦 Brief too long, applying smart compression")
-                            generation_prompt = await _create_smart_compressed_prompt(enhanced_brief)
-                            
-                    except Exception as brief_generation_error:
-                        logger.warning(f"⚠️ Brief generation failed, using enhanced original: {brief_generation_error}")
-                        # Fallback: Create basic enhanced version from original prompt
-                        comprehensive_prompt = f"High-quality, professional, realistic photograph: {request.brief_prompt}. Ultra-detailed, HD quality, cinematic lighting, sharp focus."
-                        generation_prompt = comprehensive_prompt
-                        
-            except Exception as wizard_extraction_error:
-                logger.error(f"💥 Wizard extraction failed: {wizard_extraction_error}")
-                # Ultimate fallback: Use original prompt with basic enhancement
-                logger.info("🚨 Using emergency fallback - basic prompt enhancement")
-                comprehensive_prompt = f"Professional photography, high quality, realistic: {request.brief_prompt}. Ultra-detailed, HD, sharp focus."
-                generation_prompt = comprehensive_prompt
+        context = await _context_or_404(request.brief_id) if request.brief_id else None
+        comprehensive_prompt, generation_prompt = await _prepare_generation_prompts(request, context)
         
         logger.info(f"🎯 Using optimized generation prompt ({len(generation_prompt)} characters)")
         
         # FIX: Handle both filename and base64 input methods (consistency with breakthrough)
-        uploaded_image_base64 = None
-        
-        if request.uploaded_image_filename:
-            # NEW: Load from filename (lighter requests!)
-            logger.info(f"📁 Loading image from file: {request.uploaded_image_filename}")
-            uploaded_image_base64 = load_image_from_filename(request.uploaded_image_filename)
-            
-        elif request.uploaded_image_base64:
-            # OLD: Use base64 directly (backward compatibility)
-            logger.info("📊 Using provided base64 image data")
-            uploaded_image_base64 = request.uploaded_image_base64
+        uploaded_image_base64 = _resolve_uploaded_image(request)
         
         # Progress callback untuk real-time updates with tracker
         progress_messages = []
@@ -468,15 +579,35 @@ async def generate_image(request: ImageGenerationRequest) -> ImageOutput:
             progress_tracker.add_message(session_id, message)
             logger.info(f"📡 PROGRESS: {message}")
         
-        # Generate image with optimized prompt
-        result = await openai_service.generate_image(
-            brief_prompt=generation_prompt,
-            user_api_key=request.user_api_key,
-            negative_prompt=request.negative_prompt,
-            provider_override=request.provider,
-            uploaded_image_base64=uploaded_image_base64,
-            progress_callback=progress_callback
-        )
+        if request.variant_count > 1:
+            # One brief, several renders: first successful variant is the main result
+            outputs = {}
+            async for index, output in openai_service.generate_variants(
+                brief_prompt=generation_prompt,
+                user_api_key=request.user_api_key,
+                count=request.variant_count,
+                strategy=request.variant_strategy,
+                negative_prompt=request.negative_prompt,
+                provider_override=request.provider,
+                uploaded_image_base64=uploaded_image_base64,
+                progress_callback=progress_callback
+            ):
+                outputs[index] = output
+            rendered = [outputs[index] for index in sorted(outputs) if isinstance(outputs[index], ImageOutput)]
+            if not rendered:
+                raise next(iter(outputs.values()))
+            result = rendered[0]
+            result.variant_images = [_variant_summary(output) for output in rendered[1:]] or None
+        else:
+            # Generate image with optimized prompt
+            result = await openai_service.generate_image(
+                brief_prompt=generation_prompt,
+                user_api_key=request.user_api_key,
+                negative_prompt=request.negative_prompt,
+                provider_override=request.provider,
+                uploaded_image_base64=uploaded_image_base64,
+                progress_callback=progress_callback
+            )
         
         # Ensure the result includes the full comprehensive prompt for frontend display
         result.final_enhanced_prompt = comprehensive_prompt
@@ -497,10 +628,76 @@ async def generate_image(request: ImageGenerationRequest) -> ImageOutput:
     except Exception as e:
         # Mark session as error
         progress_tracker.set_error(session_id, str(e))
+        if isinstance(e, (UpstreamError, HTTPException)):
+            raise  # UpstreamError is mapped to 503/502 with Retry-After by the app-level handler
         logger.error(f"Error in /generate-image endpoint: {e}")
         raise HTTPException(status_code=503, detail=f"Image generation service is unavailable: {str(e)}")
 
 
+@router.post("/generate-image/stream")
+async def generate_image_stream(request: ImageGenerationRequest):
+    """
+    Generate `variant_count` images from one brief, streaming each variant as soon as it is stored.
+    
+    The brief is prepared once, then rendered with `variant_strategy` ("n": one upstream call
+    returning several images; "fanout": concurrent single-image calls).
+    
+    Returns:
+        NDJSON events: {"event": "brief"}, one {"event": "variant"} or {"event": "error"} per
+        variant in completion order, then {"event": "done"}
+    """
+    if not request.brief_id and (not request.brief_prompt or not request.brief_prompt.strip()):
+        raise HTTPException(status_code=400, detail="Brief prompt or brief_id is required.")
+    if not request.user_api_key or not request.user_api_key.strip():
+        raise HTTPException(status_code=400, detail="User API key is required for image generation.")
+    if "sk-proj-" not in request.user_api_key and "sk-" not in request.user_api_key:
+        raise HTTPException(status_code=400, detail="Invalid API key format. Please check your OpenAI API key.")
+    
+    context = await _context_or_404(request.brief_id) if request.brief_id else None
+    resilience.ensure_available("images.generate")
+    session_id = progress_tracker.create_session()
+    logger.info(f"🌊 [STREAM] Generate {request.variant_count} image variants ({request.variant_strategy}) - Session: {session_id}")
+    
+    async def progress_callback(message: str):
+        progress_tracker.add_message(session_id, message)
+    
+    async def events():
+        rendered = failed = 0
+        try:
+            comprehensive_prompt, generation_prompt = await _prepare_generation_prompts(request, context)
+            yield json.dumps({"event": "brief", "session_id": session_id,
+                              "final_enhanced_prompt": comprehensive_prompt, "revised_prompt": generation_prompt}) + "\n"
+            async for index, output in openai_service.generate_variants(
+                brief_prompt=generation_prompt,
+                user_api_key=request.user_api_key,
+                count=request.variant_count,
+                strategy=request.variant_strategy,
+                negative_prompt=request.negative_prompt,
+                provider_override=request.provider,
+                uploaded_image_base64=_resolve_uploaded_image(request),
+                progress_callback=progress_callback
+            ):
+                if isinstance(output, ImageOutput):
+                    rendered += 1
+                    output.final_enhanced_prompt = comprehensive_prompt
+                    output.revised_prompt = generation_prompt
+                    output.session_id = session_id
+                    yield json.dumps({"event": "variant", "index": index, "image": output.model_dump(mode="json")}) + "\n"
+                else:
+                    failed += 1
+                    yield json.dumps({"event": "error", "index": index, "detail": str(output)}) + "\n"
+        except Exception as e:
+            # Headers are already sent, so failures are reported in-band
+            logger.error(f"Error in /generate-image/stream endpoint: {e}")
+            progress_tracker.set_error(session_id, str(e))
+            yield json.dumps({"event": "error", "index": None, "detail": str(e)}) + "\n"
+        else:
+            progress_tracker.set_completed(session_id, {'variants_rendered': rendered, 'variants_failed': failed})
+        yield json.dumps({"event": "done", "session_id": session_id, "rendered": rendered, "failed": failed}) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
 @router.post("/generate-image-breakthrough", response_model=ImageOutput)
 async def generate_image_breakthrough(request: ImageGenerationRequest) -> ImageOutput:
     """
@@ -521,8 +718,14 @@ async def generate_image_breakthrough(request: ImageGenerationRequest) -> ImageO
         logger.info(f"🚀 [BREAKTHROUGH] GPT Image-1 Edit API - Session: {session_id}")
         logger.info(f"🎯 [BREAKTHROUGH] Shape preservation mode activated")
         
-        if not request.brief_prompt or not request.brief_prompt.strip():
-            raise HTTPException(status_code=400, detail="Brief prompt cannot be empty.")
+        brief_prompt = request.brief_prompt
+        if request.brief_id:
+            context = await _context_or_404(request.brief_id)
+            pipeline_contexts.record_skip(context, "extract", "brief")
+            brief_prompt = context.brief
+        
+        if not brief_prompt or not brief_prompt.strip():
+            raise HTTPException(status_code=400, detail="Brief prompt or brief_id is required.")
         
         if not request.user_api_key or not request.user_api_key.strip():
             raise HTTPException(status_code=400, detail="User API key is required.")
@@ -558,6 +761,8 @@ async def generate_image_breakthrough(request: ImageGenerationRequest) -> ImageO
         if "sk-proj-" not in request.user_api_key and "sk-" not in request.user_api_key:
             raise HTTPException(status_code=400, detail="Invalid API key format.")
         
+        resilience.ensure_available("images.edit")
+        
         logger.info(f"🔥 [BREAKTHROUGH] Processing with Edit API for shape preservation")
         
         # Progress tracking callback
@@ -566,10 +771,11 @@ async def generate_image_breakthrough(request: ImageGenerationRequest) -> ImageO
         
         # BREAKTHROUGH: Use Edit API instead of generation
         result = await openai_service.generate_with_breakthrough_edit(
-            brief_prompt=request.brief_prompt,
+            brief_prompt=brief_prompt,
             user_api_key=request.user_api_key,
             uploaded_image_base64=uploaded_image_base64,
-            progress_callback=progress_callback
+            progress_callback=progress_callback,
+            variant_count=request.variant_count
         )
         
         # FIX: Add missing required fields for ImageOutput schema (KEEP comprehensive prompt from service)
@@ -595,6 +801,8 @@ async def generate_image_breakthrough(request: ImageGenerationRequest) -> ImageO
     except Exception as e:
         # Mark session as error
         progress_tracker.set_error(session_id, str(e))
+        if isinstance(e, (UpstreamError, HTTPException)):
+            raise  # UpstreamError is mapped to 503/502 with Retry-After by the app-level handler
         logger.error(f"💥 Error in /generate-image-breakthrough endpoint: {e}")
         raise HTTPException(status_code=503, detail=f"Breakthrough image generation failed: {str(e)}")
 
@@ -608,13 +816,13 @@ async def generate_brief_and_image(request: ImageGenerationRequest):
     try:
         logger.info(f"🚀 [UNIFIED] Starting brief + image generation")
         
-        # Step 1: Generate brief from user request
+        # Step 1: Generate brief from user request (extraction + enhancement, recorded under a brief_id)
         initial_request = InitialUserRequest(user_request=request.brief_prompt)
         brief_result = await generate_brief_from_prompt(initial_request)
         
-        # Step 2: Generate image using the enhanced brief
+        # Step 2: Generate image from the brief's artifacts (no second extraction or enhancement pass)
         image_request = ImageGenerationRequest(
-            brief_prompt=brief_result.final_prompt,
+            brief_id=brief_result.brief_id,
             user_api_key=request.user_api_key,
             provider=request.provider
         )
@@ -626,6 +834,8 @@ async def generate_brief_and_image(request: ImageGenerationRequest):
             "image": image_result
         }
         
+    except UpstreamError:
+        raise  # mapped to 503/502 with Retry-After by the app-level handler
     except Exception as e:
         logger.error(f"Error in unified endpoint: {e}")
         raise HTTPException(status_code=500, detail=f"Unified generation failed: {str(e)}")
@@ -652,6 +862,7 @@ def _is_comprehensive_descriptive_prompt(prompt: str) -> bool:
     return False  # Force all prompts through wizard for full brief generation
 
 
+@telemetry.traced("brief.enhance.optimized")
 async def _create_optimized_enhanced_brief(original_prompt: str, wizard_input, skip_extraction: bool = False) -> str:
     """
     ⚡ OPTIMIZED: Create enhanced brief efficiently using pre-extracted wizard data.
@@ -750,11 +961,14 @@ ENHANCED PHOTOGRAPHY BRIEF:
         return enhanced_brief
         
     except Exception as e:
+        if isinstance(e, UpstreamError):
+            raise  # another LLM call would fail the same way; let the caller degrade without one
         logger.warning(f"⚡ Optimized enhancement failed: {e}, using fallback")
         # Fallback: Use original ChatGPT-quality enhancement
         return await _create_chatgpt_quality_enhanced_brief(original_prompt, wizard_input)
 
 
+@telemetry.traced("brief.enhance.natural")
 async def _create_chatgpt_quality_enhanced_brief(original_prompt: str, wizard_input) -> str:
     """
     Create enhanced brief that preserves ChatGPT Image quality while adding technical depth.
@@ -829,10 +1043,13 @@ ENHANCED NATURAL PHOTOGRAPHY PROMPT:
         return enhanced_brief
         
     except Exception as e:
+        if isinstance(e, UpstreamError):
+            raise  # another LLM call would fail the same way; let the caller degrade without one
         logger.warning(f"ChatGPT-quality enhancement failed: {e}, falling back to comprehensive enhancement")
         return await _create_comprehensive_enhanced_brief(original_prompt, wizard_input)
 
 
+@telemetry.traced("brief.enhance.comprehensive")
 async def _create_comprehensive_enhanced_brief(original_prompt: str, wizard_input) -> str:
     """
     Create an enhanced comprehensive brief by combining user's detailed prompt 
@@ -919,6 +1136,8 @@ ENHANCED COMPREHENSIVE BRIEF:
         return enhanced_brief
         
     except Exception as e:
+        if isinstance(e, UpstreamError):
+            raise  # another LLM call would fail the same way; let the caller degrade without one
         logger.warning(f"Enhancement failed: {e}, falling back to wizard-generated brief")
         
         # Fallback: use orchestrator to generate standard brief
@@ -926,22 +1145,30 @@ ENHANCED COMPREHENSIVE BRIEF:
         return brief_result.final_prompt
 
 
+@telemetry.traced("prompt.compress")
 async def _create_smart_compressed_prompt(comprehensive_brief: str) -> str:
     """
     Create an optimized prompt that preserves essential technical details while staying under DALL-E limits.
     Unlike basic compression, this preserves key technical specifications.
     
-    Updated: Now uses 20,000 character limit for GPT Image-1 Edit API compatibility (32K max).
+    The limit is the GPT Image-1 prompt budget (32K characters less what the image stage adds).
+    Compression is local and extractive by default (BRIEF_COMPRESSOR=llm restores the LLM call).
     """
-    # If it's already short enough, use as-is (increased limit to 20K)
-    if len(comprehensive_brief) <= 20000:
+    # If it's already short enough, use as-is
+    if not token_budget.needs_compression(comprehensive_brief):
         return comprehensive_brief
     
+    budget = token_budget.image_prompt_budget()
+    if settings.brief_compressor != "llm":
+        compressed = extractive_compressor.compress(comprehensive_brief, max_chars=budget)
+        logger.info(f"✅ Extractive compression: {len(comprehensive_brief)} → {len(compressed)} characters")
+        return compressed
+    
     logger.info("📝 Creating smart compressed prompt preserving technical details")
     
     # Use AI to intelligently compress while preserving technical details
     compression_instruction = f"""
-You are an expert prompt engineer. Your task is to compress the following comprehensive photography brief into a concise but highly detailed prompt under 19000 characters while preserving ALL critical technical specifications.
+You are an expert prompt engineer. Your task is to compress the following comprehensive photography brief into a concise but highly detailed prompt under {budget} characters while preserving ALL critical technical specifications.
 
 COMPRESSION REQUIREMENTS:
 1. PRESERVE: Camera model, lens specifications, lighting equipment, exact technical settings
@@ -964,115 +1191,36 @@ Create a compressed version that maintains technical precision while removing re
         compressed = await ai_client.generate_text(
             prompt=compression_instruction,
             temperature=0.6,  # Standardized temperature
-            max_tokens=1500   # Sufficient for compressed output
+            max_tokens=token_budget.completion_tokens_for(comprehensive_brief, budget),  # room for the full budget
+            task="compress"
         )
         
-        # Ensure it's within limits (increased to 20K)
-        if len(compressed) <= 20000:
+        # Ensure it's within limits
+        if len(compressed) <= budget:
             logger.info(f"✅ Smart compression successful: {len(comprehensive_brief)} → {len(compressed)} characters")
             return compressed
         else:
-            # Fallback to extraction-based compression if AI compression is still too long
-            logger.warning("AI compression still too long, using extraction fallback")
-            return _extract_key_technical_elements(comprehensive_brief)
+            # Fall back to local compression if AI compression is still too long
+            logger.warning("AI compression still too long, using extractive fallback")
+            return extractive_compressor.compress(comprehensive_brief, max_chars=budget)
             
     except Exception as e:
-        logger.warning(f"Smart compression failed: {e}, using extraction fallback")
-        return _extract_key_technical_elements(comprehensive_brief)
-
-
-def _extract_key_technical_elements(comprehensive_brief: str) -> str:
-    """Extract and combine the most important technical elements from a comprehensive brief."""
-    
-    import re
-    
-    # Extract key technical sections using pattern matching
-    sections_to_extract = {
-        "subject": r"(?:product|subject):\s*([^\.]+)",
-        "camera": r"(?:camera|equipment):\s*([^\.]+)",
-        "lens": r"(?:lens):\s*([^\.]+)", 
-        "lighting": r"(?:lighting|illumination):\s*([^\.]+)",
-        "composition": r"(?:composition|framing):\s*([^\.]+)",
-        "background": r"(?:background|environment|setting):\s*([^\.]+)",
-        "style": r"(?:style|aesthetic):\s*([^\.]+)"
-    }
-    
-    extracted_elements = []
-    brief_lower = comprehensive_brief.lower()
-    
-    # Try to extract each section
-    for section_name, pattern in sections_to_extract.items():
-        matches = re.findall(pattern, brief_lower, re.IGNORECASE)
-        if matches:
-            # Take the first match and clean it up
-            content = matches[0].strip()
-            if len(content) > 10:  # Only include substantial content
-                extracted_elements.append(content)
-    
-    # If extraction failed, create a structured prompt from key terms
-    if len(extracted_elements) < 3:
-        # Look for specific technical terms and equipment
-        technical_terms = []
-        key_terms = [
-            "canon eos", "sony", "nikon", "phase one", "profoto", "softbox", 
-            "key light", "fill light", "rim light", "f/", "85mm", "50mm", "macro",
-            "studio lighting", "natural light", "golden hour", "bokeh", "depth of field",
-            "rule of thirds", "leading lines", "symmetry", "marble", "wood", "leather",
-            "luxury", "premium", "elegant", "sophisticated", "professional"
-        ]
-        
-        for term in key_terms:
-            if term in brief_lower:
-                technical_terms.append(term)
-        
-        # Create a fallback technical prompt
-        product_name = "luxury product"  # Default
-        
-        # Try to identify the product name
-        product_patterns = [
-            r"product photography of\s+([^,\.]+)",
-            r"photograph\s+(?:of\s+)?(?:a\s+|the\s+)?([^,\.]+)",
-            r"([a-zA-Z\s]+)\s+(?:bottle|jar|container|package|box)"
-        ]
-        
-        for pattern in product_patterns:
-            match = re.search(pattern, brief_lower, re.IGNORECASE)
-            if match:
-                product_name = match.group(1).strip()
-                break
-        
-        # Construct technical prompt
-        compressed = f"Professional product photography of {product_name}"
-        
-        if "canon eos" in brief_lower or "sony" in brief_lower:
-            compressed += ", shot with professional DSLR camera"
-        if "85mm" in brief_lower or "macro" in brief_lower:
-            compressed += ", 85mm lens with shallow depth of field"
-        if "softbox" in brief_lower or "studio lighting" in brief_lower:
-            compressed += ", studio softbox lighting setup"
-        if "luxury" in brief_lower or "premium" in brief_lower:
-            compressed += ", luxury premium presentation"
-        if "marble" in brief_lower:
-            compressed += ", marble background surface"
-        
-        compressed += ", professional commercial photography, ultra-detailed, 8K resolution, photorealistic"
-        
-        return compressed
-    
-    # Combine extracted elements into a coherent prompt
-    combined = "Professional product photography: " + ". ".join(extracted_elements[:6])  # Limit to prevent over-length
-    combined += ". Ultra-detailed, commercial photography quality, photorealistic rendering."
-    
-    return combined
+        logger.warning(f"Smart compression failed: {e}, using extractive fallback")
+        return extractive_compressor.compress(comprehensive_brief, max_chars=budget)
 
 @router.post("/enhance-image", response_model=ImageOutput, tags=["Image Generation"])
 async def enhance_image(request: ImageEnhancementRequest) -> ImageOutput:
     """
     Enhances or modifies a previously generated image based on user feedback.
     Requires the user to provide their own API key for the image generation service.
+    The original brief can be sent as text or referenced by brief_id.
     Optimized for OpenAI GPT Image 1.
     """
     try:
+        original_prompt = request.original_brief_prompt
+        if request.brief_id:
+            original_prompt = (await _context_or_404(request.brief_id)).brief
+
         if not request.enhancement_instruction or not request.enhancement_instruction.strip():
             raise HTTPException(status_code=400, detail="Enhancement instruction cannot be empty.")
 
@@ -1081,12 +1229,16 @@ async def enhance_image(request: ImageEnhancementRequest) -> ImageOutput:
 
         # Use multi-provider service for better compatibility
         result = await openai_service.enhance_image(
-            original_prompt=request.original_brief_prompt,
+            original_prompt=original_prompt,
             instruction=request.enhancement_instruction,
             user_api_key=request.user_api_key,
             seed=request.seed or 0
         )
         return result
+    except UpstreamError:
+        raise  # mapped to 503/502 with Retry-After by the app-level handler
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in /enhance-image endpoint: {e}")
         raise HTTPException(status_code=503, detail=f"Image enhancement service is unavailable: {str(e)}")
@@ -1094,15 +1246,17 @@ async def enhance_image(request: ImageEnhancementRequest) -> ImageOutput:
 
 # MISSION 2: New endpoint for downloading photography brief as text file
 @router.post("/download-brief", tags=["Export"])
-async def download_brief(request: DownloadBriefRequest):
+async def download_brief(request: DownloadBriefRequest, http_request: Request):
     """
     Download the final enhanced prompt as a text file.
     
     This endpoint allows users and developers to download the exact, final text prompt
     that was used to generate an image for inspection and auditing purposes.
+    With a brief_id the stored brief is served directly (prefer
+    GET /api/v1/briefs/{brief_id}?download=true, which is cacheable).
     
     Args:
-        request: DownloadBriefRequest containing the prompt text to download
+        request: DownloadBriefRequest containing the prompt text or brief_id to download
         
     Returns:
         StreamingResponse: Text file download with photography_brief.txt filename
@@ -1111,6 +1265,10 @@ async def download_brief(request: DownloadBriefRequest):
         HTTPException: If the request is invalid
     """
     try:
+        if request.brief_id:
+            logger.info(f"📥 Photography brief download requested for {request.brief_id}")
+            return brief_file_response(http_request, request.brief_id, download=True)
+
         if not request.prompt_text or not request.prompt_text.strip():
             raise HTTPException(
                 status_code=400, 
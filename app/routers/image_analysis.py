@@ -14,6 +14,8 @@ from app.services.image_wizard_bridge import ImageWizardBridge
 from app.services.brief_orchestrator import BriefOrchestratorService
 from app.services.multi_provider_image_generator import OpenAIImageService
 from app.config.settings import settings
+from app.services.resilience import UpstreamError
+from app.services.telemetry import telemetry
 
 router = APIRouter(prefix="/api/v1", tags=["image-analysis"])
 
@@ -52,7 +54,7 @@ async def analyze_and_enhance(request: AnalyzeAndEnhanceRequest):
     import time
     start_time = time.time()
     
-    logger.info("🚀 Starting analyze-and-enhance workflow", extra={
+    logger.info(f"🚀 Starting analyze-and-enhance workflow ({len(request.user_prompt)} chars)", extra={
         "image_filename": request.image_filename,
         "user_prompt": request.user_prompt[:100] + "..." if len(request.user_prompt) > 100 else request.user_prompt,
         "generate_image": request.generate_image
@@ -71,7 +73,8 @@ async def analyze_and_enhance(request: AnalyzeAndEnhanceRequest):
         # Step 3: Bridge analysis + prompt ke WizardInput
         logger.info("🌉 Step 3: Bridging analysis with user prompt")
         bridge = ImageWizardBridge()
-        wizard_input = bridge.combine_image_and_prompt(image_analysis, request.user_prompt)
+        with telemetry.span("brief.bridge"):
+            wizard_input = bridge.combine_image_and_prompt(image_analysis, request.user_prompt)
         
         # Step 4: Generate enhanced brief (using EXISTING system!)
         logger.info("📝 Step 4: Generating enhanced brief via existing orchestrator")
@@ -112,6 +115,8 @@ async def analyze_and_enhance(request: AnalyzeAndEnhanceRequest):
             processing_time=round(processing_time, 2)
         )
         
+    except UpstreamError:
+        raise  # mapped to 503/502 with Retry-After by the app-level handler
     except Exception as e:
         processing_time = time.time() - start_time
         
@@ -8,6 +8,7 @@ from pathlib import Path
 from fastapi import APIRouter, File, UploadFile, HTTPException
 from fastapi.responses import JSONResponse
 import shutil
+from app.services.image_sweeper import image_sweeper
 
 router = APIRouter(prefix="/api/v1", tags=["image-upload"])
 
@@ -61,6 +62,7 @@ async def upload_image(file: UploadFile = File(...)):
         # Save file
         with open(file_path, "wb") as buffer:
             buffer.write(file_content)
+        image_sweeper.record(f"uploads/{filename}", len(file_content))
         
         # Return response
         return JSONResponse({
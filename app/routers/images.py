@@ -0,0 +1,54 @@
+"""
+Image Delivery Router
+Serves generated images as thumbnail/preview/full derivatives in the best format the
+client accepts (AVIF → WebP → progressive JPEG), falling back to the source render.
+"""
+import re
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import RedirectResponse
+
+from app.services.image_encoder import image_encoder, derivative_key, FORMATS, VARIANTS
+from app.services.image_store import image_store
+from app.services.image_sweeper import image_sweeper
+from app.static_files import cached_file_response
+
+router = APIRouter(prefix="/api/v1", tags=["images"])
+
+IMAGE_ID_PATTERN = re.compile(r"^img_[A-Za-z0-9_-]+$")
+
+
+@router.get("/images/{image_id}")
+async def get_image(request: Request, image_id: str, variant: str = Query("full", description="thumb, preview or full")):
+    """
+    Serve a generated image, negotiating the output format from the Accept header.
+
+    Args:
+        image_id: Image identifier (filename stem, e.g. img_ab12cd34)
+        variant: Derivative size: thumb, preview or full
+
+    Returns:
+        The best matching derivative, or the source render while derivatives are still encoding
+    """
+    if not IMAGE_ID_PATTERN.match(image_id):
+        raise HTTPException(status_code=400, detail="Invalid image id")
+    if variant not in VARIANTS:
+        raise HTTPException(status_code=400, detail=f"Unknown variant '{variant}' (use {', '.join(VARIANTS)})")
+
+    backend = image_store.backend
+    candidates = [
+        (derivative_key(f"{image_id}.png", variant, format_name), FORMATS[format_name][1])
+        for format_name in image_encoder.negotiate(request.headers.get("accept", ""))
+    ]
+    candidates.append((f"{image_id}.png", "image/png"))
+
+    for key, media_type in candidates:
+        if not backend.exists(key):
+            continue
+        image_sweeper.touch(key)
+        path_for = getattr(backend, "path_for", None)
+        if path_for is None:
+            return RedirectResponse(image_store.url_for(key), headers={"Vary": "Accept"})
+        # Negotiated, so not immutable: the chosen format changes once derivatives are ready
+        return await cached_file_response(str(path_for(key)), request.scope, media_type=media_type, vary="Accept")
+
+    raise HTTPException(status_code=404, detail="Image not found")
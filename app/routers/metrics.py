@@ -0,0 +1,46 @@
+"""
+Metrics Router
+Prometheus scrape endpoint with per-stage latency quantiles, and recent pipeline
+spans as OpenTelemetry OTLP/JSON. Spans carry request ids and model names, so the JSON
+endpoints require ADMIN_TOKEN.
+"""
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+
+from app.routers.admin import require_admin
+from app.services.telemetry import telemetry
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus text exposition of pipeline stage latencies (p50/p95/p99) and service counters.
+    """
+    return PlainTextResponse(telemetry.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/api/v1/traces", dependencies=[Depends(require_admin)])
+async def recent_traces(limit: int = Query(200, ge=1, le=2000)):
+    """
+    Most recent finished spans as an OTLP/JSON ExportTraceServiceRequest.
+
+    Args:
+        limit: Maximum number of spans to return
+
+    Returns:
+        OTLP/JSON payload that can be posted to any OpenTelemetry collector
+    """
+    return telemetry.otlp_payload(limit=limit)
+
+
+@router.get("/api/v1/metrics/stages", dependencies=[Depends(require_admin)])
+async def stage_latencies():
+    """
+    Per-stage latency summary as JSON.
+
+    Returns:
+        Mapping of stage name to count, errors and p50/p95/p99 latency in seconds
+    """
+    return telemetry.stage_summary()
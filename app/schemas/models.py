@@ -4,12 +4,13 @@ Defines the data structures for user input, wizard input, and brief output.
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Literal
 
 
 class InitialUserRequest(BaseModel):
     """Model for the initial user request containing a simple text description."""
     user_request: str
+    fields: Optional[Dict[str, Any]] = Field(None, description="Wizard fields the client already knows; taken as given and not re-extracted by the LLM.")
 
 
 class WizardInput(BaseModel):
@@ -92,6 +93,7 @@ class WizardInput(BaseModel):
 class BriefOutput(BaseModel):
     """Model for the final enhanced photography brief output."""
     final_prompt: str
+    brief_id: Optional[str] = Field(None, description="Reference to this brief's pipeline artifacts; pass it to /generate-image to skip re-extraction.")
 
 
 # --- NEW MODELS ---
@@ -145,7 +147,8 @@ class TextOutput(BaseModel):
 
 class ImageGenerationRequest(BaseModel):
     """Model for the initial image generation request."""
-    brief_prompt: str = Field(..., description="The final, enhanced brief prompt generated by the /generate-brief endpoint.")
+    brief_prompt: str = Field("", description="The final, enhanced brief prompt generated by the /generate-brief endpoint (may be omitted when brief_id is given).")
+    brief_id: Optional[str] = Field(None, description="brief_id returned by a brief endpoint; reuses its extraction, brief and compressed prompt.")
     user_api_key: str = Field(..., description="User's API key for the image generation service.")
     negative_prompt: Optional[str] = Field(None, description="Optional concepts to exclude from the image.")
     style_preset: Optional[str] = Field("photorealistic", description="Artistic style for the image generation.")
@@ -153,10 +156,13 @@ class ImageGenerationRequest(BaseModel):
     use_raw_prompt: Optional[bool] = Field(False, description="If True, use the brief_prompt directly without processing it through the wizard system.")
     uploaded_image_base64: Optional[str] = Field(None, description="Base64 encoded uploaded image for 2-step Vision API flow.")
     uploaded_image_filename: Optional[str] = Field(None, description="Filename of uploaded image in static/images/uploads/ (alternative to base64 for performance).")
+    variant_count: int = Field(1, ge=1, le=8, description="Number of images to render from the one computed brief.")
+    variant_strategy: Literal["n", "fanout"] = Field("n", description="'n' requests all variants in one upstream call; 'fanout' makes concurrent single-image calls.")
 
 class ImageEnhancementRequest(BaseModel):
     """Model for iteratively enhancing a previously generated image."""
-    original_brief_prompt: str = Field(..., description="The original brief that created the image.")
+    original_brief_prompt: str = Field("", description="The original brief that created the image (or pass brief_id).")
+    brief_id: Optional[str] = Field(None, description="brief_id of the stored original brief, used instead of original_brief_prompt.")
     generation_id: str = Field(..., description="The unique ID of the image being enhanced.")
     enhancement_instruction: str = Field(..., description="User's instruction for what to change, e.g., 'Make it colder with more condensation.'")
     user_api_key: str = Field(..., description="User's API key for the image generation service.")
@@ -174,11 +180,14 @@ class ImageOutput(BaseModel):
     provider_used: Optional[str] = Field(None, description="Provider service used")
     progress_messages: Optional[list] = Field(None, description="Progress messages from pipeline processing")
     session_id: Optional[str] = Field(None, description="Session ID for real-time progress tracking")
+    derivatives: Optional[Dict[str, str]] = Field(None, description="Thumb/preview/full URLs served as AVIF/WebP/JPEG by Accept header")
+    variant_images: Optional[List[Dict[str, Any]]] = Field(None, description="Further renders of the same brief (image_url, generation_id, derivatives) when variant_count > 1")
 
 
 class DownloadBriefRequest(BaseModel):
     """MISSION 2: Request model for downloading photography brief as text file."""
-    prompt_text: str = Field(..., description="The prompt text to be downloaded as a file")
+    prompt_text: str = Field("", description="The prompt text to be downloaded as a file (or pass brief_id)")
+    brief_id: Optional[str] = Field(None, description="brief_id of a stored brief, used instead of prompt_text")
     
     class Config:
         schema_extra = {
@@ -187,4 +196,9 @@ class DownloadBriefRequest(BaseModel):
             }
         }
 
+
+class BriefUploadRequest(BaseModel):
+    """Brief text to store server-side under a brief_id."""
+    text: str = Field(..., min_length=1, description="Brief text")
+
 # --- END NEW MODELS ---
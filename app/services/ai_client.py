@@ -4,10 +4,164 @@ Handles both extraction and enhancement operations with the LLM.
 """
 
 import json
-from typing import Dict, Any, Optional
-from openai import OpenAI
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
 from loguru import logger
 from app.config.settings import settings
+from app.services.correlation import current_request_id, outbound_headers
+from app.services.model_router import model_router
+from app.services.resilience import resilience, UpstreamError
+from app.services.token_budget import token_budget
+from app.services.usage_ledger import usage_ledger
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# Alternative transport for chat completions (the offline batch collector); None calls the API directly
+chat_transport: ContextVar[Optional[Any]] = ContextVar("photoeai_chat_transport", default=None)
+
+# Extraction schema: (field, description) per prompt section; REQUIRED fields must never come back null
+EXTRACTION_SCHEMA = [
+    ("Main Subject & Story", [
+        ("product_name", "Name of the product (REQUIRED - string, never null)"),
+        ("product_description", "Description of the product (string)"),
+        ("key_features", "Key features to highlight (string, comma-separated if multiple)"),
+        ("product_state", 'State of the product (string, default: "pristine")'),
+    ]),
+    ("Composition & Framing", [
+        ("shot_type", "Type of shot (REQUIRED - string, choose most appropriate)"),
+        ("framing", "Framing style (REQUIRED - string, choose most appropriate)"),
+        ("compositional_rule", 'Compositional rule (string, default: "Rule of Thirds")'),
+        ("negative_space", 'Negative space approach (string, default: "Balanced")'),
+    ]),
+    ("Lighting & Atmosphere", [
+        ("lighting_style", "Lighting style (REQUIRED - string, choose most appropriate)"),
+        ("key_light_setup", "Key light setup description (string)"),
+        ("fill_light_setup", "Fill light setup description (string)"),
+        ("rim_light_setup", "Rim light setup description (string)"),
+        ("mood", 'Overall mood (string, default: "Clean and professional")'),
+    ]),
+    ("Background & Setting", [
+        ("environment", "Environment/background (REQUIRED - string, choose most appropriate)"),
+        ("dominant_colors", "Dominant color palette (string, comma-separated if multiple)"),
+        ("accent_colors", "Accent colors (string, comma-separated if multiple)"),
+        ("props", "Supporting props description (string)"),
+    ]),
+    ("Camera & Lens", [
+        ("camera_type", 'Camera type (string, default: "Hasselblad X2D 100C")'),
+        ("lens_type", 'Lens type (string, default: "85mm f/1.4")'),
+        ("aperture_value", "Aperture f-number (number, default: 2.8)"),
+        ("shutter_speed_value", "Shutter speed denominator (number, default: 125)"),
+        ("iso_value", "ISO value (number, default: 100)"),
+        ("visual_effect", "Visual effect description (string)"),
+    ]),
+    ("Style & Post-Production", [
+        ("overall_style", 'Overall photographic style (string, default: "Professional product photography")'),
+        ("photographer_influences", "Photographer influences (string, comma-separated if multiple)"),
+    ]),
+    ("Advanced Lighting (NEW)", [
+        ("light_temperature", 'Light temperature (string, e.g. "warm 3200K", "daylight 5600K")'),
+        ("shadow_intensity", 'Shadow intensity (string: "soft", "hard", "medium")'),
+        ("highlight_control", 'Highlight control (string: "preserved", "blown", "controlled")'),
+        ("lighting_direction", 'Lighting direction (string: "front", "side", "back", "top")'),
+        ("ambient_lighting", 'Ambient lighting (string: "studio", "natural", "mixed")'),
+    ]),
+    ("Advanced Composition (NEW)", [
+        ("perspective_angle", 'Perspective angle (string: "eye-level", "low-angle", "high-angle")'),
+        ("depth_layers", "Depth layers (string describing foreground/midground/background)"),
+        ("leading_lines", 'Leading lines (string: "diagonal", "curved", "vertical", "none")'),
+        ("symmetry_type", 'Symmetry type (string: "perfect", "asymmetrical", "radial")'),
+        ("focal_emphasis", 'Focal emphasis (string: "center", "off-center", "multiple points")'),
+    ]),
+    ("Technical Details (NEW)", [
+        ("focus_mode", 'Focus mode (string: "manual", "single-point AF", "zone AF")'),
+        ("metering_mode", 'Metering mode (string: "matrix", "center-weighted", "spot")'),
+        ("white_balance", 'White balance (string: "auto", "daylight", "tungsten", "custom")'),
+        ("file_format", 'File format (string: "RAW", "JPEG", "TIFF")'),
+        ("image_stabilization", 'Image stabilization (string: "on", "off", "lens-based", "body-based")'),
+    ]),
+    ("Brand & Marketing Context (NEW)", [
+        ("target_audience", 'Target audience (string: "luxury", "mass market", "professional")'),
+        ("brand_personality", 'Brand personality (string: "premium", "friendly", "innovative")'),
+        ("usage_purpose", 'Usage purpose (string: "e-commerce", "advertising", "social media")'),
+        ("seasonal_context", 'Seasonal context (string: "spring", "summer", "holiday", "evergreen")'),
+        ("competitive_differentiation", "Competitive differentiation (string: unique selling points)"),
+    ]),
+]
+EXTRACTION_FIELDS = [field for _, section in EXTRACTION_SCHEMA for field, _ in section]
+REQUIRED_EXTRACTION_FIELDS = {
+    "product_name": 'If unclear, infer from context or use "Product" as fallback',
+    "shot_type": "Choose from [Eye-level, High-angle, Low-angle, Dutch-angle, Top-down flat lay]",
+    "framing": "Choose from [Extreme Close-Up, Close-Up, Medium Shot, Full Shot]",
+    "lighting_style": "Choose from [Studio Softbox, Hard light, Natural window light, Golden hour glow, Cinematic neon]",
+    "environment": "Choose from [Seamless studio backdrop, Textured surface, Natural setting, Indoor setting]",
+}
+
+
+def build_extraction_prompt(user_request: str, fields: Optional[List[str]] = None,
+                            known: Optional[Dict[str, Any]] = None, feedback: Optional[List[str]] = None) -> str:
+    """
+    Build the extraction prompt for all schema fields, or only for `fields` (partial schema).
+    
+    Args:
+        user_request: Raw user request text
+        fields: Fields to ask for; None asks for the full schema
+        known: Values already determined elsewhere (listed so the answer stays consistent with them)
+        feedback: Validation errors of a previous answer, to be corrected in this one
+        
+    Returns:
+        Prompt text asking for a JSON object with exactly the requested fields
+    """
+    wanted = set(EXTRACTION_FIELDS if fields is None else fields)
+    lines = [
+        "Analyze this product photography request and extract the relevant information for a structured photography brief.",
+        "",
+        f'User request: "{user_request}"',
+        "",
+    ]
+    if known:
+        lines.append("Already determined (keep your answer consistent with these; do NOT repeat them):")
+        lines.extend(f"- {field}: {value}" for field, value in known.items())
+        lines.append("")
+    if feedback:
+        lines.append("Your previous answer failed validation with these errors; correct them:")
+        lines.extend(f"- {error}" for error in feedback)
+        lines.append("")
+    required = [field for field in REQUIRED_EXTRACTION_FIELDS if field in wanted]
+    if required:
+        lines.append("CRITICAL: You MUST provide values for these REQUIRED fields (never use null for these):")
+        lines.extend(f"- {field}: {REQUIRED_EXTRACTION_FIELDS[field]}" for field in required)
+        lines.append("")
+    count = sum(1 for field in EXTRACTION_FIELDS if field in wanted)
+    lines.append(f"Extract information for ALL {count} fields below (ALL VALUES MUST BE STRINGS, NOT ARRAYS):")
+    for number, (title, section) in enumerate(EXTRACTION_SCHEMA, start=1):
+        entries = [f"{field}: {description}" for field, description in section if field in wanted]
+        if entries:
+            lines.extend(["", f"# SECTION {number}: {title}", *entries])
+    lines.extend([
+        "",
+        "IMPORTANT: ",
+        f"- Respond ONLY with valid JSON containing ALL {count} fields",
+        "- ALL text fields must be STRINGS, not arrays",
+        '- Use comma-separated strings for multiple values (e.g. "red, blue, gold" not ["red", "blue", "gold"])',
+        "- NEVER use null for any field - provide intelligent defaults",
+        "- Use reasonable professional photography defaults when information is unclear",
+        "- Make intelligent inferences based on the request context and product type",
+    ])
+    return "\n".join(lines)
+
+
+def create_openai_client(api_key: str) -> "OpenAI":
+    """
+    Build an OpenAI client against OPENAI_BASE_URL (the official API by default).
+    The openai package is imported here, on first use, to keep app startup fast.
+    """
+    from openai import OpenAI
+    return OpenAI(
+        api_key=api_key,
+        base_url=settings.openai_base_url,
+        max_retries=0  # Retries are handled by app.services.resilience
+    )
 
 
 class AIClient:
@@ -24,128 +178,61 @@ class AIClient:
     """
     
     def __init__(self):
-        """Initialize the OpenAI client with API key and official OpenAI base URL from settings."""
-        self.client = OpenAI(
-            api_key=settings.openai_api_key,
-            base_url="https://api.openai.com/v1"  # Use official OpenAI API directly
-        )
-        self.model = settings.openai_model
+        """Initialize the client configuration; the OpenAI client itself is built on first use."""
+        self._client = None
+    
+    @property
+    def client(self) -> "OpenAI":
+        """Default OpenAI client using the API key from settings (constructed lazily)."""
+        if self._client is None:
+            self._client = create_openai_client(settings.openai_api_key)
+        return self._client
     
-    def _get_client(self, user_api_key: Optional[str] = None) -> OpenAI:
+    def _get_client(self, user_api_key: Optional[str] = None) -> "OpenAI":
         """Get OpenAI client with user API key if provided, otherwise use default."""
         if user_api_key and user_api_key.strip():
-            return OpenAI(
-                api_key=user_api_key.strip(),
-                base_url="https://api.openai.com/v1"
-            )
+            return create_openai_client(user_api_key.strip())
         return self.client
     
-    async def extract_wizard_data(self, user_request: str) -> Dict[str, Any]:
+    async def _complete(self, upstream: str, client: "OpenAI", **kwargs) -> Any:
+        """Run a chat completion through the resilience layer, or through the active chat transport (batch mode)."""
+        if kwargs.get("max_tokens") is not None:
+            kwargs["max_tokens"] = token_budget.plan_completion(kwargs.get("model", settings.openai_model), kwargs.get("messages", []), kwargs["max_tokens"])
+        transport = chat_transport.get()
+        if transport is not None:
+            return await transport.create(**kwargs)
+        return await resilience.call(upstream, client.chat.completions.create, api_key=client.api_key,
+                                     extra_headers=outbound_headers(), **kwargs)
+    
+    async def extract_wizard_data(self, user_request: str, model: Optional[str] = None,
+                                  fields: Optional[List[str]] = None,
+                                  known: Optional[Dict[str, Any]] = None,
+                                  feedback: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Extract structured wizard data from user request using LLM as Analyst.
         
         Args:
             user_request: Raw user request text
+            model: Model to use (defaults to the routed model for "extract")
+            fields: Only ask for these fields (partial schema); None asks for all of them
+            known: Values already determined elsewhere, shown to the model for consistency
+            feedback: Validation errors of a previous attempt, shown to the model to correct
             
         Returns:
             Dictionary containing extracted wizard input fields
         """
-        request_id = hash(user_request) % 10000  # Simple request tracking
+        request_id = current_request_id()
+        model = model or model_router.model_for("extract")
         
         logger.info(f"🔍 Starting wizard data extraction [ID: {request_id}]", extra={
             "request_id": request_id,
             "user_request_length": len(user_request),
-            "ai_model": self.model,
+            "requested_fields": len(fields) if fields is not None else len(EXTRACTION_FIELDS),
+            "ai_model": model,
             "operation": "extract_wizard_data"
         })
         
-        prompt = f"""
-        Analyze this product photography request and extract the relevant information for a structured photography brief.
-        
-        User request: "{user_request}"
-        
-        CRITICAL: You MUST provide values for these REQUIRED fields (never use null for these):
-        - product_name: If unclear, infer from context or use "Product" as fallback
-        - shot_type: Choose from [Eye-level, High-angle, Low-angle, Dutch-angle, Top-down flat lay]
-        - framing: Choose from [Extreme Close-Up, Close-Up, Medium Shot, Full Shot]
-        - lighting_style: Choose from [Studio Softbox, Hard light, Natural window light, Golden hour glow, Cinematic neon]
-        - environment: Choose from [Seamless studio backdrop, Textured surface, Natural setting, Indoor setting]
-        
-        Extract information for ALL 46 fields below (ALL VALUES MUST BE STRINGS, NOT ARRAYS):
-        
-        # SECTION 1: Main Subject & Story
-        product_name: Name of the product (REQUIRED - string, never null)
-        product_description: Description of the product (string)
-        key_features: Key features to highlight (string, comma-separated if multiple)
-        product_state: State of the product (string, default: "pristine")
-        
-        # SECTION 2: Composition & Framing
-        shot_type: Type of shot (REQUIRED - string, choose most appropriate)
-        framing: Framing style (REQUIRED - string, choose most appropriate) 
-        compositional_rule: Compositional rule (string, default: "Rule of Thirds")
-        negative_space: Negative space approach (string, default: "Balanced")
-        
-        # SECTION 3: Lighting & Atmosphere
-        lighting_style: Lighting style (REQUIRED - string, choose most appropriate)
-        key_light_setup: Key light setup description (string)
-        fill_light_setup: Fill light setup description (string)
-        rim_light_setup: Rim light setup description (string)
-        mood: Overall mood (string, default: "Clean and professional")
-        
-        # SECTION 4: Background & Setting
-        environment: Environment/background (REQUIRED - string, choose most appropriate)
-        dominant_colors: Dominant color palette (string, comma-separated if multiple)
-        accent_colors: Accent colors (string, comma-separated if multiple)
-        props: Supporting props description (string)
-        
-        # SECTION 5: Camera & Lens
-        camera_type: Camera type (string, default: "Hasselblad X2D 100C")
-        lens_type: Lens type (string, default: "85mm f/1.4")
-        aperture_value: Aperture f-number (number, default: 2.8)
-        shutter_speed_value: Shutter speed denominator (number, default: 125)
-        iso_value: ISO value (number, default: 100)
-        visual_effect: Visual effect description (string)
-        
-        # SECTION 6: Style & Post-Production
-        overall_style: Overall photographic style (string, default: "Professional product photography")
-        photographer_influences: Photographer influences (string, comma-separated if multiple)
-        
-        # SECTION 7: Advanced Lighting (NEW)
-        light_temperature: Light temperature (string, e.g. "warm 3200K", "daylight 5600K")
-        shadow_intensity: Shadow intensity (string: "soft", "hard", "medium")
-        highlight_control: Highlight control (string: "preserved", "blown", "controlled")
-        lighting_direction: Lighting direction (string: "front", "side", "back", "top")
-        ambient_lighting: Ambient lighting (string: "studio", "natural", "mixed")
-        
-        # SECTION 8: Advanced Composition (NEW)
-        perspective_angle: Perspective angle (string: "eye-level", "low-angle", "high-angle")
-        depth_layers: Depth layers (string describing foreground/midground/background)
-        leading_lines: Leading lines (string: "diagonal", "curved", "vertical", "none")
-        symmetry_type: Symmetry type (string: "perfect", "asymmetrical", "radial")
-        focal_emphasis: Focal emphasis (string: "center", "off-center", "multiple points")
-        
-        # SECTION 9: Technical Details (NEW)
-        focus_mode: Focus mode (string: "manual", "single-point AF", "zone AF")
-        metering_mode: Metering mode (string: "matrix", "center-weighted", "spot")
-        white_balance: White balance (string: "auto", "daylight", "tungsten", "custom")
-        file_format: File format (string: "RAW", "JPEG", "TIFF")
-        image_stabilization: Image stabilization (string: "on", "off", "lens-based", "body-based")
-        
-        # SECTION 10: Brand & Marketing Context (NEW)
-        target_audience: Target audience (string: "luxury", "mass market", "professional")
-        brand_personality: Brand personality (string: "premium", "friendly", "innovative")
-        usage_purpose: Usage purpose (string: "e-commerce", "advertising", "social media")
-        seasonal_context: Seasonal context (string: "spring", "summer", "holiday", "evergreen")
-        competitive_differentiation: Competitive differentiation (string: unique selling points)
-        
-        IMPORTANT: 
-        - Respond ONLY with valid JSON containing ALL 46 fields
-        - ALL text fields must be STRINGS, not arrays
-        - Use comma-separated strings for multiple values (e.g. "red, blue, gold" not ["red", "blue", "gold"])
-        - NEVER use null for any field - provide intelligent defaults
-        - Use reasonable professional photography defaults when information is unclear
-        - Make intelligent inferences based on the request context and product type
-        """
+        prompt = build_extraction_prompt(user_request, fields, known, feedback)
         
         logger.debug(f"📝 Sending extraction request to AI [ID: {request_id}]", extra={
             "request_id": request_id,
@@ -154,15 +241,17 @@ class AIClient:
         })
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert photography analyst. Extract structured data from user requests and respond only with valid JSON. When requests are vague, make professional inferences and use industry-standard defaults. NEVER leave required fields as null."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.6
-            )
+            with model_router.observe("extract", model):
+                response = await self._complete("chat", self.client,
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": "You are an expert photography analyst. Extract structured data from user requests and respond only with valid JSON. When requests are vague, make professional inferences and use industry-standard defaults. NEVER leave required fields as null."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.6
+                )
             
+            usage_ledger.record_chat(response, self.client.api_key, "extract")
             response_text = response.choices[0].message.content.strip()
             
             logger.debug(f"📥 Received AI response [ID: {request_id}]", extra={
@@ -214,6 +303,8 @@ class AIClient:
                     })
                     return {}
                     
+        except UpstreamError:
+            raise  # already classified and logged by the resilience layer
         except Exception as e:
             logger.error(f"💥 Critical error in wizard data extraction [ID: {request_id}]", extra={
                 "request_id": request_id,
@@ -234,12 +325,13 @@ class AIClient:
         Returns:
             Enhanced brief text
         """
-        request_id = hash(original_brief) % 10000  # Simple request tracking
+        request_id = current_request_id()
+        model = model_router.model_for("enhance")
         
         logger.info(f"🎨 Starting brief enhancement [ID: {request_id}]", extra={
             "request_id": request_id,
             "original_brief_length": len(original_brief),
-            "ai_model": self.model,
+            "ai_model": model,
             "operation": "enhance_brief"
         })
         
@@ -288,16 +380,18 @@ class AIClient:
                 "max_tokens": 2000
             })
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.6,
-                max_tokens=2000
-            )
+            with model_router.observe("enhance", model):
+                response = await self._complete("chat", self.client,
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_message},
+                        {"role": "user", "content": user_message}
+                    ],
+                    temperature=0.6,
+                    max_tokens=2000
+                )
             
+            usage_ledger.record_chat(response, self.client.api_key, "enhance_brief")
             enhanced_brief = response.choices[0].message.content.strip()
             
             # CRITICAL POST-PROCESSING: English language validation and cleanup
@@ -315,6 +409,8 @@ class AIClient:
             
             return enhanced_brief
             
+        except UpstreamError:
+            raise  # already classified and logged by the resilience layer
         except Exception as e:
             logger.error(f"💥 Critical error in brief enhancement [ID: {request_id}]", extra={
                 "request_id": request_id,
@@ -338,12 +434,13 @@ class AIClient:
         Returns:
             Complete, multi-section photography brief document with professional enhancement
         """
-        request_id = hash(str(structured_data)) % 10000  # Simple request tracking
+        request_id = current_request_id()
+        model = model_router.model_for("enhance")
         
         logger.info(f"🎭 ADVANCED: Product Photographer enhanced composition [ID: {request_id}]", extra={
             "request_id": request_id,
             "product_name": structured_data.get("product_name", "Unknown"),
-            "ai_model": self.model,
+            "ai_model": model,
             "operation": "enhance_brief_from_structured_data",
             "refactor_status": "ADVANCED_ENHANCEMENT_ACTIVE"
         })
@@ -491,19 +588,21 @@ Generate the most detailed, comprehensive photography brief possible. Every sect
 
             # OPTIMIZED PARAMETERS FOR CREATIVE EXCELLENCE
             client = self._get_client(user_api_key)
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "MANDATORY OUTPUT LANGUAGE: ENGLISH. The entire output brief MUST be written in professional English, regardless of the language of the user's input.\n\nYou are a world-class Product Photographer with elite expertise in luxury product photography. Your job is to enhance PHOTOGRAPHY QUALITY while NEVER MODIFYING THE PRODUCT ITSELF. ABSOLUTE MANDATORY: Never change product colors, shapes, or designs - only enhance lighting, composition, and camera techniques. DETECTION WARNING: NEVER use words like 'ubah', 'gantikan', 'remix', 'alter', 'modify', 'change', 'transform', or 'redesign' when referring to the product - these actions are STRICTLY FORBIDDEN. CRITICAL REQUIREMENTS: 1) Every single word must be ENTIRELY IN ENGLISH, regardless of input language. 2) Generate COMPREHENSIVE, DETAILED briefs with extensive bullet points, technical specifications, and professional equipment details. Your reputation depends on comprehensive English-only masterpiece documents with 1200+ words and extensive technical detail."
-                    },
-                    {"role": "user", "content": enhancement_instruction}
-                ],
-                temperature=0.6,     # Balanced creativity for professional results
-                max_tokens=4500       # Increased for comprehensive masterpiece output
-            )
+            with model_router.observe("enhance", model):
+                response = await self._complete("chat", client,
+                    model=model,
+                    messages=[
+                        {
+                            "role": "system", 
+                            "content": "MANDATORY OUTPUT LANGUAGE: ENGLISH. The entire output brief MUST be written in professional English, regardless of the language of the user's input.\n\nYou are a world-class Product Photographer with elite expertise in luxury product photography. Your job is to enhance PHOTOGRAPHY QUALITY while NEVER MODIFYING THE PRODUCT ITSELF. ABSOLUTE MANDATORY: Never change product colors, shapes, or designs - only enhance lighting, composition, and camera techniques. DETECTION WARNING: NEVER use words like 'ubah', 'gantikan', 'remix', 'alter', 'modify', 'change', 'transform', or 'redesign' when referring to the product - these actions are STRICTLY FORBIDDEN. CRITICAL REQUIREMENTS: 1) Every single word must be ENTIRELY IN ENGLISH, regardless of input language. 2) Generate COMPREHENSIVE, DETAILED briefs with extensive bullet points, technical specifications, and professional equipment details. Your reputation depends on comprehensive English-only masterpiece documents with 1200+ words and extensive technical detail."
+                        },
+                        {"role": "user", "content": enhancement_instruction}
+                    ],
+                    temperature=0.6,     # Balanced creativity for professional results
+                    max_tokens=4500       # Increased for comprehensive masterpiece output
+                )
             
+            usage_ledger.record_chat(response, client.api_key, "enhance_structured_brief")
             enhanced_brief = response.choices[0].message.content.strip()
             
             # ADVANCED QUALITY VALIDATION WITH LANGUAGE COMPLIANCE
@@ -576,6 +675,7 @@ Generate the most detailed, comprehensive photography brief possible. Every sect
             if bullet_points < 15:
                 quality_issues.append(f"Insufficient detail structure: {bullet_points} bullet points < 15 required")
                 
+            model_router.record_quality("enhance", model, passed=not quality_issues)
             if quality_issues:
                 logger.warning(f"⚠️ COMPREHENSIVE QUALITY ALERT: Enhancement issues detected [ID: {request_id}]", extra={
                     "request_id": request_id,
@@ -596,6 +696,8 @@ Generate the most detailed, comprehensive photography brief possible. Every sect
             
             return enhanced_brief
             
+        except UpstreamError:
+            raise  # already classified and logged by the resilience layer
         except Exception as e:
             logger.error(f"💥 CRITICAL ERROR: Elite enhancement system failure [ID: {request_id}]", extra={
                 "request_id": request_id,
@@ -622,7 +724,8 @@ Generate the most detailed, comprehensive photography brief possible. Every sect
         Returns:
             Intelligently enhanced prompt with professional improvements
         """
-        request_id = hash(original_prompt + enhancement_instruction) % 10000
+        request_id = current_request_id()
+        model = model_router.model_for("prompt_enhance")
         
         logger.info(f"🧠 INTELLIGENT: Advanced prompt enhancement [ID: {request_id}]", extra={
             "request_id": request_id,
@@ -678,19 +781,21 @@ Result: "A premium product elegantly positioned against a pristine backdrop, ill
 **EXECUTE ENHANCEMENT:** Create the intelligently enhanced prompt now.
 """
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "MANDATORY OUTPUT LANGUAGE: ENGLISH. The entire output brief MUST be written in professional English, regardless of the language of the user's input.\n\nYou are a world-class Product Photographer specializing in photography and AI image generation. Your enhancements focus on photography techniques while NEVER MODIFYING THE PRODUCT ITSELF. ABSOLUTE MANDATORY: Preserve original product colors, shapes, and designs - only enhance lighting, composition, camera settings, and background elements. DETECTION WARNING: NEVER use words like 'ubah', 'gantikan', 'remix', 'alter', 'modify', 'change', 'transform', or 'redesign' when referring to the product - these actions are STRICTLY FORBIDDEN. Your enhancements are known for their sophistication and professional quality."
-                    },
-                    {"role": "user", "content": enhancement_instruction}
-                ],
-                temperature=0.6,  # Balanced creativity and consistency
-                max_tokens=1500    # Sufficient for detailed enhancement
-            )
+            with model_router.observe("prompt_enhance", model):
+                response = await self._complete("chat", self.client,
+                    model=model,
+                    messages=[
+                        {
+                            "role": "system", 
+                            "content": "MANDATORY OUTPUT LANGUAGE: ENGLISH. The entire output brief MUST be written in professional English, regardless of the language of the user's input.\n\nYou are a world-class Product Photographer specializing in photography and AI image generation. Your enhancements focus on photography techniques while NEVER MODIFYING THE PRODUCT ITSELF. ABSOLUTE MANDATORY: Preserve original product colors, shapes, and designs - only enhance lighting, composition, camera settings, and background elements. DETECTION WARNING: NEVER use words like 'ubah', 'gantikan', 'remix', 'alter', 'modify', 'change', 'transform', or 'redesign' when referring to the product - these actions are STRICTLY FORBIDDEN. Your enhancements are known for their sophistication and professional quality."
+                        },
+                        {"role": "user", "content": enhancement_instruction}
+                    ],
+                    temperature=0.6,  # Balanced creativity and consistency
+                    max_tokens=1500    # Sufficient for detailed enhancement
+                )
             
+            usage_ledger.record_chat(response, self.client.api_key, "enhance_prompt")
             enhanced_prompt = response.choices[0].message.content.strip()
             
             # CRITICAL POST-PROCESSING: English language validation and cleanup
@@ -784,7 +889,8 @@ Result: "A premium product elegantly positioned against a pristine backdrop, ill
         Returns:
             Complete enhanced photography brief optimized for image generation
         """
-        request_id = hash(original_prompt) % 10000
+        request_id = current_request_id()
+        model = model_router.model_for("revise")
         
         logger.info(f"✨ ENHANCEMENT: Creating complete enhanced brief [ID: {request_id}]", extra={
             "request_id": request_id,
@@ -796,11 +902,7 @@ Result: "A premium product elegantly positioned against a pristine backdrop, ill
             # Use user API key if provided, otherwise fall back to system key
             if user_api_key and user_api_key.strip():
                 # Create a temporary client with user's API key
-                temp_client = OpenAI(
-                    api_key=user_api_key,
-                    base_url="https://api.openai.com/v1"  # Use OpenAI directly for user keys
-                )
-                client_to_use = temp_client
+                client_to_use = create_openai_client(user_api_key)
             else:
                 # Use system client
                 client_to_use = self.client
@@ -833,19 +935,21 @@ Create a complete, comprehensive Product Photography Brief that transforms this
             # Dynamically format the final instruction
             enhancement_instruction = enhancement_instruction_template.format(original_prompt=original_prompt)
 
-            response = client_to_use.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "MANDATORY OUTPUT LANGUAGE: ENGLISH. The entire output brief MUST be written in professional English, regardless of the language of the user's input.\n\nYou are an elite Product Photographer and world-renowned product photography specialist. You create comprehensive, fully-structured Product Photography Briefs that match professional industry standards. ABSOLUTE MANDATORY: NEVER MODIFY THE PRODUCT ITSELF - only enhance photography techniques, lighting, composition, and camera settings. Your briefs include complete technical specifications, detailed lighting setups, composition guidelines, styling directions, and creative rationales that enable professional photographers to execute award-winning shoots."
-                    },
-                    {"role": "user", "content": enhancement_instruction}
-                ],
-                temperature=0.6,  # Balanced for creativity while maintaining structure
-                max_tokens=3000   # Sufficient for complete detailed brief
-            )
+            with model_router.observe("revise", model):
+                response = await self._complete("chat", client_to_use,
+                    model=model,
+                    messages=[
+                        {
+                            "role": "system", 
+                            "content": "MANDATORY OUTPUT LANGUAGE: ENGLISH. The entire output brief MUST be written in professional English, regardless of the language of the user's input.\n\nYou are an elite Product Photographer and world-renowned product photography specialist. You create comprehensive, fully-structured Product Photography Briefs that match professional industry standards. ABSOLUTE MANDATORY: NEVER MODIFY THE PRODUCT ITSELF - only enhance photography techniques, lighting, composition, and camera settings. Your briefs include complete technical specifications, detailed lighting setups, composition guidelines, styling directions, and creative rationales that enable professional photographers to execute award-winning shoots."
+                        },
+                        {"role": "user", "content": enhancement_instruction}
+                    ],
+                    temperature=0.6,  # Balanced for creativity while maintaining structure
+                    max_tokens=3000   # Sufficient for complete detailed brief
+                )
             
+            usage_ledger.record_chat(response, client_to_use.api_key, "revise_prompt")
             revised_prompt = response.choices[0].message.content.strip()
             
             # CRITICAL POST-PROCESSING: English language validation and cleanup
@@ -875,7 +979,7 @@ Create a complete, comprehensive Product Photography Brief that transforms this
             logger.warning("⚠️ Enhanced brief creation failed, using original prompt")
             return original_prompt
     
-    async def generate_text(self, prompt: str, temperature: float = 0.6, max_tokens: int = 2000) -> str:
+    async def generate_text(self, prompt: str, temperature: float = 0.6, max_tokens: int = 2000, task: str = "enhance") -> str:
         """
         Generate text completion using the AI client.
         
@@ -885,11 +989,13 @@ Create a complete, comprehensive Product Photography Brief that transforms this
             prompt: The input prompt for text generation
             temperature: Creativity level (0.0 to 1.0)
             max_tokens: Maximum tokens to generate
+            task: Model-routing task ("compress" runs on the fast tier by default)
             
         Returns:
             Generated text response
         """
-        request_id = hash(prompt) % 10000
+        request_id = current_request_id()
+        model = model_router.model_for(task)
         
         logger.debug(f"📝 TEXT GENERATION: Starting request [ID: {request_id}]", extra={
             "request_id": request_id,
@@ -900,15 +1006,17 @@ Create a complete, comprehensive Product Photography Brief that transforms this
         })
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
+            with model_router.observe(task, model):
+                response = await self._complete("chat", self.client,
+                    model=model,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
             
+            usage_ledger.record_chat(response, self.client.api_key, "generate_text")
             generated_text = response.choices[0].message.content.strip()
             
             logger.debug(f"✅ TEXT GENERATION: Completed successfully [ID: {request_id}]", extra={
@@ -921,6 +1029,8 @@ Create a complete, comprehensive Product Photography Brief that transforms this
             
             return generated_text
             
+        except UpstreamError:
+            raise  # already classified and logged by the resilience layer
         except Exception as e:
             logger.error(f"💥 TEXT GENERATION ERROR [ID: {request_id}]", extra={
                 "request_id": request_id,
@@ -931,7 +1041,7 @@ Create a complete, comprehensive Product Photography Brief that transforms this
             })
             raise Exception(f"Text generation failed: {str(e)}")
 
-    def _ensure_english_output(self, text: str, request_id: int) -> str:
+    def _ensure_english_output(self, text: str, request_id: str) -> str:
         """
         Post-processing method to ensure output is in English.
         Validates and cleans up any remaining non-English content.
@@ -993,12 +1103,13 @@ Create a complete, comprehensive Product Photography Brief that transforms this
         Returns:
             Dictionary with structured image analysis data
         """
-        request_id = hash(image_url) % 10000
+        request_id = current_request_id()
+        model = model_router.model_for("vision")
         
         logger.info(f"👁️ Starting image analysis [ID: {request_id}]", extra={
             "request_id": request_id,
             "image_url": image_url,
-            "ai_model": self.model,
+            "ai_model": model,
             "operation": "analyze_image"
         })
         
@@ -1025,21 +1136,23 @@ Analyze this product image and extract detailed photography information.
 Focus on extracting actionable photography details that can inform brief generation.
 """
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": analysis_instruction},
-                            {"type": "image_url", "image_url": {"url": image_url}}
-                        ]
-                    }
-                ],
-                temperature=0.6,  # Standardized temperature
-                max_tokens=800
-            )
+            with model_router.observe("vision", model):
+                response = await self._complete("vision", self.client,
+                    model=model,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": [
+                                {"type": "text", "text": analysis_instruction},
+                                {"type": "image_url", "image_url": {"url": image_url}}
+                            ]
+                        }
+                    ],
+                    temperature=0.6,  # Standardized temperature
+                    max_tokens=800
+                )
             
+            usage_ledger.record_chat(response, self.client.api_key, "analyze_image")
             analysis_text = response.choices[0].message.content.strip()
             
             # Extract JSON from response
@@ -1083,6 +1196,8 @@ Focus on extracting actionable photography details that can inform brief generat
                 "camera_angle": "front"
             }
             
+        except UpstreamError:
+            raise  # already classified and logged by the resilience layer
         except Exception as e:
             logger.error(f"💥 Critical error in image analysis [ID: {request_id}]", extra={
                 "request_id": request_id,
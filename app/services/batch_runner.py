@@ -0,0 +1,598 @@
+"""
+Batch Runner - bulk brief generation for product catalogs.
+Reads CSV or JSONL product requests, runs extract_and_autofill + generate_final_brief for each
+with bounded concurrency, and appends one JSON line per finished item to the job's results
+file. That file is also the checkpoint: a resumed job skips items already completed.
+
+In "batch" mode the pipeline's chat completions are not sent one by one but collected into
+Batch-API request files (asynchronous, cheaper, minutes to hours per stage). The "local"
+backend stands in for the OpenAI Batch API by executing each request file in-process.
+"""
+
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Type
+from loguru import logger
+from app.config.settings import settings
+from app.schemas.models import InitialUserRequest
+from app.services.correlation import correlation_scope, new_request_id
+from app.services.ai_client import chat_transport, create_openai_client
+from app.services.brief_orchestrator import BriefOrchestratorService
+from app.services.rate_limiter import rate_limiter
+from app.services.resilience import resilience, UpstreamError
+from app.services.telemetry import telemetry
+from app.services.usage_ledger import usage_ledger
+
+MODES = ("direct", "batch")
+
+# Column/field names accepted for the product request, and for the item id
+REQUEST_FIELDS = ("user_request", "prompt", "request")
+ID_FIELDS = ("id", "sku")
+
+TERMINAL_BATCH_STATES = ("completed", "failed", "expired", "cancelled")
+
+# Attempts per item when the upstream is temporarily unavailable (open circuit, rate limit)
+ITEM_ATTEMPTS = 3
+
+JOB_ID_PATTERN = re.compile(r"^batch_[0-9a-f]{12}$")
+
+
+def parse_items(content: str, filename: str = "") -> List[Dict[str, str]]:
+    """
+    Parse a catalog into batch items.
+
+    Args:
+        content: CSV with a header row, or JSONL with one object per line
+        filename: Used to pick the format by extension (otherwise sniffed from the content)
+
+    Returns:
+        List of {"id", "user_request"}; rows without a user_request/prompt column are
+        described by their remaining columns ("product_name: X; color: red")
+    """
+    suffix = Path(filename).suffix.lower()
+    is_jsonl = suffix in (".jsonl", ".ndjson", ".json") or (suffix != ".csv" and content.lstrip().startswith("{"))
+    if is_jsonl:
+        rows = []
+        for line_number, line in enumerate(content.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {line_number}: invalid JSON ({e})")
+            if not isinstance(row, dict):
+                raise ValueError(f"Line {line_number}: expected a JSON object")
+            rows.append(row)
+    else:
+        rows = list(csv.DictReader(io.StringIO(content)))
+
+    items = []
+    seen = set()
+    for index, row in enumerate(rows, start=1):
+        row = {str(k).strip().lower(): v for k, v in row.items() if k is not None}
+        text = next((str(row[field]).strip() for field in REQUEST_FIELDS if str(row.get(field) or "").strip()), "")
+        if not text:
+            text = "; ".join(f"{key}: {value}" for key, value in row.items()
+                             if key not in ID_FIELDS and str(value or "").strip())
+        if not text:
+            raise ValueError(f"Row {index}: no product request")
+        item_id = next((str(row[field]).strip() for field in ID_FIELDS if str(row.get(field) or "").strip()), str(index))
+        if item_id in seen:
+            raise ValueError(f"Row {index}: duplicate id '{item_id}'")
+        seen.add(item_id)
+        items.append({"id": item_id, "user_request": text})
+    if not items:
+        raise ValueError("No product requests found")
+    return items
+
+
+def parse_batch_output(text: str) -> Dict[str, Dict[str, Any]]:
+    """Batch output/error file lines -> custom_id -> {"body": completion} or {"error": message}."""
+    results = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        if response.get("status_code") == 200:
+            results[record["custom_id"]] = {"body": response["body"]}
+        else:
+            error = record.get("error") or (response.get("body") or {}).get("error") or {}
+            results[record["custom_id"]] = {"error": error.get("message") or f"HTTP {response.get('status_code')}"}
+    return results
+
+
+class ChatBatchBackend(ABC):
+    """Interface for Batch-API style backends: submit a JSONL request file, later collect its output."""
+
+    name = "base"
+
+    @abstractmethod
+    async def submit(self, lines: List[Dict[str, Any]]) -> str:
+        """Submit request lines ({custom_id, method, url, body}) and return the batch id."""
+
+    @abstractmethod
+    async def wait(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Wait for a batch to finish.
+
+        Returns:
+            custom_id -> {"body": chat completion dict} or {"error": message}
+
+        Raises:
+            KeyError: The backend does not know the batch (e.g. it was submitted by an earlier process)
+        """
+
+
+class OpenAIBatchBackend(ChatBatchBackend):
+    """OpenAI Batch API: upload the request file, create a 24h batch, poll, download the output file."""
+
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key or settings.openai_api_key
+        self.base_url = settings.openai_base_url.rstrip("/")
+
+    def _request(self, method: str, path: str, **kwargs) -> Any:
+        import requests  # Imported on first use to keep app startup fast
+        response = requests.request(method, f"{self.base_url}{path}", timeout=120,
+                                    headers={"Authorization": f"Bearer {self.api_key}"}, **kwargs)
+        if response.status_code == 404:
+            raise KeyError(path)
+        response.raise_for_status()
+        return response
+
+    def _submit(self, lines: List[Dict[str, Any]]) -> str:
+        payload = "\n".join(json.dumps(line) for line in lines).encode("utf-8")
+        upload = self._request("POST", "/files", data={"purpose": "batch"},
+                               files={"file": ("batch.jsonl", payload, "application/jsonl")}).json()
+        batch = self._request("POST", "/batches", json={
+            "input_file_id": upload["id"],
+            "endpoint": "/v1/chat/completions",
+            "completion_window": "24h"
+        }).json()
+        return batch["id"]
+
+    async def submit(self, lines: List[Dict[str, Any]]) -> str:
+        return await asyncio.to_thread(self._submit, lines)
+
+    async def wait(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        while True:
+            batch = (await asyncio.to_thread(self._request, "GET", f"/batches/{batch_id}")).json()
+            if batch["status"] in TERMINAL_BATCH_STATES:
+                break
+            await asyncio.sleep(settings.batch_poll_interval)
+        results = {}
+        for file_field in ("output_file_id", "error_file_id"):
+            if batch.get(file_field):
+                content = await asyncio.to_thread(self._request, "GET", f"/files/{batch[file_field]}/content")
+                results.update(parse_batch_output(content.text))
+        if batch["status"] != "completed":
+            logger.warning(f"⚠️ Batch {batch_id} ended as {batch['status']}: {batch.get('errors')}")
+        return results
+
+
+class LocalBatchBackend(ChatBatchBackend):
+    """Stand-in for the Batch API: runs each request file in-process through the regular chat API."""
+
+    name = "local"
+
+    def __init__(self):
+        self._batches: Dict[str, asyncio.Task] = {}
+
+    async def submit(self, lines: List[Dict[str, Any]]) -> str:
+        batch_id = "local_batch_" + uuid.uuid4().hex[:12]
+        self._batches[batch_id] = asyncio.create_task(self._run(lines))
+        return batch_id
+
+    async def _run(self, lines: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        client = create_openai_client(settings.openai_api_key)
+
+        async def run_line(line: Dict[str, Any]):
+            try:
+                response = await resilience.call("chat", client.chat.completions.create, api_key=client.api_key, **line["body"])
+                return line["custom_id"], {"body": response.model_dump()}
+            except Exception as e:
+                return line["custom_id"], {"error": str(e)}
+
+        return dict(await asyncio.gather(*(run_line(line) for line in lines)))
+
+    async def wait(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        return await self._batches.pop(batch_id)
+
+
+# Backend name (BATCH_BACKEND) -> implementation
+BACKENDS: Dict[str, Type[ChatBatchBackend]] = {
+    OpenAIBatchBackend.name: OpenAIBatchBackend,
+    LocalBatchBackend.name: LocalBatchBackend,
+}
+
+
+class BatchCollector:
+    """
+    Chat transport (see ai_client.chat_transport) that coalesces the pipeline's completions
+    into batch files. Requests arriving within BATCH_FLUSH_SECONDS of the first pending one
+    are submitted together and identical requests share one line. Submitted batch ids are
+    journaled, so a resumed job waits for batches still in flight instead of paying twice.
+    """
+
+    def __init__(self, backend: ChatBatchBackend, journal_path: Path):
+        self.backend = backend
+        self.journal_path = journal_path
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._results: Dict[str, asyncio.Future] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+        self._journaled: Dict[str, str] = {}  # custom_id -> batch_id, from earlier runs of the job
+        if journal_path.exists():
+            for line in journal_path.read_text(encoding="utf-8").splitlines():
+                entry = json.loads(line)
+                if entry["backend"] == backend.name:
+                    self._journaled.update({custom_id: entry["batch_id"] for custom_id in entry["custom_ids"]})
+
+    async def create(self, **body) -> Any:
+        """Same contract as chat.completions.create, resolved when the request's batch finishes."""
+        custom_id = "req_" + hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+        while True:
+            future = self._results.get(custom_id)
+            if future is None and custom_id in self._journaled:
+                self._resume(self._journaled[custom_id])
+                future = self._results.get(custom_id)
+            if future is None:
+                future = self._enqueue(custom_id, body)
+            result = await asyncio.shield(future)
+            if result is not None:
+                break
+            # None: the journaled batch is unknown to the backend, submit the request again
+        if "error" in result:
+            raise RuntimeError(f"Batch request failed: {result['error']}")
+        from openai.types.chat import ChatCompletion  # Imported on first use to keep app startup fast
+        return ChatCompletion.model_validate(result["body"])
+
+    def _enqueue(self, custom_id: str, body: Dict[str, Any]) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = self._results[custom_id] = loop.create_future()
+        self._pending[custom_id] = {"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": body}
+        if len(self._pending) >= settings.batch_max_requests:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(settings.batch_flush_seconds, self._flush)
+        return future
+
+    def _resume(self, batch_id: str):
+        custom_ids = [custom_id for custom_id, journaled_id in self._journaled.items() if journaled_id == batch_id]
+        loop = asyncio.get_running_loop()
+        for custom_id in custom_ids:
+            del self._journaled[custom_id]
+            self._results.setdefault(custom_id, loop.create_future())
+        logger.info(f"📦 Resuming batch {batch_id} ({len(custom_ids)} requests)")
+        self._spawn(self._collect(batch_id, custom_ids))
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._pending:
+            lines = list(self._pending.values())
+            self._pending = {}
+            self._spawn(self._submit(lines))
+
+    def _spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _submit(self, lines: List[Dict[str, Any]]):
+        custom_ids = [line["custom_id"] for line in lines]
+        try:
+            batch_id = await self.backend.submit(lines)
+        except Exception as e:
+            logger.error(f"💥 Batch submission failed ({len(lines)} requests): {e}")
+            self._resolve(custom_ids, {}, f"Batch submission failed: {e}")
+            return
+        await asyncio.to_thread(self._journal, batch_id, custom_ids)
+        logger.info(f"📦 Submitted batch {batch_id} ({len(lines)} requests, {self.backend.name} backend)")
+        await self._collect(batch_id, custom_ids)
+
+    def _journal(self, batch_id: str, custom_ids: List[str]):
+        with open(self.journal_path, "a", encoding="utf-8") as journal:
+            journal.write(json.dumps({"batch_id": batch_id, "backend": self.backend.name,
+                                      "custom_ids": custom_ids, "submitted": time.time()}) + "\n")
+
+    async def _collect(self, batch_id: str, custom_ids: List[str]):
+        try:
+            with telemetry.span("batch.wait", backend=self.backend.name, requests=len(custom_ids)):
+                results = await self.backend.wait(batch_id)
+        except KeyError:
+            logger.warning(f"⚠️ Batch {batch_id} is unknown to the {self.backend.name} backend, resubmitting its requests")
+            self._resolve(custom_ids, None)
+            return
+        except Exception as e:
+            logger.error(f"💥 Collecting batch {batch_id} failed: {e}")
+            self._resolve(custom_ids, {}, f"Batch {batch_id} failed: {e}")
+            return
+        logger.info(f"📦 Batch {batch_id} finished ({len(results)}/{len(custom_ids)} results)")
+        self._resolve(custom_ids, results)
+
+    def _resolve(self, custom_ids: Iterable[str], results: Optional[Dict[str, Dict[str, Any]]], error: str = "Missing from batch output"):
+        for custom_id in custom_ids:
+            future = self._results.pop(custom_id, None)
+            if future is not None and not future.done():
+                future.set_result(None if results is None else results.get(custom_id) or {"error": error})
+
+    async def close(self):
+        """Cancel the flush timer and any batch still being waited for (its journal entry allows resuming)."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+class BatchRunner:
+    """
+    Creates, runs and resumes bulk brief jobs. Each job lives in BATCH_DIR/<job_id>/:
+    input.jsonl (items), job.json (settings and status), results.jsonl (one record per
+    finished item; the last record of an id wins) and, in batch mode, batches.jsonl.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self._root = root
+        self._orchestrator: Optional[BriefOrchestratorService] = None
+        self._running: Dict[str, asyncio.Task] = {}
+        self._append_lock = threading.Lock()
+
+    @property
+    def root(self) -> Path:
+        return Path(self._root or settings.batch_dir)
+
+    @property
+    def orchestrator(self) -> BriefOrchestratorService:
+        if self._orchestrator is None:
+            self._orchestrator = BriefOrchestratorService()
+        return self._orchestrator
+
+    def job_dir(self, job_id: str) -> Path:
+        """Directory of an existing job (KeyError for malformed or unknown ids)."""
+        if not JOB_ID_PATTERN.match(job_id) or not (self.root / job_id / "job.json").is_file():
+            raise KeyError(job_id)
+        return self.root / job_id
+
+    def results_path(self, job_id: str) -> Path:
+        return self.job_dir(job_id) / "results.jsonl"
+
+    def _write_meta(self, job_id: str, meta: Dict[str, Any]):
+        path = self.root / job_id / "job.json"
+        temp_path = path.with_name(".job.json.tmp")
+        temp_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        os.replace(temp_path, path)
+
+    def _read_meta(self, job_id: str) -> Dict[str, Any]:
+        return json.loads((self.job_dir(job_id) / "job.json").read_text(encoding="utf-8"))
+
+    def create_job(self, items: List[Dict[str, str]], mode: str = "direct", concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Store a new job.
+
+        Args:
+            items: Output of parse_items
+            mode: "direct" (regular API calls) or "batch" (Batch-API request files)
+            concurrency: Items in flight (defaults to BATCH_CONCURRENCY, or BATCH_MAX_REQUESTS in batch mode)
+
+        Returns:
+            The job's metadata
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown batch mode '{mode}' (use {', '.join(MODES)})")
+        if mode == "batch" and settings.batch_backend not in BACKENDS:
+            raise ValueError(f"Unknown batch backend '{settings.batch_backend}' (available: {', '.join(BACKENDS)})")
+        job_id = "batch_" + uuid.uuid4().hex[:12]
+        job_dir = self.root / job_id
+        job_dir.mkdir(parents=True)
+        with open(job_dir / "input.jsonl", "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(item) + "\n" for item in items)
+        meta = {
+            "job_id": job_id,
+            "mode": mode,
+            "backend": settings.batch_backend if mode == "batch" else None,
+            "concurrency": concurrency or (settings.batch_max_requests if mode == "batch" else settings.batch_concurrency),
+            "total": len(items),
+            "created": time.time(),
+            "status": "pending"
+        }
+        self._write_meta(job_id, meta)
+        logger.info(f"🗂️ Created batch job {job_id}: {len(items)} items, {mode} mode")
+        return meta
+
+    def _latest_results(self, job_id: str) -> Dict[str, str]:
+        """id -> status of the most recent record for each item."""
+        path = self.results_path(job_id)
+        statuses = {}
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line after a crash
+                    statuses[record["id"]] = record["status"]
+        return statuses
+
+    def get_job(self, job_id: str) -> Dict[str, Any]:
+        """Job metadata with progress counts."""
+        meta = self._read_meta(job_id)
+        statuses = list(self._latest_results(job_id).values())
+        meta["completed"] = statuses.count("ok")
+        meta["failed"] = statuses.count("error")
+        meta["running"] = self.is_running(job_id)
+        return meta
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        if not self.root.is_dir():
+            return []
+        jobs = [self.get_job(path.name) for path in self.root.iterdir()
+                if JOB_ID_PATTERN.match(path.name) and (path / "job.json").is_file()]
+        return sorted(jobs, key=lambda job: job["created"], reverse=True)
+
+    def is_running(self, job_id: str) -> bool:
+        task = self._running.get(job_id)
+        return task is not None and not task.done()
+
+    def _append_result(self, job_id: str, record: Dict[str, Any]):
+        """Append and fsync one record (blocking: called through asyncio.to_thread by the workers)."""
+        with self._append_lock, open(self.results_path(job_id), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _drop_torn_line(self, job_id: str):
+        """Cut a half-written last record (crash mid-write) so the next record starts on its own line."""
+        path = self.results_path(job_id)
+        if not path.exists() or path.stat().st_size == 0:
+            return
+        with open(path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.seek(0)
+                f.truncate(f.read().rfind(b"\n") + 1)
+                logger.warning(f"⚠️ Dropped a torn result line from batch job {job_id}")
+
+    async def _process_item(self, item: Dict[str, str]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        # One correlation ID per item, shared by its retries and recorded with its result
+        record: Dict[str, Any] = {"id": item["id"], "request_id": new_request_id()}
+        for attempt in range(1, ITEM_ATTEMPTS + 1):
+            try:
+                with correlation_scope(record["request_id"]), usage_ledger.request_scope("batch"), \
+                        telemetry.span("batch.item", attempt=attempt):
+                    wizard_input = await self.orchestrator.extract_and_autofill(InitialUserRequest(user_request=item["user_request"]))
+                    brief = await self.orchestrator.generate_final_brief(wizard_input)
+                record.update(status="ok", product_name=wizard_input.product_name, final_prompt=brief.final_prompt)
+                break
+            except UpstreamError as e:
+                if not e.transient or attempt == ITEM_ATTEMPTS:
+                    record.update(status="error", error=str(e))
+                    break
+                # Wait out the outage instead of failing the rest of the catalog in seconds
+                await asyncio.sleep(e.retry_after or settings.circuit_open_seconds)
+            except Exception as e:
+                record.update(status="error", error=str(e))
+                break
+        if record["status"] == "error":
+            logger.warning(f"⚠️ Batch item {item['id']} failed: {record['error']}")
+        record["seconds"] = round(time.perf_counter() - started, 2)
+        return record
+
+    async def run(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process the job's remaining items (failed ones are retried), checkpointing each result.
+
+        Yields:
+            Result records in completion order: {"id", "status", "product_name", "final_prompt", "seconds"}
+            or {"id", "status": "error", "error", "seconds"}
+        """
+        meta = self._read_meta(job_id)
+        job_dir = self.job_dir(job_id)
+        with open(job_dir / "input.jsonl", encoding="utf-8") as f:
+            items = [json.loads(line) for line in f if line.strip()]
+        await asyncio.to_thread(self._drop_torn_line, job_id)
+        done = {item_id for item_id, status in self._latest_results(job_id).items() if status == "ok"}
+        remaining = iter([item for item in items if item["id"] not in done])
+        if done:
+            logger.info(f"🔁 Resuming batch job {job_id}: {len(done)}/{len(items)} items already done")
+
+        collector = None
+        if meta["mode"] == "batch":
+            collector = BatchCollector(BACKENDS[meta["backend"]](), job_dir / "batches.jsonl")
+        results: asyncio.Queue = asyncio.Queue()
+        writes: set = set()
+
+        async def worker():
+            # Context set here stays in this task: the batch transport and a single, lower-weight fair-queue flow for the job
+            chat_transport.set(collector)
+            with rate_limiter.client_scope(job_id, weight=settings.rate_limit_batch_weight):
+                for item in remaining:  # shared iterator, so each item is taken by exactly one worker
+                    record = await self._process_item(item)
+                    # Off the event loop; shielded so an interrupted job still checkpoints a finished item
+                    write = asyncio.ensure_future(asyncio.to_thread(self._append_result, job_id, record))
+                    writes.add(write)
+                    write.add_done_callback(writes.discard)
+                    await asyncio.shield(write)
+                    await results.put(record)
+
+        meta["status"] = "running"
+        meta["started"] = time.time()
+        self._write_meta(job_id, meta)
+        workers = [asyncio.create_task(worker()) for _ in range(max(1, min(meta["concurrency"], len(items) - len(done))))]
+        all_done = asyncio.gather(*workers)
+        all_done.add_done_callback(lambda _: results.put_nowait(None))
+        try:
+            while (record := await results.get()) is not None:
+                yield record
+            await all_done
+            meta["status"] = "completed" if all(status == "ok" for status in self._latest_results(job_id).values()) else "completed_with_errors"
+        except BaseException:
+            meta["status"] = "interrupted"
+            raise
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await asyncio.gather(*writes, return_exceptions=True)
+            if collector is not None:
+                await collector.close()
+            meta["finished"] = time.time()
+            self._write_meta(job_id, meta)
+            logger.info(f"🗂️ Batch job {job_id} {meta['status']}")
+
+    def start(self, job_id: str) -> Dict[str, Any]:
+        """Run (or resume) a job in the background; results are read back from its results file."""
+        self.job_dir(job_id)
+        if self.is_running(job_id):
+            raise RuntimeError(f"Batch job {job_id} is already running")
+
+        async def consume():
+            async for _ in self.run(job_id):
+                pass
+
+        self._running[job_id] = asyncio.create_task(consume())
+        return self.get_job(job_id)
+
+    async def follow_results(self, job_id: str, follow: bool = True) -> AsyncIterator[bytes]:
+        """Stream the results file, then (while the job runs) each new record as it is written."""
+        path = self.results_path(job_id)
+        offset = 0
+        while True:
+            running = self.is_running(job_id)
+            if path.exists():
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    chunk = f.read()
+                complete = chunk[:chunk.rfind(b"\n") + 1]  # never emit a half-written line
+                offset += len(complete)
+                if complete:
+                    yield complete
+            if not (follow and running):
+                return
+            await asyncio.sleep(0.5)
+
+    async def stop(self):
+        """Interrupt running jobs on shutdown; they can be resumed later."""
+        tasks = [task for task in self._running.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Global instance
+batch_runner = BatchRunner()
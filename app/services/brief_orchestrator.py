@@ -7,8 +7,16 @@ Enhanced with structured logging and self-healing architecture.
 from typing import Dict, Any
 from loguru import logger
 from app.schemas.models import InitialUserRequest, WizardInput, BriefOutput
-from app.services.ai_client import AIClient
+from app.config.settings import settings
+from app.services.ai_client import AIClient, EXTRACTION_FIELDS, REQUIRED_EXTRACTION_FIELDS, build_extraction_prompt
+from app.services.correlation import current_request_id
+from app.services.extraction_retries import extraction_retries
+from app.services.model_router import model_router
 from app.services.prompt_composer import PromptComposerService
+from app.services.resilience import UpstreamError
+from app.services.rule_extractor import rule_extractor
+from app.services.telemetry import telemetry
+from app.services.token_budget import token_budget
 
 
 class BriefOrchestratorService:
@@ -23,14 +31,19 @@ class BriefOrchestratorService:
         self.prompt_composer = PromptComposerService()
         logger.info("BriefOrchestratorService initialized with self-healing architecture")
     
+    @telemetry.traced("pipeline.extract_and_autofill")
     async def extract_and_autofill(self, request: InitialUserRequest) -> WizardInput:
         """
         Extract wizard data from user request with self-healing validation feedback loop.
         
         This implements Flow 1 with self-healing architecture:
         1. Receive InitialUserRequest
-        2. Use AIClient to extract structured data (LLM as Analyst) with retry logic
-        3. Validate extracted data and provide feedback for corrections
+        2. Fill what the request states outright with the local rule extractor; if the
+           required fields are confidently known, skip the LLM, otherwise use AIClient to
+           extract only the remaining fields (LLM as Analyst)
+        3. Validate extracted data and re-ask only the fields that failed, with the errors
+           as feedback, one model tier up (upstream failures are retried by the
+           resilience layer, not here)
         4. Autofill missing fields with defaults
         5. Return complete WizardInput
         
@@ -43,7 +56,9 @@ class BriefOrchestratorService:
         MAX_RETRIES = 2
         extracted_data = None
         validation_errors = []
-        request_id = id(request)  # Simple request tracking
+        retry_fields = []  # fields blamed by the last failed validation, re-asked on their own
+        model = model_router.model_for("extract")
+        request_id = current_request_id()
         
         logger.info(f"🎬 Starting extraction workflow [ID: {request_id}]", extra={
             "request_id": request_id,
@@ -51,28 +66,74 @@ class BriefOrchestratorService:
             "workflow": "extract_and_autofill"
         })
         
-        # Self-healing retry loop
-        for attempt in range(MAX_RETRIES):
+        # Step 1: Deterministic fast path; the LLM is only asked for what the rules could not settle
+        with telemetry.span("brief.extract_rules"):
+            rules = rule_extractor.extract(request.user_request, request.fields, scan_text=settings.rule_extraction_enabled)
+        known = rules.confident()
+        llm_fields = rules.missing() if known else None
+        candidate = {**rules.values, "user_request": request.user_request}
+        if rules.score >= settings.rule_extraction_skip_confidence and not self.prompt_composer.validate_extracted_data(candidate):
+            extracted_data = candidate
+            rule_extractor.record("rules", len(known), 0)
+            logger.info(f"⚡ Rule extraction settled the request, LLM skipped [ID: {request_id}]", extra={
+                "request_id": request_id,
+                "rule_score": round(rules.score, 3),
+                "rule_fields": len(rules.values)
+            })
+        else:
+            requested = len(EXTRACTION_FIELDS) if llm_fields is None else len(llm_fields)
+            rule_extractor.record("partial" if llm_fields is not None else "full", len(known), requested)
+            logger.info(f"🧩 Rule extraction filled {len(known)} fields, asking the LLM for {requested} [ID: {request_id}]", extra={
+                "request_id": request_id,
+                "rule_score": round(rules.score, 3),
+                "ambiguous_fields": sorted(rules.ambiguous)
+            })
+        
+        # Self-healing retry loop (not entered when the rules settled the request)
+        for attempt in range(MAX_RETRIES if extracted_data is None else 0):
             try:
                 # Prepare the request for AI Client
                 if attempt == 0:
                     # First attempt - standard extraction
                     logger.info(f"🔍 Attempt {attempt + 1}/{MAX_RETRIES}: Initial extraction [ID: {request_id}]")
-                    extracted_data = await self.ai_client.extract_wizard_data(request.user_request)
+                    with telemetry.span("brief.extract", attempt=attempt + 1, model=model):
+                        extracted_data = await self.ai_client.extract_wizard_data(
+                            request.user_request, model=model, fields=llm_fields, known=known or None)
+                    # Rule values the LLM was not asked for (or left empty) complete its answer
+                    extracted_data = rules.merge(extracted_data)
+                elif retry_fields:
+                    # Retry attempt - re-ask only the fields that failed validation, errors as feedback
+                    retry_known = {name: extracted_data[name] for name in REQUIRED_EXTRACTION_FIELDS
+                                   if name not in retry_fields and extracted_data.get(name) not in (None, "")}
+                    full_prompt = build_extraction_prompt(request.user_request, llm_fields, known or None, validation_errors)
+                    partial_prompt = build_extraction_prompt(request.user_request, retry_fields, retry_known or None, validation_errors)
+                    tokens_saved = max(0, token_budget.count(full_prompt, model) - token_budget.count(partial_prompt, model))
+                    extraction_retries.record(retry_fields, tokens_saved)
+                    logger.warning(f"⚠️ Attempt {attempt + 1}/{MAX_RETRIES}: Re-extracting {len(retry_fields)} failed fields [ID: {request_id}]", extra={
+                        "request_id": request_id,
+                        "validation_errors": validation_errors,
+                        "retry_fields": retry_fields,
+                        "prompt_tokens_saved": tokens_saved
+                    })
+                    with telemetry.span("brief.extract", attempt=attempt + 1, model=model, fields=len(retry_fields)):
+                        retried = await self.ai_client.extract_wizard_data(
+                            request.user_request, model=model, fields=retry_fields, known=retry_known or None,
+                            feedback=validation_errors)
+                    # Only the failed fields are replaced; everything else keeps its previous value
+                    extracted_data = {**extracted_data, **{name: value for name, value in retried.items()
+                                                           if name in retry_fields and value not in (None, "")}}
                 else:
-                    # Retry attempt - include validation errors as feedback
-                    error_feedback = "; ".join(validation_errors)
-                    retry_instruction = (
-                        f"Your previous attempt to extract data failed with the following errors: {error_feedback}. "
-                        f"Please analyze these errors, correct your process, and provide a new, valid JSON output "
-                        f"based on the original user request: '{request.user_request}'"
-                    )
+                    # Retry attempt - full re-extraction (no single field to blame), errors as feedback
+                    extraction_retries.record(None)
                     logger.warning(f"⚠️ Attempt {attempt + 1}/{MAX_RETRIES}: Retry with error feedback [ID: {request_id}]", extra={
                         "request_id": request_id,
-                        "validation_errors": validation_errors,
-                        "error_feedback": error_feedback
+                        "validation_errors": validation_errors
                     })
-                    extracted_data = await self.ai_client.extract_wizard_data(retry_instruction)
+                    with telemetry.span("brief.extract", attempt=attempt + 1, model=model):
+                        extracted_data = await self.ai_client.extract_wizard_data(
+                            request.user_request, model=model, fields=llm_fields, known=known or None,
+                            feedback=validation_errors or None)
+                    extracted_data = rules.merge(extracted_data)
                 
                 # Debug: Log raw extracted data
                 logger.debug(f"🔍 Raw extracted data [ID: {request_id}]", extra={
@@ -85,7 +146,13 @@ class BriefOrchestratorService:
                 extracted_data["user_request"] = request.user_request
                 
                 # Validate the extracted data
-                validation_errors = self.prompt_composer.validate_extracted_data(extracted_data)
+                with telemetry.span("brief.validate_extraction", attempt=attempt + 1):
+                    failures = self.prompt_composer.validate_extracted_fields(extracted_data)
+                validation_errors = [message for _, message in failures]
+                # A partial retry is possible only when every error names schema fields
+                blamed = {name for names, _ in failures for name in names}
+                retry_fields = [name for name in EXTRACTION_FIELDS if name in blamed] if all(names for names, _ in failures) else []
+                model_router.record_quality("extract", model, passed=not validation_errors)
                 
                 if not validation_errors:
                     # Success! Data is valid
@@ -110,7 +177,11 @@ class BriefOrchestratorService:
                             "final_errors": validation_errors
                         })
                         raise Exception(f"{error_msg}. Final errors: {validation_errors}")
+                    model = model_router.escalate("extract", model) or model
                     
+            except UpstreamError:
+                # Re-asking cannot fix a rate limit or outage; resilience already retried it
+                raise
             except Exception as e:
                 if attempt == MAX_RETRIES - 1:
                     # Final attempt failed with exception
@@ -129,11 +200,14 @@ class BriefOrchestratorService:
                         "exception": str(e),
                         "retrying": True
                     })
+                    retry_fields = []  # nothing trustworthy to keep: the retry re-extracts in full
+                    model = model_router.escalate("extract", model) or model
                     continue
         
         # Step 2: Autofill missing fields with defaults
         logger.info(f"🔧 Autofilling missing fields with defaults [ID: {request_id}]")
-        wizard_input = self.prompt_composer.autofill_wizard_input(extracted_data)
+        with telemetry.span("brief.autofill"):
+            wizard_input = self.prompt_composer.autofill_wizard_input(extracted_data)
         
         logger.info(f"🎉 Extraction workflow completed successfully [ID: {request_id}]", extra={
             "request_id": request_id,
@@ -146,6 +220,7 @@ class BriefOrchestratorService:
         
         return wizard_input
     
+    @telemetry.traced("pipeline.generate_final_brief")
     async def generate_final_brief(self, wizard_input: WizardInput) -> BriefOutput:
         """
         Generate the final enhanced photography brief from wizard input.
@@ -163,7 +238,7 @@ class BriefOrchestratorService:
         Returns:
             BriefOutput containing the final enhanced prompt
         """
-        request_id = id(wizard_input)  # Simple request tracking
+        request_id = current_request_id()
         
         logger.info(f"🎨 Starting final brief generation workflow [ID: {request_id}]", extra={
             "request_id": request_id,
@@ -175,7 +250,8 @@ class BriefOrchestratorService:
         try:
             # Step 1: Compose initial brief using system prompt template
             logger.info(f"📝 Composing initial brief from wizard input [ID: {request_id}]")
-            initial_brief = self.prompt_composer.compose_initial_brief(wizard_input)
+            with telemetry.span("brief.compose"):
+                initial_brief = self.prompt_composer.compose_initial_brief(wizard_input)
             
             logger.debug(f"📊 Initial brief metrics [ID: {request_id}]", extra={
                 "request_id": request_id,
@@ -185,7 +261,8 @@ class BriefOrchestratorService:
             
             # Step 2: Validate the brief against quality rules
             logger.info(f"✅ Validating composed brief [ID: {request_id}]")
-            validation_result = self.prompt_composer.validate_brief(initial_brief, wizard_input)
+            with telemetry.span("brief.validate"):
+                validation_result = self.prompt_composer.validate_brief(initial_brief, wizard_input)
             
             if not validation_result["is_valid"]:
                 logger.warning(f"⚠️ Brief validation failed [ID: {request_id}]", extra={
@@ -257,10 +334,11 @@ PROFESSIONAL PHOTOGRAPHY QUALITY CONTROL:
 - Avoid artificial or composite appearance with seamless element integration
 """
             
-            enhanced_brief = await self.ai_client.enhance_brief_from_structured_data(
-                wizard_input.model_dump(), 
-                user_api_key=wizard_input.user_api_key
-            )
+            with telemetry.span("brief.enhance"):
+                enhanced_brief = await self.ai_client.enhance_brief_from_structured_data(
+                    wizard_input.model_dump(), 
+                    user_api_key=wizard_input.user_api_key
+                )
             
             # Combine with professional photography rules
             final_brief = professional_photography_rules + enhanced_brief
@@ -276,7 +354,7 @@ PROFESSIONAL PHOTOGRAPHY QUALITY CONTROL:
                 "refactor_success": word_count > 200 and section_count >= 5,
                 "operation": "POST_PRODUCT_PHOTOGRAPHER_VALIDATION"
             })
-            logger.info(f"📝 ENHANCED BRIEF PREVIEW [ID: {request_id}]: {enhanced_brief[:800]}{'...' if len(enhanced_brief) > 800 else ''}")
+            logger.bind(verbose=True).info(f"📝 ENHANCED BRIEF PREVIEW [ID: {request_id}]: {enhanced_brief[:800]}{'...' if len(enhanced_brief) > 800 else ''}")
             
             logger.debug(f"📈 Enhanced brief metrics [ID: {request_id}]", extra={
                 "request_id": request_id,
@@ -295,6 +373,8 @@ PROFESSIONAL PHOTOGRAPHY QUALITY CONTROL:
             
             return BriefOutput(final_prompt=final_brief)
             
+        except UpstreamError:
+            raise  # keeps its class and Retry-After for the 503/502 mapping and batch backoff
         except Exception as e:
             logger.error(f"💥 Critical error in generate_final_brief [ID: {request_id}]", extra={
                 "request_id": request_id,
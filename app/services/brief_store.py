@@ -0,0 +1,181 @@
+"""
+Brief Store - server-side, gzip-compressed storage for generated briefs.
+Briefs run 15-32K characters; keeping them under a brief_id lets clients send the id
+to /generate-image, /enhance-image and /download-brief instead of posting the text back.
+Each brief is written once as <brief_id>.txt.gz and served as-is to clients that accept gzip.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from loguru import logger
+from app.config.settings import settings
+from app.services.telemetry import telemetry
+
+BRIEF_ID_PATTERN = re.compile(r"^brief_[0-9a-f]{16}$")
+
+# Stored briefs older than BRIEF_STORE_MAX_AGE_DAYS are removed at most this often
+SWEEP_INTERVAL_SECONDS = 3600.0
+
+
+def content_brief_id(text: str) -> str:
+    """Content-addressed id for client-supplied brief text (identical briefs share one file)."""
+    return f"brief_{hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]}"
+
+
+class BriefStore:
+    """Briefs under BRIEF_STORE_DIR, one gzip file per brief_id."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self.saved = 0
+        self.loads = 0
+        self.misses = 0
+        self.chars_saved = 0
+        self.bytes_stored = 0
+
+    @property
+    def root(self) -> Path:
+        return Path(settings.brief_store_dir)
+
+    def path_for(self, brief_id: str) -> Path:
+        if not BRIEF_ID_PATTERN.match(brief_id):
+            raise ValueError(f"Invalid brief id '{brief_id}'")
+        return self.root / f"{brief_id}.txt.gz"
+
+    def _fresh(self, path: Path) -> bool:
+        try:
+            age = time.time() - path.stat().st_mtime
+        except OSError:
+            return False
+        return age <= settings.brief_store_max_age_days * 86400
+
+    def save(self, text: str, brief_id: Optional[str] = None) -> str:
+        """
+        Store a brief. When the id already exists only its mtime is refreshed, so a brief
+        that keeps being saved does not expire after BRIEF_STORE_MAX_AGE_DAYS.
+
+        Args:
+            text: Brief text
+            brief_id: Id to store it under (defaults to a content-addressed id)
+
+        Returns:
+            The brief_id
+        """
+        brief_id = brief_id or content_brief_id(text)
+        target = self.path_for(brief_id)
+        try:
+            os.utime(target)
+            stored = True
+        except FileNotFoundError:
+            stored = False
+        if not stored:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            data = gzip.compress(text.encode("utf-8"), compresslevel=6, mtime=0)
+            # Write to a unique temp file and rename, so a half-written brief is never served
+            temp_path = target.with_name(f".{target.name}.{uuid.uuid4().hex[:8]}.tmp")
+            try:
+                temp_path.write_bytes(data)
+                os.replace(temp_path, target)
+            except BaseException:
+                temp_path.unlink(missing_ok=True)
+                raise
+            with self._lock:
+                self.saved += 1
+                self.chars_saved += len(text)
+                self.bytes_stored += len(data)
+            logger.debug(f"🗄️ Stored {brief_id}: {len(text)} chars → {len(data)} bytes gzip")
+        if time.time() - self._last_sweep > SWEEP_INTERVAL_SECONDS:
+            self.sweep()
+        return brief_id
+
+    def load(self, brief_id: str) -> Optional[str]:
+        """Brief text for `brief_id`, or None when unknown, invalid or expired."""
+        try:
+            path = self.path_for(brief_id)
+            if self._fresh(path):
+                text = gzip.decompress(path.read_bytes()).decode("utf-8")
+                with self._lock:
+                    self.loads += 1
+                return text
+        except (ValueError, OSError, EOFError, zlib.error) as e:
+            logger.warning(f"⚠️ Could not load brief {brief_id}: {e}")
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def compressed_path(self, brief_id: str) -> Optional[Path]:
+        """Path of the stored gzip file (for serving it without decompressing), or None."""
+        try:
+            path = self.path_for(brief_id)
+        except ValueError:
+            return None
+        return path if self._fresh(path) else None
+
+    def iter_text(self, brief_id: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Decompressed UTF-8 bytes of a stored brief, in chunks (for clients without gzip)."""
+        with gzip.open(self.path_for(brief_id), "rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+    async def put(self, text: str, brief_id: Optional[str] = None) -> str:
+        """save() off the event loop."""
+        return await asyncio.to_thread(self.save, text, brief_id)
+
+    async def fetch(self, brief_id: str) -> Optional[str]:
+        """load() off the event loop."""
+        return await asyncio.to_thread(self.load, brief_id)
+
+    def sweep(self) -> int:
+        """Remove briefs older than BRIEF_STORE_MAX_AGE_DAYS; returns the number removed."""
+        self._last_sweep = time.time()
+        removed = 0
+        try:
+            entries = list(os.scandir(self.root))
+        except OSError:
+            return 0
+        for entry in entries:
+            if entry.name.endswith(".txt.gz") and not self._fresh(Path(entry.path)):
+                try:
+                    os.unlink(entry.path)
+                    removed += 1
+                except OSError:
+                    pass
+        if removed:
+            logger.info(f"🧹 Removed {removed} expired briefs from {self.root}")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Store counters (for /api/v1/health)."""
+        with self._lock:
+            return {
+                "saved": self.saved,
+                "loads": self.loads,
+                "misses": self.misses,
+                "compression_ratio": round(self.bytes_stored / self.chars_saved, 3) if self.chars_saved else None,
+            }
+
+    def prometheus_metrics(self) -> List[tuple]:
+        """Saved/loaded brief counters and stored bytes for /metrics."""
+        with self._lock:
+            return [
+                ("photoeai_briefs_saved_total", "counter", "Briefs written to the brief store", self.saved),
+                ('photoeai_brief_lookups_total{result="hit"}', "counter", "Brief store lookups by result", self.loads),
+                ('photoeai_brief_lookups_total{result="miss"}', "counter", "Brief store lookups by result", self.misses),
+                ("photoeai_brief_chars_saved_total", "counter", "Characters of brief text stored", self.chars_saved),
+                ("photoeai_brief_stored_bytes_total", "counter", "Compressed bytes written for stored briefs", self.bytes_stored),
+            ]
+
+
+# Global instance
+brief_store = BriefStore()
+telemetry.register_collector(brief_store.prometheus_metrics)
@@ -0,0 +1,152 @@
+"""
+Circuit breakers for upstream (OpenAI) calls.
+One breaker per upstream (chat, vision, images.generate, images.edit): after repeated
+infrastructure failures it opens and callers fail fast, then a single half-open probe
+decides whether to close it again.
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from loguru import logger
+from app.config.settings import settings
+from app.services.telemetry import telemetry
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+UPSTREAMS = ("chat", "vision", "images.generate", "images.edit")
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a timed open state and one half-open probe at a time."""
+
+    def __init__(self, name: str, failure_threshold: int, open_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._opened_total = 0
+        self._rejected_total = 0
+        self._last_failure: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker will admit a probe (0 when not open)."""
+        with self._lock:
+            if self._current_state(time.monotonic()) != OPEN:
+                return 0.0
+            return max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now; in half-open state only one probe is admitted."""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._rejected_total += 1
+            return False
+
+    def release_probe(self):
+        """Forget an admitted probe that never completed (e.g. the request was cancelled)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info(f"✅ Circuit '{self.name}' closed (probe succeeded)")
+            self._state = CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self, reason: str):
+        with self._lock:
+            self._last_failure = reason
+            self._consecutive_failures += 1
+            state = self._current_state(time.monotonic())
+            if state == HALF_OPEN or (state == CLOSED and self._consecutive_failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+                self._opened_total += 1
+                logger.error(f"🚫 Circuit '{self.name}' opened for {self.open_seconds:.0f}s after "
+                             f"{self._consecutive_failures} consecutive failures ({reason})")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "retry_after_seconds": round(max(0.0, self.open_seconds - (now - self._opened_at)), 1) if state == OPEN else 0,
+                "opened_total": self._opened_total,
+                "rejected_total": self._rejected_total,
+                "last_failure": self._last_failure
+            }
+
+
+class CircuitBreakerRegistry:
+    """Per-upstream breakers, created on first use with the configured thresholds."""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, upstream: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(upstream)
+            if breaker is None:
+                breaker = self._breakers[upstream] = CircuitBreaker(
+                    upstream, settings.circuit_failure_threshold, settings.circuit_open_seconds
+                )
+            return breaker
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Breaker state per upstream (for /api/v1/health)."""
+        return {upstream: self.get(upstream).snapshot() for upstream in sorted(set(UPSTREAMS) | set(self._breakers))}
+
+    def any_open(self) -> bool:
+        return any(snapshot["state"] != CLOSED for snapshot in self.snapshot().values())
+
+    def prometheus_metrics(self) -> List[tuple]:
+        """Breaker state (0 closed, 1 half-open, 2 open) and counters for /metrics."""
+        state_values = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+        snapshots = self.snapshot()
+        metrics = [
+            (f'photoeai_circuit_state{{upstream="{upstream}"}}', "gauge", "Circuit breaker state (0 closed, 1 half-open, 2 open)", state_values[snapshot["state"]])
+            for upstream, snapshot in snapshots.items()
+        ]
+        metrics += [
+            (f'photoeai_circuit_opened_total{{upstream="{upstream}"}}', "counter", "Times the circuit breaker opened", snapshot["opened_total"])
+            for upstream, snapshot in snapshots.items()
+        ]
+        metrics += [
+            (f'photoeai_circuit_rejected_total{{upstream="{upstream}"}}', "counter", "Calls rejected while the circuit was open", snapshot["rejected_total"])
+            for upstream, snapshot in snapshots.items()
+        ]
+        return metrics
+
+
+# Global instance
+circuit_breakers = CircuitBreakerRegistry()
+telemetry.register_collector(circuit_breakers.prometheus_metrics)
@@ -0,0 +1,87 @@
+"""
+Config Watcher Service - hot reload for system-prompt/*.json.
+Polls file modification times and asks Settings to swap in a new validated snapshot
+when a file actually changed, so rule edits no longer require a process restart.
+"""
+
+import asyncio
+import os
+from typing import Dict, Optional
+from loguru import logger
+from app.config.settings import settings, CONFIG_FILES, SYSTEM_PROMPT_DIR
+
+
+class ConfigWatcher:
+    """
+    Background task that watches the system-prompt configuration files.
+
+    A cheap stat() of the six files runs every interval; only when an mtime or size
+    changes are the files re-read and hashed. Invalid edits are logged and the last
+    good snapshot keeps serving.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._stat_signatures: Dict[str, tuple] = {}
+
+    def _current_signatures(self) -> Dict[str, tuple]:
+        """Return (mtime_ns, size) for each configuration file."""
+        signatures = {}
+        for config_name, filename in CONFIG_FILES.items():
+            try:
+                stat_result = os.stat(SYSTEM_PROMPT_DIR / filename)
+                signatures[config_name] = (stat_result.st_mtime_ns, stat_result.st_size)
+            except OSError:
+                signatures[config_name] = (None, None)
+        return signatures
+
+    async def check_once(self) -> list:
+        """
+        Check the configuration files and reload if any changed.
+
+        Returns:
+            Names of the configuration sections that were reloaded
+        """
+        signatures = self._current_signatures()
+        if signatures == self._stat_signatures:
+            return []
+
+        try:
+            changed = await asyncio.to_thread(settings.reload_prompt_config)
+        except Exception as e:
+            logger.error(f"💥 Config reload rejected, keeping fingerprint {settings.config_fingerprint}: {e}")
+            # Remember the bad signatures so the same broken edit is not re-parsed every tick
+            self._stat_signatures = signatures
+            return []
+
+        self._stat_signatures = signatures
+        return changed
+
+    async def _run(self, interval: float):
+        """Poll loop; runs until cancelled."""
+        logger.info(f"👀 Config watcher started (interval {interval}s, fingerprint {settings.config_fingerprint})")
+        while True:
+            await asyncio.sleep(interval)
+            await self.check_once()
+
+    def start(self, interval: Optional[float] = None):
+        """Start the watcher on the running event loop (no-op when disabled or already running)."""
+        interval = settings.config_watch_interval if interval is None else interval
+        if interval <= 0 or (self._task and not self._task.done()):
+            return
+        self._stat_signatures = self._current_signatures()
+        self._task = asyncio.create_task(self._run(interval))
+
+    async def stop(self):
+        """Cancel the watcher task and wait for it to finish."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global instance
+config_watcher = ConfigWatcher()
@@ -0,0 +1,68 @@
+"""
+Request Correlation - one collision-free ID per request, carried through every service.
+The HTTP middleware opens a correlation scope per request (reusing a well-formed incoming
+X-Request-ID header) and returns the ID in the response. Services read it with
+current_request_id() for their [ID: ...] log markers, every log record carries it as the
+request_id field, progress sessions store it, and outbound OpenAI calls send it as
+X-Client-Request-Id so upstream logs can be matched too.
+"""
+
+import re
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+from loguru import logger
+
+# Header a client may send (and always gets back) with the request's correlation ID
+REQUEST_ID_HEADER = "X-Request-ID"
+# Header OpenAI records for client-supplied request IDs
+OUTBOUND_REQUEST_ID_HEADER = "X-Client-Request-Id"
+# Incoming IDs are reused only if they are short, printable tokens (they end up in logs and headers)
+VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{8,64}$")
+
+_request_id: ContextVar[Optional[str]] = ContextVar("photoeai_request_id", default=None)
+
+
+def new_request_id() -> str:
+    """A fresh random 128-bit ID (never reused, unlike id() or hash() of request data)."""
+    return uuid.uuid4().hex
+
+
+def current_request_id() -> str:
+    """
+    The correlation ID of the request being served.
+
+    Returns:
+        The active scope's ID; outside a scope (scripts, tests) a new ID, so callers that
+        read it once per operation still get a unique marker
+    """
+    return _request_id.get() or new_request_id()
+
+
+@contextmanager
+def correlation_scope(request_id: Optional[str] = None) -> Iterator[str]:
+    """
+    Make `request_id` the correlation ID of everything run in this context, including log
+    records (as the request_id extra field) and worker threads started from it.
+
+    Args:
+        request_id: Incoming ID to reuse; replaced by a new one when missing or malformed
+
+    Yields:
+        The ID in effect
+    """
+    if not request_id or not VALID_REQUEST_ID.match(request_id):
+        request_id = new_request_id()
+    token = _request_id.set(request_id)
+    try:
+        with logger.contextualize(request_id=request_id):
+            yield request_id
+    finally:
+        _request_id.reset(token)
+
+
+def outbound_headers() -> Dict[str, str]:
+    """Headers that carry the active correlation ID to an upstream API (empty outside a scope)."""
+    request_id = _request_id.get()
+    return {OUTBOUND_REQUEST_ID_HEADER: request_id} if request_id else {}
@@ -0,0 +1,61 @@
+"""
+Extraction Retries - accounting for the self-healing extraction retry loop.
+Counts retries by scope (partial: only the fields that failed validation are re-asked;
+full: the whole schema again), how often each field had to be re-asked, and the prompt
+tokens partial retries saved compared with re-sending the full schema.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional
+from app.services.telemetry import telemetry
+
+
+class ExtractionRetryTracker:
+    """Thread-safe counters for extraction retries, shared by every orchestrator instance."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.retries: Dict[str, int] = {"partial": 0, "full": 0}
+        self.field_retries: Dict[str, int] = {}
+        self.prompt_tokens_saved = 0
+
+    def record(self, fields: Optional[List[str]], prompt_tokens_saved: int = 0):
+        """
+        Count one retry.
+
+        Args:
+            fields: Fields re-asked by a partial retry; None for a full re-extraction
+            prompt_tokens_saved: Prompt tokens the partial schema saved over the full one
+        """
+        with self._lock:
+            self.retries["full" if fields is None else "partial"] += 1
+            for name in fields or []:
+                self.field_retries[name] = self.field_retries.get(name, 0) + 1
+            self.prompt_tokens_saved += prompt_tokens_saved
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "partial_retries": self.retries["partial"],
+                "full_retries": self.retries["full"],
+                "prompt_tokens_saved": self.prompt_tokens_saved,
+                "field_retries": dict(sorted(self.field_retries.items(), key=lambda item: -item[1])),
+            }
+
+    def prometheus_metrics(self) -> List[tuple]:
+        """Retries by scope, re-asked fields and saved prompt tokens for /metrics."""
+        stats = self.stats()
+        metrics = [
+            ('photoeai_extraction_retries_total{scope="partial"}', "counter", "Extraction retries after failed validation", stats["partial_retries"]),
+            ('photoeai_extraction_retries_total{scope="full"}', "counter", "Extraction retries after failed validation", stats["full_retries"]),
+            ("photoeai_extraction_retry_prompt_tokens_saved_total", "counter", "Prompt tokens saved by re-asking only the failed fields", stats["prompt_tokens_saved"]),
+        ]
+        metrics += [(f'photoeai_extraction_field_retries_total{{field="{name}"}}', "counter",
+                     "Times a field was re-asked after failing validation", count)
+                    for name, count in stats["field_retries"].items()]
+        return metrics
+
+
+# Global instance
+extraction_retries = ExtractionRetryTracker()
+telemetry.register_collector(extraction_retries.prometheus_metrics)
@@ -0,0 +1,307 @@
+"""
+Extractive Compressor - deterministic, local compression for over-long photography briefs.
+Splits a brief into its sections and sentences, scores each sentence by the technical
+photography vocabulary and specifications it carries (camera, lens, lighting, composition,
+materials, post-processing, product preservation) and keeps the best ones, in their
+original order, within a hard character/token budget. Replaces the LLM round trip
+previously spent on shortening briefs and runs in milliseconds.
+"""
+
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+from app.services.telemetry import telemetry
+from app.services.token_budget import token_budget, CHARS_PER_TOKEN
+
+# Technical vocabulary, weighted by how much the term matters to the rendered image
+TERM_WEIGHTS: Dict[str, float] = {
+    **dict.fromkeys((
+        "canon", "eos", "sony", "nikon", "fujifilm", "hasselblad", "phase one", "leica", "full-frame",
+        "medium format", "dslr", "mirrorless", "macro", "prime lens", "telephoto", "wide-angle", "tilt-shift",
+        "aperture", "depth of field", "bokeh", "focal length", "focus stacking", "shutter speed", "iso",
+    ), 3.0),
+    **dict.fromkeys((
+        "key light", "fill light", "rim light", "back light", "backlight", "hair light", "softbox", "strip box",
+        "stripbox", "beauty dish", "octabox", "umbrella", "diffuser", "diffusion", "reflector", "bounce", "scrim",
+        "flag", "gobo", "snoot", "grid", "profoto", "broncolor", "godox", "strobe", "continuous light",
+        "natural light", "window light", "golden hour", "hard light", "soft light", "lighting ratio",
+        "color temperature", "kelvin", "specular", "highlights", "shadows", "gradient",
+    ), 2.5),
+    **dict.fromkeys((
+        "preserve", "exact", "exactly", "original", "product colors", "shape", "proportions", "logo", "label",
+        "branding",
+    ), 2.5),
+    **dict.fromkeys((
+        "rule of thirds", "leading lines", "symmetry", "negative space", "golden ratio", "eye-level", "eye level",
+        "overhead", "flat lay", "low angle", "high angle", "three-quarter", "close-up", "medium shot", "wide shot",
+        "hero shot", "framing", "perspective", "aspect ratio", "centered", "foreground", "background",
+    ), 2.0),
+    **dict.fromkeys((
+        "matte", "glossy", "satin", "metallic", "brushed", "chrome", "marble", "wood", "walnut", "oak", "leather",
+        "glass", "ceramic", "porcelain", "linen", "fabric", "velvet", "concrete", "stone", "slate", "texture",
+        "reflection", "reflections", "condensation", "droplets", "surface", "backdrop", "seamless", "props",
+        "steam", "smoke", "mist",
+    ), 1.5),
+    **dict.fromkeys((
+        "color grading", "grading", "retouch", "retouching", "dodge", "burn", "contrast", "saturation",
+        "desaturated", "sharpening", "sharpness", "white balance", "hdr", "clarity", "vignette", "film grain",
+        "tone curve", "skin tones", "warm tones", "cool tones", "palette",
+    ), 1.5),
+}
+
+# Exact specifications (focal lengths, apertures, ISO, shutter speeds, Kelvin, ratios) are never paraphrased
+SPEC_PATTERN = re.compile(
+    r"\b\d{2,3}\s?mm\b|\bf/\d+(?:\.\d+)?\b|\biso\s?\d{2,5}\b|\b1/\d+\s?s(?:ec)?\b|\b\d{4}\s?k\b"
+    r"|\b\d+(?:\.\d+)?\s?(?:stops?|ev)\b|\b\d:\d\b"
+)
+SPEC_WEIGHT = 3.0
+
+# Both patterns run on lowercased text (much faster than IGNORECASE on a large alternation)
+TERM_PATTERN = re.compile(
+    r"\b(?:" + "|".join(re.escape(term) for term in sorted(TERM_WEIGHTS, key=len, reverse=True)) + r")\b"
+)
+
+# Section weights by header keyword (first match wins); narrative sections rank lowest
+SECTION_WEIGHTS: Tuple[Tuple[str, float], ...] = (
+    ("rationale", 0.6), ("concept", 0.7), ("overview", 0.7), ("summary", 0.7), ("note", 0.7),
+    ("subject", 1.5), ("product", 1.5), ("preservation", 1.5),
+    ("lighting", 1.4), ("camera", 1.4), ("lens", 1.4),
+    ("composition", 1.3), ("framing", 1.3),
+    ("background", 1.1), ("setting", 1.1), ("environment", 1.1), ("styling", 1.1),
+)
+
+# Share of a term's weight still credited once the selection already covers it
+REPEAT_CREDIT = 0.15
+
+HEADER_PATTERN = re.compile(r"^\s*(?:#{1,6}\s+(.+?)\s*#*|\*\*([^*]{2,80})\*\*:?|([A-Z][A-Za-z0-9 &/,'-]{1,60}):)\s*$")
+BULLET_PATTERN = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+RULE_PATTERN = re.compile(r"^\s*(?:-{3,}|\*{3,}|_{3,}|={3,})\s*$")
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+
+
+def extract_terms(text: str) -> Set[str]:
+    """Technical vocabulary terms and exact specifications mentioned in `text` (lowercased)."""
+    lowered = text.lower()
+    terms = set(TERM_PATTERN.findall(lowered))
+    terms |= {re.sub(r"\s+", "", spec) for spec in SPEC_PATTERN.findall(lowered)}
+    return terms
+
+
+def term_weight(term: str) -> float:
+    return TERM_WEIGHTS.get(term, SPEC_WEIGHT)
+
+
+def term_retention(source: str, compressed: str) -> float:
+    """
+    Weighted share of the source's technical terms and specifications that survive compression.
+
+    Args:
+        source: Original brief
+        compressed: Compressed prompt
+
+    Returns:
+        0.0-1.0 (1.0 when the source has no technical terms)
+    """
+    source_terms = extract_terms(source)
+    if not source_terms:
+        return 1.0
+    kept = source_terms & extract_terms(compressed)
+    return sum(term_weight(term) for term in kept) / sum(term_weight(term) for term in source_terms)
+
+
+@dataclass
+class _Sentence:
+    index: int
+    section: int
+    text: str
+    terms: Set[str]
+    lead: bool  # first sentence of its section
+
+
+@dataclass
+class _Section:
+    header: str
+    weight: float
+    sentences: List[_Sentence] = field(default_factory=list)
+
+
+def _section_weight(header: str) -> float:
+    lowered = header.lower()
+    for keyword, weight in SECTION_WEIGHTS:
+        if keyword in lowered:
+            return weight
+    return 1.0
+
+
+def _clean(line: str) -> str:
+    line = BULLET_PATTERN.sub("", line)
+    return re.sub(r"\*\*|__|`", "", line).strip()
+
+
+def _parse(text: str) -> List[_Section]:
+    """Split a brief into sections (by markdown/bold/colon headers) of cleaned, de-duplicated sentences."""
+    sections = [_Section(header="", weight=1.0)]
+    seen: Set[str] = set()
+    index = 0
+    for line in text.splitlines():
+        if not line.strip() or RULE_PATTERN.match(line):
+            continue
+        header = HEADER_PATTERN.match(line)
+        if header:
+            title = _clean(next(group for group in header.groups() if group))
+            sections.append(_Section(header=title, weight=_section_weight(title)))
+            continue
+        for sentence in SENTENCE_SPLIT.split(_clean(line)):
+            sentence = sentence.strip()
+            key = sentence.lower()
+            if len(sentence) < 3 or key in seen:
+                continue  # repeated sentences add length but nothing new
+            seen.add(key)
+            section = sections[-1]
+            section.sentences.append(_Sentence(index, 0, sentence, extract_terms(sentence), lead=not section.sentences))
+            index += 1
+    sections = [section for section in sections if section.sentences]
+    for position, section in enumerate(sections):
+        for sentence in section.sentences:
+            sentence.section = position
+    return sections
+
+
+def _truncate_words(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    boundary = cut.rfind(" ")
+    return cut[:boundary] if boundary > max_chars * 0.5 else cut
+
+
+class ExtractiveCompressor:
+    """Section-aware extractive summarizer with a technical-term priority vocabulary."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.compressions = 0
+        self.chars_in = 0
+        self.chars_out = 0
+
+    def compress(self, text: str, max_chars: int, max_tokens: Optional[int] = None) -> str:
+        """
+        Compress a brief to fit a hard budget, keeping the most informative sentences.
+
+        Args:
+            text: Brief to compress
+            max_chars: Character budget of the result
+            max_tokens: Optional token budget (counted with the configured model's tokenizer)
+
+        Returns:
+            `text` unchanged when it already fits, otherwise the selected sentences in their
+            original order, one line per section ("Section: sentence sentence")
+        """
+        budget = max_chars
+        if max_tokens is not None:
+            text_tokens = token_budget.count(text)
+            if len(text) <= max_chars and text_tokens <= max_tokens:
+                return text
+            # Characters the token budget buys at this brief's own characters-per-token ratio
+            chars_per_token = len(text) / text_tokens if text_tokens else CHARS_PER_TOKEN
+            budget = min(max_chars, int(max_tokens * chars_per_token))
+        elif len(text) <= budget:
+            return text
+
+        with telemetry.span("compress.extractive", chars=len(text), budget=budget):
+            sections = _parse(text)
+            for _ in range(4):
+                compressed = _truncate_words(self._render(sections, self._select(sections, budget)), budget)
+                if max_tokens is None:
+                    break
+                tokens = token_budget.count(compressed)
+                if tokens <= max_tokens:
+                    break
+                budget = int(budget * max_tokens / tokens * 0.97)  # the selection tokenizes denser than the whole brief
+
+        with self._lock:
+            self.compressions += 1
+            self.chars_in += len(text)
+            self.chars_out += len(compressed)
+        return compressed
+
+    def _gain(self, sentence: _Sentence, sections: List[_Section], covered: Set[str]) -> float:
+        gain = sum(term_weight(term) * (REPEAT_CREDIT if term in covered else 1.0) for term in sentence.terms)
+        gain += 0.5 if sentence.lead else 0.1  # a section's opening sentence states its subject
+        return gain * sections[sentence.section].weight
+
+    def _cost(self, sentence: _Sentence, sections: List[_Section], opened: Set[int]) -> int:
+        cost = len(sentence.text) + 1
+        if sentence.section not in opened:
+            cost += len(sections[sentence.section].header) + 3  # "Header: " and the line break
+        return cost
+
+    def _select(self, sections: List[_Section], budget: int) -> Set[int]:
+        """Pick sentence indexes: each section's best sentence first, then best gain per character."""
+        selected: Set[int] = set()
+        covered: Set[str] = set()
+        opened: Set[int] = set()
+        used = 0
+
+        def take(sentence: _Sentence):
+            nonlocal used
+            used += self._cost(sentence, sections, opened)
+            selected.add(sentence.index)
+            covered.update(sentence.terms)
+            opened.add(sentence.section)
+
+        # Pass 1: every section is represented by its most informative sentence, heaviest sections first
+        for position in sorted(range(len(sections)), key=lambda i: -sections[i].weight):
+            best = max(sections[position].sentences, key=lambda s: (self._gain(s, sections, covered), -s.index))
+            if used + self._cost(best, sections, opened) <= budget:
+                take(best)
+
+        # Pass 2: greedy fill by marginal gain per character (terms already covered count for little)
+        remaining = [s for section in sections for s in section.sentences if s.index not in selected]
+        while remaining:
+            best, best_ratio, fitting = None, 0.0, []
+            for sentence in remaining:
+                cost = self._cost(sentence, sections, opened)
+                if used + cost > budget:
+                    continue  # the budget left only shrinks, so drop it from later rounds
+                fitting.append(sentence)
+                ratio = self._gain(sentence, sections, covered) / cost
+                if ratio > best_ratio:
+                    best, best_ratio = sentence, ratio
+            if best is None:
+                break
+            take(best)
+            remaining = [s for s in fitting if s is not best]
+        return selected
+
+    def _render(self, sections: List[_Section], selected: Set[int]) -> str:
+        lines = []
+        for section in sections:
+            kept = [s.text for s in section.sentences if s.index in selected]
+            if kept:
+                body = " ".join(kept)
+                lines.append(f"{section.header}: {body}" if section.header else body)
+        return "\n".join(lines)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "compressions": self.compressions,
+                "chars_in": self.chars_in,
+                "chars_out": self.chars_out,
+            }
+
+    def prometheus_metrics(self) -> List[tuple]:
+        """Compression counts and characters in/out for /metrics."""
+        stats = self.stats()
+        return [
+            ("photoeai_extractive_compressions_total", "counter", "Briefs shortened by the local extractive compressor", stats["compressions"]),
+            ('photoeai_extractive_compression_chars_total{direction="in"}', "counter", "Characters through the extractive compressor", stats["chars_in"]),
+            ('photoeai_extractive_compression_chars_total{direction="out"}', "counter", "Characters through the extractive compressor", stats["chars_out"]),
+        ]
+
+
+# Global instance
+extractive_compressor = ExtractiveCompressor()
+telemetry.register_collector(extractive_compressor.prometheus_metrics)
@@ -2,9 +2,16 @@
 Image Analysis Service - Task 2
 Service untuk handle image analysis menggunakan OpenAI Vision API
 """
+import json
+import re
 from typing import Dict, Any
 from loguru import logger
-from app.services.ai_client import AIClient
+from app.services.ai_client import AIClient, create_openai_client
+from app.services.correlation import current_request_id, outbound_headers
+from app.services.model_router import model_router
+from app.services.resilience import resilience
+from app.services.telemetry import telemetry
+from app.services.usage_ledger import usage_ledger
 
 
 class ImageAnalysisService:
@@ -16,6 +23,7 @@ class ImageAnalysisService:
     def __init__(self):
         self.ai_client = AIClient()
     
+    @telemetry.traced("vision.analyze")
     async def analyze_product_image_from_file(self, image_path: str, api_key: str = None) -> Dict[str, Any]:
         """
         Analyze product image dari file path dengan base64 encoding
@@ -38,8 +46,7 @@ class ImageAnalysisService:
             # Call Vision API through AIClient with base64
             if api_key:
                 # Create temporary client with user API key
-                from openai import OpenAI
-                temp_client = OpenAI(api_key=api_key, base_url="https://api.openai.com/v1")
+                temp_client = create_openai_client(api_key)
                 analysis_result = await self._analyze_with_custom_client_base64(temp_client, image_data)
             else:
                 # Use default client - call method to be added
@@ -79,8 +86,7 @@ class ImageAnalysisService:
             # Call Vision API through AIClient
             if api_key:
                 # Create temporary client with user API key
-                from openai import OpenAI
-                temp_client = OpenAI(api_key=api_key, base_url="https://api.openai.com/v1")
+                temp_client = create_openai_client(api_key)
                 analysis_result = await self._analyze_with_custom_client(temp_client, image_url)
             else:
                 # Use default client
@@ -107,7 +113,7 @@ class ImageAnalysisService:
         """
         Analyze image using custom OpenAI client (with user API key)
         """
-        request_id = hash(image_url) % 10000
+        request_id = current_request_id()
         
         logger.info(f"👁️ Starting image analysis with custom client [ID: {request_id}]")
         
@@ -134,31 +140,7 @@ CRITICAL: For 'dominant_colors', use professional color accuracy terminology (e.
 """
 
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o",  # Use consistent model
-                messages=[
-                    {
-                        "role": "user", 
-                        "content": [
-                            {"type": "text", "text": analysis_instruction},
-                            {"type": "image_url", "image_url": {"url": image_url}}
-                        ]
-                    }
-                ],
-                temperature=0.6,
-                max_tokens=800
-            )
-            
-            analysis_text = response.choices[0].message.content.strip()
-            
-            # Extract JSON from response
-            import re
-            import json
-            json_match = re.search(r'```json\s*(\{.*?\})\s*```', analysis_text, re.DOTALL)
-            if json_match:
-                analysis_data = json.loads(json_match.group(1))
-            else:
-                analysis_data = json.loads(analysis_text)
+            analysis_data = await self._complete_vision(client, analysis_instruction, image_url)
             
             logger.info(f"✅ Custom client image analysis completed [ID: {request_id}]")
             return analysis_data
@@ -181,7 +163,7 @@ CRITICAL: For 'dominant_colors', use professional color accuracy terminology (e.
     
     async def _analyze_with_custom_client_base64(self, client, image_data: str) -> Dict[str, Any]:
         """Analyze image dengan custom OpenAI client menggunakan base64 data"""
-        request_id = hash(image_data[:100]) % 10000
+        request_id = current_request_id()
         
         logger.info(f"👁️ Starting image analysis with custom client base64 [ID: {request_id}]")
         
@@ -208,31 +190,7 @@ CRITICAL: For 'dominant_colors', extract ONLY the authentic colors of the PRODUC
 """
 
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "user", 
-                        "content": [
-                            {"type": "text", "text": analysis_instruction},
-                            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image_data}"}}
-                        ]
-                    }
-                ],
-                temperature=0.6,
-                max_tokens=800
-            )
-            
-            analysis_text = response.choices[0].message.content.strip()
-            
-            # Extract JSON from response
-            import re
-            import json
-            json_match = re.search(r'```json\s*(\{.*?\})\s*```', analysis_text, re.DOTALL)
-            if json_match:
-                analysis_data = json.loads(json_match.group(1))
-            else:
-                analysis_data = json.loads(analysis_text)
+            analysis_data = await self._complete_vision(client, analysis_instruction, f"data:image/png;base64,{image_data}")
             
             logger.info(f"✅ Custom client base64 analysis completed [ID: {request_id}]")
             return analysis_data
@@ -253,6 +211,57 @@ CRITICAL: For 'dominant_colors', extract ONLY the authentic colors of the PRODUC
                 "camera_angle": "front"
             }
     
+    async def _complete_vision(self, client, instruction: str, image_url: str) -> Dict[str, Any]:
+        """
+        Run one vision analysis on the routed "vision" model and parse its JSON answer.
+        An unparseable answer is retried once on the next tier up, like failed extractions.
+
+        Args:
+            client: OpenAI client to call (carries the user's API key)
+            instruction: Analysis instruction sent with the image
+            image_url: Image URL or data: URL
+
+        Returns:
+            Parsed analysis data
+
+        Raises:
+            json.JSONDecodeError: If no model returned valid JSON
+            UpstreamError: If the upstream call failed (see ResilienceService.call)
+        """
+        model = model_router.model_for("vision")
+        while True:
+            with model_router.observe("vision", model):
+                response = await resilience.call("vision", client.chat.completions.create, api_key=client.api_key, extra_headers=outbound_headers(),
+                    model=model,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": [
+                                {"type": "text", "text": instruction},
+                                {"type": "image_url", "image_url": {"url": image_url}}
+                            ]
+                        }
+                    ],
+                    temperature=0.6,
+                    max_tokens=800
+                )
+
+            usage_ledger.record_chat(response, client.api_key, "vision.analyze")
+            analysis_text = response.choices[0].message.content.strip()
+
+            # Extract JSON from response
+            json_match = re.search(r'```json\s*(\{.*?\})\s*```', analysis_text, re.DOTALL)
+            try:
+                analysis_data = json.loads(json_match.group(1) if json_match else analysis_text)
+            except json.JSONDecodeError:
+                model_router.record_quality("vision", model, passed=False)
+                model = model_router.escalate("vision", model)
+                if model is None:
+                    raise
+                continue
+            model_router.record_quality("vision", model, passed=True)
+            return analysis_data
+
     def _validate_analysis_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
         """Validate dan normalize analysis result"""
         
@@ -0,0 +1,184 @@
+"""
+Image Encoder Service - responsive, bandwidth-efficient derivatives of generated images.
+The source render is stored untouched; thumbnail, preview and full-size copies are
+encoded as AVIF/WebP/progressive JPEG in a worker pool and picked per request from the
+client's Accept header.
+"""
+
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+from app.config.settings import settings
+
+# Variant name -> longest side in pixels (None keeps the source resolution)
+VARIANTS: Dict[str, Optional[int]] = {
+    "thumb": 320,
+    "preview": 1024,
+    "full": None
+}
+
+# Format name -> (file extension, MIME type)
+FORMATS: Dict[str, Tuple[str, str]] = {
+    "avif": ("avif", "image/avif"),
+    "webp": ("webp", "image/webp"),
+    "jpeg": ("jpg", "image/jpeg")
+}
+
+# Quality given to JPEG when the Accept header names neither it nor a wildcard
+JPEG_FALLBACK_Q = 0.001
+
+
+def parse_accept(accept_header: str) -> Dict[str, float]:
+    """
+    Media ranges of an Accept header with their q-values ("image/webp;q=0.8" -> 0.8).
+    A missing q counts as 1; a malformed one as 0.
+    """
+    ranges: Dict[str, float] = {}
+    for part in (accept_header or "").lower().split(","):
+        media_range, *params = [item.strip() for item in part.split(";")]
+        if not media_range:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = min(1.0, max(0.0, float(value)))
+                except ValueError:
+                    quality = 0.0
+        ranges[media_range] = quality
+    return ranges
+
+
+def derivative_key(source_key: str, variant: str, format_name: str) -> str:
+    """Object key of a derivative, e.g. img_ab12cd34.png -> img_ab12cd34.preview.webp"""
+    stem = PurePosixPath(source_key).stem
+    return f"{stem}.{variant}.{FORMATS[format_name][0]}"
+
+
+class ImageEncoderService:
+    """
+    Encodes derivatives of stored images in a thread pool (Pillow releases the GIL while encoding).
+    """
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._formats: Optional[List[str]] = None
+
+    @property
+    def formats(self) -> List[str]:
+        """Configured output formats (IMAGE_OUTPUT_FORMATS) that this Pillow build can encode, in preference order."""
+        if self._formats is None:
+            from PIL import features  # Imported on first use to keep app startup fast
+
+            formats = []
+            for format_name in (name.strip().lower() for name in settings.image_output_formats.split(",")):
+                if not format_name:
+                    continue
+                if format_name not in FORMATS:
+                    logger.warning(f"⚠️ Unknown image output format '{format_name}' ignored")
+                elif format_name != "jpeg" and not features.check(format_name):
+                    logger.warning(f"⚠️ Pillow has no {format_name} encoder, skipping that output format")
+                else:
+                    formats.append(format_name)
+            self._formats = formats
+        return self._formats
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=settings.image_encode_workers, thread_name_prefix="image-encode")
+        return self._executor
+
+    def _encode(self, image, variant: str, format_name: str) -> bytes:
+        """Resize (never upscale) and encode one derivative."""
+        # Work on a private copy: Image.save() mutates the image, and jobs share one source
+        image = image.copy()
+        max_side = VARIANTS[variant]
+        if max_side and max(image.size) > max_side:
+            image.thumbnail((max_side, max_side))
+
+        buffer = io.BytesIO()
+        quality = settings.image_encode_quality
+        if format_name == "jpeg":
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+            image.save(buffer, "JPEG", quality=quality, progressive=True, optimize=True)
+        elif format_name == "webp":
+            image.save(buffer, "WEBP", quality=quality, method=4)
+        else:
+            # AVIF's quality scale runs higher than WebP/JPEG for the same visual result
+            image.save(buffer, "AVIF", quality=max(quality - 20, 1), speed=8)
+        return buffer.getvalue()
+
+    def _encode_all(self, backend, source_key: str, source_bytes: bytes) -> Dict[str, Dict[str, str]]:
+        """Encode every variant/format pair of one source image and store them through the backend."""
+        from PIL import Image  # Imported on first use to keep app startup fast
+
+        image = Image.open(io.BytesIO(source_bytes))
+        image.load()
+
+        jobs = [(variant, format_name) for variant in VARIANTS for format_name in self.formats]
+        encoded = self.executor.map(lambda job: (job, self._encode(image, *job)), jobs)
+
+        stored: Dict[str, Dict[str, str]] = {}
+        total = 0
+        for (variant, format_name), data in encoded:
+            key = derivative_key(source_key, variant, format_name)
+            backend.write(key, iter([data]))
+            stored.setdefault(variant, {})[format_name] = key
+            total += len(data)
+
+        logger.info(
+            f"🖼️ Encoded {len(jobs)} derivatives of {source_key}: "
+            f"{len(source_bytes) / 1024:.0f} KB source → {total / 1024:.0f} KB across {', '.join(self.formats)}"
+        )
+        return stored
+
+    async def create_derivatives(self, backend, source_key: str, source_bytes: bytes) -> Dict[str, Dict[str, str]]:
+        """
+        Build all derivatives of a stored image without blocking the event loop.
+
+        Args:
+            backend: Image store backend the derivatives are written to
+            source_key: Key of the untouched source render
+            source_bytes: Encoded source image
+
+        Returns:
+            Mapping of variant -> format -> derivative key
+        """
+        if not self.formats:
+            return {}
+        return await asyncio.to_thread(self._encode_all, backend, source_key, source_bytes)
+
+    def negotiate(self, accept_header: str) -> List[str]:
+        """
+        Output formats acceptable to the client, best first.
+
+        Args:
+            accept_header: Value of the request's Accept header
+
+        Returns:
+            Enabled formats the client accepts (q > 0), by q-value and then server preference
+        """
+        ranges = parse_accept(accept_header)
+        ranked = []
+        for preference, format_name in enumerate(self.formats):
+            mime_type = FORMATS[format_name][1]
+            if format_name == "jpeg":
+                # Every browser decodes JPEG, so wildcards count for it, and it is the last resort without any
+                quality = next((ranges[media_range] for media_range in (mime_type, "image/*", "*/*") if media_range in ranges),
+                               JPEG_FALLBACK_Q)
+            else:
+                # Newer formats only when named: image/* and */* are also sent by browsers that cannot decode them
+                quality = ranges.get(mime_type, 0.0)
+            if quality > 0:
+                ranked.append((-quality, preference, format_name))
+        return [format_name for _, _, format_name in sorted(ranked)]
+
+
+# Global instance
+image_encoder = ImageEncoderService()
@@ -2,12 +2,12 @@
 Image Generator Service for interacting with a text-to-image API.
 Handles the logic for image creation and iterative enhancement.
 """
-import requests
 from typing import Optional
 from loguru import logger
 from app.config.settings import settings
 from app.schemas.models import ImageOutput
 from app.services.ai_client import AIClient
+from app.services.usage_ledger import usage_ledger
 
 class ImageGenerationService:
     """
@@ -58,6 +58,8 @@ class ImageGenerationService:
 
         logger.info(f"🎨 Sending request to Image Generation API with enhanced brief")
 
+        import requests  # Imported on first use to keep app startup fast
+
         try:
             # THIS IS A REPRESENTATION. The actual API call will depend on your chosen provider.
             # Replace with the appropriate SDK or requests call.
@@ -65,6 +67,10 @@ class ImageGenerationService:
             response.raise_for_status() # Fail fast if the API returns an error
             
             api_response = response.json()
+            usage_ledger.record_image(
+                user_api_key, "images.generate", self.model,
+                f"{payload['width']}x{payload['height']}", "standard", payload["samples"]
+            )
 
             # --- IMPORTANT ---
             # Adapt the following lines to match the actual structure
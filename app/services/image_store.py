@@ -0,0 +1,212 @@
+"""
+Image Store Service - persistence for generated images.
+Decodes base64 payloads in chunks and writes them from a worker thread, so the event loop
+never blocks on multi-megabyte decodes or disk I/O. Keys are content hashes, storage backends are pluggable and
+URLs are returned relative to the app (or under IMAGE_PUBLIC_BASE_URL for a CDN).
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import os
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from pathlib import PurePosixPath
+from typing import Dict, Iterator, Set, Tuple, Type
+from urllib.parse import urlparse
+from loguru import logger
+from app.config.settings import settings
+from app.services.image_encoder import image_encoder, VARIANTS
+from app.services.image_sweeper import image_sweeper
+from app.services.telemetry import telemetry
+
+# Base64 characters decoded per step; a multiple of 4 so each chunk decodes on its own
+DECODE_CHUNK_CHARS = 64 * 1024 * 4
+
+
+def iter_base64_chunks(base64_data: str, chunk_chars: int = DECODE_CHUNK_CHARS) -> Iterator[bytes]:
+    """
+    Decode base64 data incrementally instead of materialising one big bytes object up front.
+
+    Args:
+        base64_data: Base64 encoded payload (whitespace is tolerated)
+        chunk_chars: Number of base64 characters per decoded chunk (multiple of 4)
+
+    Yields:
+        Decoded byte chunks
+    """
+    if any(c in base64_data for c in "\r\n "):
+        base64_data = "".join(base64_data.split())
+
+    for start in range(0, len(base64_data), chunk_chars):
+        chunk = base64_data[start:start + chunk_chars]
+        try:
+            yield base64.b64decode(chunk, validate=True)
+        except binascii.Error as e:
+            raise ValueError(f"Invalid base64 image data at offset {start}: {e}")
+
+
+class ImageStoreBackend(ABC):
+    """Interface for image storage backends. Methods are blocking and run in a worker thread."""
+
+    name = "base"
+
+    @abstractmethod
+    def write(self, key: str, chunks: Iterator[bytes]) -> int:
+        """Store the chunks under key and return the number of bytes written."""
+
+    @abstractmethod
+    def read(self, key: str) -> bytes:
+        """Return the stored object's bytes."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Whether an object is stored under key."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove the object stored under key (missing objects are ignored)."""
+
+
+class LocalDiskBackend(ImageStoreBackend):
+    """Stores images under static/images, which is served by the /static mount."""
+
+    name = "local"
+
+    def __init__(self, root: str = os.path.join("static", "images")):
+        self.root = Path(root)
+
+    def write(self, key: str, chunks: Iterator[bytes]) -> int:
+        target = self.root / key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file and rename, so a half-written image is never served
+        # (unique per writer: identical images share a content-addressed key)
+        temp_path = target.with_name(f".{target.name}.{uuid.uuid4().hex[:8]}.tmp")
+        written = 0
+        try:
+            with open(temp_path, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    written += len(chunk)
+            os.replace(temp_path, target)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        image_sweeper.record(key, written)
+        return written
+
+    def read(self, key: str) -> bytes:
+        return (self.root / key).read_bytes()
+
+    def exists(self, key: str) -> bool:
+        return (self.root / key).is_file()
+
+    def path_for(self, key: str) -> Path:
+        """Filesystem path of a stored object."""
+        return self.root / key
+
+    def delete(self, key: str) -> None:
+        (self.root / key).unlink(missing_ok=True)
+
+
+# Backend name (IMAGE_STORE_BACKEND) -> implementation
+BACKENDS: Dict[str, Type[ImageStoreBackend]] = {
+    LocalDiskBackend.name: LocalDiskBackend,
+}
+
+
+class ImageStore:
+    """
+    Saves generated images through the configured backend and builds their public URLs.
+    """
+
+    def __init__(self, backend: ImageStoreBackend = None):
+        self._backend = backend
+        self._derivative_tasks: Set[asyncio.Task] = set()
+
+    @property
+    def backend(self) -> ImageStoreBackend:
+        """Backend selected by IMAGE_STORE_BACKEND, created on first use."""
+        if self._backend is None:
+            backend_name = settings.image_store_backend
+            if backend_name not in BACKENDS:
+                raise ValueError(f"Unknown image store backend '{backend_name}' (available: {', '.join(BACKENDS)})")
+            self._backend = BACKENDS[backend_name]()
+        return self._backend
+
+    def url_for(self, key: str) -> str:
+        """
+        Public URL for a stored image.
+
+        Relative (`/static/images/...`) unless IMAGE_PUBLIC_BASE_URL is set, e.g. to a CDN origin.
+        """
+        path = f"/static/images/{key}"
+        base_url = settings.image_public_base_url.rstrip("/")
+        return f"{base_url}{path}" if base_url else path
+
+    def content_key(self, base64_data: str, file_extension: str = "png") -> str:
+        """
+        Content-addressed object key: identical images share a key and a key never changes
+        content, so the URL can be cached as immutable.
+        """
+        digest = hashlib.sha256(base64_data.encode("ascii", errors="replace")).hexdigest()
+        return f"img_{digest[:16]}.{file_extension}"
+
+    def _write_base64(self, base64_data: str, file_extension: str) -> Tuple[str, int]:
+        key = self.content_key(base64_data, file_extension)
+        return key, self.backend.write(key, iter_base64_chunks(base64_data))
+
+    async def save_base64(self, base64_data: str, file_extension: str = "png") -> str:
+        """
+        Decode and store a base64 image off the event loop.
+
+        Args:
+            base64_data: Base64 encoded image data
+            file_extension: File extension (default: png)
+
+        Returns:
+            URL of the stored image
+        """
+        with telemetry.span("image.decode_save", backend=self.backend.name) as span:
+            key, size = await asyncio.to_thread(self._write_base64, base64_data, file_extension)
+            span.set_attribute("bytes", size)
+        image_url = self.url_for(key)
+
+        logger.info(f"💾 Saved image: {key} ({size / 1024:.0f} KB, {self.backend.name}) → {image_url}")
+
+        # Derivatives are encoded in the background; until they exist the source is served
+        task = asyncio.create_task(self._create_derivatives(key))
+        self._derivative_tasks.add(task)
+        task.add_done_callback(self._derivative_tasks.discard)
+        return image_url
+
+    async def _create_derivatives(self, key: str):
+        try:
+            with telemetry.span("image.encode_derivatives"):
+                source_bytes = await asyncio.to_thread(self.backend.read, key)
+                await image_encoder.create_derivatives(self.backend, key, source_bytes)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to encode derivatives of {key}: {e}")
+
+    def variant_urls(self, image_url: str) -> Dict[str, str]:
+        """
+        Content-negotiated URLs (thumb/preview/full) for an image returned by save_base64.
+
+        Args:
+            image_url: URL returned by save_base64
+
+        Returns:
+            Mapping of variant name to URL, empty for images not held by this store
+        """
+        name = PurePosixPath(urlparse(image_url).path).name
+        if not image_url or not name.startswith("img_"):
+            return {}
+        image_id = PurePosixPath(name).stem
+        base_url = settings.image_public_base_url.rstrip("/")
+        return {variant: f"{base_url}/api/v1/images/{image_id}?variant={variant}" for variant in VARIANTS}
+
+
+# Global instance
+image_store = ImageStore()
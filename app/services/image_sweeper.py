@@ -0,0 +1,267 @@
+"""
+Image Sweeper Service - background garbage collection for static/images.
+Keeps generated images and uploads within age and size quotas, evicting the
+least recently accessed files first. File sizes and access times live in an
+on-disk index, so a sweep only lists directories instead of stat()-ing every file.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from loguru import logger
+from app.config.settings import settings
+from app.services.telemetry import telemetry
+
+IMAGE_ROOT = Path("static") / "images"
+INDEX_FILE = IMAGE_ROOT / ".image_index.json"
+
+# Swept directories, relative to IMAGE_ROOT ("" is static/images itself)
+SWEPT_DIRS = ("", "uploads")
+
+
+class ImageSweeper:
+    """
+    Periodic sweeper for generated images and uploads.
+
+    The index maps a path relative to static/images to its size, creation time and
+    last access time. Writers call record(), readers call touch(); each sweep
+    reconciles the index with a directory listing, evicts files idle longer than
+    their directory's max age, then evicts least-recently-used files until the total
+    is under the size quota.
+    """
+
+    def __init__(self, root: Path = IMAGE_ROOT, index_file: Path = INDEX_FILE):
+        self.root = Path(root)
+        self.index_file = Path(index_file)
+        self._entries: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()        # guards _entries/_metrics only; never held across I/O
+        self._sweep_lock = threading.Lock()  # serializes sweeps
+        self._loaded = False
+        self._task: Optional[asyncio.Task] = None
+        self._metrics: Dict[str, Any] = {
+            "sweeps_total": 0,
+            "files_evicted_total": 0,
+            "bytes_reclaimed_total": 0,
+            "last_sweep": None
+        }
+
+    def _max_age_seconds(self, rel_path: str) -> float:
+        """Idle time after which a file is evicted (uploads may live longer than renders)."""
+        hours = settings.upload_max_age_hours if rel_path.startswith("uploads/") else settings.image_max_age_hours
+        return hours * 3600
+
+    def _load_index(self):
+        """Load the on-disk index once; a missing or corrupt index is rebuilt by the next sweep."""
+        if self._loaded:
+            return
+        entries = {}
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                entries = json.load(f).get("entries", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Image index unreadable, rebuilding: {e}")
+        with self._lock:
+            # Keep files recorded since startup, before the first sweep loaded the index
+            entries.update(self._entries)
+            self._entries = entries
+            self._loaded = True
+
+    def _save_index(self, entries: Dict[str, Dict[str, float]]):
+        """Persist a copy of the index atomically (temp file + rename)."""
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.index_file.with_name(self.index_file.name + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "entries": entries}, f)
+        os.replace(temp_path, self.index_file)
+
+    def _snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Copy of the index taken under the lock, safe to serialize while touch() keeps running."""
+        with self._lock:
+            return {rel_path: dict(entry) for rel_path, entry in self._entries.items()}
+
+    def record(self, rel_path: str, size: int):
+        """
+        Register a newly written file.
+
+        Args:
+            rel_path: Path relative to static/images (e.g. 'img_ab12cd34.png', 'uploads/<id>.jpg')
+            size: File size in bytes
+        """
+        now = time.time()
+        with self._lock:
+            self._entries[rel_path] = {"size": size, "created": now, "last_access": now}
+
+    def touch(self, rel_path: str):
+        """Mark a file as recently used; unknown paths are ignored until the next sweep indexes them."""
+        with self._lock:
+            entry = self._entries.get(rel_path)
+            if entry is not None:
+                entry["last_access"] = time.time()
+
+    def _list_files(self) -> List[str]:
+        """List swept files without stat() calls (DirEntry type comes from the directory listing)."""
+        names = []
+        for directory in SWEPT_DIRS:
+            try:
+                with os.scandir(self.root / directory) as entries:
+                    for entry in entries:
+                        if entry.name.startswith(".") or not entry.is_file():
+                            continue
+                        names.append(f"{directory}/{entry.name}" if directory else entry.name)
+            except FileNotFoundError:
+                continue
+        return names
+
+    def sweep(self) -> Dict[str, Any]:
+        """
+        Run one sweep (blocking; call from a worker thread). The index lock is only held
+        for in-memory bookkeeping, so touch() and record() never wait on the filesystem.
+
+        Returns:
+            Summary of the sweep: files evicted, bytes reclaimed, files and bytes still tracked
+        """
+        started = time.perf_counter()
+        now = time.time()
+        max_bytes = settings.image_store_max_mb * 1024 * 1024
+        evicted: List[str] = []
+        reclaimed = 0
+
+        # Filesystem work (listing, stat, unlink, index writes) happens outside self._lock:
+        # touch() runs on the event loop for every image read and must never wait for a sweep.
+        with self._sweep_lock:
+            self._load_index()
+            listed_at = time.time()
+            on_disk = set(self._list_files())
+
+            # Forget files deleted elsewhere (but not ones recorded after the listing);
+            # stat only files the index has never seen
+            with self._lock:
+                for rel_path in set(self._entries) - on_disk:
+                    if self._entries[rel_path]["created"] < listed_at:
+                        del self._entries[rel_path]
+                unseen = on_disk - set(self._entries)
+            discovered = {}
+            for rel_path in unseen:
+                try:
+                    stat_result = os.stat(self.root / rel_path)
+                except OSError:
+                    continue
+                discovered[rel_path] = {
+                    "size": stat_result.st_size,
+                    "created": stat_result.st_mtime,
+                    "last_access": stat_result.st_mtime
+                }
+
+            # Age quota first, then LRU until under the size quota (planned on an in-memory copy)
+            with self._lock:
+                for rel_path, entry in discovered.items():
+                    self._entries.setdefault(rel_path, entry)
+                by_last_access = sorted(self._entries.items(), key=lambda item: item[1]["last_access"])
+                total_bytes = sum(entry["size"] for entry in self._entries.values())
+            planned = []
+            for rel_path, entry in by_last_access:
+                expired = now - entry["last_access"] > self._max_age_seconds(rel_path)
+                if not expired and total_bytes <= max_bytes:
+                    continue
+                planned.append((rel_path, entry["size"]))
+                total_bytes -= entry["size"]
+
+            for rel_path, size in planned:
+                try:
+                    (self.root / rel_path).unlink(missing_ok=True)
+                except OSError as e:
+                    logger.warning(f"⚠️ Failed to evict {rel_path}: {e}")
+                    continue
+                reclaimed += size
+                evicted.append(rel_path)
+
+            with self._lock:
+                for rel_path in evicted:
+                    self._entries.pop(rel_path, None)
+            try:
+                self._save_index(self._snapshot())
+            except OSError as e:
+                logger.warning(f"⚠️ Failed to persist image index: {e}")
+
+            stats = self.stats()
+            summary = {
+                "at": now,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                "files_evicted": len(evicted),
+                "bytes_reclaimed": reclaimed,
+                "files_tracked": stats["files_tracked"],
+                "bytes_tracked": stats["bytes_tracked"]
+            }
+            with self._lock:
+                self._metrics["sweeps_total"] += 1
+                self._metrics["files_evicted_total"] += len(evicted)
+                self._metrics["bytes_reclaimed_total"] += reclaimed
+                self._metrics["last_sweep"] = summary
+
+        if evicted:
+            logger.info(f"🗑️ Image sweep reclaimed {reclaimed / 1024 / 1024:.1f} MB ({len(evicted)} files, {summary['duration_ms']}ms)")
+            logger.debug(f"🗑️ Evicted: {', '.join(evicted)}")
+        return summary
+
+    def stats(self) -> Dict[str, Any]:
+        """Sweeper metrics: cumulative counters plus the current index size."""
+        with self._lock:
+            return {
+                **self._metrics,
+                "files_tracked": len(self._entries),
+                "bytes_tracked": sum(entry["size"] for entry in self._entries.values())
+            }
+
+    async def _run(self, interval: float):
+        """Sweep immediately, then every interval seconds until cancelled."""
+        logger.info(f"🧹 Image sweeper started (interval {interval}s, max {settings.image_store_max_mb} MB)")
+        while True:
+            try:
+                with telemetry.span("image.sweep"):
+                    await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                logger.error(f"💥 Image sweep failed: {e}")
+            await asyncio.sleep(interval)
+
+    def prometheus_metrics(self) -> List[tuple]:
+        """Sweeper counters for /metrics (see TelemetryService.register_collector)."""
+        stats = self.stats()
+        return [
+            ("photoeai_image_sweeps_total", "counter", "Completed static/images sweeps", stats["sweeps_total"]),
+            ("photoeai_image_files_evicted_total", "counter", "Images evicted by age or size quota", stats["files_evicted_total"]),
+            ("photoeai_image_bytes_reclaimed_total", "counter", "Bytes freed by image eviction", stats["bytes_reclaimed_total"]),
+            ("photoeai_image_bytes_tracked", "gauge", "Bytes currently held in static/images", stats["bytes_tracked"])
+        ]
+
+    def start(self, interval: Optional[float] = None):
+        """Start the sweeper on the running event loop (no-op when disabled or already running)."""
+        interval = settings.image_sweep_interval if interval is None else interval
+        if interval <= 0 or (self._task and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._run(interval))
+
+    async def stop(self):
+        """Cancel the sweeper task and persist the latest access times."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._loaded:
+            try:
+                await asyncio.to_thread(self._save_index, self._snapshot())
+            except OSError as e:
+                logger.warning(f"⚠️ Failed to persist image index: {e}")
+
+
+# Global instance
+image_sweeper = ImageSweeper()
+telemetry.register_collector(image_sweeper.prometheus_metrics)
@@ -0,0 +1,328 @@
+"""
+Log Sink - queue-backed, batched structured logging for loguru.
+A log call only samples, appends the loguru record to an in-memory queue and returns;
+a background thread renders queued records as JSON lines (logs/photoeai_YYYY-MM-DD.jsonl)
+and console text in batches, so no request waits on stdout or disk. Verbose events are
+sampled, oversized fields are capped, and the queue sheds load instead of blocking
+when it is full.
+"""
+
+import gzip
+import json
+import random
+import shutil
+import sys
+import threading
+import traceback
+from collections import deque
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, TextIO
+from app.config.settings import settings
+from app.services.telemetry import telemetry
+
+# Events at or above this level (WARNING) are never sampled away
+UNSAMPLED_LEVEL_NO = 30
+# Events below this level (DEBUG, TRACE) are verbose, as are events bound with verbose=True
+VERBOSE_LEVEL_NO = 20
+# Tracebacks may be longer than other fields
+EXCEPTION_MAX_CHARS = 8000
+# Console default: whatever sys.stdout is when a batch is written (test runners swap it)
+STDOUT = "stdout"
+
+JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, default=str)
+
+LEVEL_COLORS = {"TRACE": "\033[36m", "DEBUG": "\033[34m", "INFO": "\033[1m", "SUCCESS": "\033[32m",
+                "WARNING": "\033[33m", "ERROR": "\033[31m", "CRITICAL": "\033[41m"}
+
+
+def cap(text: str, limit: int) -> str:
+    """`text` cut to `limit` characters, noting how much was dropped."""
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}… [+{len(text) - limit} chars]"
+
+
+class LogSink:
+    """
+    loguru sink object (see install()) writing JSON lines to a daily file and text to the console.
+
+    loguru calls admit() as the handler filter and write() with each accepted message on
+    the logging thread; both are constant-time. Rendering, field caps, file rotation and
+    retention happen on the writer thread, which drains the queue every
+    LOG_FLUSH_INTERVAL seconds or as soon as LOG_BATCH_SIZE records are waiting.
+    """
+
+    def __init__(self, directory: Optional[str] = None, console: Optional[Any] = STDOUT,
+                 console_format: Optional[str] = None, queue_size: Optional[int] = None,
+                 batch_size: Optional[int] = None, flush_interval: Optional[float] = None,
+                 field_max_chars: Optional[int] = None, sample_rate: Optional[float] = None):
+        """
+        Args:
+            directory: Log file directory (defaults to LOG_DIR; empty disables the file)
+            console: Console stream (STDOUT for sys.stdout, None disables console output)
+            console_format: "text", "json" or "off" (defaults to LOG_CONSOLE_FORMAT)
+            queue_size: Records queued before new ones are dropped (LOG_QUEUE_SIZE)
+            batch_size: Records that wake the writer early (LOG_BATCH_SIZE)
+            flush_interval: Seconds between writer drains (LOG_FLUSH_INTERVAL)
+            field_max_chars: Cap on the message and each extra field (LOG_FIELD_MAX_CHARS)
+            sample_rate: Fraction of verbose events kept (LOG_VERBOSE_SAMPLE_RATE)
+        """
+        directory = settings.log_dir if directory is None else directory
+        self.directory = Path(directory) if directory else None
+        self.console_format = console_format or settings.log_console_format
+        self._console = None if self.console_format == "off" else console
+        self.queue_size = queue_size or settings.log_queue_size
+        self.batch_size = batch_size or settings.log_batch_size
+        self.flush_interval = flush_interval if flush_interval is not None else settings.log_flush_interval
+        self.field_max_chars = field_max_chars or settings.log_field_max_chars
+        self.sample_rate = sample_rate if sample_rate is not None else settings.log_verbose_sample_rate
+
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._drain_lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._file: Optional[TextIO] = None
+        self._file_date: Optional[date] = None
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.fields_truncated = 0
+        self.written = 0
+        self.batches = 0
+        self.write_errors = 0
+
+    # ----- logging thread (hot path) -----
+
+    def admit(self, record: Dict[str, Any]) -> bool:
+        """loguru filter: keep all warnings and errors, sample verbose events at LOG_VERBOSE_SAMPLE_RATE."""
+        level_no = record["level"].no
+        if level_no >= UNSAMPLED_LEVEL_NO:
+            return True
+        if (level_no < VERBOSE_LEVEL_NO or record["extra"].get("verbose")) and random.random() >= self.sample_rate:
+            with self._counter_lock:
+                self.sampled_out += 1
+            return False
+        return True
+
+    def write(self, message: Any):
+        """loguru sink: queue the record behind `message` (dropped when the queue is full)."""
+        if len(self._queue) >= self.queue_size:
+            self.dropped += 1  # loguru serializes write() per handler
+            return
+        self._queue.append(message.record)
+        self.enqueued += 1
+        if self._thread is None:
+            self._start()
+        if len(self._queue) >= self.batch_size:
+            self._wake.set()
+
+    # ----- writer thread -----
+
+    def _start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.drain()
+        self.drain()
+
+    def drain(self) -> int:
+        """
+        Write everything queued so far, one write per destination per batch.
+
+        Returns:
+            Records written
+        """
+        written = 0
+        with self._drain_lock:
+            while self._queue:
+                batch: List[Dict[str, Any]] = []
+                while self._queue and len(batch) < self.batch_size:
+                    batch.append(self._queue.popleft())
+                self._write_batch(batch)
+                written += len(batch)
+        return written
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        events = [self._event(record) for record in batch]
+        try:
+            if self.directory is not None:
+                lines = "".join(self._json_line(event) for event in events)
+                self._file_for(batch[-1]["time"].date()).write(lines)
+                self._file.flush()
+            console = sys.stdout if self._console == STDOUT else self._console
+            if console is not None:
+                if self.console_format == "json":
+                    text = "".join(self._json_line(event) for event in events)
+                else:
+                    colorize = console.isatty()
+                    text = "".join(self._text_line(event, colorize) for event in events)
+                console.write(text)
+                console.flush()
+        except Exception as e:  # a full disk or closed stream must never break the application
+            self.write_errors += 1
+            if self.write_errors == 1:
+                print(f"⚠️ Log sink write failed: {e}", file=sys.__stderr__)
+            return
+        self.batches += 1
+        self.written += len(batch)
+
+    def _event(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """JSON-ready event for a loguru record, with extra fields flattened and capped."""
+        event = {
+            "ts": record["time"].isoformat(timespec="milliseconds"),
+            "level": record["level"].name,
+            "logger": record["name"],
+            "function": record["function"],
+            "line": record["line"],
+            "message": self._cap(record["message"]),
+        }
+        extra = dict(record["extra"])
+        nested = extra.pop("extra", None)  # logger.info(..., extra={...}) lands under record["extra"]["extra"]
+        if isinstance(nested, dict):
+            extra.update(nested)
+        for key, value in extra.items():
+            if key not in event:
+                event[key] = self._field(value)
+        if record["exception"] is not None:
+            exc_type, exc_value, exc_traceback = record["exception"]
+            event["exception"] = cap("".join(traceback.format_exception(exc_type, exc_value, exc_traceback)), EXCEPTION_MAX_CHARS)
+        return event
+
+    def _cap(self, text: str) -> str:
+        if len(text) > self.field_max_chars:
+            self.fields_truncated += 1
+            return cap(text, self.field_max_chars)
+        return text
+
+    def _field(self, value: Any) -> Any:
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        if isinstance(value, str):
+            return self._cap(value)
+        try:
+            encoded = JSON_ENCODER.encode(value)
+        except (TypeError, ValueError):
+            return self._cap(repr(value))
+        return value if len(encoded) <= self.field_max_chars else self._cap(encoded)
+
+    @staticmethod
+    def _text_line(event: Dict[str, Any], colorize: bool) -> str:
+        level = event["level"]
+        stamp = event["ts"][:19].replace("T", " ")
+        if colorize:
+            color = LEVEL_COLORS.get(level, "")
+            line = (f"\033[32m{stamp}\033[0m | {color}{level: <8}\033[0m | "
+                    f"\033[36m{event['logger']}:{event['function']}:{event['line']}\033[0m | {color}{event['message']}\033[0m\n")
+        else:
+            line = f"{stamp} | {level: <8} | {event['logger']}:{event['function']}:{event['line']} | {event['message']}\n"
+        return line + event["exception"] if "exception" in event else line
+
+    @staticmethod
+    def _json_line(event: Dict[str, Any]) -> str:
+        return JSON_ENCODER.encode(event) + "\n"
+
+    def _file_for(self, day: date) -> TextIO:
+        """Open file for `day`, rotating (gzip) yesterday's file and applying retention on a new day."""
+        if self._file is not None and self._file_date == day:
+            return self._file
+        if self._file is not None:
+            self._file.close()
+            self._compress(self.directory / f"photoeai_{self._file_date.isoformat()}.jsonl")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.directory / f"photoeai_{day.isoformat()}.jsonl", "a", encoding="utf-8")
+        self._file_date = day
+        self._apply_retention(day)
+        return self._file
+
+    @staticmethod
+    def _compress(path: Path):
+        try:
+            with open(path, "rb") as src, gzip.open(f"{path}.gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            path.unlink()
+        except OSError:
+            pass  # left uncompressed; retention still removes it
+
+    def _apply_retention(self, today: date):
+        """Delete JSON log files older than LOG_RETENTION_DAYS."""
+        cutoff = (today - timedelta(days=settings.log_retention_days)).isoformat()
+        for path in self.directory.glob("photoeai_*.jsonl*"):
+            day = path.name[len("photoeai_"):len("photoeai_") + 10]
+            if day < cutoff:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    # ----- lifecycle -----
+
+    def install(self, level: str = "INFO") -> int:
+        """
+        Replace loguru's handlers with this sink.
+
+        Args:
+            level: Minimum level logged
+
+        Returns:
+            loguru handler id
+        """
+        from loguru import logger
+
+        logger.remove()
+        # format is a callable so loguru does not render tracebacks on the logging thread
+        return logger.add(self, level=level, format=lambda _record: "{message}", filter=self.admit, catch=True)
+
+    def stop(self):
+        """Drain the queue and stop the writer thread (loguru calls this on logger.remove())."""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            thread.join(timeout=5)
+        self.drain()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._file_date = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue and throughput counters (for /api/v1/health)."""
+        return {
+            "file": str(self.directory / f"photoeai_{datetime.now().date().isoformat()}.jsonl") if self.directory else None,
+            "queued": len(self._queue),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "fields_truncated": self.fields_truncated,
+            "write_errors": self.write_errors,
+            "verbose_sample_rate": self.sample_rate,
+        }
+
+    def prometheus_metrics(self) -> List[tuple]:
+        """Log pipeline counters for /metrics."""
+        stats = self.stats()
+        help_text = "Log events by outcome (written, dropped on a full queue, sampled out)"
+        return [
+            ('photoeai_log_events_total{result="written"}', "counter", help_text, stats["written"]),
+            ('photoeai_log_events_total{result="dropped"}', "counter", help_text, stats["dropped"]),
+            ('photoeai_log_events_total{result="sampled_out"}', "counter", help_text, stats["sampled_out"]),
+            ("photoeai_log_queue_depth", "gauge", "Log records waiting for the writer thread", stats["queued"]),
+            ("photoeai_log_fields_truncated_total", "counter", "Log fields cut to LOG_FIELD_MAX_CHARS", stats["fields_truncated"]),
+            ("photoeai_log_write_errors_total", "counter", "Log batches that could not be written", stats["write_errors"]),
+        ]
+
+
+# Global instance
+log_sink = LogSink()
+telemetry.register_collector(log_sink.prometheus_metrics)
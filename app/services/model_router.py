@@ -0,0 +1,191 @@
+"""
+Model Router - maps each LLM task to a model tier.
+Cheap, well-constrained tasks (structured extraction, compression) run on the fast tier;
+creative enhancement and vision stay on the standard tier. Extraction that fails
+validation is retried one tier up. Per-task latency and validation outcomes are
+exported on /metrics so the routing can be tuned from data.
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from loguru import logger
+from app.config.settings import settings
+from app.services.telemetry import telemetry
+
+# Cheapest first; fallback walks up this order
+TIERS = ("fast", "standard", "premium")
+
+TASKS = ("extract", "enhance", "compress", "revise", "prompt_enhance", "vision")
+
+DEFAULT_ROUTES = {
+    "extract": "fast",
+    "compress": "fast",
+    "enhance": "standard",
+    "revise": "standard",
+    "prompt_enhance": "standard",
+    "vision": "standard",
+}
+
+
+@functools.lru_cache(maxsize=8)
+def parse_routes(spec: str) -> Dict[str, str]:
+    """Parse MODEL_ROUTES ("extract=fast,enhance=standard") on top of the defaults; unknown entries are ignored."""
+    routes = dict(DEFAULT_ROUTES)
+    for entry in spec.split(","):
+        task, _, tier = entry.partition("=")
+        task, tier = task.strip(), tier.strip().lower()
+        if not task:
+            continue
+        if task not in TASKS or tier not in TIERS:
+            logger.warning(f"⚠️ Ignoring model route '{entry.strip()}' (tasks: {', '.join(TASKS)}; tiers: {', '.join(TIERS)})")
+            continue
+        routes[task] = tier
+    return routes
+
+
+class _TaskStats:
+    __slots__ = ("calls", "errors", "latency_sum", "validation_passed", "validation_failed")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency_sum = 0.0
+        self.validation_passed = 0
+        self.validation_failed = 0
+
+
+class ModelRouter:
+    """Resolves task -> tier -> model and records how each (task, model) pair performs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], _TaskStats] = {}
+        self._escalations: Dict[str, int] = {}
+
+    def tier_models(self) -> Dict[str, str]:
+        """Configured model per tier (tiers without a model are skipped)."""
+        models = {
+            "fast": settings.model_tier_fast,
+            "standard": settings.model_tier_standard or settings.openai_model,
+            "premium": settings.model_tier_premium,
+        }
+        return {tier: models[tier] for tier in TIERS if models[tier]}
+
+    def route(self, task: str) -> Tuple[str, str]:
+        """
+        Tier and model for a task.
+
+        Args:
+            task: One of TASKS
+
+        Returns:
+            (tier, model); an unconfigured tier falls through to the next one up
+        """
+        tier = parse_routes(settings.model_routes).get(task, "standard")
+        models = self.tier_models()
+        for candidate in TIERS[TIERS.index(tier):]:
+            if candidate in models:
+                return candidate, models[candidate]
+        return "standard", settings.openai_model
+
+    def model_for(self, task: str) -> str:
+        return self.route(task)[1]
+
+    def escalate(self, task: str, model: str) -> Optional[str]:
+        """
+        Next model up the tiers after `model` failed validation for `task`.
+
+        Returns:
+            A more capable model, or None when `model` is already the top configured tier
+        """
+        models = self.tier_models()
+        tiers = [tier for tier, name in models.items() if name == model]
+        start = TIERS.index(tiers[-1]) + 1 if tiers else TIERS.index(self.route(task)[0]) + 1
+        for tier in TIERS[start:]:
+            if tier in models and models[tier] != model:
+                with self._lock:
+                    self._escalations[task] = self._escalations.get(task, 0) + 1
+                logger.info(f"⬆️ Escalating '{task}' from {model} to {models[tier]} ({tier} tier)")
+                return models[tier]
+        return None
+
+    def _task_stats(self, task: str, model: str) -> _TaskStats:
+        stats = self._stats.get((task, model))
+        if stats is None:
+            stats = self._stats[(task, model)] = _TaskStats()
+        return stats
+
+    @contextmanager
+    def observe(self, task: str, model: str) -> Iterator[None]:
+        """Time one LLM call for a task (an `llm.<task>` span plus per-model latency/error counters)."""
+        start = time.perf_counter()
+        failed = False
+        try:
+            with telemetry.span(f"llm.{task}", model=model):
+                yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                stats = self._task_stats(task, model)
+                stats.calls += 1
+                stats.errors += failed
+                stats.latency_sum += time.perf_counter() - start
+
+    def record_quality(self, task: str, model: str, passed: bool):
+        """Record whether a task's output passed its validation (extraction rules, brief quality checks)."""
+        with self._lock:
+            stats = self._task_stats(task, model)
+            if passed:
+                stats.validation_passed += 1
+            else:
+                stats.validation_failed += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Routes and per-(task, model) performance (for /api/v1/health)."""
+        routes = {task: dict(zip(("tier", "model"), self.route(task))) for task in TASKS}
+        with self._lock:
+            performance = {
+                f"{task}:{model}": {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "avg_latency_seconds": round(stats.latency_sum / stats.calls, 3) if stats.calls else 0.0,
+                    "validation_passed": stats.validation_passed,
+                    "validation_failed": stats.validation_failed,
+                }
+                for (task, model), stats in sorted(self._stats.items())
+            }
+            escalations = dict(sorted(self._escalations.items()))
+        return {"routes": routes, "performance": performance, "escalations": escalations}
+
+    def prometheus_metrics(self) -> List[tuple]:
+        """Per-(task, model) call, latency and validation counters for /metrics."""
+        with self._lock:
+            stats = {labels: (s.calls, s.errors, s.latency_sum, s.validation_passed, s.validation_failed)
+                     for labels, s in sorted(self._stats.items())}
+            escalations = dict(sorted(self._escalations.items()))
+        metrics = []
+        families = (
+            ("photoeai_model_calls_total", "", "LLM calls per task and model", 0),
+            ("photoeai_model_errors_total", "", "Failed LLM calls per task and model", 1),
+            ("photoeai_model_latency_seconds_sum", "", "Total LLM call latency per task and model", 2),
+            ("photoeai_model_validation_total", ',result="passed"', "Task outputs by validation result", 3),
+            ("photoeai_model_validation_total", ',result="failed"', "Task outputs by validation result", 4),
+        )
+        for metric_name, extra_labels, help_text, index in families:
+            for (task, model), values in stats.items():
+                metrics.append((f'{metric_name}{{task="{task}",model="{model}"{extra_labels}}}', "counter", help_text, round(values[index], 6)))
+        metrics += [
+            (f'photoeai_model_escalations_total{{task="{task}"}}', "counter", "Retries moved up a model tier after failed validation", count)
+            for task, count in escalations.items()
+        ]
+        return metrics
+
+
+# Global instance
+model_router = ModelRouter()
+telemetry.register_collector(model_router.prometheus_metrics)
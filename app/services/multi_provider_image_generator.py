@@ -3,18 +3,49 @@
 NOW WITH IMAGE EDIT API FOR PERFECT SHAPE PRESERVATION!
 Optimized for single provider (OpenAI) for reliability and performance.
 """
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, Tuple, Union
 from enum import Enum
 from loguru import logger
-import requests
+import asyncio
 import re
 import base64
 import os
 import uuid
 import io
-from PIL import Image
 from app.config.settings import settings
+from app.services.correlation import outbound_headers
+from app.services.extractive_compressor import extractive_compressor
 from app.schemas.models import ImageOutput
+from app.services.image_store import image_store
+from app.services.resilience import resilience, UpstreamError
+from app.services.telemetry import telemetry
+from app.services.token_budget import IMAGE_PROMPT_MAX_CHARS
+from app.services.usage_ledger import usage_ledger
+
+# Product preservation rules put in front of every generation brief (_normalize_for_chatgpt_quality)
+PRESERVATION_PREFIX = """You must photograph this EXACT product as it exists. DO NOT change the product shape, DO NOT redesign any components, DO NOT alter proportions or design elements. This is professional product photography of an existing product - capture it EXACTLY as shown in the reference image. Your job is professional lighting and composition ONLY, not product design changes. Maintain original dimensions, design features, and visual characteristics EXACTLY as they appear."""
+
+# Technical preservation constraints appended to every generation prompt (build_request_payload)
+TECHNICAL_CONSTRAINTS = """ Technical photography specification: maintain exact product shape, color accuracy, and proportions as shown. Documentary photography mode with zero artistic modifications to the product itself. Natural product representation only. Render at 3500 DPI for print-quality output.
+            
+🔒 Mandatory Rules for Photography Realism:
+- Use realistic textures with natural surface details and micro-imperfections (no plastic-like surfaces)
+- Preserve original design of brand text and logos with sharp, legible typography
+- Add natural imperfections in lighting with soft gradients and realistic shadow falloff
+- Ensure all human elements are anatomically correct with realistic skin textures and proportions
+- Ground all objects properly with physics-accurate shadows and reflections
+- Apply realistic lens behaviors (depth of field, bokeh, subtle chromatic aberration)
+- Avoid AI-generated symmetry in textures, patterns, or materials
+- Use contextually appropriate backgrounds that match the subject logically
+- Follow established photography composition rules (rule of thirds, leading lines)
+- Respect physical light and material interactions (metal reflects, glass refracts, cloth absorbs)"""
+
+# Characters the generation stage adds to a brief; token_budget reserves this much of the prompt limit
+IMAGE_PROMPT_OVERHEAD_CHARS = len(PRESERVATION_PREFIX) + 1 + len(TECHNICAL_CONSTRAINTS)
+
+# How several variants of one brief are requested: one call with n images, or n concurrent calls
+VARIANT_STRATEGIES = ("n", "fanout")
+
 
 class ImageProvider(Enum):
     """Supported image generation providers."""
@@ -35,6 +66,7 @@ class OpenAIImageService:
         # Simplified: Always use OpenAI for GPT Image 1
         return ImageProvider.OPENAI_GPT_IMAGE
     
+    @telemetry.traced("prompt.normalize")
     def _normalize_for_chatgpt_quality(self, prompt: str) -> str:
         """
         🎯 SMART DALL-E OPTIMIZATION: Balance comprehensive brief with DALL-E limits
@@ -51,7 +83,7 @@ class OpenAIImageService:
         
         # FOCUSED FIX: UNIVERSAL PRODUCT PRESERVATION FOR ANY PRODUCT TYPE
         # Generic preservation rules that work for shoes, bottles, cosmetics, etc.
-        preservation_content = """You must photograph this EXACT product as it exists. DO NOT change the product shape, DO NOT redesign any components, DO NOT alter proportions or design elements. This is professional product photography of an existing product - capture it EXACTLY as shown in the reference image. Your job is professional lighting and composition ONLY, not product design changes. Maintain original dimensions, design features, and visual characteristics EXACTLY as they appear."""
+        preservation_content = PRESERVATION_PREFIX
         
         logger.info("🔒 PRESERVATION: Direct shape preservation protocol injected")
         logger.info("🔒 FOCUSED MODE: Documentary photography - no product modifications")
@@ -75,11 +107,11 @@ class OpenAIImageService:
         if preservation_content:
             normalized = preservation_content + " " + normalized
             logger.info(f"🔒 PRESERVATION INJECTION: Added {len(preservation_content)} chars of protection rules")
-            logger.info(f"🔒 PRESERVATION PREVIEW: {preservation_content[:100]}...")
+            logger.bind(verbose=True).info(f"🔒 PRESERVATION PREVIEW: {preservation_content[:100]}...")
         else:
             logger.error("🚨 CRITICAL ERROR: NO PRESERVATION RULES INJECTED - PRODUCT AT RISK!")
         
-        logger.info(f"🔒 FINAL PROMPT PREVIEW: {normalized[:200]}...")
+        logger.bind(verbose=True).info(f"🔒 FINAL PROMPT PREVIEW: {normalized[:200]}...")
         
         
         # Ensure natural photography language
@@ -106,6 +138,7 @@ class OpenAIImageService:
         
         return normalized
     
+    @telemetry.traced("prompt.normalize")
     def _normalize_for_edit_api(self, prompt: str) -> str:
         """
         🚀 BREAKTHROUGH: NO COMPRESSION for GPT Image-1 Edit API (32,000 char limit)
@@ -284,37 +317,6 @@ class OpenAIImageService:
         
         return normalized.strip()
     
-    def _save_base64_to_file(self, base64_data: str, file_extension: str = "png") -> str:
-        """
-        Save base64 image data to static file and return URL.
-        
-        Args:
-            base64_data: Base64 encoded image data
-            file_extension: File extension (default: png)
-            
-        Returns:
-            HTTP URL to the saved image file
-        """
-        # Generate unique filename
-        file_id = str(uuid.uuid4())[:8]
-        filename = f"img_{file_id}.{file_extension}"
-        filepath = os.path.join("static", "images", filename)
-        
-        # Create directory if not exists
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        
-        # Decode and save base64 data
-        image_bytes = base64.b64decode(base64_data)
-        with open(filepath, 'wb') as f:
-            f.write(image_bytes)
-        
-        # Return HTTP URL
-        base_url = f"http://{settings.host}:{settings.port}"
-        image_url = f"{base_url}/static/images/{filename}"
-        
-        logger.info(f"💾 Saved image: {filepath} → {image_url}")
-        return image_url
-    
     def _extract_enhancement_ratio(self, brief_content: str) -> str:
         """Extract enhancement ratio information for display"""
         import re
@@ -346,67 +348,40 @@ class OpenAIImageService:
     
     def build_request_payload(self, provider: ImageProvider, brief_prompt: str, 
                             negative_prompt: Optional[str] = None, 
-                            model: Optional[str] = None) -> Dict[str, Any]:
-        """Build request payload based on provider specifications."""
+                            model: Optional[str] = None, n: int = 1) -> Dict[str, Any]:
+        """Build request payload based on provider specifications (n = images per call)."""
         
         model = model or self.default_model
         
-        if provider == ImageProvider.OPENAI_GPT_IMAGE:
-            # GPT Image 1 image generation format with HIGH quality
-            normalized_prompt = self._normalize_for_chatgpt_quality(brief_prompt)
-            
-            # FORCE TECHNICAL PRESERVATION constraints at prompt end
-            technical_constraints = """ Technical photography specification: maintain exact product shape, color accuracy, and proportions as shown. Documentary photography mode with zero artistic modifications to the product itself. Natural product representation only. Render at 3500 DPI for print-quality output.
-            
-🔒 Mandatory Rules for Photography Realism:
-- Use realistic textures with natural surface details and micro-imperfections (no plastic-like surfaces)
-- Preserve original design of brand text and logos with sharp, legible typography
-- Add natural imperfections in lighting with soft gradients and realistic shadow falloff
-- Ensure all human elements are anatomically correct with realistic skin textures and proportions
-- Ground all objects properly with physics-accurate shadows and reflections
-- Apply realistic lens behaviors (depth of field, bokeh, subtle chromatic aberration)
-- Avoid AI-generated symmetry in textures, patterns, or materials
-- Use contextually appropriate backgrounds that match the subject logically
-- Follow established photography composition rules (rule of thirds, leading lines)
-- Respect physical light and material interactions (metal reflects, glass refracts, cloth absorbs)"""
-            final_prompt = normalized_prompt + technical_constraints
-            
-            # 🎯 GPT IMAGE 1 API payload (uses images endpoint) with HIGH quality
-            return {
-                "model": "gpt-image-1",
-                "prompt": final_prompt,
-                "n": 1,
-                "size": "1024x1024",
-                "quality": "high"  # HIGH quality setting (updated from 'hd')
-                # Note: GPT Image-1 doesn't support "style" parameter - removed
-            }
-        else:  # Always fallback to GPT Image 1 format
-            normalized_prompt = self._normalize_for_chatgpt_quality(brief_prompt)
-            
-            # FORCE TECHNICAL PRESERVATION constraints at prompt end
-            technical_constraints = """ Technical photography specification: maintain exact product shape, color accuracy, and proportions as shown. Documentary photography mode with zero artistic modifications to the product itself. Natural product representation only. Render at 3500 DPI for print-quality output.
-            
-🔒 Mandatory Rules for Photography Realism:
-- Use realistic textures with natural surface details and micro-imperfections (no plastic-like surfaces)
-- Preserve original design of brand text and logos with sharp, legible typography
-- Add natural imperfections in lighting with soft gradients and realistic shadow falloff
-- Ensure all human elements are anatomically correct with realistic skin textures and proportions
-- Ground all objects properly with physics-accurate shadows and reflections
-- Apply realistic lens behaviors (depth of field, bokeh, subtle chromatic aberration)
-- Avoid AI-generated symmetry in textures, patterns, or materials
-- Use contextually appropriate backgrounds that match the subject logically
-- Follow established photography composition rules (rule of thirds, leading lines)
-- Respect physical light and material interactions (metal reflects, glass refracts, cloth absorbs)"""
-            final_prompt = normalized_prompt + technical_constraints
-            
-            return {
-                "model": "gpt-image-1",
-                "prompt": final_prompt,
-                "n": 1,
-                "size": "1024x1024",
-                "quality": "high"  # HIGH quality setting (updated from 'hd')
-                # Note: GPT Image-1 doesn't support "style" parameter - removed
-            }
+        # GPT Image 1 image generation format with HIGH quality (every provider falls back to it)
+        normalized_prompt = self._normalize_for_chatgpt_quality(brief_prompt)
+        
+        # FORCE TECHNICAL PRESERVATION constraints at prompt end
+        limit = IMAGE_PROMPT_MAX_CHARS["gpt-image-1"]
+        if len(normalized_prompt) + len(TECHNICAL_CONSTRAINTS) > limit:
+            # Briefs are compressed to token_budget.image_prompt_budget() upstream; this catches any that were not
+            logger.warning(f"⚠️ Image prompt over {limit} chars ({len(normalized_prompt) + len(TECHNICAL_CONSTRAINTS)}), compressing brief")
+            normalized_prompt = extractive_compressor.compress(normalized_prompt, max_chars=limit - len(TECHNICAL_CONSTRAINTS))
+        final_prompt = normalized_prompt + TECHNICAL_CONSTRAINTS
+        
+        # 🎯 GPT IMAGE 1 API payload (uses images endpoint) with HIGH quality
+        return {
+            "model": "gpt-image-1",
+            "prompt": final_prompt,
+            "n": n,
+            "size": "1024x1024",
+            "quality": "high"  # HIGH quality setting (updated from 'hd')
+            # Note: GPT Image-1 doesn't support "style" parameter - removed
+        }
+    
+    @staticmethod
+    def _post(endpoint: str, headers: Dict[str, str], **kwargs):
+        """Blocking POST to the images API, raising requests.HTTPError on 4xx/5xx (run via resilience.call)."""
+        import requests  # Imported on first use to keep app startup fast
+        timeout = (settings.image_api_connect_timeout, settings.image_api_read_timeout)
+        response = requests.post(endpoint, headers={**headers, **outbound_headers()}, timeout=timeout, **kwargs)
+        response.raise_for_status()
+        return response
     
     def get_endpoint_path(self, provider: ImageProvider) -> str:
         """Get the correct endpoint path for image generation."""
@@ -414,72 +389,172 @@ class OpenAIImageService:
             return "/images/generations"  # GPT Image 1 uses images endpoint
         return "/chat/completions"  # Default for other providers
     
-    def parse_response(self, provider: ImageProvider, response_data: Dict[str, Any]) -> ImageOutput:
-        """Parse API response based on provider format."""
+    async def image_output(self, provider: ImageProvider, image_data: Dict[str, Any]) -> ImageOutput:
+        """Build the ImageOutput for one entry of an images API response, storing base64 images via the image store."""
+        # Handle different response formats
+        if "url" in image_data:
+            image_url = image_data["url"]
+        elif "b64_json" in image_data:
+            # GPT Image 1 format - save base64 to file and return URL
+            image_url = await image_store.save_base64(image_data["b64_json"])
+        else:
+            raise KeyError("No 'url' or 'b64_json' found in response")
+        
+        revised_prompt = image_data.get("revised_prompt", "")
+        if provider == ImageProvider.OPENAI_GPT_IMAGE:
+            generation_id = f"gpt_image_{abs(hash(image_url)) % 100000}"
+            model_used, provider_used = "GPT-Image-1", "OpenAI GPT Image 1"
+        else:  # Always fallback to OpenAI format
+            generation_id = f"openai_{abs(hash(image_url)) % 100000}"
+            model_used, provider_used = "OpenAI Image Model", "OpenAI Image API"
+        
+        return ImageOutput(
+            image_url=image_url,
+            generation_id=generation_id,
+            seed=0,  # GPT Image 1 doesn't use seeds
+            revised_prompt=revised_prompt,
+            final_enhanced_prompt=revised_prompt,
+            model_used=model_used,
+            provider_used=provider_used,
+            derivatives=image_store.variant_urls(image_url) or None
+        )
+    
+    async def parse_response(self, provider: ImageProvider, response_data: Dict[str, Any]) -> ImageOutput:
+        """Parse API response based on provider format, storing base64 images via the image store."""
         
         try:
-            if provider == ImageProvider.OPENAI_GPT_IMAGE:
-                # GPT Image 1 response format (image generation API format)
-                if "data" in response_data and response_data["data"]:
-                    image_data = response_data["data"][0]
-                    
-                    # Handle different response formats
-                    if "url" in image_data:
-                        image_url = image_data["url"]
-                    elif "b64_json" in image_data:
-                        # GPT Image 1 format - save base64 to file and return URL
-                        base64_data = image_data["b64_json"]
-                        image_url = self._save_base64_to_file(base64_data)
-                    else:
-                        raise KeyError("No 'url' or 'b64_json' found in response")
-                    
-                    revised_prompt = image_data.get("revised_prompt", "")
-                    generation_id = f"gpt_image_{abs(hash(image_url)) % 100000}"
-                    
-                    return ImageOutput(
-                        image_url=image_url,
-                        generation_id=generation_id,
-                        seed=0,  # GPT Image 1 doesn't use seeds
-                        revised_prompt=revised_prompt,
-                        final_enhanced_prompt=revised_prompt,
-                        model_used="GPT-Image-1",
-                        provider_used="OpenAI GPT Image 1"
-                    )
-                else:
-                    raise KeyError("No 'data' found in GPT Image 1 response")
-            
-            else:  # Always fallback to OpenAI format
-                # Handle as OpenAI response format
-                image_data = response_data["data"][0]
-                revised_prompt = image_data.get("revised_prompt", "")
-                
-                # Handle different response formats
-                if "url" in image_data:
-                    image_url = image_data["url"]
-                elif "b64_json" in image_data:
-                    # GPT Image 1 format - save base64 to file and return URL
-                    base64_data = image_data["b64_json"]
-                    image_url = self._save_base64_to_file(base64_data)
-                else:
-                    raise KeyError("No 'url' or 'b64_json' found in response")
-                
-                generation_id = f"openai_{abs(hash(image_url)) % 100000}"
-                
-                return ImageOutput(
-                    image_url=image_url,
-                    generation_id=generation_id,
-                    seed=0,
-                    revised_prompt=revised_prompt,
-                    final_enhanced_prompt=revised_prompt,
-                    model_used="OpenAI Image Model",
-                    provider_used="OpenAI Image API"
-                )
+            if "data" not in response_data or not response_data["data"]:
+                raise KeyError(f"No 'data' found in {provider.value} response")
+            return await self.image_output(provider, response_data["data"][0])
         
         except (KeyError, IndexError, TypeError) as e:
             logger.error(f"Failed to parse {provider.value} response: {e}")
             logger.error(f"Response data: {response_data}")
             raise Exception(f"Unable to parse response from {provider.value}: {str(e)}")
     
+    async def _request_images(self, provider: ImageProvider, brief_prompt: str, user_api_key: str,
+                              negative_prompt: Optional[str] = None, n: int = 1) -> Dict[str, Any]:
+        """
+        Call the images generation API once and record its usage.
+        
+        Args:
+            provider: Target provider
+            brief_prompt: Prompt to render
+            user_api_key: User's API key for the service
+            negative_prompt: Optional negative prompt
+            n: Images requested in this call
+            
+        Returns:
+            The decoded API response
+        """
+        # Build request
+        endpoint = f"{self.api_base_url.rstrip('/')}{self.get_endpoint_path(provider)}"
+        payload = self.build_request_payload(provider, brief_prompt, negative_prompt, n=n)
+        
+        # Set up headers (GPT Image 1 compatible with OpenAI 1.101.0)
+        headers = {
+            "Authorization": f"Bearer {user_api_key}",
+            "Content-Type": "application/json",
+            "User-Agent": "OpenAI/1.101.0"  # OpenAI 1.101.0 user agent
+        }
+        
+        # Add any provider-specific headers if needed
+        # (OpenRouter headers removed since it's no longer supported)
+        
+        logger.info(f"🎨 Sending request to {provider.value} for: '{brief_prompt[:50]}...' (n={n})")
+        logger.info(f"🔗 Endpoint: {endpoint}")
+        
+        try:
+            response = await resilience.call("images.generate", self._post, endpoint, headers, api_key=user_api_key, json=payload)
+        except UpstreamError as e:
+            logger.error(f"💥 API request failed for {provider.value}: {e}")
+            response = getattr(e.__cause__, 'response', None)
+            if response is not None:
+                logger.error(f"Response: {response.text}")
+            raise
+        
+        api_response = response.json()
+        usage_ledger.record_image(
+            user_api_key, "images.generate", payload.get("model", ""), payload.get("size", ""),
+            payload.get("quality", ""), payload.get("n", 1), api_response.get("usage")
+        )
+        logger.info(f"✅ Received response from {provider.value}")
+        
+        # 🔍 DEBUG: Log response structure for better ID extraction
+        logger.debug(f"📋 API Response structure: {list(api_response.keys())}")
+        if "data" in api_response and api_response["data"]:
+            logger.debug(f"📋 Image data keys: {list(api_response['data'][0].keys())}")
+        
+        return api_response
+    
+    async def _brief_from_uploaded_image(self, uploaded_image_base64: str, brief_prompt: str,
+                                         user_api_key: str, progress_callback=None) -> str:
+        """
+        🎯 BOSS PROPER PIPELINE steps 1-3: Image Analysis → Wizard → Brief.
+        
+        Returns:
+            The comprehensive brief combining the uploaded image's analysis with the user prompt
+        """
+        if progress_callback:
+            await progress_callback("Analisis image sedang berlangsung")
+        logger.info("🎯 BOSS PIPELINE: Running full analysis pipeline")
+        
+        # Import services for pipeline
+        from app.services.image_analysis_service import ImageAnalysisService
+        from app.services.image_wizard_bridge import ImageWizardBridge  
+        from app.services.brief_orchestrator import BriefOrchestratorService
+        import tempfile
+        import base64
+        from pathlib import Path
+        
+        # STEP 1: Vision API analyze image (BACKGROUND)
+        if progress_callback:
+            await progress_callback("Sedang ekstrak dari image")
+        image_service = ImageAnalysisService()
+        
+        # Convert base64 to temp file for analysis
+        image_data = base64.b64decode(uploaded_image_base64)
+        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp_file:
+            tmp_file.write(image_data)
+            temp_path = tmp_file.name
+        
+        try:
+            # Analyze image
+            logger.info("🔍 PIPELINE STEP 1: Analyzing uploaded image...")
+            image_analysis = await image_service.analyze_product_image_from_file(temp_path, user_api_key)
+            
+            if progress_callback:
+                await progress_callback("Prompt dari image berhasil di ekstrak")
+            
+            # STEP 2: Bridge analysis + prompt → wizard fields (BACKGROUND)  
+            if progress_callback:
+                await progress_callback("Sedang mengisi 48 wizard fields dari image analysis dan prompt user")
+            logger.info("🌉 PIPELINE STEP 2: Bridging image analysis with user prompt...")
+            bridge = ImageWizardBridge()
+            with telemetry.span("brief.bridge"):
+                wizard_input = bridge.combine_image_and_prompt(image_analysis, brief_prompt)
+            
+            if progress_callback:
+                await progress_callback("Prompt dari user dan image berhasil di isi di 48 wizard fields")
+            
+            # STEP 3: Generate comprehensive brief from wizard (BACKGROUND)
+            if progress_callback:
+                await progress_callback("Enhance brief sudah digenerate")
+            logger.info("📝 PIPELINE STEP 3: Generating comprehensive brief from wizard data...")
+            orchestrator = BriefOrchestratorService()
+            brief_output = await orchestrator.generate_final_brief(wizard_input)
+            
+            if progress_callback:
+                await progress_callback("Enhance full brief dikirim ke OpenAI")
+            
+            # Use enhanced brief for generation
+            return brief_output.final_prompt
+            
+        finally:
+            # Clean up temp file
+            Path(temp_path).unlink(missing_ok=True)
+    
+    @telemetry.traced("pipeline.generate_image")
     async def generate_image(self, brief_prompt: str, user_api_key: str, 
                            negative_prompt: Optional[str] = None,
                            provider_override: Optional[str] = None,
@@ -498,63 +573,7 @@ class OpenAIImageService:
         
         # If image uploaded, run FULL PIPELINE (background processing)
         if uploaded_image_base64:
-            if progress_callback:
-                await progress_callback("Analisis image sedang berlangsung")
-            logger.info("🎯 BOSS PIPELINE: Running full analysis pipeline")
-            
-            # Import services for pipeline
-            from app.services.image_analysis_service import ImageAnalysisService
-            from app.services.image_wizard_bridge import ImageWizardBridge  
-            from app.services.brief_orchestrator import BriefOrchestratorService
-            import tempfile
-            import base64
-            from pathlib import Path
-            
-            # STEP 1: Vision API analyze image (BACKGROUND)
-            if progress_callback:
-                await progress_callback("Sedang ekstrak dari image")
-            image_service = ImageAnalysisService()
-            
-            # Convert base64 to temp file for analysis
-            image_data = base64.b64decode(uploaded_image_base64)
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp_file:
-                tmp_file.write(image_data)
-                temp_path = tmp_file.name
-            
-            try:
-                # Analyze image
-                logger.info("🔍 PIPELINE STEP 1: Analyzing uploaded image...")
-                image_analysis = await image_service.analyze_product_image_from_file(temp_path, user_api_key)
-                
-                if progress_callback:
-                    await progress_callback("Prompt dari image berhasil di ekstrak")
-                
-                # STEP 2: Bridge analysis + prompt → wizard fields (BACKGROUND)  
-                if progress_callback:
-                    await progress_callback("Sedang mengisi 48 wizard fields dari image analysis dan prompt user")
-                logger.info("🌉 PIPELINE STEP 2: Bridging image analysis with user prompt...")
-                bridge = ImageWizardBridge()
-                wizard_input = bridge.combine_image_and_prompt(image_analysis, brief_prompt)
-                
-                if progress_callback:
-                    await progress_callback("Prompt dari user dan image berhasil di isi di 48 wizard fields")
-                
-                # STEP 3: Generate comprehensive brief from wizard (BACKGROUND)
-                if progress_callback:
-                    await progress_callback("Enhance brief sudah digenerate")
-                logger.info("📝 PIPELINE STEP 3: Generating comprehensive brief from wizard data...")
-                orchestrator = BriefOrchestratorService()
-                brief_output = await orchestrator.generate_final_brief(wizard_input)
-                
-                if progress_callback:
-                    await progress_callback("Enhance full brief dikirim ke OpenAI")
-                
-                # Use enhanced brief for generation
-                brief_prompt = brief_output.final_prompt
-                
-            finally:
-                # Clean up temp file
-                Path(temp_path).unlink(missing_ok=True)
+            brief_prompt = await self._brief_from_uploaded_image(uploaded_image_base64, brief_prompt, user_api_key, progress_callback)
         
         # STEP 4: Generate image with existing logic (BACKGROUND)
         if progress_callback:
@@ -568,47 +587,77 @@ class OpenAIImageService:
         if provider_override:
             logger.info(f"Provider override '{provider_override}' requested, using OpenAI GPT Image 1")
         
-        # Build request
-        endpoint = f"{self.api_base_url.rstrip('/')}{self.get_endpoint_path(provider)}"
-        payload = self.build_request_payload(provider, brief_prompt, negative_prompt)
-        
-        # Set up headers (GPT Image 1 compatible with OpenAI 1.101.0)
-        headers = {
-            "Authorization": f"Bearer {user_api_key}",
-            "Content-Type": "application/json",
-            "User-Agent": "OpenAI/1.101.0"  # OpenAI 1.101.0 user agent
-        }
-        
-        # Add any provider-specific headers if needed
-        # (OpenRouter headers removed since it's no longer supported)
-        
-        logger.info(f"🎨 Sending request to {provider.value} for: '{brief_prompt[:50]}...'")
-        logger.info(f"🔗 Endpoint: {endpoint}")
-        
         try:
-            response = requests.post(endpoint, headers=headers, json=payload, timeout=300)
-            response.raise_for_status()
-            
-            api_response = response.json()
-            logger.info(f"✅ Received response from {provider.value}")
-            
-            # 🔍 DEBUG: Log response structure for better ID extraction
-            logger.debug(f"📋 API Response structure: {list(api_response.keys())}")
-            if "data" in api_response and api_response["data"]:
-                logger.debug(f"📋 Image data keys: {list(api_response['data'][0].keys())}")
-            
-            return self.parse_response(provider, api_response)
+            api_response = await self._request_images(provider, brief_prompt, user_api_key, negative_prompt)
+            return await self.parse_response(provider, api_response)
             
-        except requests.exceptions.RequestException as e:
-            logger.error(f"💥 API request failed for {provider.value}: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                logger.error(f"Response: {e.response.text}")
-            raise Exception(f"Image generation request failed: {str(e)}")
+        except UpstreamError:
+            raise  # already logged with the upstream response body
         
         except Exception as e:
             logger.error(f"💥 Unexpected error with {provider.value}: {e}")
             raise Exception(f"Image generation service error: {str(e)}")
     
+    async def generate_variants(self, brief_prompt: str, user_api_key: str, count: int,
+                                strategy: str = "n",
+                                negative_prompt: Optional[str] = None,
+                                provider_override: Optional[str] = None,
+                                uploaded_image_base64: Optional[str] = None,
+                                progress_callback = None) -> AsyncIterator[Tuple[int, Union[ImageOutput, Exception]]]:
+        """
+        Render several variants of one brief, yielding each as soon as it is stored.
+        
+        Args:
+            brief_prompt: Prompt to render (the brief is computed once for all variants)
+            user_api_key: User's API key for the service
+            count: Number of variants
+            strategy: "n" for one upstream call returning `count` images, "fanout" for `count`
+                      concurrent single-image calls (independent samples; GPT Image 1 takes no seed)
+            negative_prompt, provider_override, uploaded_image_base64, progress_callback: As for generate_image
+            
+        Yields:
+            (variant index, ImageOutput), or (variant index, exception) when that variant failed;
+            with the "n" strategy a failed upstream call raises instead
+        """
+        if strategy not in VARIANT_STRATEGIES:
+            raise ValueError(f"Unknown variant strategy '{strategy}' (use {', '.join(VARIANT_STRATEGIES)})")
+        if uploaded_image_base64:
+            brief_prompt = await self._brief_from_uploaded_image(uploaded_image_base64, brief_prompt, user_api_key, progress_callback)
+        if progress_callback:
+            await progress_callback("Full brief sudah dikirim ke OpenAI")
+        if provider_override:
+            logger.info(f"Provider override '{provider_override}' requested, using OpenAI GPT Image 1")
+        provider = ImageProvider.OPENAI_GPT_IMAGE
+        logger.info(f"🎨 PIPELINE FINAL: Generating {count} variants ({strategy})...")
+        
+        async def indexed(index: int, coroutine):
+            try:
+                return index, await coroutine
+            except Exception as e:
+                logger.warning(f"⚠️ Variant {index} failed: {e}")
+                return index, e
+        
+        async def render_one() -> ImageOutput:
+            api_response = await self._request_images(provider, brief_prompt, user_api_key, negative_prompt)
+            return await self.parse_response(provider, api_response)
+        
+        if strategy == "n":
+            api_response = await self._request_images(provider, brief_prompt, user_api_key, negative_prompt, n=count)
+            images = api_response.get("data") or []
+            if not images:
+                raise Exception(f"Unable to parse response from {provider.value}: no 'data' in response")
+            tasks = [asyncio.create_task(indexed(index, self.image_output(provider, image_data)))
+                     for index, image_data in enumerate(images)]
+        else:
+            tasks = [asyncio.create_task(indexed(index, render_one())) for index in range(count)]
+        
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+    
     async def enhance_image(self, original_prompt: str, instruction: str, 
                           user_api_key: str, seed: int) -> ImageOutput:
         """Enhanced image generation with modified prompt."""
@@ -620,12 +669,14 @@ class OpenAIImageService:
             user_api_key=user_api_key
         )
     
+    @telemetry.traced("pipeline.breakthrough_edit")
     async def generate_with_breakthrough_edit(
         self, 
         brief_prompt: str, 
         user_api_key: str,
         uploaded_image_base64: str,
-        progress_callback = None
+        progress_callback = None,
+        variant_count: int = 1
     ) -> ImageOutput:
         """
         🚀 BREAKTHROUGH: GPT Image-1 Edit API for PERFECT Shape Preservation
@@ -635,6 +686,9 @@ class OpenAIImageService:
         2. Use 'input_fidelity=high' to preserve original features  
         3. Apply professional photography enhancement prompts
         4. RESULT: Enhanced image with PRESERVED original shape!
+        
+        With variant_count > 1 the edit API returns several images in one call; the first is the
+        main result and the rest are listed in `variant_images`.
         """
         if progress_callback:
             await progress_callback("🚀 BREAKTHROUGH: Initializing GPT Image-1 Edit API...")
@@ -748,13 +802,11 @@ class OpenAIImageService:
             if progress_callback:
                 await progress_callback("🚀 Calling GPT Image-1 Edit API with HIGH fidelity...")
             
-            logger.info(f"🎯 Edit API call with preservation prompt: {edit_prompt[:200]}...")
+            logger.bind(verbose=True).info(f"🎯 Edit API call with preservation prompt: {edit_prompt[:200]}...")
             
             # Build edit request (multipart form data)
-            import requests
-            
             # FIX: Ensure no double v1 in endpoint URL
-            endpoint = "https://api.openai.com/v1/images/edits"
+            endpoint = f"{settings.openai_base_url.rstrip('/')}/images/edits"
             
             headers = {
                 "Authorization": f"Bearer {user_api_key}",
@@ -762,7 +814,7 @@ class OpenAIImageService:
             }
             
             files = {
-                'image': ('image.png', png_buffer, 'image/png')
+                'image': ('image.png', png_buffer.getvalue(), 'image/png')  # bytes, so retries can resend it
             }
             
             data = {
@@ -770,27 +822,31 @@ class OpenAIImageService:
                 'prompt': edit_prompt,
                 'input_fidelity': 'high', 
                 'quality': 'high',
-                'n': 1,
+                'n': variant_count,
                 'output_format': 'png'
             }
             
             if progress_callback:
                 await progress_callback("⚡ Processing with GPT Image-1 Edit API...")
             
-            response = requests.post(endpoint, headers=headers, files=files, data=data, timeout=300)
-            response.raise_for_status()
+            response = await resilience.call(
+                "images.edit", self._post, endpoint, headers, api_key=user_api_key, files=files, data=data
+            )
             
             api_response = response.json()
+            usage_ledger.record_image(
+                user_api_key, "images.edit", data["model"], api_response.get("size", "1024x1024"),
+                data["quality"], data["n"], api_response.get("usage")
+            )
             logger.info("✅ BREAKTHROUGH SUCCESS: GPT Image-1 Edit API completed!")
             
             # STEP 5: Process response
             if progress_callback:
                 await progress_callback("🎉 BREAKTHROUGH: Shape preserved! Processing result...")
             
-            image_base64 = api_response['data'][0]['b64_json']
-            
-            # FIX: Save base64 to file like normal flow - ensure we use the correct method
-            image_url = self._save_base64_to_file(image_base64)
+            # Persist off the event loop like the normal generation flow (all variants concurrently)
+            image_urls = await asyncio.gather(*(image_store.save_base64(image['b64_json']) for image in api_response['data']))
+            image_url = image_urls[0]
             
             # Generate unique IDs for tracking
             generation_id = f"bt_{str(uuid.uuid4())[:8]}"
@@ -803,13 +859,20 @@ class OpenAIImageService:
                 revised_prompt=enhanced_brief,
                 final_enhanced_prompt=enhanced_brief,
                 model_used="gpt-image-1",
-                provider_used="gpt-image-1-edit-breakthrough"
+                provider_used="gpt-image-1-edit-breakthrough",
+                derivatives=image_store.variant_urls(image_url) or None,
+                variant_images=[
+                    {"image_url": url, "generation_id": f"bt_{str(uuid.uuid4())[:8]}", "derivatives": image_store.variant_urls(url) or None}
+                    for url in image_urls[1:]
+                ] or None
             )
             
         except Exception as e:
             logger.error(f"💥 BREAKTHROUGH Edit API failed: {e}")
             if progress_callback:
                 await progress_callback(f"❌ Edit API Error: {str(e)}")
+            if isinstance(e, UpstreamError):
+                raise
             raise Exception(f"GPT Image-1 Edit API failed: {str(e)}")
     
     def _build_edit_preservation_prompt(self, user_prompt: str, analysis_text: str = "") -> str:
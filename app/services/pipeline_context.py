@@ -0,0 +1,135 @@
+"""
+Pipeline Context - artifacts handed from the brief stages to the image stages.
+Extraction output (WizardInput), the enhanced brief and the generation prompt derived
+from it are recorded once under a brief_id. A later request that references the id
+(e.g. /generate-image after /generate-brief-from-prompt) skips the stages already done
+instead of re-extracting and re-enhancing a 15K-character brief. Briefs are also
+persisted in the brief store, so a brief_id outlives its in-memory context.
+"""
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from loguru import logger
+from app.config.settings import settings
+from app.schemas.models import WizardInput
+from app.services.brief_store import brief_store
+from app.services.telemetry import telemetry
+
+# Stages whose artifacts a context can carry, in pipeline order
+STAGES = ("extract", "brief", "compress")
+
+
+@dataclass
+class PipelineContext:
+    """Artifacts of one brief's pipeline run."""
+    brief_id: str
+    user_request: str = ""
+    wizard_input: Optional[WizardInput] = None  # extract
+    brief: Optional[str] = None  # brief (the full enhanced brief shown to the user)
+    generation_prompt: Optional[str] = None  # compress (the prompt sent to the image API)
+    created_at: float = field(default_factory=time.time)
+
+    def completed_stages(self) -> List[str]:
+        artifacts = {"extract": self.wizard_input, "brief": self.brief, "compress": self.generation_prompt}
+        return [stage for stage in STAGES if artifacts[stage] is not None]
+
+
+class PipelineContextStore:
+    """In-memory registry of recent pipeline contexts (LRU, bounded by count and age)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contexts: "OrderedDict[str, PipelineContext]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.restored = 0
+        self.stages_skipped: Dict[str, int] = {stage: 0 for stage in STAGES}
+
+    def create(self, user_request: str = "") -> PipelineContext:
+        """Register a new, empty context."""
+        context = PipelineContext(brief_id=f"brief_{secrets.token_hex(8)}", user_request=user_request)
+        with self._lock:
+            self._contexts[context.brief_id] = context
+            while len(self._contexts) > max(1, settings.pipeline_context_max):
+                self._contexts.popitem(last=False)
+        return context
+
+    async def set_brief(self, context: PipelineContext, brief: str):
+        """Record a context's enhanced brief and persist it in the brief store under the same id."""
+        context.brief = brief
+        await brief_store.put(brief, context.brief_id)
+
+    async def get(self, brief_id: str) -> Optional[PipelineContext]:
+        """
+        Look up a context (a context no longer in memory is restored from the brief store
+        off the event loop).
+
+        Args:
+            brief_id: Id returned by a brief endpoint
+
+        Returns:
+            The context; once it has left memory (PIPELINE_CONTEXT_TTL/MAX) a context holding only
+            the stored brief, or None when the brief store does not have it either
+        """
+        with self._lock:
+            context = self._contexts.get(brief_id)
+            if context is not None and time.time() - context.created_at > settings.pipeline_context_ttl:
+                del self._contexts[brief_id]
+                context = None
+            if context is not None:
+                self._contexts.move_to_end(brief_id)
+                self.hits += 1
+                return context
+
+        brief = await brief_store.fetch(brief_id)
+        with self._lock:
+            if brief is None:
+                self.misses += 1
+                return None
+            context = self._contexts.get(brief_id)
+            if context is None:
+                context = self._contexts[brief_id] = PipelineContext(brief_id=brief_id, brief=brief)
+            self.restored += 1
+            return context
+
+    def record_skip(self, context: PipelineContext, *stages: str):
+        """Count stages a request did not have to run because the context already held their output."""
+        with self._lock:
+            for stage in stages:
+                self.stages_skipped[stage] += 1
+        logger.info(f"⏭️ Reusing {', '.join(stages)} from {context.brief_id}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Registry size and reuse counters (for /api/v1/health)."""
+        with self._lock:
+            return {
+                "contexts": len(self._contexts),
+                "hits": self.hits,
+                "misses": self.misses,
+                "restored": self.restored,
+                "stages_skipped": dict(self.stages_skipped),
+            }
+
+    def prometheus_metrics(self) -> List[tuple]:
+        """Context count, lookups and skipped stages for /metrics."""
+        stats = self.stats()
+        metrics = [
+            ("photoeai_pipeline_contexts", "gauge", "Pipeline contexts held for brief_id references", stats["contexts"]),
+            ('photoeai_pipeline_context_lookups_total{result="hit"}', "counter", "brief_id lookups by result", stats["hits"]),
+            ('photoeai_pipeline_context_lookups_total{result="miss"}', "counter", "brief_id lookups by result", stats["misses"]),
+            ('photoeai_pipeline_context_lookups_total{result="restored"}', "counter", "brief_id lookups by result", stats["restored"]),
+        ]
+        metrics += [
+            (f'photoeai_pipeline_stages_skipped_total{{stage="{stage}"}}', "counter", "Pipeline stages skipped by reusing a brief_id's artifacts", count)
+            for stage, count in stats["stages_skipped"].items()
+        ]
+        return metrics
+
+
+# Global instance
+pipeline_contexts = PipelineContextStore()
+telemetry.register_collector(pipeline_contexts.prometheus_metrics)
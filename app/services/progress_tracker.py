@@ -5,6 +5,7 @@ SIMPLE! GA OVER-ENGINEER!
 from typing import Dict, List
 import time
 import uuid
+from app.services.correlation import current_request_id
 
 class ProgressTracker:
     """Simple in-memory progress tracker"""
@@ -20,6 +21,7 @@ class ProgressTracker:
             'current_step': 0,
             'total_steps': 8,  # 8 progress messages dari pipeline
             'status': 'started',
+            'request_id': current_request_id(),  # correlates the session with the request's logs
             'created_at': time.time()
         }
         return session_id
@@ -3,10 +3,57 @@ Prompt Composer Service for handling autofill, composition, and validation of ph
 """
 
 import json
-from typing import Dict, Any
+import re
+from typing import Dict, Any, List, Tuple
 from loguru import logger
 from app.schemas.models import WizardInput
 from app.config.settings import settings
+from app.services.correlation import current_request_id
+
+
+# Order in which template sections are rendered into the brief
+SECTION_ORDER = [
+    "main_subject",
+    "composition_and_framing", 
+    "lighting_and_atmosphere",
+    "background_and_setting",
+    "camera_and_lens",
+    "style_and_post_production",
+    "product_lock"
+]
+
+# Compiled templates keyed by the content fingerprint of system_prompt_template.json,
+# so a hot reload only recompiles when that particular file changed
+_compiled_template_cache: Dict[str, List[Tuple[str, List[List[str]]]]] = {}
+
+
+def _compile_template(prompt_structure: Dict[str, Any]) -> List[Tuple[str, List[List[str]]]]:
+    """
+    Pre-split every template line into alternating literal / variable parts.
+    
+    Args:
+        prompt_structure: The 'prompt_structure' section of the system prompt template
+        
+    Returns:
+        List of (section_name, lines) where each line is the re.split result on {{variable}}
+    """
+    compiled = []
+    
+    if "introduction" in prompt_structure:
+        compiled.append(("introduction", [[prompt_structure["introduction"]]]))
+    
+    for section_name in SECTION_ORDER:
+        if section_name in prompt_structure:
+            section = prompt_structure[section_name]
+            lines = []
+            if "header" in section:
+                lines.append([section["header"]])
+            for key, value in section.items():
+                if key != "header" and isinstance(value, str):
+                    lines.append(re.split(r'\{\{(\w+)\}\}', value))
+            compiled.append((section_name, lines))
+    
+    return compiled
 
 
 class PromptComposerService:
@@ -15,11 +62,30 @@ class PromptComposerService:
     Handles autofill with defaults, template composition, and quality validation.
     """
     
-    def __init__(self):
-        """Initialize the service with configuration from settings."""
-        self.defaults = settings.defaults.get("defaults", {})
-        self.system_prompt_template = settings.system_prompt_template
-        self.quality_rules = settings.quality_rules
+    @property
+    def defaults(self) -> Dict[str, Any]:
+        """Default field values from the active configuration snapshot."""
+        return settings.defaults.get("defaults", {})
+    
+    @property
+    def system_prompt_template(self) -> Dict[str, Any]:
+        """System prompt template from the active configuration snapshot."""
+        return settings.system_prompt_template
+    
+    @property
+    def quality_rules(self) -> Dict[str, Any]:
+        """Quality rules from the active configuration snapshot."""
+        return settings.quality_rules
+    
+    def _get_compiled_template(self) -> List[Tuple[str, List[List[str]]]]:
+        """Return the compiled template for the current system_prompt_template.json contents."""
+        fingerprint = settings.config_file_fingerprint("system_prompt_template")
+        compiled = _compiled_template_cache.get(fingerprint)
+        if compiled is None:
+            compiled = _compile_template(self.system_prompt_template.get("prompt_structure", {}))
+            _compiled_template_cache.clear()
+            _compiled_template_cache[fingerprint] = compiled
+        return compiled
     
     def autofill_wizard_input(self, wizard_data: Dict[str, Any]) -> WizardInput:
         """
@@ -31,7 +97,7 @@ class PromptComposerService:
         Returns:
             WizardInput object with all fields filled (using defaults where necessary)
         """
-        data_id = id(wizard_data)  # Simple data tracking
+        data_id = current_request_id()
         
         logger.info(f"🔧 Starting autofill process [ID: {data_id}]", extra={
             "data_id": data_id,
@@ -71,7 +137,7 @@ class PromptComposerService:
         Returns:
             Composed initial brief text
         """
-        brief_id = id(wizard_input)  # Simple brief tracking
+        brief_id = current_request_id()
         
         logger.info(f"📝 Starting initial brief composition [ID: {brief_id}]", extra={
             "brief_id": brief_id,
@@ -83,43 +149,28 @@ class PromptComposerService:
             # Convert wizard input to dictionary for template replacement
             wizard_dict = wizard_input.model_dump()
             
-            # Get the prompt structure from template
-            prompt_structure = self.system_prompt_template.get("prompt_structure", {})
+            # Get the compiled prompt structure (rebuilt only when the template file changes)
+            compiled_template = self._get_compiled_template()
             
             logger.debug(f"📋 Retrieved prompt template [ID: {brief_id}]", extra={
                 "brief_id": brief_id,
-                "template_sections": list(prompt_structure.keys()),
+                "template_sections": [name for name, _ in compiled_template],
                 "wizard_fields": list(wizard_dict.keys())
             })
             
             # Build the brief by processing each section
             brief_sections = []
-            
-            # Introduction
-            if "introduction" in prompt_structure:
-                brief_sections.append(prompt_structure["introduction"])
-                brief_sections.append("")  # Empty line
-            
-            # Process each section
-            section_order = [
-                "main_subject",
-                "composition_and_framing", 
-                "lighting_and_atmosphere",
-                "background_and_setting",
-                "camera_and_lens",
-                "style_and_post_production",
-                "product_lock"
-            ]
-            
             sections_processed = []
-            for section_name in section_order:
-                if section_name in prompt_structure:
-                    section = prompt_structure[section_name]
-                    section_text = self._process_section(section, wizard_dict)
-                    if section_text:
-                        brief_sections.append(section_text)
-                        brief_sections.append("")  # Empty line between sections
-                        sections_processed.append(section_name)
+            
+            for section_name, lines in compiled_template:
+                section_text = "\n".join(self._render_line(parts, wizard_dict) for parts in lines)
+                if section_name == "introduction":
+                    brief_sections.append(section_text)
+                    brief_sections.append("")  # Empty line
+                elif section_text:
+                    brief_sections.append(section_text)
+                    brief_sections.append("")  # Empty line between sections
+                    sections_processed.append(section_name)
             
             # Join all sections
             complete_brief = "\n".join(brief_sections).strip()
@@ -146,68 +197,50 @@ class PromptComposerService:
             })
             return f"Error composing brief: {str(e)}"
     
-    def _process_section(self, section: Dict[str, Any], wizard_dict: Dict[str, Any]) -> str:
+    def _render_line(self, parts: List[str], wizard_dict: Dict[str, Any]) -> str:
         """
-        Process a section of the prompt template, replacing placeholders with wizard data.
+        Render a compiled template line, replacing variables with wizard data.
         
         Args:
-            section: Section dictionary from the template
+            parts: Alternating literal / variable-name parts from _compile_template
             wizard_dict: Wizard input data as dictionary
             
         Returns:
-            Processed section text
+            Rendered line text
         """
-        section_lines = []
-        
-        # Add header if present
-        if "header" in section:
-            section_lines.append(section["header"])
-        
-        # Process all other keys in the section
-        for key, value in section.items():
-            if key != "header" and isinstance(value, str):
-                # Replace template variables
-                processed_line = self._replace_template_variables(value, wizard_dict)
-                section_lines.append(processed_line)
-        
-        return "\n".join(section_lines)
+        rendered = []
+        for index, part in enumerate(parts):
+            if index % 2 == 0:
+                rendered.append(part)
+            elif part in wizard_dict and wizard_dict[part] is not None:
+                rendered.append(str(wizard_dict[part]))
+            else:
+                # If variable not found, replace with placeholder
+                rendered.append(f"[{part}]")
+        return "".join(rendered)
     
-    def _replace_template_variables(self, text: str, wizard_dict: Dict[str, Any]) -> str:
+    def validate_extracted_data(self, extracted_data: Dict[str, Any]) -> list:
         """
-        Replace template variables in format {{variable_name}} with actual values.
+        Validate extracted data against quality rules.
         
         Args:
-            text: Text containing template variables
-            wizard_dict: Dictionary with variable values
+            extracted_data: Dictionary containing extracted wizard data
             
         Returns:
-            Text with variables replaced
+            List of validation error messages. Empty list means valid data.
         """
-        import re
-        
-        # Find all template variables in the format {{variable_name}}
-        variables = re.findall(r'\{\{(\w+)\}\}', text)
-        
-        result = text
-        for variable in variables:
-            if variable in wizard_dict and wizard_dict[variable] is not None:
-                value = str(wizard_dict[variable])
-                result = result.replace(f"{{{{{variable}}}}}", value)
-            else:
-                # If variable not found, replace with placeholder
-                result = result.replace(f"{{{{{variable}}}}}", f"[{variable}]")
-        
-        return result
+        return [message for _, message in self.validate_extracted_fields(extracted_data)]
     
-    def validate_extracted_data(self, extracted_data: Dict[str, Any]) -> list:
+    def validate_extracted_fields(self, extracted_data: Dict[str, Any]) -> List[Tuple[List[str], str]]:
         """
-        Validate extracted data against quality rules.
+        Validate extracted data against quality rules, naming the fields behind each error.
         
         Args:
             extracted_data: Dictionary containing extracted wizard data
             
         Returns:
-            List of validation error messages. Empty list means valid data.
+            List of (fields, error message); fields is empty when no field can be blamed
+            (e.g. a validation system error). Empty list means valid data.
         """
         validation_errors = []
         
@@ -223,7 +256,7 @@ class PromptComposerService:
                     required_fields = rule.get("required_fields", [])
                     for field in required_fields:
                         if field not in extracted_data or extracted_data[field] is None or extracted_data[field] == "":
-                            validation_errors.append(f"Required field '{field}' is missing or empty")
+                            validation_errors.append(([field], f"Required field '{field}' is missing or empty"))
                 
                 elif rule_name == "Check for Vague Language":
                     # Check for banned words
@@ -233,7 +266,7 @@ class PromptComposerService:
                             value = str(extracted_data[field]).lower()
                             for banned_word in banned_list:
                                 if banned_word.lower() in value:
-                                    validation_errors.append(f"Vague term '{banned_word}' found in '{field}'. Consider being more specific.")
+                                    validation_errors.append(([field], f"Vague term '{banned_word}' found in '{field}'. Consider being more specific."))
                 
                 elif rule_name == "Check for Contradictions":
                     # Check logical consistency
@@ -246,10 +279,11 @@ class PromptComposerService:
                         # Simple condition checking (can be expanded)
                         if self._check_condition(if_condition, extracted_data):
                             if not self._check_condition(then_condition, extracted_data):
-                                validation_errors.append(error_message)
+                                # Either side of the contradiction may be the wrong one
+                                validation_errors.append(([*if_condition, *then_condition], error_message))
             
         except Exception as e:
-            validation_errors.append(f"Validation system error: {str(e)}")
+            validation_errors.append(([], f"Validation system error: {str(e)}"))
         
         return validation_errors
 
@@ -349,7 +383,7 @@ class PromptComposerService:
                 validation_result["is_valid"] = False
             
         except Exception as e:
-            print(f"Error in validate_brief: {e}")
+            logger.error(f"💥 Error in validate_brief: {e}")
             validation_result["errors"].append(f"Validation error: {str(e)}")
             validation_result["is_valid"] = False
         
@@ -3,11 +3,17 @@ Smart Prompt Compressor Service for PhotoeAI
 
 This service intelligently compresses long, enhanced photography briefs into dense,
 powerful prompts that respect API character limits while preserving artistic essence.
+By default compression is local and extractive (app/services/extractive_compressor.py);
+BRIEF_COMPRESSOR=llm uses an LLM rewrite instead.
 """
 
 from typing import Optional
 from loguru import logger
+from app.config.settings import settings
 from app.services.ai_client import AIClient
+from app.services.correlation import current_request_id
+from app.services.extractive_compressor import extractive_compressor
+from app.services.model_router import model_router
 
 
 class PromptCompressorService:
@@ -38,7 +44,12 @@ class PromptCompressorService:
             logger.info(f"📏 Brief already within limits ({len(brief_text)} chars), no compression needed")
             return brief_text
         
-        request_id = hash(brief_text) % 10000  # Simple request tracking
+        if settings.brief_compressor != "llm":
+            compressed_prompt = extractive_compressor.compress(brief_text, max_length)
+            logger.info(f"✅ COMPRESSION: Extractive compression {len(brief_text)} → {len(compressed_prompt)} chars")
+            return compressed_prompt
+        
+        request_id = current_request_id()
         
         logger.info(f"🔧 COMPRESSION: Starting smart brief compression [ID: {request_id}]", extra={
             "request_id": request_id,
@@ -49,39 +60,7 @@ class PromptCompressorService:
         })
         
         try:
-            compression_instruction = f"""
-You are an expert AI Prompt Engineer for image generation models like DALL-E 3. Your task is to take a long, descriptive photography brief and compress it into a single, dense paragraph that captures all the essential visual elements.
-
-**CRITICAL INSTRUCTIONS:**
-1.  **Extract Key Concepts**: Identify and extract the most critical artistic and technical keywords from the brief below (e.g., "matte black jar", "dramatic yet refined studio lighting", "textured black marble surface", "Canon EOS R5", "50mm f/1.8", "creamy bokeh", "ethereal smoke", "cool, desaturated grading").
-2.  **Synthesize into a Dense Paragraph**: Combine all these keywords and concepts into a single, comma-separated, highly descriptive paragraph that flows naturally while being information-dense.
-3.  **Prioritize Visuals**: Focus on words that describe visual elements, lighting, composition, mood, materials, textures, and technical camera details. Omit section headers, narrative rationale, and process explanations.
-4.  **Preserve Technical Details**: Keep specific camera models, lens specifications, lighting setups, and post-processing notes as these are crucial for image quality.
-5.  **Maintain Creative Vision**: Ensure the emotional tone and artistic vision from the original brief is preserved in the compressed version.
-6.  **Respect Character Limit**: The final output MUST be under {max_length} characters while being as comprehensive as possible.
-
-**Long Brief to Compress:**
----
-{brief_text}
----
-
-Now, produce the single, compressed, and powerful paragraph for the image generation model. Focus on creating a flowing, natural description that reads like a professional photography prompt while being incredibly dense with visual information.
-"""
-            
-            logger.debug(f"📝 Sending compression request to AI [ID: {request_id}]", extra={
-                "request_id": request_id,
-                "instruction_length": len(compression_instruction),
-                "temperature": 0.6
-            })
-            
-            response = await self.ai_client.generate_text(compression_instruction)
-            compressed_prompt = response.strip()
-            
-            # Verify compression was successful
-            if len(compressed_prompt) > max_length:
-                logger.warning(f"⚠️ AI compression exceeded limit, applying hard truncation [ID: {request_id}]")
-                # Apply smart truncation as fallback
-                compressed_prompt = self._smart_truncate(compressed_prompt, max_length)
+            compressed_prompt = await self.compress_with_llm(brief_text, max_length, request_id)
             
             compression_ratio = len(compressed_prompt) / len(brief_text) if brief_text else 0
             
@@ -106,9 +85,57 @@ Now, produce the single, compressed, and powerful paragraph for the image genera
                 "status": "error"
             })
             
-            # Fallback: Use smart truncation of the original brief
-            logger.warning(f"⚠️ AI compression failed, falling back to smart truncation [ID: {request_id}]")
-            return self._smart_truncate(brief_text, max_length)
+            # Fallback: local extractive compression of the original brief
+            logger.warning(f"⚠️ AI compression failed, falling back to extractive compression [ID: {request_id}]")
+            return extractive_compressor.compress(brief_text, max_length)
+    
+    async def compress_with_llm(self, brief_text: str, max_length: int, request_id: Optional[str] = None) -> str:
+        """
+        Rewrite a brief into a dense paragraph with the `compress` model task.
+        
+        Args:
+            brief_text: The long, enhanced photography brief to compress
+            max_length: Maximum character limit for the compressed prompt
+            request_id: Tracking id for log lines
+            
+        Returns:
+            The model's paragraph, truncated at a natural break if it overshoots max_length
+        """
+        compression_instruction = f"""
+You are an expert AI Prompt Engineer for image generation models like DALL-E 3. Your task is to take a long, descriptive photography brief and compress it into a single, dense paragraph that captures all the essential visual elements.
+
+**CRITICAL INSTRUCTIONS:**
+1.  **Extract Key Concepts**: Identify and extract the most critical artistic and technical keywords from the brief below (e.g., "matte black jar", "dramatic yet refined studio lighting", "textured black marble surface", "Canon EOS R5", "50mm f/1.8", "creamy bokeh", "ethereal smoke", "cool, desaturated grading").
+2.  **Synthesize into a Dense Paragraph**: Combine all these keywords and concepts into a single, comma-separated, highly descriptive paragraph that flows naturally while being information-dense.
+3.  **Prioritize Visuals**: Focus on words that describe visual elements, lighting, composition, mood, materials, textures, and technical camera details. Omit section headers, narrative rationale, and process explanations.
+4.  **Preserve Technical Details**: Keep specific camera models, lens specifications, lighting setups, and post-processing notes as these are crucial for image quality.
+5.  **Maintain Creative Vision**: Ensure the emotional tone and artistic vision from the original brief is preserved in the compressed version.
+6.  **Respect Character Limit**: The final output MUST be under {max_length} characters while being as comprehensive as possible.
+
+**Long Brief to Compress:**
+---
+{brief_text}
+---
+
+Now, produce the single, compressed, and powerful paragraph for the image generation model. Focus on creating a flowing, natural description that reads like a professional photography prompt while being incredibly dense with visual information.
+"""
+        
+        logger.debug(f"📝 Sending compression request to AI [ID: {request_id}]", extra={
+            "request_id": request_id,
+            "instruction_length": len(compression_instruction),
+            "temperature": 0.6
+        })
+        
+        response = await self.ai_client.generate_text(compression_instruction, task="compress")
+        compressed_prompt = response.strip()
+        
+        # Verify compression was successful
+        model_router.record_quality("compress", model_router.model_for("compress"), passed=len(compressed_prompt) <= max_length)
+        if len(compressed_prompt) > max_length:
+            logger.warning(f"⚠️ AI compression exceeded limit, applying hard truncation [ID: {request_id}]")
+            # Apply smart truncation as fallback
+            compressed_prompt = self._smart_truncate(compressed_prompt, max_length)
+        return compressed_prompt
     
     def _smart_truncate(self, text: str, max_length: int) -> str:
         """
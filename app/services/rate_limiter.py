@@ -0,0 +1,351 @@
+"""
+Upstream Rate Limiter - per-key and per-node admission control for OpenAI calls.
+Each upstream pool (chat, images) has a node-wide concurrency cap and RPM/TPM token
+buckets sized from the configured OpenAI usage tier; each client (hashed user API key,
+or hashed client address for calls on the server key) gets a share of that budget.
+Waiting calls are dispatched by weighted start-time fair queuing, so one aggressive client
+queues behind its own backlog instead of starving everyone else, and background flows
+(batch jobs, RATE_LIMIT_BATCH_WEIGHT) get a smaller share than interactive clients.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from loguru import logger
+from app.config.settings import settings
+from app.services.telemetry import telemetry
+from app.services.token_budget import token_budget
+from app.services.usage_ledger import hash_api_key
+
+# OpenAI usage-tier budgets per pool: (requests or images per minute, tokens per minute)
+TIER_LIMITS: Dict[int, Dict[str, Tuple[int, Optional[int]]]] = {
+    1: {"chat": (500, 30_000), "images": (5, None)},
+    2: {"chat": (5_000, 450_000), "images": (20, None)},
+    3: {"chat": (5_000, 800_000), "images": (50, None)},
+    4: {"chat": (10_000, 2_000_000), "images": (150, None)},
+    5: {"chat": (10_000, 30_000_000), "images": (250, None)},
+}
+
+UPSTREAM_POOLS = {"chat": "chat", "vision": "chat", "images.generate": "images", "images.edit": "images"}
+
+DEFAULT_COMPLETION_TOKENS = 1000
+
+_client_id: ContextVar[Optional[str]] = ContextVar("photoeai_client_id", default=None)
+_flow_weight: ContextVar[float] = ContextVar("photoeai_flow_weight", default=1.0)
+
+
+def estimate_cost(upstream: str, call_kwargs: Dict[str, Any]) -> float:
+    """
+    Admission cost of a call before it is made: tokens for chat/vision (prompt tokens from
+    the model's tokenizer plus max_tokens), images for the images pool.
+    """
+    if UPSTREAM_POOLS.get(upstream) == "images":
+        params = call_kwargs.get("json") or call_kwargs.get("data") or {}
+        return float(params.get("n", 1))
+    prompt_tokens = token_budget.count_messages(call_kwargs.get("messages", []), call_kwargs.get("model"))
+    return float(prompt_tokens + (call_kwargs.get("max_tokens") or DEFAULT_COMPLETION_TOKENS))
+
+
+def actual_cost(upstream: str, result: Any) -> Optional[float]:
+    """Tokens actually used by a chat/vision response (None keeps the estimate)."""
+    if UPSTREAM_POOLS.get(upstream) == "images":
+        return None
+    total_tokens = getattr(getattr(result, "usage", None), "total_tokens", None)
+    return float(total_tokens) if total_tokens is not None else None
+
+
+class TokenBucket:
+    """Refills continuously at per_minute/60 per second up to one minute of budget."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (requests larger than the bucket wait for a full bucket)."""
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        return 0.0 if self.tokens >= needed else (needed - self.tokens) / self.rate
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= amount
+
+    def adjust(self, delta: float):
+        """Charge (positive) or refund (negative) the difference between estimated and actual usage."""
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+    def full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class Lease:
+    """An admitted upstream call; hand it back to UpstreamRateLimiter.release()."""
+
+    __slots__ = ("flow", "cost", "start_tag", "enqueued", "future")
+
+    def __init__(self, flow: "_Flow", cost: float, start_tag: float, future: asyncio.Future):
+        self.flow = flow
+        self.cost = cost
+        self.start_tag = start_tag
+        self.enqueued = time.monotonic()
+        self.future = future
+
+
+class _Flow:
+    """Queue and budget of one client within a pool."""
+
+    def __init__(self, key: str, rpm: float, tpm: Optional[float]):
+        self.key = key
+        self.queue: Deque[Lease] = deque()
+        self.active = 0
+        self.last_finish = 0.0
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm) if tpm else None
+
+
+class FairScheduler:
+    """
+    Weighted start-time fair queuing over client flows for one pool. A call is dispatched
+    when the node-wide concurrency and buckets allow it; among eligible flows the head with
+    the smallest start tag goes first, and flows over their own caps are skipped. A call
+    advances its flow's tags by cost/weight, so backlogged flows are served in proportion
+    to their weights.
+    """
+
+    def __init__(self, pool: str, rpm: float, tpm: Optional[float], concurrency: int,
+                 key_share: float, key_concurrency: int):
+        self.pool = pool
+        self.concurrency = concurrency
+        self.key_share = key_share
+        self.key_concurrency = key_concurrency
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.active = 0
+        self.virtual_time = 0.0
+        self.flows: Dict[str, _Flow] = {}
+        self.rejected_total = 0
+        self.cancelled_total = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _flow(self, key: str) -> _Flow:
+        flow = self.flows.get(key)
+        if flow is None:
+            flow = self.flows[key] = _Flow(
+                key,
+                max(1.0, self.requests.capacity * self.key_share),
+                max(1.0, self.tokens.capacity * self.key_share) if self.tokens else None
+            )
+        return flow
+
+    @property
+    def queued(self) -> int:
+        return sum(len(flow.queue) for flow in self.flows.values())
+
+    async def acquire(self, key: str, cost: float, weight: float, timeout: float) -> Lease:
+        flow = self._flow(key)
+        start_tag = max(self.virtual_time, flow.last_finish)
+        flow.last_finish = start_tag + cost / weight
+        lease = Lease(flow, cost, start_tag, asyncio.get_running_loop().create_future())
+        flow.queue.append(lease)
+        self._dispatch()
+        try:
+            await asyncio.wait_for(lease.future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if lease.future.done() and not lease.future.cancelled():
+                # Admitted just as the caller gave up (e.g. a client disconnect): hand the slot back
+                self.release(lease, 0)
+            elif lease in flow.queue:
+                flow.queue.remove(lease)
+            if isinstance(e, asyncio.CancelledError):
+                self.cancelled_total += 1
+            else:
+                self.rejected_total += 1
+            raise
+        return lease
+
+    def release(self, lease: Lease, actual_cost: Optional[float] = None):
+        self.active -= 1
+        lease.flow.active -= 1
+        if actual_cost is not None and self.tokens is not None:
+            delta = actual_cost - lease.cost
+            self.tokens.adjust(delta)
+            lease.flow.tokens.adjust(delta)
+        self._dispatch()
+
+    def _request_units(self, lease: Lease) -> float:
+        """Pools without a TPM budget (images) are limited per image rather than per call."""
+        return 1 if self.tokens is not None else lease.cost
+
+    def _dispatch(self):
+        now = time.monotonic()
+        retry_in: Optional[float] = None
+        while self.active < self.concurrency:
+            best: Optional[Lease] = None
+            for flow in self.flows.values():
+                while flow.queue and flow.queue[0].future.done():
+                    flow.queue.popleft()  # cancelled or timed out while queued
+                if not flow.queue or flow.active >= self.key_concurrency:
+                    continue
+                head = flow.queue[0]
+                wait = max(flow.requests.wait_time(self._request_units(head), now),
+                           flow.tokens.wait_time(head.cost, now) if flow.tokens else 0.0)
+                if wait > 0:
+                    retry_in = wait if retry_in is None else min(retry_in, wait)
+                    continue
+                if best is None or head.start_tag < best.start_tag:
+                    best = head
+            if best is None:
+                break
+
+            wait = max(self.requests.wait_time(self._request_units(best), now),
+                       self.tokens.wait_time(best.cost, now) if self.tokens else 0.0)
+            if wait > 0:
+                retry_in = wait if retry_in is None else min(retry_in, wait)
+                break
+
+            flow = best.flow
+            flow.queue.popleft()
+            units = self._request_units(best)
+            for bucket, amount in ((self.requests, units), (self.tokens, best.cost), (flow.requests, units), (flow.tokens, best.cost)):
+                if bucket is not None:
+                    bucket.take(amount, now)
+            self.active += 1
+            flow.active += 1
+            self.virtual_time = best.start_tag
+            waited = now - best.enqueued
+            if waited > 1:
+                logger.info(f"⏳ {self.pool} call for {flow.key} admitted after {waited:.1f}s in queue")
+            best.future.set_result(None)
+            retry_in = None
+
+        self._prune(now)
+        if retry_in is not None and self.queued:
+            self._schedule(retry_in)
+
+    def _schedule(self, delay: float):
+        loop = asyncio.get_running_loop()
+        if self._timer is not None and not self._timer.cancelled() and self._timer.when() <= loop.time() + delay:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = loop.call_later(delay, self._dispatch)
+
+    def _prune(self, now: float):
+        """Forget idle flows whose budgets have refilled and that owe no fairness debt."""
+        for key in [key for key, flow in self.flows.items()
+                    if not flow.queue and flow.active == 0 and flow.last_finish <= self.virtual_time
+                    and flow.requests.full(now) and (flow.tokens is None or flow.tokens.full(now))]:
+            del self.flows[key]
+
+
+class UpstreamRateLimiter:
+    """Fair schedulers per upstream pool, configured from OPENAI_RATE_TIER and overrides."""
+
+    def __init__(self):
+        self._schedulers: Dict[str, FairScheduler] = {}
+
+    @contextmanager
+    def client_scope(self, client_address: Optional[str], weight: float = 1.0) -> Iterator[None]:
+        """
+        Identify the caller of the current request (used for calls made with the server key).
+
+        Args:
+            client_address: Client address, or another stable id such as a batch job id
+            weight: Fair-share weight of the calls made in this scope (interactive clients 1.0)
+        """
+        client_id = "ip_" + hashlib.sha256(client_address.encode()).hexdigest()[:12] if client_address else None
+        tokens = _client_id.set(client_id), _flow_weight.set(weight)
+        try:
+            yield
+        finally:
+            _client_id.reset(tokens[0])
+            _flow_weight.reset(tokens[1])
+
+    def flow_key(self, api_key: Optional[str]) -> str:
+        """User keys are their own flow; server-key calls are queued per calling client."""
+        if api_key and api_key.strip() and api_key.strip() != settings.openai_api_key:
+            return hash_api_key(api_key)
+        return _client_id.get() or "background"
+
+    def _scheduler(self, pool: str) -> FairScheduler:
+        scheduler = self._schedulers.get(pool)
+        if scheduler is None:
+            rpm, tpm = TIER_LIMITS.get(settings.openai_rate_tier, TIER_LIMITS[1])[pool]
+            if pool == "chat":
+                rpm = settings.rate_limit_chat_rpm or rpm
+                tpm = settings.rate_limit_chat_tpm or tpm
+            else:
+                rpm = settings.rate_limit_images_per_minute or rpm
+            scheduler = self._schedulers[pool] = FairScheduler(
+                pool, rpm, tpm, settings.upstream_max_concurrency,
+                settings.rate_limit_key_share, settings.key_max_concurrency
+            )
+            logger.info(f"🚦 Rate limiter '{pool}': {rpm}/min, {tpm or '-'} TPM, {settings.upstream_max_concurrency} concurrent "
+                        f"(per client {settings.rate_limit_key_share:.0%}, {settings.key_max_concurrency} concurrent)")
+        return scheduler
+
+    async def acquire(self, upstream: str, api_key: Optional[str], cost: float) -> Optional[Tuple[FairScheduler, Lease]]:
+        """
+        Wait for admission of one upstream call.
+
+        Args:
+            upstream: Upstream name ("chat", "vision", "images.generate", "images.edit")
+            api_key: API key the call will use (only its hash is kept)
+            cost: Estimated tokens for chat calls, images for image calls (weighted by the
+                  current client_scope's weight)
+
+        Returns:
+            Handle for release(), or None when rate limiting is disabled
+
+        Raises:
+            asyncio.TimeoutError: If the call waited longer than RATE_LIMIT_QUEUE_TIMEOUT
+        """
+        if not settings.rate_limit_enabled:
+            return None
+        scheduler = self._scheduler(UPSTREAM_POOLS.get(upstream, upstream))
+        with telemetry.span("ratelimit.wait", pool=scheduler.pool):
+            lease = await scheduler.acquire(self.flow_key(api_key), max(1.0, cost), _flow_weight.get(),
+                                          settings.rate_limit_queue_timeout)
+        return scheduler, lease
+
+    def release(self, handle: Optional[Tuple[FairScheduler, Lease]], actual_cost: Optional[float] = None):
+        if handle is not None:
+            scheduler, lease = handle
+            scheduler.release(lease, actual_cost)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            pool: {"active": scheduler.active, "queued": scheduler.queued, "flows": len(scheduler.flows),
+                   "rejected_total": scheduler.rejected_total, "cancelled_total": scheduler.cancelled_total}
+            for pool, scheduler in sorted(self._schedulers.items())
+        }
+
+    def prometheus_metrics(self) -> List[tuple]:
+        """Limiter gauges/counters for /metrics (see TelemetryService.register_collector)."""
+        metrics = []
+        for field, metric_type, help_text in (
+            ("active", "gauge", "Upstream calls in flight"),
+            ("queued", "gauge", "Upstream calls waiting for admission"),
+            ("rejected_total", "counter", "Upstream calls that timed out waiting for admission"),
+            ("cancelled_total", "counter", "Upstream calls whose caller went away while waiting for admission")
+        ):
+            name = f"photoeai_ratelimit_{field}" if field.endswith("_total") else f"photoeai_ratelimit_{field}_calls"
+            metrics += [(f'{name}{{pool="{pool}"}}', metric_type, help_text, stats[field]) for pool, stats in self.stats().items()]
+        return metrics
+
+
+# Global instance
+rate_limiter = UpstreamRateLimiter()
+telemetry.register_collector(rate_limiter.prometheus_metrics)
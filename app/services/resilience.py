@@ -0,0 +1,310 @@
+"""
+Resilience layer for upstream (OpenAI) calls.
+Classifies failures, retries only transient ones with exponential full-jitter backoff,
+honors Retry-After, and caps retries per upstream with a retry budget so that retries
+never add more than a fixed fraction on top of the base request rate.
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from loguru import logger
+from app.config.settings import settings
+from app.services.circuit_breaker import circuit_breakers, OPEN
+from app.services.rate_limiter import rate_limiter, estimate_cost, actual_cost
+from app.services.telemetry import telemetry
+
+# Error classes
+RATE_LIMITED = "rate_limited"      # 429
+SERVER_ERROR = "server_error"      # 5xx, 408, 409
+TIMEOUT = "timeout"
+CONNECTION = "connection"
+QUOTA_EXHAUSTED = "quota_exhausted"  # 429 insufficient_quota: retrying cannot help
+CLIENT_ERROR = "client_error"      # other 4xx (bad request, auth, not found)
+UNKNOWN = "unknown"
+CIRCUIT_OPEN = "circuit_open"
+QUEUE_TIMEOUT = "queue_timeout"    # waited too long for rate-limiter admission
+
+# Failures that say the upstream itself is unhealthy (these trip circuit breakers)
+INFRASTRUCTURE_FAILURES = {SERVER_ERROR, TIMEOUT, CONNECTION}
+# Failures worth telling the client to retry later (503 rather than 502)
+TRANSIENT_FAILURES = INFRASTRUCTURE_FAILURES | {RATE_LIMITED, CIRCUIT_OPEN, QUEUE_TIMEOUT}
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int
+    base_delay: float
+    max_delay: float
+
+
+# Per-error-class policies; classes not listed here are never retried
+RETRY_POLICIES: Dict[str, RetryPolicy] = {
+    RATE_LIMITED: RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=30.0),
+    SERVER_ERROR: RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=8.0),
+    CONNECTION: RetryPolicy(max_attempts=3, base_delay=0.25, max_delay=4.0),
+    TIMEOUT: RetryPolicy(max_attempts=2, base_delay=0.5, max_delay=4.0),
+}
+
+
+class UpstreamError(Exception):
+    """An upstream call failed permanently or ran out of retries."""
+
+    def __init__(self, upstream: str, error_class: str, cause: BaseException, attempts: int = 1,
+                 status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        status = f" HTTP {status_code}" if status_code else ""
+        super().__init__(f"{upstream} failed ({error_class}{status}) after {attempts} attempt(s): {cause}")
+        self.upstream = upstream
+        self.error_class = error_class
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.attempts = attempts
+
+    @property
+    def transient(self) -> bool:
+        return self.error_class in TRANSIENT_FAILURES
+
+
+class CircuitOpenError(UpstreamError):
+    """The upstream's circuit breaker is open: the call was not attempted."""
+
+    def __init__(self, upstream: str, retry_after: float, attempts: int = 0):
+        Exception.__init__(self, f"{upstream} is temporarily unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.upstream = upstream
+        self.error_class = CIRCUIT_OPEN
+        self.status_code = None
+        self.retry_after = retry_after
+        self.attempts = attempts
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    """HTTP status from openai (APIStatusError.status_code) or requests (HTTPError.response) errors."""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _error_code(exc: BaseException) -> Optional[str]:
+    """OpenAI error code (e.g. insufficient_quota) from the exception or its JSON body."""
+    code = getattr(exc, "code", None)
+    if isinstance(code, str):
+        return code
+    response = getattr(exc, "response", None)
+    try:
+        return (response.json().get("error") or {}).get("code")
+    except Exception:
+        return None
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Server-requested delay from `retry-after-ms` / `retry-after` (seconds or HTTP date)."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        if value.strip().replace(".", "", 1).isdigit():
+            return float(value)
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(exc: BaseException) -> str:
+    """Map an exception from openai/requests/httpx to an error class."""
+    status = _status_code(exc)
+    if status == 429:
+        return QUOTA_EXHAUSTED if _error_code(exc) == "insufficient_quota" else RATE_LIMITED
+    if status is not None:
+        if status >= 500 or status in (408, 409):
+            return SERVER_ERROR
+        if status >= 400:
+            return CLIENT_ERROR
+    names = " ".join(cls.__name__ for cls in type(exc).__mro__)
+    if "Timeout" in names:
+        return TIMEOUT
+    if "Connection" in names or isinstance(exc, ConnectionError):
+        return CONNECTION
+    return UNKNOWN
+
+
+class RetryBudget:
+    """
+    Sliding-window retry budget: retries may not exceed `ratio` × requests in the window,
+    with a small floor so low-traffic nodes can still retry.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, window: float):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = window
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+
+    def _trim(self, now: float):
+        for events in (self._requests, self._retries):
+            while events and events[0] < now - self.window:
+                events.popleft()
+
+    def record_request(self):
+        now = time.monotonic()
+        self._trim(now)
+        self._requests.append(now)
+
+    def try_spend(self) -> bool:
+        now = time.monotonic()
+        self._trim(now)
+        allowed = max(self.min_per_second * self.window, self.ratio * len(self._requests))
+        if len(self._retries) >= allowed:
+            return False
+        self._retries.append(now)
+        return True
+
+
+class ResilienceService:
+    """Runs blocking upstream calls off the event loop with classified, budgeted retries."""
+
+    def __init__(self):
+        self._budgets: Dict[str, RetryBudget] = {}
+        self._retries: Dict[Tuple[str, str], int] = {}
+        self._failures: Dict[Tuple[str, str], int] = {}
+        self._budget_exhausted: Dict[str, int] = {}
+
+    def _budget(self, upstream: str) -> RetryBudget:
+        budget = self._budgets.get(upstream)
+        if budget is None:
+            budget = self._budgets[upstream] = RetryBudget(
+                settings.retry_budget_ratio, settings.retry_budget_min_per_second, settings.retry_budget_window
+            )
+        return budget
+
+    @staticmethod
+    def backoff_delay(policy: RetryPolicy, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff; a server Retry-After is a floor, spread by up to 20%."""
+        if retry_after is not None:
+            return retry_after * random.uniform(1.0, 1.2)
+        return random.uniform(0, min(policy.max_delay, policy.base_delay * 2 ** (attempt - 1)))
+
+    def ensure_available(self, upstream: str):
+        """
+        Fail fast before doing expensive preparatory work for an upstream whose circuit is open.
+
+        Raises:
+            CircuitOpenError: If the upstream's breaker is open
+        """
+        breaker = circuit_breakers.get(upstream)
+        if breaker.state == OPEN:
+            raise CircuitOpenError(upstream, breaker.retry_after())
+
+    async def call(self, upstream: str, func: Callable[..., Any], *args, api_key: Optional[str] = None, **kwargs) -> Any:
+        """
+        Call a blocking upstream function in a worker thread, retrying transient failures.
+        Every attempt is admitted by the rate limiter first (fair-queued per client).
+
+        Args:
+            upstream: Upstream name ("chat", "vision", "images.generate", "images.edit")
+            func: Blocking callable (openai client method, requests.post wrapper, ...)
+            api_key: API key the call uses; selects the client's rate-limit flow
+
+        Returns:
+            The callable's result
+
+        Raises:
+            CircuitOpenError: If the upstream's circuit breaker is open (fails fast, nothing is sent)
+            UpstreamError: On a permanent failure, when retries/budget are exhausted, or when
+                the call waited longer than RATE_LIMIT_QUEUE_TIMEOUT for admission
+        """
+        breaker = circuit_breakers.get(upstream)
+        budget = self._budget(upstream)
+        budget.record_request()
+        cost = estimate_cost(upstream, kwargs)
+        attempt = 0
+        while True:
+            attempt += 1
+            if breaker.state == OPEN:
+                raise CircuitOpenError(upstream, breaker.retry_after(), attempt - 1)
+            try:
+                admission = await rate_limiter.acquire(upstream, api_key, cost)
+            except asyncio.TimeoutError as exc:
+                logger.warning(f"🚦 {upstream} call not admitted within {settings.rate_limit_queue_timeout:.0f}s")
+                raise UpstreamError(upstream, QUEUE_TIMEOUT, exc, attempt - 1) from exc
+            if not breaker.allow():
+                rate_limiter.release(admission, 0)  # nothing was sent
+                raise CircuitOpenError(upstream, breaker.retry_after(), attempt - 1)
+            try:
+                with telemetry.span(f"upstream.{upstream}", attempt=attempt):
+                    result = await asyncio.to_thread(func, *args, **kwargs)
+            except asyncio.CancelledError:
+                rate_limiter.release(admission)
+                breaker.release_probe()
+                raise
+            except Exception as exc:
+                rate_limiter.release(admission)  # before any backoff sleep, so the slot is not held
+                error_class = classify_error(exc)
+                status = _status_code(exc)
+                retry_after = retry_after_seconds(exc)
+                if error_class in INFRASTRUCTURE_FAILURES:
+                    breaker.record_failure(f"{error_class}{f' HTTP {status}' if status else ''}")
+                else:
+                    breaker.record_success()  # the upstream answered; the request itself was the problem
+                policy = RETRY_POLICIES.get(error_class)
+
+                give_up_reason = None
+                if policy is None:
+                    give_up_reason = "not retryable"
+                elif attempt >= policy.max_attempts:
+                    give_up_reason = "attempts exhausted"
+                elif retry_after is not None and retry_after > settings.retry_max_delay:
+                    give_up_reason = f"Retry-After {retry_after:.0f}s exceeds {settings.retry_max_delay:.0f}s"
+                elif not budget.try_spend():
+                    give_up_reason = "retry budget exhausted"
+                    self._budget_exhausted[upstream] = self._budget_exhausted.get(upstream, 0) + 1
+
+                if give_up_reason:
+                    key = (upstream, error_class)
+                    self._failures[key] = self._failures.get(key, 0) + 1
+                    logger.error(f"💥 {upstream} call failed: {error_class} ({give_up_reason}) after {attempt} attempt(s): {exc}")
+                    raise UpstreamError(upstream, error_class, exc, attempt, status, retry_after) from exc
+
+                delay = self.backoff_delay(policy, attempt, retry_after)
+                key = (upstream, error_class)
+                self._retries[key] = self._retries.get(key, 0) + 1
+                logger.warning(f"🔁 {upstream} {error_class}{f' HTTP {status}' if status else ''}: retry {attempt}/{policy.max_attempts - 1} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+            else:
+                rate_limiter.release(admission, actual_cost(upstream, result))
+                breaker.record_success()
+                return result
+
+    def prometheus_metrics(self) -> List[tuple]:
+        """Retry counters for /metrics (see TelemetryService.register_collector)."""
+        metrics = [
+            (f'photoeai_upstream_retries_total{{upstream="{upstream}",error_class="{error_class}"}}', "counter",
+             "Upstream calls retried", count)
+            for (upstream, error_class), count in sorted(self._retries.items())
+        ]
+        metrics += [
+            (f'photoeai_upstream_failures_total{{upstream="{upstream}",error_class="{error_class}"}}', "counter",
+             "Upstream calls that failed after retries", count)
+            for (upstream, error_class), count in sorted(self._failures.items())
+        ]
+        metrics += [
+            (f'photoeai_upstream_retry_budget_exhausted_total{{upstream="{upstream}"}}', "counter",
+             "Retries skipped because the retry budget was spent", count)
+            for upstream, count in sorted(self._budget_exhausted.items())
+        ]
+        return metrics
+
+
+# Global instance
+resilience = ResilienceService()
+telemetry.register_collector(resilience.prometheus_metrics)
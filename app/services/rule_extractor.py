@@ -0,0 +1,291 @@
+"""
+Rule Extractor - deterministic, local fast path for wizard field extraction.
+Fills wizard fields from what a request states outright: fields sent by the client,
+"label: value" segments (wizard summaries, batch catalog rows), exact camera specifications
+(85mm, f/2.8, ISO 100, 1/125, 5600K) and the phrase vocabulary indexed from the
+"extraction_vocabulary" section of defaults.json (golden hour, flat lay, marble, ...).
+Every value carries a confidence: the orchestrator skips the extraction LLM call when the
+required fields are confidently known, and otherwise asks the LLM only for the fields the
+rules left missing, ambiguous or uncertain.
+"""
+
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+from app.config.settings import settings
+from app.schemas.models import WizardInput
+from app.services.ai_client import EXTRACTION_FIELDS, REQUIRED_EXTRACTION_FIELDS
+from app.services.telemetry import telemetry
+
+# Confidence of a value by how it was found
+EXPLICIT_CONFIDENCE = 1.0    # client-sent field, labeled segment or exact specification
+VOCABULARY_CONFIDENCE = 0.9  # exactly one vocabulary phrase for the field
+HEURISTIC_CONFIDENCE = 0.6   # product name taken from the opening words of free text
+
+# Values below this are re-asked from the LLM and only kept as a fallback
+FIELD_CONFIDENCE_FLOOR = 0.75
+
+# The request score is the mean confidence over the fields the LLM must never leave empty
+CORE_FIELDS = tuple(REQUIRED_EXTRACTION_FIELDS)
+
+# Wizard fields the rules may fill (the request text and API key are not extracted)
+WIZARD_FIELDS = [name for name in WizardInput.model_fields if name not in ("user_api_key", "user_request")]
+NUMERIC_FIELDS = {"aperture_value": float, "shutter_speed_value": int, "iso_value": int}
+
+# Exact specifications: field -> (pattern, value formatter); several distinct values make the field ambiguous
+SPEC_PATTERNS = {
+    # "85mm f/1.4" names a lens (its maximum aperture), not the aperture to shoot at
+    "lens_type": (re.compile(r"\b(\d{2,3}\s?mm(?:\s+f\s?/\s?\d{1,2}(?:\.\d)?)?)", re.IGNORECASE), lambda lens: f"{lens} lens"),
+    "aperture_value": (re.compile(r"(?<!mm )(?<!mm)\bf\s?/\s?(\d{1,2}(?:\.\d)?)\b", re.IGNORECASE), float),
+    "iso_value": (re.compile(r"\biso\s?:?\s?(\d{2,5})\b", re.IGNORECASE), int),
+    "shutter_speed_value": (re.compile(r"(?<![\d.])1/(\d{1,5})\s?(?:s|sec)?\b", re.IGNORECASE), int),
+    "light_temperature": (re.compile(r"\b([2-9]\d{3})\s?k\b", re.IGNORECASE), lambda n: f"{n}K"),
+}
+CAMERA_PATTERN = re.compile(
+    r"\b(?:canon|nikon|sony|fujifilm|fuji|hasselblad|leica|phase one|panasonic|lumix|olympus|pentax)"
+    r"(?:\s+(?:eos|alpha|gfx|[a-z]{0,3}\d[\w-]*|mark|ii|iii|iv|r|z))*\b",
+    re.IGNORECASE,
+)
+
+# "label: value" segments (one per line or ';'); labels map to fields via the vocabulary or field names
+SEGMENT_SPLIT = re.compile(r"[\n;]")
+LABELED_SEGMENT = re.compile(r"^\s*(?:[-*•]\s*)?([A-Za-z][A-Za-z _/-]{0,30}?)\s*[:=]\s*(\S.*?)\s*$")
+NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+# Product name from free text: drop the request preamble, cut at the first preposition or clause break
+PRODUCT_PREAMBLE = re.compile(
+    r"^(?:(?:please|create|generate|make|shoot|take|need|want|i|we|me|us|give)\s+)*"
+    r"(?:(?:a|an|the)\s+)?"
+    r"(?:(?:professional|high[- ]end|premium|commercial|studio|clean|beautiful|stunning|simple|nice|e-?commerce)\s+)*"
+    r"(?:(?:product\s+)?(?:photo(?:graph|graphy)?|shot|image|picture|foto|photoshoot)s?\s+(?:of\s+|for\s+)?)?"
+    r"(?:(?:a|an|the|my|our)\s+)?",
+    re.IGNORECASE,
+)
+PRODUCT_END = re.compile(
+    r"\s+(?:on|in|with|against|for|at|under|beside|near|over|placed|sitting|standing|shot|photographed|dengan|untuk|di)\s+"
+    r"|[,.;:!?()\n]|\s+-\s+",
+    re.IGNORECASE,
+)
+PRODUCT_MAX_WORDS = 6
+
+# Compiled vocabulary keyed by the content fingerprint of defaults.json (hot reload swaps the key)
+_vocabulary_cache: Dict[str, "Vocabulary"] = {}
+
+
+def _tokens(text: str) -> List[str]:
+    """Lowercased word tokens; hyphens and punctuation separate words ("close-up" -> close, up)."""
+    return re.findall(r"[a-z0-9]+(?:'[a-z]+)?", text.lower().replace("’", "'"))
+
+
+@dataclass
+class Vocabulary:
+    """Label aliases and an n-gram index of phrase -> [(field, canonical value)]."""
+    labels: Dict[str, str]
+    index: Dict[Tuple[str, ...], List[Tuple[str, str]]]
+    longest: int
+
+    @classmethod
+    def compile(cls, section: Dict[str, Any]) -> "Vocabulary":
+        labels = {" ".join(_tokens(name)): name for name in WIZARD_FIELDS}
+        for label, target in (section.get("labels") or {}).items():
+            if target in WIZARD_FIELDS:
+                labels[" ".join(_tokens(label))] = target
+        index: Dict[Tuple[str, ...], List[Tuple[str, str]]] = {}
+        for target, values in (section.get("terms") or {}).items():
+            if target not in WIZARD_FIELDS:
+                continue
+            for canonical, phrases in values.items():
+                for phrase in [canonical, *phrases]:
+                    key = tuple(_tokens(phrase))
+                    if key and (target, canonical) not in index.setdefault(key, []):
+                        index[key].append((target, canonical))
+        return cls(labels=labels, index=index, longest=max((len(key) for key in index), default=0))
+
+    def scan(self, text: str) -> Dict[str, Set[str]]:
+        """Canonical values per field for every phrase in the text (longest match wins at each position)."""
+        found: Dict[str, Set[str]] = {}
+        words = _tokens(text)
+        position = 0
+        while position < len(words):
+            for size in range(min(self.longest, len(words) - position), 0, -1):
+                matches = self.index.get(tuple(words[position:position + size]))
+                if matches:
+                    for target, canonical in matches:
+                        found.setdefault(target, set()).add(canonical)
+                    position += size
+                    break
+            else:
+                position += 1
+        return found
+
+
+@dataclass
+class RuleExtraction:
+    """Fields found by the rules, their confidence, and the candidates of ambiguous fields."""
+    values: Dict[str, Any] = field(default_factory=dict)
+    confidence: Dict[str, float] = field(default_factory=dict)
+    ambiguous: Dict[str, List[str]] = field(default_factory=dict)
+
+    def set(self, name: str, value: Any, confidence: float):
+        """Keep the value unless the field already holds one at least as confident."""
+        if confidence > self.confidence.get(name, 0.0):
+            self.values[name] = value
+            self.confidence[name] = confidence
+            self.ambiguous.pop(name, None)
+
+    @property
+    def score(self) -> float:
+        """Mean confidence over the core fields (missing and ambiguous fields count as 0)."""
+        return sum(self.confidence.get(name, 0.0) for name in CORE_FIELDS) / len(CORE_FIELDS)
+
+    def confident(self) -> Dict[str, Any]:
+        """Values trusted as final: the LLM is not asked for them and cannot override them."""
+        return {name: value for name, value in self.values.items() if self.confidence[name] >= FIELD_CONFIDENCE_FLOOR}
+
+    def missing(self) -> List[str]:
+        """Extraction schema fields still to ask the LLM for (absent, ambiguous or below the floor)."""
+        confident = self.confident()
+        return [name for name in EXTRACTION_FIELDS if name not in confident]
+
+    def merge(self, llm_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Combine an LLM answer with the rules: confident values win, uncertain ones fill gaps the LLM left."""
+        confident = self.confident()
+        merged = {name: value for name, value in self.values.items() if name not in confident}
+        merged.update({name: value for name, value in llm_data.items() if value is not None and value != ""})
+        merged.update(confident)
+        return merged
+
+
+class RuleExtractor:
+    """
+    Deterministic extraction of wizard fields from request text and client-sent fields.
+    Stateless apart from the vocabulary cache and outcome counters, safe to share.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.outcomes: Dict[str, int] = {"rules": 0, "partial": 0, "full": 0}
+        self.fields_from_rules = 0
+        self.fields_from_llm = 0
+
+    def vocabulary(self) -> Vocabulary:
+        """Vocabulary compiled from defaults.json, rebuilt when the file's content changes."""
+        fingerprint = settings.config_file_fingerprint("defaults")
+        compiled = _vocabulary_cache.get(fingerprint)
+        if compiled is None:
+            compiled = Vocabulary.compile(settings.defaults.get("extraction_vocabulary", {}))
+            _vocabulary_cache.clear()
+            _vocabulary_cache[fingerprint] = compiled
+        return compiled
+
+    def extract(self, text: str, explicit: Optional[Dict[str, Any]] = None, scan_text: bool = True) -> RuleExtraction:
+        """
+        Extract what the request states outright.
+
+        Args:
+            text: Raw user request text
+            explicit: Fields the client already knows (taken as given)
+            scan_text: Apply the text rules; False keeps only the explicit fields
+
+        Returns:
+            RuleExtraction with per-field values and confidence
+        """
+        result = RuleExtraction()
+        for name, value in (explicit or {}).items():
+            value = self._coerce(name, value)
+            if value is not None:
+                result.set(name, value, EXPLICIT_CONFIDENCE)
+        if not scan_text or not text:
+            return result
+
+        vocabulary = self.vocabulary()
+        free_text = []
+        for segment in SEGMENT_SPLIT.split(text):
+            match = LABELED_SEGMENT.match(segment)
+            target = vocabulary.labels.get(" ".join(_tokens(match.group(1)))) if match else None
+            value = self._labeled_value(vocabulary, target, match.group(2)) if target else None
+            if value is None:
+                free_text.append(segment)
+            else:
+                result.set(target, value, EXPLICIT_CONFIDENCE)
+
+        for name, (pattern, convert) in SPEC_PATTERNS.items():
+            self._set_unique(result, name, {convert(found) for found in pattern.findall(text)}, EXPLICIT_CONFIDENCE)
+        self._set_unique(result, "camera_type", {found.strip() for found in CAMERA_PATTERN.findall(text)}, EXPLICIT_CONFIDENCE)
+        for name, candidates in vocabulary.scan(text).items():
+            self._set_unique(result, name, candidates, VOCABULARY_CONFIDENCE)
+
+        product_name = self._product_name(" ".join(segment.strip() for segment in free_text))
+        if product_name:
+            result.set("product_name", product_name, HEURISTIC_CONFIDENCE)
+        return result
+
+    def record(self, outcome: str, rule_fields: int, llm_fields: int):
+        """Count one extraction by how the LLM was used: rules (skipped), partial or full schema."""
+        with self._lock:
+            self.outcomes[outcome] += 1
+            self.fields_from_rules += rule_fields
+            self.fields_from_llm += llm_fields
+
+    @staticmethod
+    def _set_unique(result: RuleExtraction, name: str, candidates: Set[Any], confidence: float):
+        if len(candidates) == 1:
+            result.set(name, next(iter(candidates)), confidence)
+        elif len(candidates) > 1 and result.confidence.get(name, 0.0) < confidence:
+            result.ambiguous[name] = sorted(str(candidate) for candidate in candidates)
+
+    @staticmethod
+    def _coerce(name: str, value: Any) -> Any:
+        """Explicit values as the wizard expects them; unusable values are dropped (None)."""
+        if name not in WIZARD_FIELDS or value is None:
+            return None
+        if name in NUMERIC_FIELDS:
+            number = NUMBER.findall(str(value).replace("1/", "", 1) if name == "shutter_speed_value" else str(value))
+            return NUMERIC_FIELDS[name](float(number[0])) if number else None
+        value = ", ".join(str(item) for item in value) if isinstance(value, list) else str(value).strip()
+        return value or None
+
+    def _labeled_value(self, vocabulary: Vocabulary, name: str, raw: str) -> Any:
+        """A labeled value, mapped onto the field's canonical vocabulary value when it names exactly one."""
+        value = self._coerce(name, raw.strip().strip("'\""))
+        if isinstance(value, str):
+            canonical = vocabulary.scan(value).get(name, set())
+            if len(canonical) == 1:
+                return next(iter(canonical))
+        return value
+
+    @staticmethod
+    def _product_name(text: str) -> Optional[str]:
+        text = PRODUCT_PREAMBLE.sub("", text.strip(), count=1)
+        name = " ".join(PRODUCT_END.split(text, maxsplit=1)[0].split()[:PRODUCT_MAX_WORDS])
+        return name if re.search(r"[^\W\d_]", name) else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "extractions": sum(self.outcomes.values()),
+                "llm_skipped": self.outcomes["rules"],
+                "partial_llm": self.outcomes["partial"],
+                "full_llm": self.outcomes["full"],
+                "fields_from_rules": self.fields_from_rules,
+                "fields_from_llm": self.fields_from_llm,
+            }
+
+    def prometheus_metrics(self) -> List[tuple]:
+        """Extractions by LLM usage and fields by source for /metrics."""
+        with self._lock:
+            outcomes = dict(self.outcomes)
+            fields = {"rules": self.fields_from_rules, "llm": self.fields_from_llm}
+        metrics = [(f'photoeai_rule_extractions_total{{path="{outcome}"}}', "counter",
+                    "Wizard extractions by path (rules = LLM skipped, partial/full = LLM schema size)", count)
+                   for outcome, count in outcomes.items()]
+        metrics += [(f'photoeai_extracted_fields_total{{source="{source}"}}', "counter",
+                     "Wizard fields filled by the rules or requested from the LLM", count)
+                    for source, count in fields.items()]
+        return metrics
+
+
+# Global instance
+rule_extractor = RuleExtractor()
+telemetry.register_collector(rule_extractor.prometheus_metrics)
@@ -0,0 +1,268 @@
+"""
+Telemetry Service - span-based latency instrumentation for the generation pipelines.
+Each pipeline stage runs inside a span; finished spans feed per-stage latency windows
+(p50/p95/p99 at /metrics) and a ring buffer exportable as OpenTelemetry OTLP/JSON.
+"""
+
+import asyncio
+import functools
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from loguru import logger
+from app.config.settings import settings
+
+SERVICE_NAME = "photoeai-backend"
+QUANTILES = (0.5, 0.95, 0.99)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("photoeai_current_span", default=None)
+
+
+class Span:
+    """One timed pipeline stage. Use via telemetry.span(); works in sync and async code."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "start_ns", "end_ns", "error", "_token")
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        parent = _current_span.get()
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error: Optional[str] = None
+        self._token = None
+
+    @property
+    def duration_seconds(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if exc is not None and not isinstance(exc, (asyncio.CancelledError, GeneratorExit)):
+            self.error = f"{type(exc).__name__}: {exc}"
+        telemetry.record(self)
+        return False
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP/JSON span representation."""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _quantile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank quantile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class TelemetryService:
+    """
+    Collects finished spans, keeps a sliding latency window per span name and renders
+    Prometheus text / OTLP JSON. Other services can contribute metrics via register_collector().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._windows: Dict[str, Deque[float]] = {}
+        self._totals: Dict[str, List[float]] = {}  # name -> [count, sum_seconds, errors]
+        self._finished: Deque[Span] = deque(maxlen=settings.telemetry_span_buffer)
+        self._export_queue: Deque[Span] = deque(maxlen=settings.telemetry_span_buffer)
+        self._collectors: List[Callable[[], List[Tuple[str, str, str, float]]]] = []
+        self._export_task: Optional[asyncio.Task] = None
+
+    def span(self, name: str, **attributes) -> Span:
+        """
+        Start a span for a pipeline stage.
+
+        Usage:
+            with telemetry.span("brief.compose", product=name) as span:
+                ...
+        """
+        return Span(name, attributes)
+
+    def traced(self, name: str) -> Callable:
+        """Decorator running a sync or async function inside a span."""
+        def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(name):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, span: Span):
+        """Aggregate a finished span (called by Span.__exit__)."""
+        with self._lock:
+            window = self._windows.get(span.name)
+            if window is None:
+                window = self._windows[span.name] = deque(maxlen=settings.telemetry_window_size)
+                self._totals[span.name] = [0, 0.0, 0]
+            window.append(span.duration_seconds)
+            totals = self._totals[span.name]
+            totals[0] += 1
+            totals[1] += span.duration_seconds
+            totals[2] += 1 if span.error else 0
+            self._finished.append(span)
+            if settings.otel_exporter_otlp_endpoint:
+                self._export_queue.append(span)
+
+    def register_collector(self, collector: Callable[[], List[Tuple[str, str, str, float]]]):
+        """
+        Add extra metrics to /metrics.
+
+        Args:
+            collector: Callable returning (name, type, help, value) tuples, type being 'counter' or 'gauge'
+        """
+        self._collectors.append(collector)
+
+    def stage_summary(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage count, error count and p50/p95/p99 latency (seconds) over the sliding window."""
+        with self._lock:
+            snapshot = {name: (sorted(window), list(self._totals[name])) for name, window in self._windows.items()}
+        summary = {}
+        for name, (values, (count, total, errors)) in sorted(snapshot.items()):
+            summary[name] = {
+                "count": count,
+                "errors": errors,
+                "sum_seconds": round(total, 6),
+                **{f"p{int(q * 100)}": round(_quantile(values, q), 6) for q in QUANTILES}
+            }
+        return summary
+
+    def prometheus_text(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP photoeai_stage_duration_seconds Pipeline stage latency (sliding window quantiles)",
+            "# TYPE photoeai_stage_duration_seconds summary"
+        ]
+        error_lines = [
+            "# HELP photoeai_stage_errors_total Pipeline stage spans that ended with an exception",
+            "# TYPE photoeai_stage_errors_total counter"
+        ]
+        for name, stats in self.stage_summary().items():
+            for q in QUANTILES:
+                lines.append(f'photoeai_stage_duration_seconds{{stage="{name}",quantile="{q}"}} {stats[f"p{int(q * 100)}"]}')
+            lines.append(f'photoeai_stage_duration_seconds_sum{{stage="{name}"}} {stats["sum_seconds"]}')
+            lines.append(f'photoeai_stage_duration_seconds_count{{stage="{name}"}} {stats["count"]}')
+            error_lines.append(f'photoeai_stage_errors_total{{stage="{name}"}} {stats["errors"]}')
+        lines.extend(error_lines)
+
+        for collector in self._collectors:
+            try:
+                for metric_name, metric_type, help_text, value in collector():
+                    base_name = metric_name.split("{", 1)[0]
+                    header = f"# TYPE {base_name} {metric_type}"
+                    if header not in lines:
+                        lines.append(f"# HELP {base_name} {help_text}")
+                        lines.append(header)
+                    lines.append(f"{metric_name} {value}")
+            except Exception as e:
+                logger.warning(f"⚠️ Metrics collector failed: {e}")
+        return "\n".join(lines) + "\n"
+
+    def otlp_payload(self, spans: Optional[List[Span]] = None, limit: int = 200) -> Dict[str, Any]:
+        """
+        Finished spans as an OTLP/JSON ExportTraceServiceRequest.
+
+        Args:
+            spans: Spans to export (defaults to the most recent finished spans)
+            limit: Maximum number of recent spans when spans is not given
+        """
+        if spans is None:
+            with self._lock:
+                spans = list(self._finished)[-limit:]
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": "app.services.telemetry"},
+                    "spans": [span.to_otlp() for span in spans]
+                }]
+            }]
+        }
+
+    async def _export_loop(self, endpoint: str, interval: float):
+        """Push queued spans to an OTLP/HTTP collector (JSON encoding) until cancelled."""
+        import httpx  # Imported on first use to keep app startup fast
+
+        url = endpoint.rstrip("/") + "/v1/traces"
+        async with httpx.AsyncClient(timeout=10) as client:
+            while True:
+                await asyncio.sleep(interval)
+                with self._lock:
+                    batch = list(self._export_queue)
+                    self._export_queue.clear()
+                if not batch:
+                    continue
+                try:
+                    response = await client.post(url, json=self.otlp_payload(batch))
+                    response.raise_for_status()
+                except Exception as e:
+                    logger.warning(f"⚠️ OTLP export of {len(batch)} spans failed: {e}")
+
+    def start_exporter(self):
+        """Start pushing spans when OTEL_EXPORTER_OTLP_ENDPOINT is configured."""
+        endpoint = settings.otel_exporter_otlp_endpoint
+        if not endpoint or (self._export_task and not self._export_task.done()):
+            return
+        logger.info(f"📡 Exporting spans to {endpoint} (OTLP/JSON)")
+        self._export_task = asyncio.create_task(self._export_loop(endpoint, settings.telemetry_export_interval))
+
+    async def stop_exporter(self):
+        if self._export_task:
+            self._export_task.cancel()
+            try:
+                await self._export_task
+            except asyncio.CancelledError:
+                pass
+            self._export_task = None
+
+
+# Global instance
+telemetry = TelemetryService()
@@ -0,0 +1,210 @@
+"""
+Token Budget - tokenizer-backed sizing for prompts and completions.
+Counts tokens with the configured model's tokenizer (tiktoken, imported on first use; a
+4-characters-per-token estimate when it is unavailable), caches counts per text so a
+brief is never tokenized twice, plans max_tokens so prompt plus completion fit the
+model's context window, and decides when a brief is too long for the image API.
+"""
+
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+from app.config.settings import settings
+from app.services.telemetry import telemetry
+
+# (model prefix, context window, max completion tokens); the longest matching prefix wins
+MODEL_LIMITS: Tuple[Tuple[str, int, int], ...] = (
+    ("gpt-4o-mini", 128000, 16384),
+    ("gpt-4o", 128000, 16384),
+    ("gpt-4.1", 1047576, 32768),
+    ("gpt-4-turbo", 128000, 4096),
+    ("gpt-4", 8192, 8192),
+    ("gpt-3.5-turbo", 16385, 4096),
+    ("o1", 200000, 100000),
+    ("o3", 200000, 100000),
+    ("o4-mini", 200000, 100000),
+)
+DEFAULT_LIMITS = (128000, 4096)
+
+# Chat formatting overhead per message and for the reply primer (OpenAI's counting recipe)
+TOKENS_PER_MESSAGE = 3
+REPLY_PRIMER_TOKENS = 3
+# Prompt-token cost of one image in a vision request (high detail, 512px tiles)
+VISION_IMAGE_TOKENS = 765
+# Headroom left in the context window for tokenizer drift between model versions
+CONTEXT_MARGIN_TOKENS = 256
+# Clamping never goes below this (a completion that short would be useless)
+MIN_COMPLETION_TOKENS = 256
+
+# Image prompt limits are characters, not tokens (gpt-image-1 accepts 32000 characters)
+IMAGE_PROMPT_MAX_CHARS = {"gpt-image-1": 32000, "dall-e-3": 4000, "dall-e-2": 1000}
+
+# Prompts longer than this many tokens are treated as comprehensive briefs, not short requests
+COMPREHENSIVE_PROMPT_TOKENS = 75
+
+COUNT_CACHE_SIZE = 4096
+CHARS_PER_TOKEN = 4
+
+
+class TokenBudget:
+    """Token counting (cached per text) and prompt/completion planning per model."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._encodings: Dict[str, Any] = {}
+        self._tokenizer_missing = False
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.completions_clamped = 0
+
+    def limits(self, model: Optional[str] = None) -> Tuple[int, int]:
+        """(context window, max completion tokens) for `model` (defaults to OPENAI_MODEL)."""
+        model = (model or settings.openai_model).lower()
+        matches = [entry for entry in MODEL_LIMITS if model.startswith(entry[0])]
+        if not matches:
+            return DEFAULT_LIMITS
+        _, window, max_output = max(matches, key=lambda entry: len(entry[0]))
+        return window, max_output
+
+    def _encoding(self, model: str) -> Optional[Any]:
+        """tiktoken encoding for `model`, or None when tiktoken (or its vocabulary) is unavailable."""
+        if model in self._encodings:
+            return self._encodings[model]
+        encoding = None
+        if not self._tokenizer_missing:
+            try:
+                import tiktoken
+
+                try:
+                    encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    encoding = tiktoken.get_encoding("o200k_base" if model.startswith(("gpt-4o", "gpt-4.1", "o")) else "cl100k_base")
+            except Exception as e:  # not installed, or the vocabulary cannot be downloaded
+                self._tokenizer_missing = True
+                logger.warning(f"⚠️ Tokenizer unavailable ({e}); estimating {CHARS_PER_TOKEN} characters per token")
+        self._encodings[model] = encoding
+        return encoding
+
+    @property
+    def tokenizer(self) -> str:
+        return "estimate" if self._tokenizer_missing else "tiktoken"
+
+    def count(self, text: str, model: Optional[str] = None) -> int:
+        """
+        Tokens in `text` for `model`, computed once per distinct text.
+
+        Args:
+            text: Text to count
+            model: Model whose tokenizer to use (defaults to OPENAI_MODEL)
+
+        Returns:
+            Token count
+        """
+        if not text:
+            return 0
+        model = model or settings.openai_model
+        key = (hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest(), model)
+        with self._lock:
+            cached = self._counts.get(key)
+            if cached is not None:
+                self._counts.move_to_end(key)
+                self.cache_hits += 1
+                return cached
+
+        encoding = self._encoding(model)
+        tokens = len(encoding.encode(text, disallowed_special=())) if encoding else math.ceil(len(text) / CHARS_PER_TOKEN)
+
+        with self._lock:
+            self.cache_misses += 1
+            self._counts[key] = tokens
+            if len(self._counts) > COUNT_CACHE_SIZE:
+                self._counts.popitem(last=False)
+        return tokens
+
+    def count_messages(self, messages: List[Dict[str, Any]], model: Optional[str] = None) -> int:
+        """Prompt tokens of a chat request, including per-message overhead and image parts."""
+        tokens = REPLY_PRIMER_TOKENS
+        for message in messages:
+            tokens += TOKENS_PER_MESSAGE
+            content = message.get("content") or ""
+            parts = content if isinstance(content, list) else [{"type": "text", "text": content}]
+            for part in parts:
+                if part.get("type") == "image_url":
+                    tokens += VISION_IMAGE_TOKENS
+                else:
+                    tokens += self.count(str(part.get("text", "")), model)
+        return tokens
+
+    def plan_completion(self, model: str, messages: List[Dict[str, Any]], desired: Optional[int]) -> Optional[int]:
+        """
+        max_tokens for a chat call so that prompt plus completion fit the context window.
+
+        Args:
+            model: Model the call goes to
+            messages: Chat messages of the call
+            desired: max_tokens the caller asked for (None leaves the API default)
+
+        Returns:
+            `desired`, lowered to the model's completion limit and the room left in its
+            context window (but not below MIN_COMPLETION_TOKENS; the API rejects a prompt
+            that leaves no room)
+        """
+        if desired is None:
+            return None
+        window, max_output = self.limits(model)
+        available = window - self.count_messages(messages, model) - CONTEXT_MARGIN_TOKENS
+        planned = min(desired, max(MIN_COMPLETION_TOKENS, min(max_output, available)))
+        if planned < desired:
+            with self._lock:
+                self.completions_clamped += 1
+            logger.info(f"📐 max_tokens {desired} → {planned} to fit {model} ({window} context, {max_output} max output)")
+        return planned
+
+    def image_prompt_budget(self, image_model: str = "gpt-image-1") -> int:
+        """Characters of brief the image stage can send for `image_model` (the limit less what that stage adds)."""
+        # Measured from the preservation text the generator actually adds (imported here: it depends on this module)
+        from app.services.multi_provider_image_generator import IMAGE_PROMPT_OVERHEAD_CHARS
+        return IMAGE_PROMPT_MAX_CHARS.get(image_model, IMAGE_PROMPT_MAX_CHARS["gpt-image-1"]) - IMAGE_PROMPT_OVERHEAD_CHARS
+
+    def needs_compression(self, brief: str, image_model: str = "gpt-image-1") -> bool:
+        """Whether `brief` exceeds what the image API accepts (compression is skipped otherwise)."""
+        return len(brief) > self.image_prompt_budget(image_model)
+
+    def completion_tokens_for(self, text: str, target_chars: int, model: Optional[str] = None) -> int:
+        """Completion tokens needed to write `target_chars` characters of text like `text`."""
+        if not text:
+            return math.ceil(target_chars / CHARS_PER_TOKEN)
+        return math.ceil(self.count(text, model) * target_chars / len(text))
+
+    def is_comprehensive(self, prompt: str) -> bool:
+        """Whether a prompt is a comprehensive brief rather than a short request."""
+        return self.count(prompt) > COMPREHENSIVE_PROMPT_TOKENS
+
+    def stats(self) -> Dict[str, Any]:
+        """Tokenizer, cache and planning counters (for /api/v1/health)."""
+        with self._lock:
+            return {
+                "tokenizer": self.tokenizer,
+                "cached_counts": len(self._counts),
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "completions_clamped": self.completions_clamped,
+            }
+
+    def prometheus_metrics(self) -> List[tuple]:
+        """Token-count cache and planning counters for /metrics."""
+        stats = self.stats()
+        return [
+            ('photoeai_token_count_cache_total{result="hit"}', "counter", "Token counts served from the per-text cache", stats["cache_hits"]),
+            ('photoeai_token_count_cache_total{result="miss"}', "counter", "Token counts served from the per-text cache", stats["cache_misses"]),
+            ("photoeai_completions_clamped_total", "counter", "Chat calls whose max_tokens was lowered to fit the context window", stats["completions_clamped"]),
+        ]
+
+
+# Global instance
+token_budget = TokenBudget()
+telemetry.register_collector(token_budget.prometheus_metrics)
@@ -0,0 +1,290 @@
+"""
+Usage Ledger - token, image-call and estimated-cost accounting.
+Every OpenAI call records its usage against the current API request; totals are kept
+per endpoint (route template), per hashed API key and per model and are queryable via the
+admin API. /metrics exports them per endpoint and model only, so client keys never become
+Prometheus labels.
+"""
+
+import hashlib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from loguru import logger
+from app.config.settings import settings
+from app.services.correlation import current_request_id
+from app.services.telemetry import telemetry
+
+# USD per 1M tokens: (input, output)
+TOKEN_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-image-1": (5.00, 40.00),  # text input / image output tokens
+}
+# gpt-image-1 image *input* tokens (edits) are billed separately
+IMAGE_INPUT_TOKEN_PRICE = 10.00
+
+# USD per image when the API reports no token usage: model -> quality -> size -> price
+IMAGE_PRICES = {
+    "gpt-image-1": {
+        "low": {"1024x1024": 0.011, "1024x1536": 0.016, "1536x1024": 0.016},
+        "medium": {"1024x1024": 0.042, "1024x1536": 0.063, "1536x1024": 0.063},
+        "high": {"1024x1024": 0.167, "1024x1536": 0.25, "1536x1024": 0.25},
+    },
+    "dall-e-3": {
+        "standard": {"1024x1024": 0.040, "1024x1792": 0.080, "1792x1024": 0.080},
+        "hd": {"1024x1024": 0.080, "1024x1792": 0.120, "1792x1024": 0.120},
+    },
+}
+
+GROUPS = ("endpoint", "key", "model")
+
+_current_request: ContextVar[Optional["RequestUsage"]] = ContextVar("photoeai_request_usage", default=None)
+
+
+def hash_api_key(api_key: Optional[str]) -> str:
+    """Stable, non-reversible label for an API key (the key itself is never stored)."""
+    if not api_key or not api_key.strip():
+        return "anonymous"
+    return "key_" + hashlib.sha256(api_key.strip().encode()).hexdigest()[:12]
+
+
+def _model_prices(model: str) -> Optional[Tuple[float, float]]:
+    """Token prices for a model, matching dated snapshots (gpt-4o-2024-08-06) to their base name."""
+    for name in sorted(TOKEN_PRICES, key=len, reverse=True):
+        if model == name or model.startswith(f"{name}-"):
+            return TOKEN_PRICES[name]
+    return None
+
+
+def estimate_chat_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prices = _model_prices(model)
+    if prices is None:
+        return 0.0
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+
+def estimate_image_cost(model: str, size: str, quality: str, n: int, usage: Optional[Dict[str, Any]] = None) -> float:
+    """Image cost from reported token usage when present, else from the per-image price table."""
+    if usage:
+        prices = _model_prices(model)
+        if prices is not None:
+            details = usage.get("input_tokens_details") or {}
+            image_input = details.get("image_tokens", 0)
+            text_input = details.get("text_tokens", usage.get("input_tokens", 0) - image_input)
+            return (text_input * prices[0] + image_input * IMAGE_INPUT_TOKEN_PRICE
+                    + usage.get("output_tokens", 0) * prices[1]) / 1_000_000
+    return IMAGE_PRICES.get(model, {}).get(quality, {}).get(size, 0.0) * n
+
+
+class RequestUsage:
+    """Usage accumulated by one API request (one entry in the ledger)."""
+
+    __slots__ = ("request_id", "endpoint", "started", "calls")
+
+    def __init__(self, endpoint: str):
+        self.request_id = current_request_id()
+        self.endpoint = endpoint
+        self.started = time.time()
+        self.calls: List[Dict[str, Any]] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "request_id": self.request_id,
+            "endpoint": self.endpoint,
+            "started": self.started,
+            "keys": sorted({call["key"] for call in self.calls}),
+            "prompt_tokens": sum(call["prompt_tokens"] for call in self.calls),
+            "completion_tokens": sum(call["completion_tokens"] for call in self.calls),
+            "image_calls": sum(call["images"] for call in self.calls),
+            "cost_usd": round(sum(call["cost_usd"] for call in self.calls), 6),
+            "calls": list(self.calls)
+        }
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {"requests": 0, "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "image_calls": 0, "cost_usd": 0.0}
+
+
+class UsageLedger:
+    """
+    Thread-safe ledger of OpenAI usage. API requests are scoped by the usage middleware;
+    calls made outside a request (background jobs, scripts) are booked to endpoint "background".
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, Dict[str, Any]]] = {group: {} for group in GROUPS}
+        self._series: Dict[Tuple[str, str], Dict[str, Any]] = {}  # (endpoint, model) -> totals, for /metrics
+        self._requests: deque = deque(maxlen=settings.usage_ledger_size)
+
+    @contextmanager
+    def request_scope(self, endpoint: str = "unmatched") -> Iterator[RequestUsage]:
+        """
+        Attribute every call made while handling one API request to that request.
+        Calls are booked when the scope exits, so the caller may still set the yielded
+        request's `endpoint` (e.g. to the route template, known only once routing is done).
+        """
+        request = RequestUsage(endpoint)
+        token = _current_request.set(request)
+        try:
+            yield request
+        finally:
+            _current_request.reset(token)
+            if request.calls:
+                self._finish(request)
+
+    def record_chat(self, response: Any, api_key: Optional[str], operation: str):
+        """
+        Record a chat completion's token usage.
+
+        Args:
+            response: ChatCompletion returned by the openai client
+            api_key: API key the call was made with (only its hash is kept)
+            operation: Short name of the calling operation (e.g. "extract", "enhance_brief")
+        """
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        model = getattr(response, "model", None) or settings.openai_model
+        self._add({
+            "operation": operation,
+            "model": model,
+            "key": hash_api_key(api_key),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "images": 0,
+            "cost_usd": estimate_chat_cost(model, prompt_tokens, completion_tokens)
+        })
+
+    def record_image(self, api_key: Optional[str], operation: str, model: str, size: str = "1024x1024",
+                     quality: str = "high", n: int = 1, usage: Optional[Dict[str, Any]] = None):
+        """
+        Record an image generation/edit call.
+
+        Args:
+            api_key: API key the call was made with (only its hash is kept)
+            operation: "images.generate" or "images.edit"
+            model, size, quality, n: Request parameters used for per-image pricing
+            usage: The response's `usage` object, if the API returned one (gpt-image-1 does)
+        """
+        usage = usage or {}
+        self._add({
+            "operation": operation,
+            "model": model,
+            "key": hash_api_key(api_key),
+            "prompt_tokens": usage.get("input_tokens", 0),
+            "completion_tokens": usage.get("output_tokens", 0),
+            "images": n,
+            "size": size,
+            "quality": quality,
+            "cost_usd": estimate_image_cost(model, size, quality, n, usage)
+        })
+
+    def _add(self, call: Dict[str, Any]):
+        request = _current_request.get()
+        with self._lock:
+            if request is not None:
+                request.calls.append(call)  # booked by _finish once the endpoint is final
+                return
+            self._book("background", call)
+            self._totals["endpoint"]["background"]["requests"] += 1
+            self._totals["key"][call["key"]]["requests"] += 1
+
+    def _book(self, endpoint: str, call: Dict[str, Any]):
+        """Add one call to the endpoint/key/model totals and the /metrics series (lock held)."""
+        for totals in (
+            self._totals["endpoint"].setdefault(endpoint, _empty_totals()),
+            self._totals["key"].setdefault(call["key"], _empty_totals()),
+            self._totals["model"].setdefault(call["model"], _empty_totals()),
+            self._series.setdefault((endpoint, call["model"]), _empty_totals())
+        ):
+            totals["calls"] += 1
+            totals["prompt_tokens"] += call["prompt_tokens"]
+            totals["completion_tokens"] += call["completion_tokens"]
+            totals["image_calls"] += call["images"]
+            totals["cost_usd"] += call["cost_usd"]
+
+    def _finish(self, request: RequestUsage):
+        with self._lock:
+            for call in request.calls:
+                self._book(request.endpoint, call)
+            self._totals["endpoint"][request.endpoint]["requests"] += 1
+            for key in {call["key"] for call in request.calls}:
+                self._totals["key"][key]["requests"] += 1
+            self._requests.append(request)
+        summary = request.to_dict()
+        # bind() rather than extra=: loguru would str.format() the message, and route templates contain braces
+        logger.bind(usage={k: v for k, v in summary.items() if k != "calls"}).info(
+            f"💰 Usage {request.endpoint}: {summary['prompt_tokens']}+{summary['completion_tokens']} tokens, "
+            f"{summary['image_calls']} images, ~${summary['cost_usd']:.4f} [ID: {request.request_id}]"
+        )
+
+    def summary(self, group_by: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Aggregated usage.
+
+        Args:
+            group_by: "endpoint", "key" or "model"; all groups when omitted
+
+        Returns:
+            Mapping of group -> name -> totals (requests, calls, tokens, image calls, cost)
+        """
+        groups = [group_by] if group_by else list(GROUPS)
+        with self._lock:
+            summary = {
+                group: {name: {**totals, "cost_usd": round(totals["cost_usd"], 6)}
+                        for name, totals in sorted(self._totals[group].items())}
+                for group in groups
+            }
+        for totals in summary.get("model", {}).values():
+            totals.pop("requests")  # one request can span several models
+        return summary
+
+    def recent_requests(self, limit: int = 50, endpoint: Optional[str] = None, key: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most recent per-request records (newest first), optionally filtered by endpoint or key hash."""
+        with self._lock:
+            requests = list(self._requests)
+        records = []
+        for request in reversed(requests):
+            record = request.to_dict()
+            if endpoint and record["endpoint"] != endpoint:
+                continue
+            if key and key not in record["keys"]:
+                continue
+            records.append(record)
+            if len(records) >= limit:
+                break
+        return records
+
+    def prometheus_metrics(self) -> List[tuple]:
+        """Usage counters for /metrics, one series per (endpoint, model) (see TelemetryService.register_collector)."""
+        with self._lock:
+            series = {labels: dict(totals) for labels, totals in sorted(self._series.items())}
+            requests = {endpoint: totals["requests"] for endpoint, totals in sorted(self._totals["endpoint"].items())}
+        metrics = [
+            (f'photoeai_usage_requests_total{{endpoint="{endpoint}"}}', "counter", "API requests that called OpenAI", count)
+            for endpoint, count in requests.items()
+        ]
+        # Prometheus requires each metric family's samples to be contiguous
+        families = (
+            ("photoeai_usage_tokens_total", ',type="prompt"', "OpenAI tokens used", "prompt_tokens"),
+            ("photoeai_usage_tokens_total", ',type="completion"', "OpenAI tokens used", "completion_tokens"),
+            ("photoeai_usage_image_calls_total", "", "Images generated or edited", "image_calls"),
+            ("photoeai_usage_cost_usd_total", "", "Estimated OpenAI spend in USD", "cost_usd")
+        )
+        for metric_name, extra_labels, help_text, field in families:
+            for (endpoint, model), totals in series.items():
+                labels = f'endpoint="{endpoint}",model="{model}"{extra_labels}'
+                metrics.append((f"{metric_name}{{{labels}}}", "counter", help_text, round(totals[field], 6)))
+        return metrics
+
+
+# Global instance
+usage_ledger = UsageLedger()
+telemetry.register_collector(usage_ledger.prometheus_metrics)
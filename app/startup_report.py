@@ -0,0 +1,112 @@
+"""
+Startup time report for the PhotoeAI backend.
+Profiles a cold `import app.main` with `python -X importtime` and lists the slowest modules,
+so regressions in worker cold-start time can be spotted before they ship.
+
+Usage:
+    python -m app.startup_report [--top 20] [--json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+# Dependencies that must stay out of the import path of app.main (loaded on first use)
+HEAVY_MODULES = ("openai", "PIL", "requests")
+
+_REPORT_MARKER = "__startup_report__"
+
+# Filled in by app.main while it imports and starts up
+startup_timings: Dict[str, float] = {}
+
+
+def loaded_heavy_modules() -> List[str]:
+    """Return which of the heavy dependencies are currently imported in this process."""
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+def _parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse `-X importtime` output lines into module timing records (microseconds)."""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header line
+        records.append({
+            "module": parts[2].strip(),
+            "self_us": int(parts[0]),
+            "cumulative_us": int(parts[1])
+        })
+    return records
+
+
+def profile_cold_import(module: str = "app.main", top: int = 20) -> Dict[str, Any]:
+    """
+    Import a module in a fresh interpreter with -X importtime and summarise the result.
+
+    Args:
+        module: Module to import cold
+        top: Number of slowest modules (by cumulative time) to include
+
+    Returns:
+        Dictionary with total import time, the slowest modules and heavy modules that were pulled in
+    """
+    code = (
+        "import sys, time; started = time.perf_counter(); "
+        f"import {module}; "
+        "elapsed = time.perf_counter() - started; "
+        f"heavy = ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules); "
+        f"print('{_REPORT_MARKER}', elapsed, heavy)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=os.environ.copy()
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Cold import of {module} failed: {result.stderr.strip()[-500:]}")
+
+    # The app logs to stdout while importing, so pick out our own marker line
+    marker_line = next(line for line in reversed(result.stdout.splitlines()) if line.startswith(_REPORT_MARKER))
+    _, elapsed, *heavy = marker_line.split(" ")
+    records = _parse_importtime(result.stderr)
+    records.sort(key=lambda record: record["cumulative_us"], reverse=True)
+
+    return {
+        "module": module,
+        "import_seconds": round(float(elapsed), 4),
+        "heavy_modules_loaded": [name for name in "".join(heavy).split(",") if name],
+        "modules_imported": len(records),
+        "slowest_modules": records[:top]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report cold-start import time of the PhotoeAI backend")
+    parser.add_argument("--module", default="app.main", help="Module to import cold (default: app.main)")
+    parser.add_argument("--top", type=int, default=20, help="Number of slowest modules to show")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = profile_cold_import(args.module, args.top)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"⏱️  Cold import of {report['module']}: {report['import_seconds']:.3f}s ({report['modules_imported']} modules)")
+    print(f"📦 Heavy modules loaded at import: {', '.join(report['heavy_modules_loaded']) or 'none'}")
+    print()
+    print(f"{'cumulative ms':>14}  {'self ms':>8}  module")
+    for record in report["slowest_modules"]:
+        print(f"{record['cumulative_us'] / 1000:>14.1f}  {record['self_us'] / 1000:>8.1f}  {record['module']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Cache-friendly static file delivery for the PhotoeAI backend.
+Adds strong content ETags, conditional requests (304), single byte-range requests (206),
+precompressed `.gz` siblings and long-lived `Cache-Control: immutable` headers for
+images, whose filenames are never reused.
+"""
+
+import hashlib
+import mimetypes
+import os
+import stat
+from collections import OrderedDict
+from email.utils import formatdate
+from typing import Dict, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=3600"
+
+# Paths (relative to the mount) whose files are written once under a unique name
+IMMUTABLE_PREFIXES = ("images/",)
+
+ETAG_CACHE_SIZE = 4096
+_etag_cache: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+
+
+def content_etag(full_path: str, stat_result: os.stat_result) -> str:
+    """
+    Strong ETag derived from the file content (sha256), cached per (path, mtime, size).
+
+    Blocking; call from a worker thread.
+    """
+    cache_key = (str(full_path), stat_result.st_mtime_ns, stat_result.st_size)
+    etag = _etag_cache.get(cache_key)
+    if etag is not None:
+        _etag_cache.move_to_end(cache_key)
+        return etag
+
+    digest = hashlib.sha256()
+    with open(full_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    etag = f'"{digest.hexdigest()[:32]}"'
+
+    _etag_cache[cache_key] = etag
+    if len(_etag_cache) > ETAG_CACHE_SIZE:
+        _etag_cache.popitem(last=False)
+    return etag
+
+
+def _etag_matches(header_value: str, etag: str) -> bool:
+    """If-None-Match comparison (weak comparison, as RFC 9110 requires for this header)."""
+    if header_value.strip() == "*":
+        return True
+    candidates = [value.strip() for value in header_value.split(",")]
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def accepts_encoding(accept_encoding: Optional[str], coding: str) -> bool:
+    """
+    Whether an Accept-Encoding header allows `coding` (q > 0), named explicitly or via "*".
+    "gzip;q=0" is a refusal, not an acceptance.
+    """
+    qualities: Dict[str, float] = {}
+    for part in (accept_encoding or "").lower().split(","):
+        name, *params = [item.strip() for item in part.split(";")]
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name] = quality
+    return qualities.get(coding, qualities.get("*", 0.0)) > 0
+
+
+def _parse_range(header_value: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=` range into inclusive (start, end).
+
+    Returns:
+        (start, end), or None when the header should be ignored (multiple ranges, other units)
+
+    Raises:
+        ValueError: If the range is syntactically valid but not satisfiable
+    """
+    units, _, spec = header_value.partition("=")
+    if units.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = (part.strip() for part in spec.partition("-"))
+    if (first and not first.isdigit()) or (last and not last.isdigit()) or not (first or last):
+        return None  # malformed: ignore it and serve the whole file
+
+    if not first:  # suffix range: the last N bytes
+        if int(last) == 0:
+            raise ValueError("empty suffix range")
+        return max(size - int(last), 0), size - 1
+
+    start, end = int(first), int(last) if last else size - 1
+    if start >= size:
+        raise ValueError("range not satisfiable")
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+class FileRangeResponse(Response):
+    """206 Partial Content response streaming one byte range of a file."""
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, path: str, start: int, end: int, size: int, headers: Dict[str, str], media_type: str, method: str):
+        super().__init__(status_code=206, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.end = end
+        self.send_header_only = method.upper() == "HEAD"
+        self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+async def cached_file_response(
+    full_path: str,
+    scope: Scope,
+    stat_result: Optional[os.stat_result] = None,
+    media_type: Optional[str] = None,
+    cache_control: str = DEFAULT_CACHE_CONTROL,
+    vary: Optional[str] = None
+) -> Response:
+    """
+    Build a cache-friendly response for a file: ETag/304, Range/206 and `.gz` siblings.
+
+    Args:
+        full_path: Path of the file on disk
+        scope: ASGI scope of the request
+        stat_result: os.stat() of the file if already known
+        media_type: Content type (guessed from the filename when omitted)
+        cache_control: Cache-Control header value
+        vary: Extra Vary header value (e.g. "Accept" for negotiated responses)
+
+    Returns:
+        200, 206, 304 or 416 response
+    """
+    method = scope["method"]
+    request_headers = Headers(scope=scope)
+    if stat_result is None:
+        stat_result = await anyio.to_thread.run_sync(os.stat, full_path)
+    vary_values = [vary] if vary else []
+
+    # Serve a precompressed sibling when the client accepts it (whole-file only)
+    served_path, served_stat, content_encoding = full_path, stat_result, None
+    try:
+        gz_stat = await anyio.to_thread.run_sync(os.stat, f"{full_path}.gz")
+    except OSError:
+        gz_stat = None
+    if gz_stat is not None:
+        vary_values.append("Accept-Encoding")
+        if accepts_encoding(request_headers.get("accept-encoding"), "gzip"):
+            served_path, served_stat, content_encoding = f"{full_path}.gz", gz_stat, "gzip"
+
+    etag = await anyio.to_thread.run_sync(content_etag, served_path, served_stat)
+    headers = {
+        "etag": etag,
+        "cache-control": cache_control,
+        "accept-ranges": "none" if content_encoding else "bytes",
+        "last-modified": formatdate(served_stat.st_mtime, usegmt=True)
+    }
+    if vary_values:
+        headers["vary"] = ", ".join(vary_values)
+    if content_encoding:
+        headers["content-encoding"] = content_encoding
+
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    if media_type is None:
+        media_type = mimetypes.guess_type(str(full_path))[0] or "application/octet-stream"
+
+    range_header = request_headers.get("range")
+    if range_header and not content_encoding:
+        if_range = request_headers.get("if-range")
+        if if_range is None or if_range.strip() == etag:
+            size = served_stat.st_size
+            try:
+                byte_range = _parse_range(range_header, size)
+            except ValueError:
+                return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+            if byte_range is not None:
+                return FileRangeResponse(served_path, *byte_range, size, headers, media_type, method)
+
+    response = FileResponse(served_path, stat_result=served_stat, media_type=media_type, headers=headers, method=method)
+    response.headers["etag"] = etag  # FileResponse overwrites it with a stat-based tag
+    return response
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles with strong ETags, 304/206 handling, `.gz` siblings and immutable caching
+    for write-once image paths. Dotfiles (e.g. the image sweeper index) are never served.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+        if any(part.startswith(".") for part in path.replace("\\", "/").split("/")):
+            raise HTTPException(status_code=404)
+
+        full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path)
+        if not (stat_result and stat.S_ISREG(stat_result.st_mode)):
+            return await super().get_response(path, scope)
+
+        relative_path = path.replace("\\", "/")
+        immutable = relative_path.startswith(IMMUTABLE_PREFIXES)
+        return await cached_file_response(
+            full_path,
+            scope,
+            stat_result=stat_result,
+            cache_control=IMMUTABLE_CACHE_CONTROL if immutable else DEFAULT_CACHE_CONTROL
+        )
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Bulk brief generation for product catalogs (offline, no server needed).
+
+Usage:
+    python batch_briefs.py catalog.csv                       # direct mode, BATCH_CONCURRENCY items at a time
+    python batch_briefs.py catalog.jsonl --mode batch        # through the OpenAI Batch API (BATCH_BACKEND)
+    python batch_briefs.py --resume batch_0123456789ab       # continue an interrupted job
+    python batch_briefs.py catalog.csv --output briefs.jsonl
+
+Result records are printed as JSONL while items complete; progress goes to stderr.
+Every job is checkpointed under BATCH_DIR, so an interrupted run can be resumed.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+from app.services.batch_runner import batch_runner, parse_items, MODES
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Generate photography briefs for a product catalog")
+    parser.add_argument("input", nargs="?", help="CSV (user_request/prompt column, optional id/sku) or JSONL file")
+    parser.add_argument("--mode", choices=MODES, default="direct", help="direct API calls, or Batch-API request files")
+    parser.add_argument("--concurrency", type=int, default=None, help="items in flight (default from settings)")
+    parser.add_argument("--resume", metavar="JOB_ID", help="resume an existing job instead of creating one")
+    parser.add_argument("--output", help="write result records to this file instead of stdout")
+    args = parser.parse_args()
+
+    if args.resume:
+        job_id = args.resume
+        try:
+            job = batch_runner.get_job(job_id)
+        except KeyError:
+            parser.error(f"unknown job {job_id}")
+    elif args.input:
+        try:
+            items = parse_items(Path(args.input).read_text(encoding="utf-8-sig"), args.input)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        job = batch_runner.create_job(items, mode=args.mode, concurrency=args.concurrency)
+        job_id = job["job_id"]
+    else:
+        parser.error("an input file or --resume JOB_ID is required")
+
+    print(f"🗂️ Job {job_id}: {job['total']} items, {job['mode']} mode (resume with --resume {job_id})", file=sys.stderr)
+    output = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    ok = failed = 0
+    try:
+        async for record in batch_runner.run(job_id):
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+            if record["status"] == "ok":
+                ok += 1
+            else:
+                failed += 1
+            print(f"   {ok + failed} done ({failed} failed) - last: {record['id']} {record['status']}", file=sys.stderr)
+    finally:
+        if args.output:
+            output.close()
+
+    job = batch_runner.get_job(job_id)
+    print(f"✅ Job {job_id} {job['status']}: {job['completed']}/{job['total']} completed, {job['failed']} failed", file=sys.stderr)
+    return 0 if job["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
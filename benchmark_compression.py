@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Quality and speed benchmark for brief compression.
+
+Compresses briefs with the local extractive compressor (app/services/extractive_compressor.py)
+and reports compression time, output size and technical-term retention: the weighted share
+of camera, lens, lighting, composition, material and post-processing terms (and exact specs
+such as 100mm or f/8) from the source brief that survive. With --llm the same briefs are also
+compressed by the LLM path (PromptCompressorService.compress_with_llm) and the extractive
+output is scored against the terms the LLM kept.
+
+Usage:
+    python benchmark_compression.py                              # 20 generated briefs of ~30K chars
+    python benchmark_compression.py --briefs briefs/*.txt.gz     # stored or exported briefs
+    python benchmark_compression.py --max-chars 4000 --llm       # compare with the LLM (uses OPENAI_API_KEY)
+    python benchmark_compression.py --llm --mock                 # LLM path against mock_openai_server.py
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+PRODUCTS = ("matte black ceramic coffee mug", "frosted glass serum bottle", "brushed aluminium wireless speaker",
+            "walnut wood watch box", "white porcelain teapot", "leather card holder")
+
+SECTIONS = {
+    "Main Subject": (
+        "The {product} is photographed exactly as it exists, preserving its original product colors, shape and proportions.",
+        "Every logo and label on the {product} stays sharp, legible and unaltered.",
+        "The {product} sits at a three-quarter angle so its silhouette and texture read clearly.",
+    ),
+    "Composition & Framing": (
+        "A medium shot at eye level places the {product} on the right third, following the rule of thirds.",
+        "Negative space on the left leaves room for copy while leading lines in the surface guide the eye.",
+        "The framing uses a 4:5 aspect ratio with a clean foreground and a softly receding background.",
+    ),
+    "Lighting & Atmosphere": (
+        "A large octabox key light sits 45 degrees camera left at 5600K, feathered across the {product}.",
+        "A white bounce reflector provides fill light at a 3:1 lighting ratio, keeping shadows open.",
+        "A narrow strip box rim light from behind separates the edges with crisp specular highlights.",
+        "A black flag controls spill so the background falls off by two stops.",
+    ),
+    "Background & Setting": (
+        "The {product} rests on honed grey marble with a seamless charcoal backdrop behind it.",
+        "Fine condensation droplets and a faint wisp of steam add tactile realism around the surface.",
+        "Props are limited to a folded linen napkin kept out of focus.",
+    ),
+    "Camera & Lens Simulation": (
+        "Shot on a Canon EOS R5 full-frame mirrorless body with a 100mm macro lens.",
+        "Aperture f/8 at ISO 100 and 1/160s keeps the {product} sharp edge to edge with gentle bokeh behind.",
+        "Focus stacking of five frames extends depth of field across the front face.",
+    ),
+    "Visual Effects & Style": (
+        "The style is clean, premium commercial photography with a calm, confident mood.",
+        "The palette pairs neutral greys with warm tones from the key light.",
+    ),
+    "Post-Processing": (
+        "Color grading keeps white balance neutral with a slight lift in the shadows.",
+        "Retouching removes dust with dodge and burn to shape form, then light sharpening and a subtle vignette.",
+        "Contrast and saturation stay natural so the product colors remain accurate.",
+    ),
+}
+
+NARRATIVE = (
+    "This section describes how the image should feel to a shopper browsing the catalog.",
+    "The overall intention is to communicate quality, care and attention to detail.",
+    "It is important that the viewer immediately understands what makes this item special.",
+    "Every choice here supports the story the brand wants to tell about everyday rituals.",
+    "The result should feel aspirational yet attainable, polished but never artificial.",
+    "Consider how the image will be seen on both mobile screens and large displays.",
+    "The team should review the final frame together before delivery to the client.",
+)
+
+
+def sample_brief(seed: int = 0, target_chars: int = 30000) -> str:
+    """
+    A generated 7-section brief in the shape the enhancement step produces, padded with
+    narrative prose and repeated technical sentences until it reaches `target_chars`.
+
+    Args:
+        seed: Random seed (the same seed always gives the same brief)
+        target_chars: Approximate length
+
+    Returns:
+        Brief text
+    """
+    rng = random.Random(seed)
+    product = rng.choice(PRODUCTS)
+    body: Dict[str, List[str]] = {name: [s.format(product=product) for s in sentences] for name, sentences in SECTIONS.items()}
+    names = list(SECTIONS)
+
+    def render() -> str:
+        lines = [f"# Product Photography Brief: {product.title()}", ""]
+        for name in names:
+            lines.append(f"## {name}")
+            lines.extend(f"- {sentence}" for sentence in body[name])
+            lines.append("")
+        return "\n".join(lines)
+
+    while len(render()) < target_chars:
+        name = rng.choice(names)
+        if rng.random() < 0.7:
+            body[name].append(rng.choice(NARRATIVE))
+        else:
+            body[name].append(rng.choice(SECTIONS[name]).format(product=product))
+    return render()
+
+
+def load_briefs(paths: List[str]) -> List[str]:
+    """Brief texts from .txt or .txt.gz files."""
+    briefs = []
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            briefs.append(f.read())
+    return briefs
+
+
+def run_benchmark(briefs: List[str], max_chars: int, llm: bool = False) -> Dict[str, Any]:
+    """
+    Compress every brief and collect timings, sizes and term retention.
+
+    Args:
+        briefs: Brief texts
+        max_chars: Character budget for the compressed prompt
+        llm: Also compress with the LLM path and compare
+
+    Returns:
+        Report with per-brief rows and aggregates
+    """
+    from app.services.extractive_compressor import extractive_compressor, term_retention
+
+    rows = []
+    for brief in briefs:
+        started = time.perf_counter()
+        compressed = extractive_compressor.compress(brief, max_chars=max_chars)
+        row = {
+            "chars": len(brief),
+            "extractive_chars": len(compressed),
+            "extractive_ms": (time.perf_counter() - started) * 1000,
+            "extractive_retention": term_retention(brief, compressed),
+        }
+        if llm:
+            from app.services.prompt_compressor import prompt_compressor
+
+            started = time.perf_counter()
+            llm_output = asyncio.run(prompt_compressor.compress_with_llm(brief, max_chars))
+            row.update({
+                "llm_chars": len(llm_output),
+                "llm_ms": (time.perf_counter() - started) * 1000,
+                "llm_retention": term_retention(brief, llm_output),
+                # Of the terms the LLM kept, how many the extractive output also kept
+                "retention_vs_llm": term_retention(llm_output, compressed),
+            })
+        rows.append(row)
+
+    summary = {
+        key: round(statistics.mean(row[key] for row in rows), 3)
+        for key in rows[0] if key != "chars"
+    } if rows else {}
+    if rows:
+        summary["extractive_p99_ms"] = round(max(row["extractive_ms"] for row in rows), 3)
+    return {"max_chars": max_chars, "briefs": len(rows), "summary": summary, "rows": rows}
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    summary = report["summary"]
+    lines = [f"Compressed {report['briefs']} briefs to ≤{report['max_chars']} chars", ""]
+    lines.append(f"  extractive: {summary.get('extractive_ms', 0):.1f} ms mean, {summary.get('extractive_p99_ms', 0):.1f} ms max, "
+                 f"{summary.get('extractive_chars', 0):.0f} chars, term retention {summary.get('extractive_retention', 0):.1%}")
+    if "llm_ms" in summary:
+        lines.append(f"  llm:        {summary['llm_ms']:.1f} ms mean, {summary['llm_chars']:.0f} chars, "
+                     f"term retention {summary['llm_retention']:.1%}")
+        lines.append(f"  extractive keeps {summary['retention_vs_llm']:.1%} of the terms the LLM kept")
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark local extractive brief compression (optionally against the LLM)")
+    parser.add_argument("--briefs", nargs="*", help="brief files (.txt or .txt.gz); default: generated briefs")
+    parser.add_argument("--count", type=int, default=20, help="generated briefs when --briefs is not given")
+    parser.add_argument("--brief-chars", type=int, default=30000, help="length of generated briefs")
+    parser.add_argument("--max-chars", type=int, default=19000, help="compression budget (the generator uses 19000)")
+    parser.add_argument("--llm", action="store_true", help="also compress with the LLM and compare term retention")
+    parser.add_argument("--mock", action="store_true", help="send --llm calls to mock_openai_server.py instead of OpenAI")
+    parser.add_argument("--json", dest="json_path", help="write the full report to this file")
+    parser.add_argument("--verbose", action="store_true", help="show app logs on stderr")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        from loguru import logger
+
+        logger.remove()
+
+    briefs = load_briefs(args.briefs) if args.briefs else [sample_brief(seed, args.brief_chars) for seed in range(args.count)]
+
+    server: Optional[Any] = None
+    if args.llm and args.mock:
+        from mock_openai_server import MockConfig, MockServer
+
+        server = MockServer(MockConfig(latency_scale=0))
+        server.start()
+        os.environ.setdefault("OPENAI_API_KEY", "sk-bench-" + "0" * 40)
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+    try:
+        report = run_benchmark(briefs, args.max_chars, llm=args.llm)
+    finally:
+        if server is not None:
+            server.stop()
+
+    print(format_report(report))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark for every endpoint in app/routers, with OpenAI replaced by
+mock_openai_server.py (no network, no API key spend).
+
+The app runs in-process behind an ASGI client; upstream calls go to the mock over
+loopback. Each endpoint is driven with a fixed number of requests at a fixed
+concurrency and reported with throughput, p50/p95/p99 latency and process memory.
+Generated images, logs and batch jobs go to a temporary working directory.
+
+Usage:
+    python benchmark_endpoints.py                                  # every endpoint, 20 requests, concurrency 4
+    python benchmark_endpoints.py --requests 200 --concurrency 32 --only generate-image
+    python benchmark_endpoints.py --latency-scale 0.05 --error-rate 0.05 --json results.json
+    python benchmark_endpoints.py --keep-rate-limits               # include OPENAI_RATE_TIER admission queues
+
+Upstream latency defaults to the mock's realistic distributions; --latency-scale 0 measures
+the app's own overhead only.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import resource
+import secrets
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from mock_openai_server import MockConfig, MockServer, canned_png
+
+API_KEY = "sk-bench-" + "0" * 40
+PROMPT = "Professional product photo of a matte black ceramic coffee mug on a walnut table, soft morning window light"
+BRIEF = "# Product Photography Brief\n\n## Lighting Design\n- Soft window key light from camera left\n" * 20
+WIZARD = {
+    "user_request": PROMPT,
+    "product_name": "Ceramic Coffee Mug",
+    "product_description": "Matte black ceramic mug",
+    "shot_type": "Eye-level",
+    "framing": "Medium Shot",
+    "lighting_style": "Natural window light",
+    "environment": "Textured surface",
+}
+CATALOG_CSV = "sku,user_request\nmug-1,Black ceramic mug on walnut\nmug-2,White ceramic mug on marble\n"
+
+
+class Scenario:
+    """One endpoint under load: request factory plus the statuses that count as success."""
+
+    def __init__(self, name: str, method: str, path: str, build: Callable[[Dict[str, Any]], Dict[str, Any]] = None,
+                 ok: tuple = (200,), admin: bool = False):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.build = build or (lambda fixtures: {})
+        self.ok = ok
+        self.admin = admin
+
+
+SCENARIOS = [
+    Scenario("root", "GET", "/"),
+    Scenario("health", "GET", "/api/v1/health"),
+    Scenario("startup-report", "GET", "/api/v1/startup-report"),
+    Scenario("metrics", "GET", "/metrics"),
+    Scenario("metrics-stages", "GET", "/api/v1/metrics/stages", admin=True),
+    Scenario("traces", "GET", "/api/v1/traces", admin=True),
+    Scenario("progress", "GET", "/api/v1/progress/{session_id}"),
+    Scenario("extract-and-fill", "POST", "/api/v1/extract-and-fill", lambda f: {"json": {"user_request": PROMPT}}),
+    Scenario("preview-brief", "POST", "/api/v1/preview-brief", lambda f: {"json": WIZARD}),
+    Scenario("generate-brief", "POST", "/api/v1/generate-brief", lambda f: {"json": WIZARD}),
+    Scenario("generate-brief-from-prompt", "POST", "/api/v1/generate-brief-from-prompt", lambda f: {"json": {"user_request": PROMPT}}),
+    # Reads product_name/user_api_key, which InitialUserRequest does not define, so it always fails
+    Scenario("generate-text", "POST", "/api/v1/generate-text", lambda f: {"json": {"user_request": PROMPT}}, ok=(500,)),
+    Scenario("generate-text-advanced", "POST", "/api/v1/generate-text-advanced",
+             lambda f: {"json": {"prompt": PROMPT, "user_api_key": API_KEY}}),
+    Scenario("generate-image", "POST", "/api/v1/generate-image",
+             lambda f: {"json": {"brief_prompt": PROMPT, "user_api_key": API_KEY}}),
+    Scenario("generate-image-stream", "POST", "/api/v1/generate-image/stream",
+             lambda f: {"json": {"brief_prompt": PROMPT, "user_api_key": API_KEY, "variant_count": 2, "variant_strategy": "fanout"}}),
+    Scenario("generate-image-breakthrough", "POST", "/api/v1/generate-image-breakthrough",
+             lambda f: {"json": {"brief_prompt": PROMPT, "user_api_key": API_KEY, "uploaded_image_filename": f["filename"]}}),
+    Scenario("generate-brief-and-image", "POST", "/api/v1/generate-brief-and-image",
+             lambda f: {"json": {"brief_prompt": PROMPT, "user_api_key": API_KEY}}),
+    Scenario("enhance-image", "POST", "/api/v1/enhance-image",
+             lambda f: {"json": {"original_brief_prompt": BRIEF, "generation_id": "gen_bench",
+                                 "enhancement_instruction": "Make it warmer with golden lighting", "user_api_key": API_KEY}}),
+    Scenario("download-brief", "POST", "/api/v1/download-brief", lambda f: {"json": {"prompt_text": BRIEF}}),
+    Scenario("brief-store", "POST", "/api/v1/briefs", lambda f: {"json": {"text": BRIEF}}),
+    Scenario("brief-get", "GET", "/api/v1/briefs/{brief_id}", lambda f: {"params": {"download": "true"}}),
+    Scenario("upload-image", "POST", "/api/v1/upload-image",
+             lambda f: {"files": {"file": ("product.png", f["png"], "image/png")}}),
+    Scenario("analyze-and-enhance", "POST", "/api/v1/analyze-and-enhance",
+             lambda f: {"json": {"image_filename": f["filename"], "user_prompt": PROMPT, "api_key": API_KEY}}),
+    Scenario("image-analysis-status", "GET", "/api/v1/image-analysis-status/{filename}"),
+    Scenario("images", "GET", "/api/v1/images/{image_id}", lambda f: {"params": {"variant": "full"}}),
+    Scenario("admin-usage", "GET", "/api/v1/admin/usage", admin=True),
+    Scenario("admin-usage-requests", "GET", "/api/v1/admin/usage/requests", admin=True),
+    Scenario("batch-create", "POST", "/api/v1/batch/jobs",
+             lambda f: {"files": {"file": ("catalog.csv", CATALOG_CSV.encode(), "text/csv")}, "data": {"mode": "direct"}},
+             ok=(202,), admin=True),
+    Scenario("batch-list", "GET", "/api/v1/batch/jobs", admin=True),
+    Scenario("batch-get", "GET", "/api/v1/batch/jobs/{job_id}", admin=True),
+    Scenario("batch-resume", "POST", "/api/v1/batch/jobs/{job_id}/resume", ok=(202, 409), admin=True),
+    Scenario("batch-results", "GET", "/api/v1/batch/jobs/{job_id}/results", lambda f: {"params": {"follow": "false"}}, admin=True),
+]
+
+
+def prepare_environment(base_url: str, admin_token: str, keep_rate_limits: bool) -> str:
+    """
+    Point the app at the mock and a scratch working directory. Must run before app.main is imported.
+
+    Returns:
+        The temporary working directory
+    """
+    workdir = tempfile.mkdtemp(prefix="photoeai_bench_")
+    os.makedirs(os.path.join(workdir, "static", "images", "uploads"))
+    os.environ.update({
+        "OPENAI_API_KEY": API_KEY,
+        "OPENAI_BASE_URL": base_url,
+        "IMAGE_API_BASE_URL": base_url,
+        "ADMIN_TOKEN": admin_token,
+        "BATCH_DIR": os.path.join(workdir, "batches"),
+        "BRIEF_STORE_DIR": os.path.join(workdir, "briefs"),
+    })
+    if not keep_rate_limits:
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.chdir(workdir)
+    return workdir
+
+
+def _rss_bytes() -> int:
+    """Current resident set size (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))]
+
+
+async def _prepare_fixtures(client, admin_headers: Dict[str, str]) -> Dict[str, Any]:
+    """Create the resources that path parameters refer to (an upload, an image, a session, a stored brief, a batch job)."""
+    fixtures: Dict[str, Any] = {"png": canned_png()}
+    response = await client.post("/api/v1/upload-image", files={"file": ("product.png", fixtures["png"], "image/png")})
+    response.raise_for_status()
+    fixtures["filename"] = response.json()["filename"]
+
+    response = await client.post("/api/v1/generate-image", json={"brief_prompt": PROMPT, "user_api_key": API_KEY, "use_raw_prompt": True})
+    response.raise_for_status()
+    image = response.json()
+    fixtures["session_id"] = image["session_id"]
+    fixtures["image_id"] = os.path.splitext(os.path.basename(image["image_url"]))[0]
+
+    response = await client.post("/api/v1/briefs", json={"text": BRIEF})
+    response.raise_for_status()
+    fixtures["brief_id"] = response.json()["brief_id"]
+
+    response = await client.post("/api/v1/batch/jobs", headers=admin_headers,
+                                 files={"file": ("catalog.csv", CATALOG_CSV.encode(), "text/csv")}, data={"mode": "direct"})
+    response.raise_for_status()
+    fixtures["job_id"] = response.json()["job_id"]
+    return fixtures
+
+
+async def run_scenario(client, scenario: Scenario, fixtures: Dict[str, Any], admin_headers: Dict[str, str],
+                       requests: int, concurrency: int, trace_memory: bool = False) -> Dict[str, Any]:
+    """
+    Drive one endpoint and summarize it.
+
+    Args:
+        client: httpx.AsyncClient bound to the app
+        scenario: Endpoint under test
+        fixtures: Values for path parameters and request bodies
+        admin_headers: Headers for ADMIN_TOKEN-guarded endpoints
+        requests: Total requests to send
+        concurrency: Requests in flight at once
+        trace_memory: Also report the Python heap peak (tracemalloc; slows the run)
+
+    Returns:
+        Throughput, latency percentiles (ms), status counts and memory figures
+    """
+    path = scenario.path.format(**fixtures)
+    headers = admin_headers if scenario.admin else {}
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            kwargs = scenario.build(fixtures)
+            start = time.perf_counter()
+            try:
+                response = await client.request(scenario.method, path, headers=headers, **kwargs)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    rss_start = rss_peak = _rss_bytes()
+    sampling = True
+
+    async def sample_rss():
+        nonlocal rss_peak
+        while sampling:
+            rss_peak = max(rss_peak, _rss_bytes())
+            await asyncio.sleep(0.02)
+
+    if trace_memory:
+        tracemalloc.start()
+    sampler = asyncio.create_task(sample_rss())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    elapsed = time.perf_counter() - started
+    sampling = False
+    await sampler
+    heap_peak = None
+    if trace_memory:
+        heap_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    rss_end = max(rss_peak, _rss_bytes())
+
+    succeeded = sum(count for status, count in statuses.items() if status in scenario.ok)
+    result = {
+        "endpoint": f"{scenario.method} {scenario.path}",
+        "requests": requests,
+        "succeeded": succeeded,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 2),
+        "rss_peak_mb": round(rss_end / 2**20, 1),
+        "rss_growth_mb": round((rss_end - rss_start) / 2**20, 1),
+    }
+    if heap_peak is not None:
+        result["heap_peak_mb"] = round(heap_peak / 2**20, 2)
+    return result
+
+
+def _router_endpoints(app) -> List[str]:
+    """"METHOD path" for every route defined in app/routers (and the app's own routes)."""
+    from fastapi.routing import APIRoute
+    return sorted(
+        f"{method} {route.path}"
+        for route in app.routes if isinstance(route, APIRoute)
+        for method in route.methods
+    )
+
+
+async def run_benchmark(requests: int = 20, concurrency: int = 4, only: Optional[List[str]] = None,
+                        latency: str = "", latency_scale: float = 1.0, error_rate: float = 0.0,
+                        seed: Optional[int] = None, keep_rate_limits: bool = False, trace_memory: bool = False,
+                        verbose: bool = False) -> Dict[str, Any]:
+    """
+    Start the mock, import the app against it and benchmark the selected endpoints.
+
+    Returns:
+        Report with per-endpoint results, endpoints without a scenario and mock traffic counters
+    """
+    import httpx
+
+    config = MockConfig(latency=latency, latency_scale=latency_scale, error_rate=error_rate, seed=seed)
+    admin_token = secrets.token_hex(16)
+    admin_headers = {"Authorization": f"Bearer {admin_token}"}
+    with MockServer(config) as mock:
+        workdir = prepare_environment(mock.base_url, admin_token, keep_rate_limits)
+        # The app logs (and some routers print) to stdout; keep the report on stdout clean
+        sink = sys.stderr if verbose else open(os.devnull, "w")
+        with contextlib.redirect_stdout(sink):
+            from app.main import app
+            from app.services.batch_runner import batch_runner
+            from app.services.log_sink import log_sink
+
+            scenarios = [s for s in SCENARIOS if not only or any(name in s.name for name in only)]
+            results = []
+            transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)  # unhandled errors become 500s
+            async with httpx.AsyncClient(transport=transport, base_url="http://photoeai.bench", timeout=300) as client:
+                fixtures = await _prepare_fixtures(client, admin_headers)
+                for scenario in scenarios:
+                    print(f"⏱️  {scenario.method} {scenario.path} ...", file=sys.stderr)
+                    results.append(await run_scenario(client, scenario, fixtures, admin_headers,
+                                                      requests, concurrency, trace_memory))
+            await batch_runner.stop()
+            log_sink.drain()  # write queued app logs while stdout is still redirected
+
+        covered = {f"{s.method} {s.path}" for s in SCENARIOS}
+        return {
+            "config": {"requests": requests, "concurrency": concurrency, "latency_scale": latency_scale,
+                       "error_rate": error_rate, "rate_limits": keep_rate_limits, "workdir": workdir},
+            "results": results,
+            "uncovered": [endpoint for endpoint in _router_endpoints(app) if endpoint not in covered],
+            "mock": mock.stats.snapshot(),
+        }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Fixed-width table of a run_benchmark report."""
+    lines = [f"{'endpoint':<52} {'ok/n':>9} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rss MB':>8} {'+MB':>6}"]
+    for result in report["results"]:
+        lines.append(
+            f"{result['endpoint']:<52} {result['succeeded']:>4}/{result['requests']:<4} {result['throughput_rps']:>8} "
+            f"{result['p50_ms']:>9} {result['p95_ms']:>9} {result['p99_ms']:>9} {result['rss_peak_mb']:>8} {result['rss_growth_mb']:>6}"
+        )
+        if result["succeeded"] != result["requests"]:
+            lines.append(f"{'':<4}statuses: {result['statuses']}")
+    if report["uncovered"]:
+        lines.append(f"⚠️ Endpoints without a benchmark scenario: {', '.join(report['uncovered'])}")
+    mock = report["mock"]
+    lines.append(f"🧪 Mock upstream requests: {mock['requests']} (injected errors: {mock['injected_errors']}, images: {mock['images']})")
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark every PhotoeAI endpoint against a local mock OpenAI API")
+    parser.add_argument("--requests", type=int, default=20, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight per endpoint")
+    parser.add_argument("--only", nargs="*", help="benchmark scenarios whose name contains any of these")
+    parser.add_argument("--latency", default="", help="mock latency spec (see mock_openai_server.py)")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplier for mock latency (0 = app overhead only)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls failed by the mock")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--keep-rate-limits", action="store_true", help="keep OPENAI_RATE_TIER admission control on")
+    parser.add_argument("--trace-memory", action="store_true", help="also report the Python heap peak per endpoint")
+    parser.add_argument("--json", dest="json_path", help="write the full report to this file")
+    parser.add_argument("--verbose", action="store_true", help="show app logs on stderr")
+    args = parser.parse_args()
+    json_path = os.path.abspath(args.json_path) if args.json_path else None  # the run changes directory
+
+    report = asyncio.run(run_benchmark(
+        requests=args.requests, concurrency=args.concurrency, only=args.only, latency=args.latency,
+        latency_scale=args.latency_scale, error_rate=args.error_rate, seed=args.seed,
+        keep_rate_limits=args.keep_rate_limits, trace_memory=args.trace_memory, verbose=args.verbose,
+    ))
+    print(format_report(report))
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    failed = [r for r in report["results"] if r["succeeded"] != r["requests"]]
+    return 1 if failed and args.error_rate == 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for application logging.
+
+Runs simulated brief generations on one event loop, each emitting the log lines
+generate_final_brief emits (start/validation/completion events with extra fields, an
+800-character verbose brief preview, filtered DEBUG lines and an occasional warning),
+and measures what logging costs the event loop in three modes:
+
+    off     no log handlers (the baseline)
+    sync    the previous setup: loguru writing text to the console and a daily file
+            on the calling thread
+    queued  app/services/log_sink.py: sampled, queued and written as JSON lines in
+            batches by a background thread
+
+Usage:
+    python benchmark_logging.py                          # 2000 generations, console to /dev/null
+    python benchmark_logging.py --requests 10000 --concurrency 50
+    python benchmark_logging.py --console stdout         # include real terminal writes
+    python benchmark_logging.py --json logging_report.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+MODES = ("off", "sync", "queued")
+
+SYNC_CONSOLE_FORMAT = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> | <level>{message}</level>"
+SYNC_FILE_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} | {message}"
+
+PREVIEW = ("## Lighting & Atmosphere\n- A large octabox key light sits 45 degrees camera left at 5600K. " * 12)[:800]
+
+
+def configure(mode: str, directory: str, console: Any) -> Optional[Any]:
+    """Install the handlers for `mode`; returns the LogSink in queued mode."""
+    from loguru import logger
+
+    logger.remove()
+    if mode == "sync":
+        logger.add(console, format=SYNC_CONSOLE_FORMAT, level="INFO", colorize=False)
+        logger.add(os.path.join(directory, "photoeai_{time:YYYY-MM-DD}.log"), format=SYNC_FILE_FORMAT,
+                   level="INFO", rotation="1 day")
+    elif mode == "queued":
+        from app.services.log_sink import LogSink
+
+        sink = LogSink(directory=directory, console=console, console_format="text")
+        sink.install(level="INFO")
+        return sink
+    return None
+
+
+async def simulated_generation(index: int, latencies: List[float]):
+    """One brief generation's worth of log calls, timing each call."""
+    from loguru import logger
+
+    request_id = f"{index:08x}"
+
+    def timed(emit, *args, **kwargs):
+        started = time.perf_counter()
+        emit(*args, **kwargs)
+        latencies.append(time.perf_counter() - started)
+
+    timed(logger.info, f"🚀 BRIEF GENERATION START [ID: {request_id}]", extra={
+        "request_id": request_id, "product_name": "matte black ceramic coffee mug", "operation": "generate_final_brief"})
+    timed(logger.debug, f"🔧 Building system prompt [ID: {request_id}]")
+    await asyncio.sleep(0)  # the upstream call would yield here
+    timed(logger.info, f"📊 MISSION VALIDATION: Enhanced brief analysis [ID: {request_id}]", extra={
+        "request_id": request_id, "enhanced_brief_length": 14000, "word_count": 2100, "section_count": 7,
+        "refactor_success": True, "operation": "POST_PRODUCT_PHOTOGRAPHER_VALIDATION"})
+    timed(logger.bind(verbose=True).info, f"📝 ENHANCED BRIEF PREVIEW [ID: {request_id}]: {PREVIEW}...")
+    timed(logger.debug, f"📈 Enhanced brief metrics [ID: {request_id}]", extra={"request_id": request_id})
+    if index % 50 == 0:
+        timed(logger.warning, f"⚠️ Brief shorter than expected [ID: {request_id}]")
+    await asyncio.sleep(0)
+    timed(logger.info, f"🎉 Brief generation completed successfully [ID: {request_id}]", extra={
+        "request_id": request_id, "final_brief_length": 15000, "status": "success"})
+
+
+async def _run(requests: int, concurrency: int, latencies: List[float]):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int):
+        async with semaphore:
+            await simulated_generation(index, latencies)
+
+    await asyncio.gather(*(one(index) for index in range(requests)))
+
+
+def run_benchmark(mode: str, requests: int = 2000, concurrency: int = 20, console: Any = None,
+                  directory: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run `requests` simulated generations with logging in `mode`.
+
+    Args:
+        mode: off, sync or queued
+        requests: Simulated brief generations
+        concurrency: Generations in flight at once
+        console: Console stream (defaults to /dev/null)
+        directory: Log directory (defaults to a temporary directory)
+
+    Returns:
+        Generations per second, per-call latency percentiles (µs), the time the writer
+        thread needed to drain afterwards and the sink's counters in queued mode
+    """
+    from loguru import logger
+
+    own_console = console is None
+    console = open(os.devnull, "w", encoding="utf-8") if own_console else console
+    with tempfile.TemporaryDirectory() as tmp:
+        sink = configure(mode, directory or tmp, console)
+        latencies: List[float] = []
+        started = time.perf_counter()
+        asyncio.run(_run(requests, concurrency, latencies))
+        elapsed = time.perf_counter() - started
+        drain_started = time.perf_counter()
+        logger.remove()  # flushes file sinks; stops and drains the queued sink
+        drain_seconds = time.perf_counter() - drain_started
+    if own_console:
+        console.close()
+
+    latencies.sort()
+    micros = [value * 1e6 for value in latencies]
+    result = {
+        "mode": mode,
+        "requests": requests,
+        "log_calls": len(latencies),
+        "seconds": round(elapsed, 4),
+        "requests_per_second": round(requests / elapsed, 1),
+        "call_mean_us": round(statistics.mean(micros), 2),
+        "call_p50_us": round(micros[len(micros) // 2], 2),
+        "call_p99_us": round(micros[min(len(micros) - 1, int(len(micros) * 0.99))], 2),
+        "drain_ms": round(drain_seconds * 1000, 2),
+    }
+    if sink is not None:
+        result["sink"] = sink.stats()
+    return result
+
+
+def format_report(results: List[Dict[str, Any]]) -> str:
+    baseline = next((row for row in results if row["mode"] == "off"), None)
+    lines = [f"{'mode':<8} {'gen/s':>10} {'vs off':>8} {'call µs p50':>12} {'p99':>9} {'drain ms':>9}"]
+    for row in results:
+        relative = f"{row['requests_per_second'] / baseline['requests_per_second']:.0%}" if baseline else "-"
+        lines.append(f"{row['mode']:<8} {row['requests_per_second']:>10.1f} {relative:>8} "
+                     f"{row['call_p50_us']:>12.2f} {row['call_p99_us']:>9.2f} {row['drain_ms']:>9.1f}")
+    queued = next((row for row in results if "sink" in row), None)
+    if queued:
+        stats = queued["sink"]
+        lines.append(f"\nqueued sink: {stats['written']} written in {stats['batches']} batches, "
+                     f"{stats['sampled_out']} sampled out, {stats['dropped']} dropped, {stats['fields_truncated']} fields truncated")
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark log-call overhead with logging off, synchronous and queued")
+    parser.add_argument("--requests", type=int, default=2000, help="simulated brief generations per mode")
+    parser.add_argument("--concurrency", type=int, default=20, help="generations in flight at once")
+    parser.add_argument("--modes", nargs="*", default=list(MODES), choices=MODES)
+    parser.add_argument("--console", choices=("null", "stdout"), default="null", help="where console log lines go")
+    parser.add_argument("--json", dest="json_path", help="write the results to this file")
+    args = parser.parse_args()
+
+    console = sys.stdout if args.console == "stdout" else None
+    results = [run_benchmark(mode, args.requests, args.concurrency, console) for mode in args.modes]
+    print(format_report(results))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
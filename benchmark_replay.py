@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Replay production traffic from PhotoeAI logs against the app, with OpenAI replaced by
+mock_openai_server.py (no network, no API key spend).
+
+The logs are turned into a workload: every API request with its arrival time, endpoint
+and prompt length. JSON-lines logs (and text logs that contain them) are read from the
+access line the app writes for every request, with the arrival time taken as the access
+line's time minus the request's duration and the prompt length from the request's entry
+line (matched by request_id). Older text logs have no access lines; their requests are
+recognized from the entry line each router endpoint logs first ("🌟 [FRONTEND REQUEST]
+Generate image - Prompt length: 630 chars", ...).
+
+The workload is replayed open-loop: each request is sent at its original offset (gaps
+optionally capped and time compressed), whether or not earlier requests have finished,
+with a synthesized prompt of the logged length and the request shapes, fixtures and mock
+setup of benchmark_endpoints.py. The report compares the replayed and original endpoint
+mix and latency and shows how far the sender fell behind the schedule.
+
+Usage:
+    python benchmark_replay.py --summary                       # describe the workload in logs/
+    python benchmark_replay.py --speed 60 --max-gap 30         # replay logs/ 60x faster, idle gaps capped at 30 s
+    python benchmark_replay.py --files logs/*.jsonl.gz --save-workload traffic.json --summary
+    python benchmark_replay.py --workload traffic.json --latency-scale 0.1 --json replay.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import re
+import secrets
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from benchmark_endpoints import SCENARIOS, _percentile, _prepare_fixtures, _rss_bytes, prepare_environment
+from mock_openai_server import MockConfig, MockServer
+from monitor_logs_enhanced import expand_files, parse_line, read_lines
+
+# Entry lines that start a request in text logs without access lines: (function, message pattern, method, route).
+# `chars` is the logged prompt length; `preview` the truncated prompt older lines show instead.
+ENTRY_RULES = [
+    ("extract_and_fill", re.compile(r"\[FRONTEND REQUEST\] Extract and fill(?: \((?P<chars>\d+) chars\))?: '(?P<preview>.*?)(?:\.\.\.)?'$"),
+     "POST", "/api/v1/extract-and-fill"),
+    ("generate_brief", re.compile(r"\[FRONTEND REQUEST\] Generate brief for product: .*?(?: \((?P<chars>\d+) chars\))?$"),
+     "POST", "/api/v1/generate-brief"),
+    ("generate_brief_from_prompt", re.compile(r"Creating comprehensive brief from simple prompt(?: \((?P<chars>\d+) chars\))?: (?P<preview>.*?)(?:\.\.\.)?$"),
+     "POST", "/api/v1/generate-brief-from-prompt"),
+    ("generate_image", re.compile(r"\[FRONTEND REQUEST\] Generate image - Prompt length: (?P<chars>\d+) chars"),
+     "POST", "/api/v1/generate-image"),
+    ("generate_image_stream", re.compile(r"\[STREAM\] Generate \d+ image variants"), "POST", "/api/v1/generate-image/stream"),
+    ("generate_image_breakthrough", re.compile(r"\[BREAKTHROUGH\] GPT Image-1 Edit API - Session|BREAKTHROUGH: Starting GPT Image-1 Edit API"),
+     "POST", "/api/v1/generate-image-breakthrough"),
+    ("generate_brief_and_image", re.compile(r"\[UNIFIED\] Starting brief \+ image generation"), "POST", "/api/v1/generate-brief-and-image"),
+    ("generate_text_advanced", re.compile(r"Advanced text generation with provider"), "POST", "/api/v1/generate-text-advanced"),
+    ("analyze_and_enhance", re.compile(r"Starting analyze-and-enhance workflow(?: \((?P<chars>\d+) chars\))?"),
+     "POST", "/api/v1/analyze-and-enhance"),
+]
+# Endpoints that call another endpoint's function, whose entry line must not count as a second request
+NESTED_ENTRIES = {"generate_brief_and_image": "generate_image"}
+# Request body fields that carry the user's prompt
+PROMPT_FIELDS = ("user_request", "brief_prompt", "prompt", "user_prompt")
+# Entry-line prompt lengths kept while waiting for the request's access line
+MAX_PENDING_PROMPTS = 10000
+
+PROMPT_PHRASES = (
+    "Professional product photo of a matte black ceramic coffee mug", "on a walnut table", "soft morning window light",
+    "shot on 85mm at f/2.8", "shallow depth of field", "golden hour rim light", "clean white seamless background",
+    "e-commerce hero shot", "subtle reflections on the glaze", "steam rising from the cup", "minimalist styling",
+    "top-down flat lay", "linen napkin and coffee beans as props", "warm color grading", "crisp label detail",
+)
+SCENARIO_BY_ROUTE = {(scenario.method, scenario.path): scenario for scenario in SCENARIOS}
+
+
+def _entry_request(event: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """(function, request) for an endpoint entry line; None for other lines."""
+    function = event["operation"].split(":", 1)[-1]
+    for rule_function, pattern, method, path in ENTRY_RULES:
+        if function != rule_function:
+            continue
+        match = pattern.search(event["message"])
+        if not match:
+            continue
+        groups = match.groupdict()
+        chars = groups.get("chars")
+        preview = groups.get("preview")
+        prompt_chars = int(chars) if chars else (len(preview) if preview is not None else None)
+        return function, {"ts": event["ts"], "method": method, "path": path, "prompt_chars": prompt_chars}
+    return None
+
+
+def _file_requests(lines: Iterable[str]) -> List[Dict[str, Any]]:
+    """Requests in one log file: from its access lines if it has any, otherwise from entry lines."""
+    access: List[Dict[str, Any]] = []
+    entries: List[Dict[str, Any]] = []
+    prompts: Dict[str, int] = {}
+    absorb: Optional[str] = None
+    for line in lines:
+        event = parse_line(line)
+        if event is None:
+            continue
+        if "status_code" in event and "endpoint" in event:
+            access.append({
+                "ts": event["ts"] - event["duration_ms"] / 1000,
+                "method": event.get("method", "GET"),
+                "path": event["endpoint"],
+                "prompt_chars": prompts.pop(event.get("request_id"), None),
+                "status": event["status_code"],
+                "duration_ms": event["duration_ms"],
+            })
+            continue
+        entry = _entry_request(event)
+        if entry is None:
+            continue
+        function, request = entry
+        if function == absorb:
+            absorb = None
+            continue
+        absorb = NESTED_ENTRIES.get(function)
+        entries.append(request)
+        if event.get("request_id") is not None and request["prompt_chars"] is not None:
+            prompts[event["request_id"]] = request["prompt_chars"]
+            if len(prompts) > MAX_PENDING_PROMPTS:
+                prompts.pop(next(iter(prompts)))
+    return access or entries
+
+
+def build_workload(paths: List[str]) -> Dict[str, Any]:
+    """
+    Turn log files into a replay workload.
+
+    Args:
+        paths: .log/.jsonl files and their rotated .zip/.gz archives
+
+    Returns:
+        Workload with the source files and the requests in arrival order, each with its
+        offset in seconds from the first request (at), method, route, prompt length
+        and, where the logs have access lines, the original status and duration
+    """
+    requests = [request for path in paths for request in _file_requests(read_lines(path))]
+    requests.sort(key=lambda request: request["ts"])
+    first = requests[0]["ts"] if requests else 0.0
+    for request in requests:
+        request["at"] = round(request.pop("ts") - first, 3)
+    return {"source": [os.path.basename(path) for path in paths], "requests": requests}
+
+
+def _distribution(values: List[float]) -> Dict[str, float]:
+    return {"p50": _percentile(values, 0.50), "p95": _percentile(values, 0.95), "max": max(values, default=0)}
+
+
+def summarize_workload(workload: Dict[str, Any]) -> Dict[str, Any]:
+    """Request count, span, inter-arrival times (s) and per-endpoint share and prompt lengths."""
+    requests = workload["requests"]
+    arrivals = [request["at"] for request in requests]
+    gaps = [later - earlier for earlier, later in zip(arrivals, arrivals[1:])]
+    endpoints: Dict[str, Dict[str, Any]] = {}
+    for key, count in Counter(f"{r['method']} {r['path']}" for r in requests).most_common():
+        chars = [r["prompt_chars"] for r in requests if f"{r['method']} {r['path']}" == key and r["prompt_chars"] is not None]
+        endpoints[key] = {"count": count, "share": round(count / len(requests), 3), "prompt_chars": _distribution(chars) if chars else None}
+    return {
+        "requests": len(requests),
+        "span_seconds": arrivals[-1] if arrivals else 0.0,
+        "interarrival_seconds": {key: round(value, 3) for key, value in _distribution(gaps).items()} if gaps else None,
+        "endpoints": endpoints,
+    }
+
+
+def synthesize_prompt(chars: int, index: int) -> str:
+    """A product-photography prompt of exactly `chars` characters, varied by `index`."""
+    if chars <= 0:
+        return ""
+    start = index % len(PROMPT_PHRASES)
+    phrases = itertools.islice(itertools.cycle(PROMPT_PHRASES), start, None)
+    text = ""
+    while len(text) < chars:
+        text += (", " if text else "") + next(phrases)
+    return text[:chars]
+
+
+def schedule(requests: List[Dict[str, Any]], speed: float = 1.0, max_gap: Optional[float] = None) -> List[float]:
+    """Send times (s from the start) keeping the original gaps, idle gaps capped at max_gap, divided by speed."""
+    times, clock, previous = [], 0.0, None
+    for request in requests:
+        gap = 0.0 if previous is None else request["at"] - previous
+        if max_gap is not None:
+            gap = min(gap, max_gap)
+        clock += gap / speed
+        previous = request["at"]
+        times.append(clock)
+    return times
+
+
+def build_request(request: Dict[str, Any], fixtures: Dict[str, Any], index: int) -> Optional[Tuple[Any, str, Dict[str, Any]]]:
+    """(scenario, path, httpx kwargs) for a logged request; None for routes benchmark_endpoints cannot drive."""
+    scenario = SCENARIO_BY_ROUTE.get((request["method"], request["path"]))
+    if scenario is None:
+        return None
+    kwargs = scenario.build(fixtures)
+    if request["prompt_chars"] is not None and "json" in kwargs:
+        body = dict(kwargs["json"])
+        prompt = synthesize_prompt(request["prompt_chars"], index)
+        for field in PROMPT_FIELDS:
+            if field in body:
+                body[field] = prompt
+        kwargs = {**kwargs, "json": body}
+    return scenario, scenario.path.format(**fixtures), kwargs
+
+
+async def run_replay(workload: Dict[str, Any], speed: float = 1.0, max_gap: Optional[float] = None,
+                     limit: Optional[int] = None, max_in_flight: int = 256, latency: str = "",
+                     latency_scale: float = 1.0, error_rate: float = 0.0, seed: Optional[int] = None,
+                     keep_rate_limits: bool = False, verbose: bool = False) -> Dict[str, Any]:
+    """
+    Start the mock, import the app against it and replay `workload` open-loop.
+
+    Args:
+        workload: build_workload() output (or a saved copy)
+        speed: Time compression (60 replays an hour of traffic in a minute)
+        max_gap: Cap on idle gaps between requests, in original seconds
+        limit: Replay only the first `limit` requests
+        max_in_flight: Requests in flight at once; further requests wait and fall behind schedule
+        latency, latency_scale, error_rate, seed: Mock upstream behaviour (see mock_openai_server.py)
+        keep_rate_limits: Keep OPENAI_RATE_TIER admission control on
+        verbose: Show app logs on stderr
+
+    Returns:
+        Report with per-endpoint replayed and original results, schedule adherence,
+        skipped routes and mock traffic counters
+    """
+    import httpx
+
+    requests = workload["requests"][:limit] if limit else workload["requests"]
+    send_times = schedule(requests, speed, max_gap)
+    config = MockConfig(latency=latency, latency_scale=latency_scale, error_rate=error_rate, seed=seed)
+    admin_token = secrets.token_hex(16)
+    admin_headers = {"Authorization": f"Bearer {admin_token}"}
+    latencies: Dict[str, List[float]] = {}
+    statuses: Dict[str, Counter] = {}
+    succeeded: Counter = Counter()
+    lags: List[float] = []
+    skipped: Counter = Counter()
+    in_flight = peak_in_flight = 0
+
+    with MockServer(config) as mock:
+        workdir = prepare_environment(mock.base_url, admin_token, keep_rate_limits)
+        sink = sys.stderr if verbose else open(os.devnull, "w")
+        with contextlib.redirect_stdout(sink):
+            from app.main import app
+            from app.services.batch_runner import batch_runner
+            from app.services.log_sink import log_sink
+
+            transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://photoeai.replay", timeout=300) as client:
+                fixtures = await _prepare_fixtures(client, admin_headers)
+                semaphore = asyncio.Semaphore(max_in_flight)
+                rss_start = rss_peak = _rss_bytes()
+                loop = asyncio.get_running_loop()
+
+                async def send(index: int, request: Dict[str, Any], due: float):
+                    nonlocal in_flight, peak_in_flight, rss_peak
+                    scenario, path, kwargs = built[index]
+                    key = f"{scenario.method} {scenario.path}"
+                    async with semaphore:
+                        lags.append(max(0.0, loop.time() - started - due))
+                        in_flight += 1
+                        peak_in_flight = max(peak_in_flight, in_flight)
+                        sent = time.perf_counter()
+                        try:
+                            response = await client.request(scenario.method, path,
+                                                            headers=admin_headers if scenario.admin else {}, **kwargs)
+                            status = response.status_code
+                        except httpx.HTTPError:
+                            status = 0
+                        in_flight -= 1
+                    latencies.setdefault(key, []).append(time.perf_counter() - sent)
+                    statuses.setdefault(key, Counter())[status] += 1
+                    succeeded[key] += status in scenario.ok
+                    rss_peak = max(rss_peak, _rss_bytes())
+
+                built = [build_request(request, fixtures, index) for index, request in enumerate(requests)]
+                tasks = []
+                started = loop.time()
+                wall_started = time.perf_counter()
+                for index, (request, due) in enumerate(zip(requests, send_times)):
+                    if built[index] is None:
+                        skipped[f"{request['method']} {request['path']}"] += 1
+                        continue
+                    delay = started + due - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    tasks.append(asyncio.create_task(send(index, request, due)))
+                await asyncio.gather(*tasks)
+                elapsed = time.perf_counter() - wall_started
+            await batch_runner.stop()
+            log_sink.drain()  # write queued app logs while stdout is still redirected
+
+    originals: Dict[str, List[Dict[str, Any]]] = {}
+    for request in requests:
+        originals.setdefault(f"{request['method']} {request['path']}", []).append(request)
+    results = []
+    for key, values in sorted(latencies.items(), key=lambda item: -len(item[1])):
+        original_ms = [r["duration_ms"] for r in originals.get(key, []) if r.get("duration_ms") is not None]
+        original_status = Counter(str(r["status"]) for r in originals.get(key, []) if r.get("status") is not None)
+        results.append({
+            "endpoint": key,
+            "requests": len(values),
+            "succeeded": succeeded[key],
+            "statuses": {str(status): count for status, count in sorted(statuses[key].items())},
+            "p50_ms": round(_percentile(values, 0.50) * 1000, 2),
+            "p95_ms": round(_percentile(values, 0.95) * 1000, 2),
+            "p99_ms": round(_percentile(values, 0.99) * 1000, 2),
+            "original_p50_ms": round(_percentile(original_ms, 0.50), 2) if original_ms else None,
+            "original_p95_ms": round(_percentile(original_ms, 0.95), 2) if original_ms else None,
+            "original_statuses": dict(sorted(original_status.items())) or None,
+        })
+    sent = sum(len(values) for values in latencies.values())
+    return {
+        "config": {"source": workload.get("source", []), "speed": speed, "max_gap": max_gap, "limit": limit,
+                   "max_in_flight": max_in_flight, "latency_scale": latency_scale, "error_rate": error_rate,
+                   "rate_limits": keep_rate_limits, "workdir": workdir},
+        "workload": summarize_workload({"requests": requests}),
+        "replay": {
+            "sent": sent,
+            "scheduled_seconds": round(send_times[-1], 3) if send_times else 0.0,
+            "elapsed_seconds": round(elapsed, 3),
+            "offered_rps": round(sent / send_times[-1], 2) if send_times and send_times[-1] else None,
+            "achieved_rps": round(sent / elapsed, 2) if elapsed else None,
+            "lag_p50_ms": round(_percentile(lags, 0.50) * 1000, 2),
+            "lag_p99_ms": round(_percentile(lags, 0.99) * 1000, 2),
+            "lag_max_ms": round(max(lags, default=0.0) * 1000, 2),
+            "peak_in_flight": peak_in_flight,
+            "rss_peak_mb": round(rss_peak / 2**20, 1),
+            "rss_growth_mb": round((rss_peak - rss_start) / 2**20, 1),
+        },
+        "results": results,
+        "skipped": dict(skipped),
+        "mock": mock.stats.snapshot(),
+    }
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """Fixed-width description of a workload."""
+    gaps = summary["interarrival_seconds"] or {}
+    lines = [f"📼 {summary['requests']} requests over {summary['span_seconds']:.0f}s "
+             f"(inter-arrival p50 {gaps.get('p50', 0)}s, p95 {gaps.get('p95', 0)}s, max {gaps.get('max', 0)}s)",
+             f"{'endpoint':<52} {'count':>6} {'share':>6} {'prompt p50':>11} {'p95':>6} {'max':>6}"]
+    for key, endpoint in summary["endpoints"].items():
+        chars = endpoint["prompt_chars"] or {}
+        lines.append(f"{key:<52} {endpoint['count']:>6} {endpoint['share']:>6.1%} "
+                     f"{chars.get('p50', '-'):>11} {chars.get('p95', '-'):>6} {chars.get('max', '-'):>6}")
+    return "\n".join(lines)
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Fixed-width table of a run_replay report."""
+    replay = report["replay"]
+    lines = [format_summary(report["workload"]), "",
+             f"{'endpoint':<52} {'ok/n':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'orig p50':>9} {'orig p95':>9}"]
+    for result in report["results"]:
+        lines.append(f"{result['endpoint']:<52} {result['succeeded']:>4}/{result['requests']:<4} {result['p50_ms']:>9} "
+                     f"{result['p95_ms']:>9} {result['p99_ms']:>9} {result['original_p50_ms'] or '-':>9} {result['original_p95_ms'] or '-':>9}")
+        if result["succeeded"] != result["requests"]:
+            lines.append(f"{'':<4}statuses: {result['statuses']} (original: {result['original_statuses'] or 'unknown'})")
+    lines.append(f"⏱️  {replay['sent']} requests in {replay['elapsed_seconds']}s (scheduled {replay['scheduled_seconds']}s): "
+                 f"offered {replay['offered_rps']} rps, achieved {replay['achieved_rps']} rps, "
+                 f"schedule lag p50 {replay['lag_p50_ms']}ms / p99 {replay['lag_p99_ms']}ms, peak {replay['peak_in_flight']} in flight")
+    if report["skipped"]:
+        lines.append(f"⚠️ Not replayable (no benchmark scenario): {report['skipped']}")
+    mock = report["mock"]
+    lines.append(f"🧪 Mock upstream requests: {mock['requests']} (injected errors: {mock['injected_errors']}, images: {mock['images']})")
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay PhotoeAI traffic from logs against the app and a local mock OpenAI API")
+    parser.add_argument("--dir", default="logs", help="log directory to read when neither --files nor --workload is given")
+    parser.add_argument("--files", nargs="*", help="log files to build the workload from (.log, .zip, .jsonl, .jsonl.gz)")
+    parser.add_argument("--workload", help="replay a workload saved with --save-workload instead of reading logs")
+    parser.add_argument("--save-workload", help="write the workload to this file")
+    parser.add_argument("--summary", action="store_true", help="describe the workload and exit without replaying")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression factor (60 = an hour of traffic per minute)")
+    parser.add_argument("--max-gap", type=float, default=None, help="cap idle gaps between requests at this many original seconds")
+    parser.add_argument("--limit", type=int, default=None, help="replay only the first N requests")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="requests in flight at once")
+    parser.add_argument("--latency", default="", help="mock latency spec (see mock_openai_server.py)")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplier for mock latency (0 = app overhead only)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls failed by the mock")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--keep-rate-limits", action="store_true", help="keep OPENAI_RATE_TIER admission control on")
+    parser.add_argument("--json", dest="json_path", help="write the full report to this file")
+    parser.add_argument("--verbose", action="store_true", help="show app logs on stderr")
+    args = parser.parse_args()
+    json_path = os.path.abspath(args.json_path) if args.json_path else None  # the replay changes directory
+
+    if args.workload:
+        with open(args.workload, encoding="utf-8") as f:
+            workload = json.load(f)
+    else:
+        patterns = args.files or [os.path.join(args.dir, "photoeai_*")]
+        workload = build_workload(expand_files(patterns))
+    if not workload["requests"]:
+        print(f"❌ No replayable requests found ({args.workload or args.files or args.dir})", file=sys.stderr)
+        return 1
+    if args.save_workload:
+        with open(args.save_workload, "w", encoding="utf-8") as f:
+            json.dump(workload, f, indent=1)
+    if args.summary:
+        print(format_summary(summarize_workload(workload)))
+        return 0
+
+    report = asyncio.run(run_replay(
+        workload, speed=args.speed, max_gap=args.max_gap, limit=args.limit, max_in_flight=args.max_in_flight,
+        latency=args.latency, latency_scale=args.latency_scale, error_rate=args.error_rate, seed=args.seed,
+        keep_rate_limits=args.keep_rate_limits, verbose=args.verbose,
+    ))
+    print(format_report(report))
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
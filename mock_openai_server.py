@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI endpoints PhotoeAI calls (no network, no API key spend).
+
+Serves chat completions (text, JSON extraction and vision), images/generations and
+images/edits with configurable latency distributions, error injection and a canned
+b64_json PNG. Point the app at it with:
+
+    python mock_openai_server.py --port 8100
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 IMAGE_API_BASE_URL=http://127.0.0.1:8100/v1 python run.py
+
+Options (flags or MOCK_* environment variables):
+    --latency  / MOCK_LATENCY       per-route distributions, e.g. "chat=lognormal:600:0.35,images=uniform:1500:3000"
+                                    (routes: chat, vision, images, edits; kinds: fixed:MS, uniform:LO:HI, lognormal:MEDIAN:SIGMA)
+    --latency-scale / MOCK_LATENCY_SCALE   multiplier applied to every delay (0 disables them)
+    --error-rate / MOCK_ERROR_RATE  fraction of requests answered with an injected error
+    --error-statuses / MOCK_ERROR_STATUSES  statuses to inject, e.g. "429,500,503" (429s carry Retry-After)
+    --image-file / MOCK_IMAGE_FILE  PNG returned as b64_json (default: generated 256x256 gradient)
+    --seed / MOCK_SEED              RNG seed for reproducible latency/error sequences
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import random
+import re
+import struct
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+ROUTES = ("chat", "vision", "images", "edits")
+
+DEFAULT_LATENCY = "chat=lognormal:600:0.35,vision=lognormal:1200:0.35,images=lognormal:2500:0.3,edits=lognormal:3000:0.3"
+
+
+def parse_latency(spec: str) -> Dict[str, Tuple[str, Tuple[float, ...]]]:
+    """
+    Parse a latency spec ("chat=fixed:50,images=uniform:100:300") on top of DEFAULT_LATENCY.
+
+    Returns:
+        route -> (distribution kind, parameters in milliseconds)
+    """
+    distributions = {}
+    for entry in f"{DEFAULT_LATENCY},{spec}".split(","):
+        route, _, distribution = entry.partition("=")
+        route = route.strip()
+        if not route:
+            continue
+        kind, *params = distribution.strip().split(":")
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2}.get(kind)
+        if route not in ROUTES or expected != len(params):
+            raise ValueError(f"Invalid latency entry '{entry.strip()}' (routes: {', '.join(ROUTES)}; "
+                             "kinds: fixed:MS, uniform:LO:HI, lognormal:MEDIAN:SIGMA)")
+        distributions[route] = (kind, tuple(float(p) for p in params))
+    return distributions
+
+
+def canned_png(size: int = 256) -> bytes:
+    """A small valid RGB gradient PNG, built with the standard library only."""
+    rows = b"".join(
+        b"\x00" + bytes(channel for x in range(size) for channel in (x * 255 // size, y * 255 // size, 160))
+        for y in range(size)
+    )
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows, 6)) + chunk(b"IEND", b"")
+
+
+class MockConfig:
+    """Latency, error-injection and payload settings of a mock server instance."""
+
+    def __init__(self, latency: str = "", latency_scale: float = 1.0, error_rate: float = 0.0,
+                 error_statuses: str = "429,500,503", image_file: Optional[str] = None, seed: Optional[int] = None):
+        self.latency = parse_latency(latency)
+        self.latency_scale = latency_scale
+        self.error_rate = error_rate
+        self.error_statuses = [int(status) for status in error_statuses.split(",") if status.strip()]
+        self.rng = random.Random(seed)
+        if image_file:
+            with open(image_file, "rb") as f:
+                image = f.read()
+        else:
+            image = canned_png()
+        self.image_b64 = base64.b64encode(image).decode("ascii")
+
+    @classmethod
+    def from_env(cls) -> "MockConfig":
+        seed = os.getenv("MOCK_SEED")
+        return cls(
+            latency=os.getenv("MOCK_LATENCY", ""),
+            latency_scale=float(os.getenv("MOCK_LATENCY_SCALE", "1.0")),
+            error_rate=float(os.getenv("MOCK_ERROR_RATE", "0.0")),
+            error_statuses=os.getenv("MOCK_ERROR_STATUSES", "429,500,503"),
+            image_file=os.getenv("MOCK_IMAGE_FILE") or None,
+            seed=int(seed) if seed else None,
+        )
+
+    def delay(self, route: str) -> float:
+        """Seconds to wait before answering a request on `route`."""
+        kind, params = self.latency[route]
+        if kind == "fixed":
+            milliseconds = params[0]
+        elif kind == "uniform":
+            milliseconds = self.rng.uniform(*params)
+        else:
+            milliseconds = params[0] * math.exp(self.rng.gauss(0.0, params[1]))
+        return max(0.0, milliseconds * self.latency_scale / 1000)
+
+    def injected_error(self) -> Optional[int]:
+        """Status code to fail this request with, or None."""
+        if self.error_statuses and self.error_rate > 0 and self.rng.random() < self.error_rate:
+            return self.rng.choice(self.error_statuses)
+        return None
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _message_text(messages: List[Dict[str, Any]]) -> Tuple[str, bool]:
+    """Concatenated text of a chat request and whether it carries an image."""
+    parts, has_image = [], False
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "text":
+                    parts.append(part.get("text", ""))
+                elif part.get("type") == "image_url":
+                    has_image = True
+    return "\n".join(parts), has_image
+
+
+def _product_name(prompt: str) -> str:
+    match = re.search(r'User request: "([^"]{1,80})', prompt)
+    words = re.findall(r"[A-Za-z]+", match.group(1) if match else prompt)[:3]
+    return " ".join(words).title() or "Product"
+
+
+def _wizard_fields(prompt: str) -> Dict[str, Any]:
+    """Fixed extraction answer, narrowed to the fields a (partial) schema prompt lists as `field: description`."""
+    fields = {
+        "product_name": _product_name(prompt),
+        "product_description": "Premium consumer product with a clean, modern finish",
+        "key_features": "matte finish, precise edges, brand logo",
+        "shot_type": "Eye-level",
+        "framing": "Medium Shot",
+        "lighting_style": "Studio Softbox",
+        "environment": "Seamless studio backdrop",
+        "color_palette": "neutral whites with warm accents",
+        "mood": "clean and premium",
+        "camera_type": "Full-frame DSLR",
+        "lens_type": "100mm macro",
+        "aperture_value": 8.0,
+    }
+    listed = {field: value for field, value in fields.items() if re.search(rf"^\s*{field}: ", prompt, re.MULTILINE)}
+    return listed or fields
+
+
+def _vision_analysis() -> Dict[str, Any]:
+    return {
+        "product_type": "consumer product",
+        "product_name": "Product",
+        "dominant_colors": ["white", "silver"],
+        "materials": ["aluminium", "glass"],
+        "shape": "rectangular with rounded corners",
+        "current_background": "plain white",
+        "current_lighting": "soft diffuse light",
+        "key_features": ["brand logo", "matte finish"],
+        "suggested_improvements": ["add rim light", "use textured surface"],
+    }
+
+
+def _brief(prompt: str) -> str:
+    """A structured English photography brief long enough to pass the enhancement quality checks."""
+    name = _product_name(prompt)
+    sections = ("Creative Concept", "Composition & Framing", "Lighting Design", "Camera & Lens",
+                "Styling & Props", "Color & Mood", "Post-Production", "Creative Rationale")
+    bullets = (
+        "Professional studio photography with controlled softbox key light and subtle rim light",
+        "Camera at eye level with a 100mm macro lens at f/8 for edge-to-edge sharpness",
+        "Seamless backdrop with a gentle gradient that keeps attention on the product",
+        "Neutral palette with warm accents, preserving the original product colors exactly",
+        "Shallow shadows and crisp highlights to reveal texture, material and form",
+    )
+    lines = [f"# Product Photography Brief: {name}", ""]
+    for section in sections:
+        lines.append(f"## {section}")
+        for bullet in bullets:
+            lines.append(f"- **{section.split()[0]}**: {bullet}, composed for a premium commercial look "
+                         f"that highlights the {name.lower()} with photographic realism and consistent detail.")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def _chat_content(body: Dict[str, Any]) -> Tuple[str, str, int]:
+    """Route name, completion text and prompt tokens for a chat request."""
+    text, has_image = _message_text(body.get("messages", []))
+    if has_image:
+        return "vision", json.dumps(_vision_analysis()), _estimate_tokens(text) + 765
+    if body.get("response_format", {}).get("type") == "json_object" or "json" in text.lower():
+        return "chat", json.dumps(_wizard_fields(text)), _estimate_tokens(text)
+    return "chat", _brief(text), _estimate_tokens(text)
+
+
+class MockStats:
+    """Request counters (GET /mock/stats) so benchmarks can check upstream traffic."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[str, int] = {route: 0 for route in ROUTES}
+        self.injected_errors: Dict[str, int] = {route: 0 for route in ROUTES}
+        self.images = 0
+        self.client_request_ids: Dict[str, int] = {}
+
+    def record(self, route: str, error: Optional[int], images: int = 0):
+        with self._lock:
+            self.requests[route] += 1
+            self.injected_errors[route] += error is not None
+            self.images += images if error is None else 0
+
+    def correlate(self, request: Request):
+        """Count calls per X-Client-Request-Id so correlation can be checked end to end."""
+        client_request_id = request.headers.get("x-client-request-id")
+        if client_request_id:
+            with self._lock:
+                self.client_request_ids[client_request_id] = self.client_request_ids.get(client_request_id, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"requests": dict(self.requests), "injected_errors": dict(self.injected_errors), "images": self.images,
+                    "client_request_ids": dict(self.client_request_ids)}
+
+
+def _error_response(status: int) -> JSONResponse:
+    headers = {"Retry-After": "1"} if status == 429 else {}
+    kind = "rate_limit_exceeded" if status == 429 else "server_error"
+    return JSONResponse({"error": {"message": f"Injected mock error ({status})", "type": kind, "code": kind}},
+                        status_code=status, headers=headers)
+
+
+def create_mock_app(config: Optional[MockConfig] = None) -> FastAPI:
+    """
+    Build the mock OpenAI application.
+
+    Args:
+        config: Latency/error settings (defaults from MOCK_* environment variables)
+
+    Returns:
+        FastAPI app serving /v1/chat/completions, /v1/images/generations and /v1/images/edits
+    """
+    config = config or MockConfig.from_env()
+    stats = MockStats()
+    app = FastAPI(title="PhotoeAI mock OpenAI API")
+    app.state.config = config
+    app.state.stats = stats
+
+    async def respond(route: str, request: Request) -> Optional[JSONResponse]:
+        stats.correlate(request)
+        await asyncio.sleep(config.delay(route))
+        status = config.injected_error()
+        if status is not None:
+            stats.record(route, status)
+            return _error_response(status)
+        return None
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        route, content, prompt_tokens = _chat_content(body)
+        error = await respond(route, request)
+        if error is not None:
+            return error
+        stats.record(route, None)
+        completion_tokens = _estimate_tokens(content)
+        return {
+            "id": f"chatcmpl-mock{uuid.uuid4().hex[:20]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    def image_payload(prompt: str, n: int) -> Dict[str, Any]:
+        return {
+            "created": int(time.time()),
+            "data": [{"b64_json": config.image_b64, "revised_prompt": prompt[:1000]} for _ in range(n)],
+            "usage": {"input_tokens": _estimate_tokens(prompt), "output_tokens": 4160 * n,
+                      "total_tokens": _estimate_tokens(prompt) + 4160 * n},
+        }
+
+    @app.post("/v1/images/generations")
+    async def images_generations(request: Request):
+        body = await request.json()
+        error = await respond("images", request)
+        if error is not None:
+            return error
+        n = int(body.get("n", 1))
+        stats.record("images", None, n)
+        return image_payload(body.get("prompt", ""), n)
+
+    @app.post("/v1/images/edits")
+    async def images_edits(request: Request):
+        form = await request.form()
+        error = await respond("edits", request)
+        if error is not None:
+            return error
+        n = int(form.get("n", 1))
+        stats.record("edits", None, n)
+        return image_payload(str(form.get("prompt", "")), n)
+
+    @app.get("/mock/stats")
+    async def mock_stats():
+        return stats.snapshot()
+
+    return app
+
+
+class MockServer:
+    """Runs the mock app with uvicorn in a background thread (for benchmarks and tests)."""
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        import socket
+        import uvicorn  # Imported on first use; only the benchmark/test path needs it
+
+        self.app = create_mock_app(config)
+        if port == 0:
+            with socket.socket() as probe:
+                probe.bind((host, 0))
+                port = probe.getsockname()[1]
+        self.base_url = f"http://{host}:{port}/v1"
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host=host, port=port, log_level="warning", access_log=False))
+        self._thread = threading.Thread(target=self._server.run, name="mock-openai", daemon=True)
+
+    @property
+    def stats(self) -> MockStats:
+        return self.app.state.stats
+
+    def start(self, timeout: float = 10.0) -> "MockServer":
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("Mock OpenAI server failed to start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the OpenAI endpoints used by PhotoeAI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", default=os.getenv("MOCK_LATENCY", ""), help="per-route latency distributions")
+    parser.add_argument("--latency-scale", type=float, default=float(os.getenv("MOCK_LATENCY_SCALE", "1.0")))
+    parser.add_argument("--error-rate", type=float, default=float(os.getenv("MOCK_ERROR_RATE", "0.0")))
+    parser.add_argument("--error-statuses", default=os.getenv("MOCK_ERROR_STATUSES", "429,500,503"))
+    parser.add_argument("--image-file", default=os.getenv("MOCK_IMAGE_FILE"))
+    parser.add_argument("--seed", type=int, default=int(os.environ["MOCK_SEED"]) if os.getenv("MOCK_SEED") else None)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = MockConfig(args.latency, args.latency_scale, args.error_rate, args.error_statuses, args.image_file, args.seed)
+    print(f"🧪 Mock OpenAI API on http://{args.host}:{args.port}/v1 "
+          f"(error rate {args.error_rate:.0%}, latency scale {args.latency_scale})")
+    uvicorn.run(create_mock_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,99 +1,544 @@
 """
-PhotoEAI Enhanced Log Monitor - Real-time Backend Activity Viewer
-================================================================
+PhotoEAI Enhanced Log Monitor - Streaming Log Analytics
+=======================================================
 
-This script provides real-time monitoring of backend activities with:
-- Color-coded log levels (INFO, WARNING, ERROR)
-- Filtered view options (API requests, AI operations, errors only)
-- Enhanced readability with timestamps and structured formatting
+Follows the backend's logs and computes, on the fly and in constant memory:
+- Rolling per-endpoint request rates, error rates and latency (from the access line
+  the app writes for every API request)
+- Rolling per-stage latency and error rates (from the first and the final line each
+  service function logs with an [ID: ...] marker)
+- Log level counts
+
+Understands both log formats under logs/: JSON lines (photoeai_YYYY-MM-DD.jsonl, rotated
+to .jsonl.gz) and loguru text lines (photoeai_YYYY-MM-DD.log, rotated to .zip). Following
+uses seek-based tailing woken by inotify on Linux (polling elsewhere) and switches to the
+next day's file on rotation.
+
+Usage:
+    python monitor_logs_enhanced.py                       # follow today's log, dashboard every 5 s
+    python monitor_logs_enhanced.py --from-start --echo   # replay today's log first, print colored lines
+    python monitor_logs_enhanced.py --files logs/photoeai_2025-08-2*.log --once   # analyze files and exit
+    python monitor_logs_enhanced.py --files logs/*.jsonl.gz --once --json         # machine-readable summary
 """
 
+import argparse
+import bisect
+import ctypes
+import ctypes.util
+import glob
+import gzip
+import io
+import json
 import os
+import re
+import select
 import sys
 import time
-import subprocess
+import zipfile
+from collections import Counter, OrderedDict
 from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 2025-08-26 08:18:09 | INFO     | app.services.ai_client:extract_wizard_data:46 | message
+# (loguru's default "<time> | <level> | <name>:<function>:<line> - <message>" is accepted too)
+TEXT_LINE = re.compile(
+    r"^(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:\.\d+)?)\s*\|\s*([A-Z]+)\s*\|\s*([^:\s]+):([^:\s]+):(\d+)\s*(?:\||-)\s(.*)$"
+)
+ID_MARKER = re.compile(r"\[ID: ([^\]]+)\]")
+ACCESS_LINE = re.compile(r"^🌐 (\S+) (\S+) → (\d{3}) in (\d+)ms")
+SPAN_DONE = re.compile(r"\b(?:completed|successful|successfully|succeeded)\b|🎉", re.IGNORECASE)
+ERROR_LEVELS = {"ERROR", "CRITICAL"}
+# Per-request summaries that carry the request's ID but are not a stage
+SUMMARY_PREFIXES = ("💰 Usage ",)
+
+# Latency histogram bucket upper bounds (milliseconds); percentiles report the bucket bound
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000, 30000, 60000, 120000, 300000, float("inf"))
+
+# Memory bounds: distinct endpoints/stages tracked (later ones are grouped as "(other)") and
+# stages that have logged a first line but not their final line yet
+MAX_KEYS = 200
+MAX_OPEN_SPANS = 10000
+OTHER_KEY = "(other)"
 
-def colored_text(text, color):
+COLORS = {"green": "\033[92m", "yellow": "\033[93m", "red": "\033[91m", "cyan": "\033[96m", "white": "\033[97m", "reset": "\033[0m"}
+
+
+def colored_text(text: str, color: str) -> str:
     """Return colored text for terminal display"""
-    colors = {
-        'green': '\033[92m',
-        'yellow': '\033[93m',
-        'red': '\033[91m',
-        'blue': '\033[94m',
-        'cyan': '\033[96m',
-        'white': '\033[97m',
-        'reset': '\033[0m'
-    }
-    return f"{colors.get(color, colors['white'])}{text}{colors['reset']}"
-
-def format_log_line(line):
-    """Format log line with colors and better readability"""
+    return f"{COLORS.get(color, COLORS['white'])}{text}{COLORS['reset']}"
+
+
+def format_log_line(line: str) -> str:
+    """Color a raw log line by level and highlight request/AI activity"""
     if not line.strip():
         return ""
-    
-    # Color-code by log level
-    if "ERROR" in line:
-        return colored_text(line, 'red')
-    elif "WARNING" in line:
-        return colored_text(line, 'yellow')
-    elif "INFO" in line:
-        # Highlight important activities
-        if "[FRONTEND REQUEST]" in line or "[FRONTEND RESPONSE]" in line:
-            return colored_text(line, 'cyan')
-        elif "🎨" in line or "🚀" in line or "✅" in line:
-            return colored_text(line, 'green')
-        else:
-            return colored_text(line, 'white')
+    if "ERROR" in line or "CRITICAL" in line:
+        return colored_text(line, "red")
+    if "WARNING" in line:
+        return colored_text(line, "yellow")
+    if "🌐" in line or "[FRONTEND REQUEST]" in line or "[FRONTEND RESPONSE]" in line:
+        return colored_text(line, "cyan")
+    if "🎨" in line or "🚀" in line or "✅" in line or "🎉" in line:
+        return colored_text(line, "green")
+    return colored_text(line, "white")
+
+
+# ----- parsing -----
+
+def _epoch(stamp: str) -> float:
+    """Seconds since the epoch for an ISO timestamp (naive ones are local time, as loguru writes them)."""
+    moment = datetime.fromisoformat(stamp.replace(" ", "T", 1))
+    return moment.timestamp()
+
+
+def parse_line(line: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse one log line in either format.
+
+    Args:
+        line: A JSON-lines event or a loguru text line
+
+    Returns:
+        Event with ts (epoch seconds), level, operation (module:function), message,
+        request_id, stage_id (the [ID: ...] marker) and, for access lines, endpoint/status_code/duration_ms; None for
+        lines that are not log events (traceback continuation lines, blank lines)
+    """
+    line = line.rstrip("\r\n")
+    if line.startswith("{"):
+        try:
+            raw = json.loads(line)
+            event = {
+                "ts": _epoch(raw["ts"]),
+                "level": raw["level"],
+                "operation": f"{raw['logger'].rsplit('.', 1)[-1]}:{raw['function']}",
+                "message": raw.get("message", ""),
+            }
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
+        for field in ("request_id", "endpoint", "method", "status_code", "duration_ms"):
+            if raw.get(field) is not None:
+                event[field] = raw[field]
     else:
-        return line
-
-def main():
-    print(colored_text("🔍 PhotoEAI Enhanced Log Monitor", 'cyan'))
-    print(colored_text("=" * 50, 'cyan'))
-    print()
-    print(colored_text("⚡ Real-time backend activity monitoring", 'green'))
-    print(colored_text("🎯 Tracking: API requests, AI operations, image generation", 'green'))
-    print(colored_text("⏹️  Press Ctrl+C to stop monitoring", 'yellow'))
-    print()
-    print(colored_text("=" * 50, 'cyan'))
-    print()
-    
-    # Get today's log file
-    today = datetime.now().strftime("%Y-%m-%d")
-    log_file = f"logs/photoeai_{today}.log"
-    
-    if not os.path.exists(log_file):
-        print(colored_text(f"❌ Log file not found: {log_file}", 'red'))
-        print(colored_text("Make sure the backend server is running!", 'yellow'))
-        input("Press Enter to exit...")
-        return
-    
-    try:
-        # Use PowerShell Get-Content -Wait (equivalent to tail -f)
-        cmd = f'powershell -Command "Get-Content -Path \'{log_file}\' -Wait -Tail 10"'
-        process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        
-        print(colored_text("📊 Monitoring backend logs...", 'green'))
-        print(colored_text("-" * 50, 'white'))
-        
-        while True:
-            line = process.stdout.readline()
-            if line:
-                formatted_line = format_log_line(line.rstrip())
-                if formatted_line:
-                    print(formatted_line)
-            elif process.poll() is not None:
+        match = TEXT_LINE.match(line)
+        if not match:
+            return None
+        stamp, level, name, function, _, message = match.groups()
+        try:
+            event = {"ts": _epoch(stamp), "level": level, "operation": f"{name.rsplit('.', 1)[-1]}:{function}", "message": message}
+        except ValueError:
+            return None
+
+    # Every JSON record carries its request's request_id; only lines tagged [ID: ...] mark stages
+    marker = ID_MARKER.search(event["message"])
+    if marker:
+        event["stage_id"] = event["request_id"] = marker.group(1)
+    if "status_code" not in event:
+        access = ACCESS_LINE.match(event["message"])
+        if access:
+            event.update(method=access.group(1), endpoint=access.group(2),
+                         status_code=int(access.group(3)), duration_ms=float(access.group(4)))
+    if "request_id" in event:
+        event["request_id"] = str(event["request_id"])
+    return event
+
+
+def read_lines(path: str) -> Iterator[str]:
+    """Lines of a log file, including rotated .zip (every member) and .gz archives."""
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                with archive.open(member) as raw:
+                    yield from io.TextIOWrapper(raw, encoding="utf-8", errors="replace")
+    elif path.endswith(".gz"):
+        with gzip.open(path, "rt", encoding="utf-8", errors="replace") as f:
+            yield from f
+    else:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            yield from f
+
+
+def _log_sort_key(path: str) -> Tuple[str, float]:
+    """Day in the file name, then modification time (loguru adds a suffix to same-day rotations)."""
+    day = re.search(r"\d{4}-\d{2}-\d{2}", os.path.basename(path))
+    return (day.group(0) if day else "", os.path.getmtime(path))
+
+
+def expand_files(patterns: List[str]) -> List[str]:
+    """Paths matching `patterns`, oldest day first."""
+    paths = {path for pattern in patterns for path in (glob.glob(pattern) or [pattern]) if os.path.isfile(path)}
+    return sorted(paths, key=_log_sort_key)
+
+
+# ----- rolling statistics -----
+
+class RollingWindow:
+    """
+    Counts, errors and latency histograms per key over the last `seconds`, in a fixed ring
+    of time slots; memory depends on the slot and key counts, never on log volume.
+    """
+
+    def __init__(self, seconds: float = 300.0, slots: int = 60):
+        self.seconds = seconds
+        self.slot_seconds = seconds / slots
+        self._slots: List[Optional[Tuple[int, Dict[str, List[float]]]]] = [None] * slots
+        self._totals: Dict[str, List[float]] = {}  # since the first event, for reports over whole files
+        self.first: Optional[float] = None
+        self.last: Optional[float] = None
+
+    @staticmethod
+    def _empty() -> List[float]:
+        return [0, 0] + [0] * len(LATENCY_BUCKETS_MS)  # count, errors, latency histogram
+
+    def _slot_cell(self, key: str, ts: float) -> Optional[List[float]]:
+        index = int(ts // self.slot_seconds)
+        position = index % len(self._slots)
+        slot = self._slots[position]
+        if slot is None or slot[0] != index:
+            if slot is not None and slot[0] > index:
+                return None  # older than the window (out-of-order line)
+            slot = (index, {})
+            self._slots[position] = slot
+        return slot[1].setdefault(key, self._empty())
+
+    def add(self, key: str, ts: float, error: bool = False, latency_ms: Optional[float] = None):
+        if key not in self._totals and len(self._totals) >= MAX_KEYS:
+            key = OTHER_KEY
+        self.first = ts if self.first is None else min(self.first, ts)
+        self.last = ts if self.last is None else max(self.last, ts)
+        bucket = 2 + bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms) if latency_ms is not None else None
+        for cell in (self._totals.setdefault(key, self._empty()), self._slot_cell(key, ts)):
+            if cell is None:
+                continue
+            cell[0] += 1
+            if error:
+                cell[1] += 1
+            if bucket is not None:
+                cell[bucket] += 1
+
+    def snapshot(self, now: float) -> Dict[str, Dict[str, Any]]:
+        """Per-key rate (per second over the window), error rate and latency percentiles."""
+        current = int(now // self.slot_seconds)
+        merged: Dict[str, List[float]] = {}
+        for slot in self._slots:
+            if slot is None or not current - len(self._slots) < slot[0] <= current:
+                continue
+            for key, cell in slot[1].items():
+                total = merged.setdefault(key, self._empty())
+                for i, value in enumerate(cell):
+                    total[i] += value
+        return self._rows(merged, self.seconds)
+
+    def totals(self) -> Dict[str, Dict[str, Any]]:
+        """The same statistics since the first event (rates over the time the events span)."""
+        span = (self.last - self.first) if self.first is not None else 0.0
+        return self._rows(self._totals, max(span, 1.0))
+
+    def _rows(self, cells: Dict[str, List[float]], seconds: float) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for key, cell in sorted(cells.items(), key=lambda item: -item[1][0]):
+            histogram = cell[2:]
+            result[key] = {
+                "count": int(cell[0]),
+                "per_second": round(cell[0] / seconds, 3),
+                "error_rate": round(cell[1] / cell[0], 3) if cell[0] else 0.0,
+                "p50_ms": self._percentile(histogram, 0.50),
+                "p95_ms": self._percentile(histogram, 0.95),
+                "p99_ms": self._percentile(histogram, 0.99),
+            }
+        return result
+
+    @staticmethod
+    def _percentile(histogram: List[float], q: float) -> Optional[float]:
+        total = sum(histogram)
+        if not total:
+            return None
+        running = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, histogram):
+            running += count
+            if running >= q * total:
+                return bound if bound != float("inf") else LATENCY_BUCKETS_MS[-2]
+        return None
+
+
+class LogAnalytics:
+    """
+    Streaming analytics over parsed log events.
+
+    Endpoints come from access lines ("🌐 POST /api/v1/generate-brief → 200 in 812ms [ID: ...]").
+    Stages are the service functions that tag their lines with [ID: ...]: a stage starts at
+    its first line for an ID and ends at a line that reports completion (success) or at an
+    ERROR line (failure); stages still open after `span_timeout` seconds count as abandoned.
+    """
+
+    def __init__(self, window_seconds: float = 300.0, slots: int = 60, span_timeout: float = 600.0):
+        self.endpoints = RollingWindow(window_seconds, slots)
+        self.stages = RollingWindow(window_seconds, slots)
+        self.span_timeout = span_timeout
+        self._open: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self.levels: Counter = Counter()
+        self.events = 0
+        self.abandoned_spans = 0
+        self.latest = 0.0
+
+    def feed(self, event: Dict[str, Any]):
+        ts = event["ts"]
+        self.events += 1
+        self.latest = max(self.latest, ts)
+        self.levels[event["level"]] += 1
+
+        if "endpoint" in event and "status_code" in event:
+            self.endpoints.add(f"{event.get('method', '')} {event['endpoint']}".strip(), ts,
+                               error=int(event["status_code"]) >= 500, latency_ms=event.get("duration_ms"))
+            return
+
+        stage_id = event.get("stage_id")
+        if stage_id is None or event["message"].startswith(SUMMARY_PREFIXES):
+            return
+        key = (event["operation"], stage_id)
+        failed = event["level"] in ERROR_LEVELS
+        started = self._open.get(key)
+        if started is None:
+            if failed or SPAN_DONE.search(event["message"]):
+                self.stages.add(event["operation"], ts, error=failed, latency_ms=0.0)  # single-line stage
+                return
+            self._open[key] = ts
+            if len(self._open) > MAX_OPEN_SPANS:
+                self._open.popitem(last=False)
+                self.abandoned_spans += 1
+            self._expire(ts)
+        elif failed or SPAN_DONE.search(event["message"]):
+            del self._open[key]
+            self.stages.add(event["operation"], ts, error=failed, latency_ms=max(0.0, ts - started) * 1000)
+
+    def _expire(self, now: float):
+        """Drop stages whose final line never came (oldest first, so this stops early)."""
+        while self._open:
+            key, started = next(iter(self._open.items()))
+            if now - started <= self.span_timeout:
                 break
-    
+            del self._open[key]
+            self.abandoned_spans += 1
+
+    def snapshot(self, now: Optional[float] = None, totals: bool = False) -> Dict[str, Any]:
+        """
+        Endpoint and stage statistics.
+
+        Args:
+            now: End of the rolling window (defaults to the latest event)
+            totals: Report everything since the first event instead of the rolling window
+        """
+        now = now if now is not None else self.latest
+        return {
+            "window_seconds": None if totals else self.endpoints.seconds,
+            "as_of": datetime.fromtimestamp(now).isoformat(timespec="seconds") if now else None,
+            "events": self.events,
+            "levels": dict(self.levels),
+            "open_spans": len(self._open),
+            "abandoned_spans": self.abandoned_spans,
+            "endpoints": self.endpoints.totals() if totals else self.endpoints.snapshot(now),
+            "stages": self.stages.totals() if totals else self.stages.snapshot(now),
+        }
+
+
+def format_dashboard(snapshot: Dict[str, Any], top: int = 15) -> str:
+    def ms(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value:.0f}"
+
+    period = f"last {snapshot['window_seconds']:.0f}s" if snapshot["window_seconds"] else "all events"
+    lines = [
+        colored_text(f"🔍 PhotoEAI Log Analytics — {period} as of {snapshot['as_of']}", "cyan"),
+        f"events {snapshot['events']}  levels {snapshot['levels']}  open stages {snapshot['open_spans']}  abandoned {snapshot['abandoned_spans']}",
+    ]
+    for title, rows in (("Endpoints", snapshot["endpoints"]), ("Stages", snapshot["stages"])):
+        lines.append("")
+        lines.append(colored_text(f"{title:<48} {'count':>7} {'/min':>8} {'err%':>6} {'p50ms':>7} {'p95ms':>7} {'p99ms':>7}", "white"))
+        if not rows:
+            lines.append("  (none)")
+        for key, row in list(rows.items())[:top]:
+            text = (f"{key[:48]:<48} {row['count']:>7} {row['per_second'] * 60:>8.2f} {row['error_rate'] * 100:>5.1f}% "
+                    f"{ms(row['p50_ms']):>7} {ms(row['p95_ms']):>7} {ms(row['p99_ms']):>7}")
+            lines.append(colored_text(text, "red" if row["error_rate"] >= 0.05 else "green"))
+    return "\n".join(lines)
+
+
+# ----- following -----
+
+class _Inotify:
+    """Directory change notifications through Linux inotify (ctypes, no extra dependency)."""
+
+    MASK = 0x00000002 | 0x00000008 | 0x00000080 | 0x00000100  # IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+
+    def wait(self, timeout: float):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if ready:
+            try:
+                while os.read(self.fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _Poller:
+    """Fallback waiter for platforms without inotify."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+
+    def wait(self, timeout: float):
+        time.sleep(min(timeout, self.interval))
+
+    def close(self):
+        pass
+
+
+class LogFollower:
+    """
+    Seek-based follower of the newest photoeai_* log (JSON lines or text) in a directory.
+
+    Keeps a file offset and a partial-line buffer; when a newer day's file appears, it
+    reads the rest of the current one and moves on. A file that shrinks (truncated or
+    replaced) is reread from the start.
+    """
+
+    PATTERNS = ("photoeai_*.jsonl", "photoeai_*.log")
+
+    def __init__(self, directory: str = "logs", poll_interval: float = 1.0):
+        self.directory = directory
+        self.poll_interval = poll_interval
+
+    def newest_file(self) -> Optional[str]:
+        paths = [path for pattern in self.PATTERNS for path in glob.glob(os.path.join(self.directory, pattern))]
+        return max(paths, key=_log_sort_key) if paths else None
+
+    def _waiter(self):
+        if sys.platform.startswith("linux"):
+            try:
+                return _Inotify(self.directory)
+            except (OSError, AttributeError):
+                pass
+        return _Poller(self.poll_interval)
+
+    def follow(self, from_start: bool = False, idle_timeout: Optional[float] = None) -> Iterator[Optional[str]]:
+        """
+        Yield complete lines as they are appended; yields None whenever no new line
+        arrived within `poll_interval` (so callers can refresh displays).
+
+        Args:
+            from_start: Read the current file from the beginning instead of its end
+            idle_timeout: Stop after this many seconds without new lines (None follows forever)
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        waiter = self._waiter()
+        path, handle, buffer, current_key = None, None, "", None
+        last_line = time.monotonic()
+        try:
+            while True:
+                newest = self.newest_file()
+                # Switch only forward: the sink gzips yesterday's file, so it can vanish before today's exists
+                if newest is not None and newest != path and (current_key is None or _log_sort_key(newest)[0] >= current_key[0]):
+                    if handle is not None:
+                        for line in (buffer + handle.read()).splitlines(True):
+                            yield line
+                        handle.close()
+                    starting = path is None and not from_start
+                    path, buffer, current_key = newest, "", _log_sort_key(newest)
+                    handle = open(path, "r", encoding="utf-8", errors="replace")
+                    if starting:
+                        handle.seek(0, os.SEEK_END)
+                if handle is not None:
+                    try:
+                        truncated = os.path.getsize(path) < handle.tell()
+                    except OSError:
+                        truncated = False  # rotated away; the open handle still reads what was written
+                    if truncated:
+                        handle.seek(0)
+                        buffer = ""
+                    chunk = handle.read()
+                    if chunk:
+                        lines = (buffer + chunk).split("\n")
+                        buffer = lines.pop()
+                        for line in lines:
+                            yield line + "\n"
+                        last_line = time.monotonic()
+                        continue
+                if idle_timeout is not None and time.monotonic() - last_line > idle_timeout:
+                    return
+                yield None
+                waiter.wait(self.poll_interval)
+        finally:
+            if handle is not None:
+                handle.close()
+            waiter.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Follow PhotoeAI logs and report rolling endpoint/stage statistics")
+    parser.add_argument("--dir", default="logs", help="log directory to follow")
+    parser.add_argument("--files", nargs="*", help="analyze these files (.log, .zip, .jsonl, .jsonl.gz) instead of following")
+    parser.add_argument("--once", action="store_true", help="print one summary after reading --files (or the current file) and exit")
+    parser.add_argument("--from-start", action="store_true", help="when following, process the current file from its beginning")
+    parser.add_argument("--window", type=float, default=300.0, help="rolling window in seconds")
+    parser.add_argument("--refresh", type=float, default=5.0, help="seconds between dashboard refreshes while following")
+    parser.add_argument("--span-timeout", type=float, default=600.0, help="seconds after which an unfinished stage counts as abandoned")
+    parser.add_argument("--echo", action="store_true", help="print each log line (colored) while following")
+    parser.add_argument("--errors-only", action="store_true", help="with --echo, print only warnings and errors")
+    parser.add_argument("--json", action="store_true", help="print summaries as JSON")
+    args = parser.parse_args()
+
+    analytics = LogAnalytics(window_seconds=args.window, span_timeout=args.span_timeout)
+
+    def show(now: Optional[float] = None, totals: bool = False):
+        snapshot = analytics.snapshot(now, totals=totals)
+        if args.json:
+            print(json.dumps(snapshot, indent=2))
+        else:
+            if sys.stdout.isatty() and not args.echo and not args.once:
+                print("\033[2J\033[H", end="")
+            print(format_dashboard(snapshot))
+
+    if args.files or args.once:
+        paths = expand_files(args.files) if args.files else [p for p in [LogFollower(args.dir).newest_file()] if p]
+        if not paths:
+            print(colored_text(f"❌ No log files found ({args.files or args.dir})", "red"))
+            return 1
+        for path in paths:
+            for line in read_lines(path):
+                event = parse_line(line)
+                if event is not None:
+                    analytics.feed(event)
+        show(totals=True)
+        return 0
+
+    print(colored_text(f"📊 Following {args.dir}/ — press Ctrl+C to stop", "green"))
+    next_refresh = time.monotonic() + args.refresh
+    try:
+        for line in LogFollower(args.dir).follow(from_start=args.from_start):
+            if line is not None:
+                event = parse_line(line)
+                if event is not None:
+                    analytics.feed(event)
+                if args.echo and (not args.errors_only or (event and event["level"] not in ("DEBUG", "INFO", "SUCCESS"))):
+                    print(format_log_line(line.rstrip()))
+            if time.monotonic() >= next_refresh:
+                show(time.time())
+                next_refresh = time.monotonic() + args.refresh
     except KeyboardInterrupt:
         print()
-        print(colored_text("🛑 Log monitoring stopped by user", 'yellow'))
-    except Exception as e:
-        print(colored_text(f"❌ Error monitoring logs: {e}", 'red'))
-    finally:
-        if 'process' in locals():
-            process.terminate()
+        print(colored_text("🛑 Log monitoring stopped by user", "yellow"))
+    return 0
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -14,6 +14,7 @@ A clean, simple interface for AI image generation with:
 
 import streamlit as st
 import requests
+from urllib.parse import urljoin
 import json
 from typing import Optional, Dict
 import time
@@ -87,13 +88,16 @@ def save_uploaded_image(uploaded_file) -> Optional[str]:
 
 
 def generate_image_from_brief(comprehensive_brief: str, api_key: str, provider: str = None, 
-                            negative_prompt: str = None, uploaded_image_filename: str = None) -> Optional[Dict]:
-    """Generate image from comprehensive photography brief"""
+                            negative_prompt: str = None, uploaded_image_filename: str = None,
+                            brief_id: str = None) -> Optional[Dict]:
+    """Generate image from comprehensive photography brief (by brief_id when the server still holds it)"""
     try:
-        payload = {
-            "brief_prompt": comprehensive_brief,
-            "user_api_key": api_key
-        }
+        payload = {"user_api_key": api_key}
+        if brief_id:
+            # Server reuses the extraction/brief it already computed; no need to resend 15K+ chars
+            payload["brief_id"] = brief_id
+        else:
+            payload["brief_prompt"] = comprehensive_brief
         
         # Boss: Add image upload support for 2-step flow
         if uploaded_image_filename:
@@ -155,7 +159,8 @@ def generate_image(prompt: str, api_key: str, provider: str = None, negative_pro
             api_key=api_key,
             provider=provider,
             negative_prompt=negative_prompt,
-            uploaded_image_filename=uploaded_image_filename
+            uploaded_image_filename=uploaded_image_filename,
+            brief_id=brief_result.get("brief_id")
         )
         
         progress_bar.progress(90)
@@ -369,6 +374,7 @@ def main():
         # Generated Image
         st.subheader("🖼️ Enhanced Image")
         image_url = result.get("image_url", "")
+        image_url = urljoin(API_BASE_URL, image_url) if image_url else ""  # backend returns relative /static URLs
         if image_url:
             st.image(image_url, caption="Enhanced Professional Photography", use_container_width=True)
             st.code(image_url)
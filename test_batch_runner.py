@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Batch Runner Test
+Checks that catalogs parse from CSV and JSONL, that an interrupted direct-mode job resumes
+from its results file (completed items are not redone, failed ones are retried), and that
+in batch mode a resumed collector waits for the journaled batch instead of paying for its
+requests again, resubmitting only when the backend no longer knows the batch.
+"""
+
+import asyncio
+import json
+import tempfile
+from collections import Counter
+from pathlib import Path
+import pytest
+from app.config.settings import settings
+from app.services.batch_runner import BatchCollector, BatchRunner, ChatBatchBackend, parse_items
+
+COMPLETION = {
+    "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "ok"}}],
+}
+
+
+class RecordingBackend(ChatBatchBackend):
+    """Backend that records submissions; waits block until released and fail for unknown batches."""
+
+    name = "recording"
+
+    def __init__(self, known: dict = None):
+        self.submitted = []
+        self.known = dict(known or {})  # batch_id -> custom_ids
+        self.release = asyncio.Event()
+
+    async def submit(self, lines):
+        self.submitted.append([line["custom_id"] for line in lines])
+        batch_id = f"recording_{len(self.submitted)}"
+        self.known[batch_id] = self.submitted[-1]
+        return batch_id
+
+    async def wait(self, batch_id):
+        if batch_id not in self.known:
+            raise KeyError(batch_id)
+        await self.release.wait()
+        return {custom_id: {"body": COMPLETION} for custom_id in self.known[batch_id]}
+
+
+def test_parse_items():
+    """CSV and JSONL rows become {id, user_request}; rows without a request column are described"""
+    csv_items = parse_items("sku,prompt\nA1,Red mug\nA2,Blue vase\n", "catalog.csv")
+    assert csv_items == [{"id": "A1", "user_request": "Red mug"}, {"id": "A2", "user_request": "Blue vase"}]
+    jsonl_items = parse_items('{"product_name": "Lamp", "color": "brass"}\n\n{"user_request": "Oak chair"}\n')
+    assert jsonl_items == [{"id": "1", "user_request": "product_name: Lamp; color: brass"}, {"id": "2", "user_request": "Oak chair"}]
+
+    for content, filename in (("id,prompt\n1,a\n1,b\n", "dup.csv"), ("[1]\n", "bad.jsonl"), ("", "empty.csv")):
+        with pytest.raises(ValueError):
+            parse_items(content, filename)
+    print("✅ Catalogs parse from CSV and JSONL")
+
+
+def test_direct_job_resumes_from_checkpoint():
+    """An interrupted job skips items already completed and retries failed ones"""
+    from mock_openai_server import MockConfig, MockServer
+
+    async def scenario(runner: BatchRunner):
+        items = [{"id": str(n), "user_request": f"Ceramic mug number {n} on marble"} for n in range(1, 5)]
+        job_id = runner.create_job(items, mode="direct", concurrency=1)["job_id"]
+
+        # Interrupt after the first finished item (workers may have finished more by then)
+        results = runner.run(job_id)
+        assert (await results.__anext__())["status"] == "ok"
+        await results.aclose()
+        job = runner.get_job(job_id)
+        done = {item_id for item_id, status in runner._latest_results(job_id).items() if status == "ok"}
+        assert job["status"] == "interrupted" and job["completed"] == len(done) >= 1
+
+        # A later failed record for a completed item makes it due again; a torn last line is ignored
+        failed_id = sorted(done)[0]
+        with open(runner.results_path(job_id), "a", encoding="utf-8") as f:
+            f.write(json.dumps({"id": failed_id, "status": "error", "error": "HTTP 503"}) + "\n")
+            f.write('{"id": "4", "sta')
+        assert runner.get_job(job_id)["failed"] == 1
+
+        resumed = [record["id"] async for record in runner.run(job_id)]
+        return job_id, done, failed_id, resumed
+
+    server = MockServer(MockConfig(latency_scale=0)).start()
+    original_base_url, settings.openai_base_url = settings.openai_base_url, server.base_url
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            runner = BatchRunner(temp_dir)
+            job_id, done, failed_id, resumed = asyncio.run(scenario(runner))
+            job = runner.get_job(job_id)
+            records = [line for line in runner.results_path(job_id).read_text(encoding="utf-8").splitlines()
+                       if line.endswith("}")]
+    finally:
+        settings.openai_base_url = original_base_url
+        server.stop()
+
+    assert sorted(resumed) == sorted({"1", "2", "3", "4"} - done | {failed_id})
+    assert (job["status"], job["completed"], job["failed"]) == ("completed", 4, 0)
+    # Completed items were not redone; only the failed one has a second successful record
+    ok_counts = Counter(record["id"] for record in map(json.loads, records) if record["status"] == "ok")
+    assert ok_counts == {item_id: 2 if item_id == failed_id else 1 for item_id in ("1", "2", "3", "4")}
+    print("✅ Direct-mode jobs resume from their checkpoint")
+
+
+def test_batch_collector_resumes_journaled_batches():
+    """A journaled batch is waited for after a restart; an unknown one is resubmitted once"""
+    body = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "Describe a mug"}]}
+
+    async def first_run(journal: Path) -> RecordingBackend:
+        backend = RecordingBackend()
+        collector = BatchCollector(backend, journal)
+        request = asyncio.create_task(collector.create(**body))
+        while not backend.submitted:
+            await asyncio.sleep(0.01)
+        request.cancel()
+        await collector.close()  # process stops while the batch is in flight
+        return backend
+
+    async def resumed_run(journal: Path, backend: RecordingBackend):
+        collector = BatchCollector(backend, journal)
+        backend.release.set()
+        completion = await collector.create(**body)
+        await collector.close()
+        return completion
+
+    original_flush, settings.batch_flush_seconds = settings.batch_flush_seconds, 0.01
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            journal = Path(temp_dir) / "batches.jsonl"
+            submitted = asyncio.run(first_run(journal)).submitted
+            assert len(submitted) == 1 and len(journal.read_text().splitlines()) == 1
+
+            # Same backend still knows the batch: its result is collected, nothing is resubmitted
+            still_known = RecordingBackend(known={"recording_1": submitted[0]})
+            completion = asyncio.run(resumed_run(journal, still_known))
+            assert completion.choices[0].message.content == "ok" and still_known.submitted == []
+
+            # The backend lost the batch: its requests are submitted again
+            forgetful = RecordingBackend()
+            completion = asyncio.run(resumed_run(journal, forgetful))
+            assert completion.choices[0].message.content == "ok" and forgetful.submitted == submitted
+    finally:
+        settings.batch_flush_seconds = original_flush
+    print("✅ Batch collector resumes journaled batches")
+
+
+if __name__ == "__main__":
+    test_parse_items()
+    test_direct_job_resumes_from_checkpoint()
+    test_batch_collector_resumes_journaled_batches()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Brief Store Test
+Checks that stored briefs round-trip through POST/GET /api/v1/briefs (gzip as stored, or
+decompressed, each with its own strong ETag; gzip;q=0 is a refusal), that a matching
+If-None-Match gets a 304, that re-saving a brief restarts its expiry while the sweep
+removes expired ones, and that a pipeline context that left memory is restored from the
+brief store under its brief_id.
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from app.config.settings import settings
+from app.services.brief_store import brief_store, content_brief_id
+from app.services.pipeline_context import PipelineContextStore
+
+BRIEF = "PROFESSIONAL PHOTOGRAPHY BRIEF\n" + "Soft key light from camera left, 85mm at f/2.8. " * 200
+
+
+def _with_store_dir(test):
+    """Run a test against an empty temporary brief store."""
+    original = settings.brief_store_dir
+    with tempfile.TemporaryDirectory() as temp_dir:
+        settings.brief_store_dir = temp_dir
+        try:
+            test()
+        finally:
+            settings.brief_store_dir = original
+
+
+def test_brief_round_trip_and_304():
+    """A stored brief is served gzip-encoded or as text, and revalidates to 304"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    def scenario():
+        client = TestClient(app)
+        stored = client.post("/api/v1/briefs", json={"text": BRIEF})
+        assert stored.status_code == 200, stored.text
+        brief_id = stored.json()["brief_id"]
+        assert brief_id == content_brief_id(BRIEF)
+        assert stored.json()["stored_bytes"] < len(BRIEF) / 10
+
+        gzipped = client.get(f"/api/v1/briefs/{brief_id}", headers={"Accept-Encoding": "gzip"})
+        assert gzipped.status_code == 200 and gzipped.headers["content-encoding"] == "gzip"
+        assert gzipped.text == BRIEF  # decoded by the test client
+        plain = client.get(f"/api/v1/briefs/{brief_id}", headers={"Accept-Encoding": "identity"})
+        assert plain.text == BRIEF and "content-encoding" not in plain.headers
+        assert plain.headers["etag"] == f'"{brief_id}"' and "immutable" in plain.headers["cache-control"]
+        assert gzipped.headers["etag"] == f'"{brief_id}-gz"'  # one strong validator per content-coding
+        refused = client.get(f"/api/v1/briefs/{brief_id}", headers={"Accept-Encoding": "gzip;q=0, br"})
+        assert "content-encoding" not in refused.headers and refused.headers["etag"] == plain.headers["etag"]
+
+        revalidated = client.get(f"/api/v1/briefs/{brief_id}", headers={"Accept-Encoding": "identity", "If-None-Match": plain.headers["etag"]})
+        assert revalidated.status_code == 304 and revalidated.content == b""
+        # The gzip validator does not revalidate the identity representation (and vice versa)
+        other = client.get(f"/api/v1/briefs/{brief_id}", headers={"Accept-Encoding": "identity", "If-None-Match": gzipped.headers["etag"]})
+        assert other.status_code == 200 and other.text == BRIEF
+        revalidated = client.get(f"/api/v1/briefs/{brief_id}", headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]})
+        assert revalidated.status_code == 304
+        assert client.get("/api/v1/briefs/brief_0000000000000000").status_code == 404
+        assert client.get("/api/v1/briefs/not-a-brief").status_code == 400
+
+    _with_store_dir(scenario)
+    print("✅ Briefs round-trip and revalidate")
+
+
+def test_resave_refreshes_and_sweep_expires():
+    """Saving an existing brief restarts its expiry; the sweep removes expired briefs"""
+    def scenario():
+        kept, expired = brief_store.save(BRIEF), brief_store.save("An older brief")
+        month_ago = time.time() - (settings.brief_store_max_age_days + 1) * 86400
+        for brief_id in (kept, expired):
+            os.utime(brief_store.path_for(brief_id), (month_ago, month_ago))
+        assert brief_store.load(kept) is None  # expired until saved again
+
+        assert brief_store.save(BRIEF) == kept
+        assert brief_store.load(kept) == BRIEF
+        assert brief_store.sweep() == 1
+        assert not brief_store.path_for(expired).exists() and brief_store.path_for(kept).exists()
+
+    _with_store_dir(scenario)
+    print("✅ Re-saved briefs stay fresh, expired briefs are swept")
+
+
+def test_pipeline_context_restored_from_store():
+    """A context evicted from memory comes back from the brief store with its brief"""
+    def scenario():
+        async def run():
+            contexts = PipelineContextStore()
+            context = contexts.create("a mug")
+            await contexts.set_brief(context, BRIEF)
+            assert await contexts.get(context.brief_id) is context
+
+            contexts._contexts.clear()  # evicted (PIPELINE_CONTEXT_MAX/TTL)
+            restored = await contexts.get(context.brief_id)
+            assert restored is not context and restored.brief == BRIEF
+            assert restored.completed_stages() == ["brief"]
+            assert await contexts.get("brief_0000000000000000") is None
+            return contexts.stats()
+
+        stats = asyncio.run(run())
+        assert (stats["hits"], stats["restored"], stats["misses"]) == (1, 1, 1)
+
+    _with_store_dir(scenario)
+    print("✅ Pipeline contexts are restored from the brief store")
+
+
+if __name__ == "__main__":
+    test_brief_round_trip_and_304()
+    test_resave_refreshes_and_sweep_expires()
+    test_pipeline_context_restored_from_store()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Cold Start Regression Test
+Fails when a fresh `import app.main` exceeds the startup budget or pulls in heavy
+dependencies (openai, PIL, requests) that should only load on first use. Also checks
+that startup and shutdown messages go through the queued log sink to the JSON-lines file.
+
+Budget defaults to 2 seconds; override with COLD_IMPORT_BUDGET_SECONDS on slow CI machines.
+"""
+
+import os
+from app.startup_report import profile_cold_import
+
+COLD_IMPORT_BUDGET_SECONDS = float(os.getenv("COLD_IMPORT_BUDGET_SECONDS", "2.0"))
+
+
+def test_cold_import_within_budget():
+    """Cold import of app.main stays under the startup budget"""
+    print("⏱️  Profiling cold import of app.main...")
+    os.environ.setdefault("OPENAI_API_KEY", "sk-cold-start-test")
+    report = profile_cold_import("app.main", top=5)
+
+    print(f"   Import time: {report['import_seconds']:.3f}s (budget {COLD_IMPORT_BUDGET_SECONDS}s)")
+    for record in report["slowest_modules"]:
+        print(f"   {record['cumulative_us'] / 1000:>8.1f} ms  {record['module']}")
+
+    assert report["import_seconds"] < COLD_IMPORT_BUDGET_SECONDS, (
+        f"Cold import took {report['import_seconds']:.3f}s, budget is {COLD_IMPORT_BUDGET_SECONDS}s"
+    )
+    assert report["heavy_modules_loaded"] == [], (
+        f"Heavy modules imported eagerly: {report['heavy_modules_loaded']}"
+    )
+    print("✅ Cold import within budget, no heavy modules loaded")
+
+
+def test_startup_report_profile_requires_admin():
+    """Timings are public; a fresh import profile (a subprocess) needs the admin token"""
+    from fastapi.testclient import TestClient
+    from app.config.settings import settings
+    from app.main import app
+
+    client = TestClient(app)
+    original_token, settings.admin_token = settings.admin_token, "test-admin-token"
+    try:
+        report = client.get("/api/v1/startup-report")
+        assert report.status_code == 200 and "cold_import_profile" not in report.json()
+        assert client.get("/api/v1/startup-report?profile=true").status_code == 401
+        assert client.get("/api/v1/startup-report?profile=true",
+                          headers={"X-Admin-Token": "wrong"}).status_code == 401
+    finally:
+        settings.admin_token = original_token
+    print("✅ Import profiling is admin-only")
+
+
+def test_lifespan_messages_reach_json_log():
+    """Startup/shutdown messages are log records (not prints), so they land in photoeai_*.jsonl"""
+    import json
+    import tempfile
+    from pathlib import Path
+    from fastapi.testclient import TestClient
+    from loguru import logger
+    from app.config.settings import settings
+    from app.main import app
+    from app.services.log_sink import LogSink, log_sink
+
+    original_interval, settings.image_sweep_interval = settings.image_sweep_interval, 0  # keep static/images untouched
+    with tempfile.TemporaryDirectory() as tmp:
+        LogSink(directory=tmp, console=None).install()
+        try:
+            with TestClient(app):
+                pass
+        finally:
+            logger.remove()  # drains the temporary sink
+            settings.image_sweep_interval = original_interval
+            log_sink.install(level="DEBUG" if settings.debug else "INFO")
+        messages = [json.loads(line)["message"] for path in Path(tmp).glob("photoeai_*.jsonl")
+                    for line in path.read_text(encoding="utf-8").splitlines()]
+    for expected in ("PhotoeAI Backend starting up", "Startup completed successfully",
+                     "PhotoeAI Backend shutting down", "Shutdown completed successfully"):
+        assert any(expected in message for message in messages), expected
+    print("✅ Lifespan messages reach the JSON-lines log")
+
+
+if __name__ == "__main__":
+    test_cold_import_within_budget()
+    test_startup_report_profile_requires_admin()
+    test_lifespan_messages_reach_json_log()
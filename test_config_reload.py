@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Config Hot-Reload Test
+Works on a copy of system-prompt/: checks that the config watcher picks up an edited
+JSON file (new snapshot, new fingerprint, consumers such as the rule extractor's
+vocabulary follow), and that a file with broken JSON or an invalid structure is rejected
+while the previous snapshot keeps serving.
+"""
+
+import asyncio
+import json
+import shutil
+import tempfile
+from pathlib import Path
+import app.config.settings as settings_module
+import app.services.config_watcher as watcher_module
+from app.config.settings import settings
+from app.services.config_watcher import ConfigWatcher
+from app.services.rule_extractor import rule_extractor
+
+
+def _edit(path: Path, update):
+    data = json.loads(path.read_text(encoding="utf-8"))
+    update(data)
+    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+
+def test_changed_file_reloaded_bad_file_rejected():
+    """An edit is picked up by the next check; broken edits keep the last good snapshot"""
+    original_dir = settings_module.SYSTEM_PROMPT_DIR
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config_dir = Path(temp_dir) / "system-prompt"
+        shutil.copytree(original_dir, config_dir)
+        settings_module.SYSTEM_PROMPT_DIR = watcher_module.SYSTEM_PROMPT_DIR = config_dir
+        try:
+            watcher = ConfigWatcher()
+            watcher._stat_signatures = watcher._current_signatures()
+            assert asyncio.run(watcher.check_once()) == []
+            fingerprint = settings.config_fingerprint
+            assert "Incandescent glow" not in str(rule_extractor.extract("lit by a tungsten bulb").values)
+
+            # A valid edit: new vocabulary is used by the very next extraction
+            _edit(config_dir / "defaults.json", lambda data: data["extraction_vocabulary"]["terms"]["lighting_style"]
+                  .__setitem__("Incandescent glow", ["tungsten bulb"]))
+            assert asyncio.run(watcher.check_once()) == ["defaults"]
+            assert settings.config_fingerprint != fingerprint
+            assert rule_extractor.extract("lit by a tungsten bulb").values["lighting_style"] == "Incandescent glow"
+            good_fingerprint, good_rules = settings.config_fingerprint, settings.quality_rules
+
+            # Broken JSON: rejected, the last good snapshot keeps serving, and it is not re-parsed every tick
+            (config_dir / "quality_rules.json").write_text("{ not json", encoding="utf-8")
+            assert asyncio.run(watcher.check_once()) == []
+            assert settings.config_fingerprint == good_fingerprint and settings.quality_rules == good_rules
+            assert watcher._stat_signatures == watcher._current_signatures()
+
+            # Valid JSON with the wrong structure fails validation the same way
+            (config_dir / "quality_rules.json").write_text("[]", encoding="utf-8")
+            assert asyncio.run(watcher.check_once()) == []
+            assert settings.config_fingerprint == good_fingerprint and settings.quality_rules == good_rules
+
+            # Fixing the file recovers on the next check
+            shutil.copy(original_dir / "quality_rules.json", config_dir / "quality_rules.json")
+            assert asyncio.run(watcher.check_once()) == []  # same content as the active snapshot
+            assert settings.config_fingerprint == good_fingerprint
+        finally:
+            settings_module.SYSTEM_PROMPT_DIR = watcher_module.SYSTEM_PROMPT_DIR = original_dir
+            settings.reload_prompt_config()
+
+    assert settings.config_fingerprint == fingerprint
+    assert "lighting_style" not in rule_extractor.extract("lit by a tungsten bulb").values
+    print("✅ Config edits hot-reload; bad edits keep the previous snapshot")
+
+
+if __name__ == "__main__":
+    test_changed_file_reloaded_bad_file_rejected()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Request Correlation Test
+Checks that correlation scopes reuse well-formed incoming IDs and replace malformed ones,
+that the ID reaches log records and outbound headers only inside a scope, and that an
+API request's X-Request-ID is echoed back, used in every [ID: ...] marker of its log
+lines and sent to the (mock) OpenAI upstream as X-Client-Request-Id.
+"""
+
+from loguru import logger
+from app.services.correlation import (
+    OUTBOUND_REQUEST_ID_HEADER, correlation_scope, current_request_id, outbound_headers,
+)
+
+
+def test_correlation_scope():
+    """Scopes set the ID for services, log records and outbound calls"""
+    records = []
+    handler = logger.add(lambda message: records.append(message.record), level="INFO")
+    try:
+        assert outbound_headers() == {}
+        assert current_request_id() != current_request_id()  # no scope: fresh IDs, never reused
+
+        with correlation_scope("client-0001") as request_id:
+            assert request_id == current_request_id() == "client-0001"
+            assert outbound_headers() == {OUTBOUND_REQUEST_ID_HEADER: "client-0001"}
+            logger.info("🔍 inside scope")
+            with correlation_scope("bad id with spaces") as nested:
+                assert len(nested) == 32 and current_request_id() == nested
+            assert current_request_id() == "client-0001"
+        logger.info("🔍 outside scope")
+    finally:
+        logger.remove(handler)
+
+    assert records[0]["extra"]["request_id"] == "client-0001"
+    assert "request_id" not in records[1]["extra"]
+    assert outbound_headers() == {}
+    print("✅ Correlation scopes validate, nest and reach log records and outbound headers")
+
+
+def test_request_id_propagates_end_to_end():
+    """X-Request-ID is echoed, logged on every [ID: ...] line and forwarded upstream"""
+    from fastapi.testclient import TestClient
+    from mock_openai_server import MockConfig, MockServer
+    from app.config.settings import settings
+    from app.main import app
+    from app.routers.generator import orchestrator
+
+    server = MockServer(MockConfig(latency_scale=0)).start()
+    client_ai = orchestrator.ai_client
+    original_base_url, settings.openai_base_url, client_ai._client = settings.openai_base_url, server.base_url, None
+    records = []
+    handler = logger.add(lambda message: records.append(message.record), level="INFO")
+    try:
+        client = TestClient(app)
+        response = client.post("/api/v1/extract-and-fill", json={"user_request": "A matte black ceramic mug on marble"},
+                               headers={"X-Request-ID": "test-correlation-0001"})
+        assert response.headers["X-Request-ID"] == "test-correlation-0001"
+        replaced = client.post("/api/v1/extract-and-fill", json={"user_request": "mug"},
+                               headers={"X-Request-ID": "not valid!"})
+        assert len(replaced.headers["X-Request-ID"]) == 32
+        upstream = server.stats.snapshot()["client_request_ids"]
+    finally:
+        logger.remove(handler)
+        settings.openai_base_url, client_ai._client = original_base_url, None
+        server.stop()
+
+    marked = [record for record in records if "[ID: " in record["message"]]
+    assert marked and all(f"[ID: {record['extra'].get('request_id')}]" in record["message"] for record in marked)
+    assert any("[ID: test-correlation-0001]" in record["message"] for record in marked)
+    assert upstream.get("test-correlation-0001", 0) >= 1
+    assert upstream.get(replaced.headers["X-Request-ID"], 0) >= 1
+    print("✅ X-Request-ID echoed, logged on every marker and forwarded as X-Client-Request-Id")
+
+
+if __name__ == "__main__":
+    test_correlation_scope()
+    test_request_id_propagates_end_to_end()
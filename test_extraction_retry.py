@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Extraction Retry Test
+Checks that validation names the fields behind each error, and that when an extraction
+fails validation the self-healing loop re-asks the (mock) LLM for only those fields with a
+narrowed schema, merges them into the previous answer and records per-field retry counts
+and the prompt tokens saved over a full re-extraction.
+"""
+
+from app.services.ai_client import build_extraction_prompt
+from app.services.extraction_retries import extraction_retries
+from app.services.prompt_composer import PromptComposerService
+
+
+def test_validation_names_failed_fields():
+    """Each validation error carries the fields a retry has to re-ask"""
+    composer = PromptComposerService()
+    failures = composer.validate_extracted_fields({
+        "user_request": "a mug", "product_name": "", "mood": "nice and calm",
+        "visual_effect": "shallow depth of field with creamy bokeh", "aperture_value": 8,
+    })
+    assert [fields for fields, _ in failures] == [["visual_effect", "aperture_value"], ["product_name"], ["mood"]]
+    assert composer.validate_extracted_data({"user_request": "a mug", "product_name": "Mug"}) == []
+    assert [message for _, message in failures][1] == "Required field 'product_name' is missing or empty"
+
+    retry_prompt = build_extraction_prompt("a mug", fields=["mood"], feedback=["Vague term 'nice' found in 'mood'."])
+    assert "ALL 1 fields" in retry_prompt and "- Vague term 'nice' found in 'mood'." in retry_prompt
+    print("✅ Validation errors name their fields")
+
+
+def test_retry_reasks_only_failed_fields():
+    """A vague client value fails validation and only that field is re-extracted"""
+    from fastapi.testclient import TestClient
+    from mock_openai_server import MockConfig, MockServer
+    from app.config.settings import settings
+    from app.main import app
+    from app.routers.generator import orchestrator
+
+    server = MockServer(MockConfig(latency_scale=0)).start()
+    client_ai = orchestrator.ai_client
+    original_base_url, settings.openai_base_url, client_ai._client = settings.openai_base_url, server.base_url, None
+    before = extraction_retries.stats()
+    try:
+        response = TestClient(app).post("/api/v1/extract-and-fill", json={
+            "user_request": "A matte black ceramic mug on marble, golden hour",
+            "fields": {"mood": "nice and cozy"},
+        })
+        chat_calls = server.stats.snapshot()["requests"]["chat"]
+    finally:
+        settings.openai_base_url, client_ai._client = original_base_url, None
+        server.stop()
+
+    assert response.status_code == 200, response.text
+    assert chat_calls == 2  # initial partial extraction + one single-field retry
+    data = response.json()
+    assert data["mood"] == "clean and premium"           # re-asked from the mock
+    assert data["lighting_style"] == "Golden hour glow"  # kept from the first pass
+    after = extraction_retries.stats()
+    assert after["partial_retries"] == before["partial_retries"] + 1
+    assert after["full_retries"] == before["full_retries"]
+    assert after["field_retries"]["mood"] == before["field_retries"].get("mood", 0) + 1
+    assert after["prompt_tokens_saved"] > before["prompt_tokens_saved"]
+    print(f"✅ Only the failed field was re-extracted ({after['prompt_tokens_saved'] - before['prompt_tokens_saved']} prompt tokens saved)")
+
+
+if __name__ == "__main__":
+    test_validation_names_failed_fields()
+    test_retry_reasks_only_failed_fields()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Extractive Brief Compressor Test & Quality Benchmark
+Checks that local compression honours its character/token budgets, keeps exact camera
+and lighting specifications, stays section-ordered and deterministic, and runs in
+milliseconds; then reports term retention across budgets (benchmark_compression.py).
+"""
+
+import time
+from app.services.extractive_compressor import extractive_compressor, extract_terms, term_retention
+from app.services.token_budget import token_budget
+from benchmark_compression import format_report, run_benchmark, sample_brief
+
+
+def test_extractive_compression():
+    """Budgets are hard limits; specs, section order and determinism are kept"""
+    brief = sample_brief(seed=1, target_chars=30000)
+    assert extractive_compressor.compress("Short brief.", max_chars=100) == "Short brief."
+
+    compressed = extractive_compressor.compress(brief, max_chars=1500)
+    assert 1000 < len(compressed) <= 1500
+    assert compressed == extractive_compressor.compress(brief, max_chars=1500)
+    for spec in ("100mm", "f/8", "iso100", "1/160s", "5600k", "3:1"):
+        assert spec in extract_terms(compressed), spec
+    headers = [line.split(":")[0] for line in compressed.splitlines()]
+    assert headers.index("Lighting & Atmosphere") < headers.index("Camera & Lens Simulation") < headers.index("Post-Processing")
+    assert term_retention(brief, compressed) > 0.8
+
+    by_tokens = extractive_compressor.compress(brief, max_chars=19000, max_tokens=200)
+    assert token_budget.count(by_tokens) <= 200
+
+    started = time.perf_counter()
+    for seed in range(10):
+        extractive_compressor.compress(sample_brief(seed), max_chars=4000)
+    assert (time.perf_counter() - started) / 10 < 0.25
+    print("✅ Extractive compression respects budgets and keeps technical specs")
+
+
+def test_image_payload_fits_prompt_limit():
+    """Briefs at the image prompt budget, compressed or not, stay within gpt-image-1's 32000 characters"""
+    from app.services.multi_provider_image_generator import ImageProvider, OpenAIImageService
+
+    service = OpenAIImageService()
+    budget = token_budget.image_prompt_budget()
+    long_brief = sample_brief(seed=2, target_chars=31000)
+    assert token_budget.needs_compression(long_brief)
+    at_budget = long_brief[:budget]
+    assert not token_budget.needs_compression(at_budget)
+
+    for brief in (at_budget, extractive_compressor.compress(long_brief, max_chars=budget), long_brief):
+        prompt = service.build_request_payload(ImageProvider.OPENAI_GPT_IMAGE, brief)["prompt"]
+        assert len(prompt) <= 32000, len(prompt)
+    print(f"✅ Image payloads fit the prompt limit (brief budget {budget} chars)")
+
+
+def test_compression_quality_benchmark():
+    """Term retention stays high at the generator's budget and degrades gracefully below it"""
+    full = run_benchmark([sample_brief(seed) for seed in range(5)], max_chars=19000)
+    tight = run_benchmark([sample_brief(seed) for seed in range(5)], max_chars=1000)
+    print(format_report(full))
+    print(format_report(tight))
+    assert full["summary"]["extractive_retention"] > 0.95
+    assert 0.4 < tight["summary"]["extractive_retention"] <= full["summary"]["extractive_retention"]
+    assert all(row["extractive_chars"] <= 1000 for row in tight["rows"])
+
+
+if __name__ == "__main__":
+    test_extractive_compression()
+    test_image_payload_fits_prompt_limit()
+    test_compression_quality_benchmark()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Image Encoder Test
+Checks that derivative formats are negotiated from the Accept header's media ranges and
+q-values: q=0 excludes a format, higher q wins, ties go to the server's preference, newer
+formats count only when named, and JPEG stays acceptable as the last resort. Also checks
+that derivative URLs are built only for stored images and that /api/v1/images serves the
+negotiated derivative (the untouched source render until the derivatives exist).
+"""
+
+import asyncio
+import base64
+import io
+import tempfile
+from pathlib import Path
+from app.config.settings import settings
+from app.services.image_encoder import image_encoder, parse_accept
+from app.services.image_store import ImageStore, LocalDiskBackend, image_store
+
+
+def _png_base64(color=(200, 40, 40), size=(1600, 1200)) -> str:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def test_parse_accept():
+    """Media ranges map to their q-values; a missing q is 1 and a malformed one 0"""
+    assert parse_accept("image/avif;q=0, image/webp ,*/*; q=0.5") == {"image/avif": 0.0, "image/webp": 1.0, "*/*": 0.5}
+    assert parse_accept("image/webp;q=high, IMAGE/AVIF;Q=2") == {"image/webp": 0.0, "image/avif": 1.0}
+    assert parse_accept("") == {}
+    print("✅ Accept media ranges and q-values parsed")
+
+
+def test_negotiate_honors_q_values():
+    """Formats are ordered by q, then server preference; q=0 removes a format"""
+    original_formats, image_encoder._formats = image_encoder._formats, ["avif", "webp", "jpeg"]
+    try:
+        assert image_encoder.negotiate("image/avif,image/webp,*/*") == ["avif", "webp", "jpeg"]
+        assert image_encoder.negotiate("image/webp,*/*") == ["webp", "jpeg"]
+        assert image_encoder.negotiate("") == ["jpeg"]
+        assert image_encoder.negotiate("image/avif;q=0, image/webp") == ["webp", "jpeg"]
+        assert image_encoder.negotiate("image/avif;q=0.5, image/webp, */*;q=0.8") == ["webp", "jpeg", "avif"]
+        assert image_encoder.negotiate("image/avif, image/webp, image/*;q=0.8, */*;q=0.5") == ["avif", "webp", "jpeg"]
+        assert image_encoder.negotiate("image/webp, image/jpeg;q=0") == ["webp"]
+        # Wildcards alone do not promise AVIF/WebP support
+        assert image_encoder.negotiate("image/*") == ["jpeg"]
+    finally:
+        image_encoder._formats = original_formats
+    print("✅ Derivative format negotiated by q-value")
+
+
+def test_variant_urls():
+    """thumb/preview/full URLs for stored images only, under IMAGE_PUBLIC_BASE_URL when set"""
+    urls = image_store.variant_urls("/static/images/img_0123456789abcdef.png")
+    assert urls == {variant: f"/api/v1/images/img_0123456789abcdef?variant={variant}" for variant in ("thumb", "preview", "full")}
+    assert image_store.variant_urls("https://cdn.example.com/other/photo.png") == {}
+    assert image_store.variant_urls("") == {}
+
+    original, settings.image_public_base_url = settings.image_public_base_url, "https://cdn.example.com/"
+    try:
+        assert image_store.variant_urls("https://cdn.example.com/static/images/img_ab.png")["thumb"] == \
+            "https://cdn.example.com/api/v1/images/img_ab?variant=thumb"
+    finally:
+        settings.image_public_base_url = original
+    print("✅ Derivative URLs built for stored images")
+
+
+def test_images_endpoint_serves_negotiated_derivative():
+    """/api/v1/images serves the best accepted derivative, or the source render before derivatives exist"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    async def store_render(store: ImageStore) -> str:
+        url = await store.save_base64(_png_base64())
+        await asyncio.gather(*store._derivative_tasks)
+        return url
+
+    original_backend = image_store._backend
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_store._backend = LocalDiskBackend(temp_dir)
+        try:
+            image_id = Path(asyncio.run(store_render(image_store))).stem
+            client = TestClient(app)
+            for accept in ("image/avif,image/webp,*/*", "image/webp,*/*", "image/avif;q=0, image/webp", "*/*"):
+                best = image_encoder.negotiate(accept)[0]
+                response = client.get(f"/api/v1/images/{image_id}?variant=thumb", headers={"Accept": accept})
+                assert response.status_code == 200 and response.headers["content-type"] == f"image/{best}"
+            full = client.get(f"/api/v1/images/{image_id}?variant=full", headers={"Accept": "*/*"})
+            thumb = client.get(f"/api/v1/images/{image_id}?variant=thumb", headers={"Accept": "*/*"})
+            assert len(thumb.content) < len(full.content)
+
+            # Until derivatives exist the untouched source render is served
+            for derivative in Path(temp_dir).glob(f"{image_id}.*.*"):
+                derivative.unlink()
+            assert client.get(f"/api/v1/images/{image_id}", headers={"Accept": "image/webp"}).headers["content-type"] == "image/png"
+            assert client.get(f"/api/v1/images/{image_id}?variant=huge").status_code == 400
+        finally:
+            image_store._backend = original_backend
+    print("✅ /api/v1/images serves the negotiated derivative")
+
+
+if __name__ == "__main__":
+    test_parse_accept()
+    test_negotiate_honors_q_values()
+    test_variant_urls()
+    test_images_endpoint_serves_negotiated_derivative()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Image Store Test
+Checks that storage backends must implement the whole interface, that identical renders
+share one content-addressed key and file, and that save_base64 never leaves a
+half-written image behind.
+"""
+
+import asyncio
+import base64
+import io
+import tempfile
+from pathlib import Path
+import pytest
+from app.services.image_store import ImageStore, ImageStoreBackend, LocalDiskBackend
+
+
+def _png_base64(color=(200, 40, 40), size=(640, 480)) -> str:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def test_backend_interface_is_abstract():
+    """Backends must implement every storage method"""
+    with pytest.raises(TypeError):
+        ImageStoreBackend()
+
+    class WriteOnlyBackend(ImageStoreBackend):
+        def write(self, key, chunks):
+            return 0
+
+    with pytest.raises(TypeError):
+        WriteOnlyBackend()
+    print("✅ ImageStoreBackend is abstract")
+
+
+def test_content_key_dedup_and_atomic_save():
+    """Identical images share a key and one file; a failed decode leaves nothing behind"""
+    async def scenario(root: Path):
+        store = ImageStore(LocalDiskBackend(str(root)))
+        red, blue = _png_base64(), _png_base64(color=(40, 40, 200))
+        assert store.content_key(red) == store.content_key(red) != store.content_key(blue)
+        assert store.content_key(red, "jpg").endswith(".jpg")
+
+        first, again = await store.save_base64(red), await store.save_base64(red)
+        other = await store.save_base64(blue)
+        assert first == again == f"/static/images/{store.content_key(red)}" and other != first
+        await asyncio.gather(*store._derivative_tasks)
+        assert sorted(path.name for path in root.glob("img_*.png")) == sorted([store.content_key(red), store.content_key(blue)])
+
+        # Corrupt data after the first decoded chunk: the partial temp file is removed
+        broken = "A" * (64 * 1024 * 4) + "!!!!"
+        with pytest.raises(ValueError):
+            await store.save_base64(broken)
+        assert not store.backend.exists(store.content_key(broken))
+        assert list(root.glob(".*.tmp")) == []
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        asyncio.run(scenario(Path(temp_dir)))
+    print("✅ Content-addressed keys dedupe and writes are atomic")
+
+
+if __name__ == "__main__":
+    test_backend_interface_is_abstract()
+    test_content_key_dedup_and_atomic_save()
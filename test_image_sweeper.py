@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Image Sweeper Test
+Checks that a sweep evicts idle images and then the least recently used ones until
+static/images is under its size quota, and that touch() (called on the event loop for
+every image read) is never blocked by the sweep's filesystem work.
+"""
+
+import tempfile
+import threading
+import time
+from pathlib import Path
+from app.config.settings import settings
+from app.services.image_sweeper import ImageSweeper
+
+
+def _sweeper(root: Path) -> ImageSweeper:
+    """Sweeper over a temporary image root holding three 1000-byte renders."""
+    (root / "uploads").mkdir(parents=True)
+    sweeper = ImageSweeper(root, root / ".image_index.json")
+    for name in ("old.png", "cold.png", "hot.png"):
+        (root / name).write_bytes(b"\0" * 1000)
+        sweeper.record(name, 1000)
+    return sweeper
+
+
+def test_sweep_evicts_by_age_then_lru():
+    """Idle files go first, then the least recently used until under the size quota"""
+    original = settings.image_max_age_hours, settings.image_store_max_mb
+    settings.image_max_age_hours, settings.image_store_max_mb = 1.0, 1500 / 1024 / 1024
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            sweeper = _sweeper(root)
+            sweeper._entries["old.png"]["last_access"] = time.time() - 2 * 3600
+            sweeper._entries["cold.png"]["last_access"] = time.time() - 60
+            sweeper.touch("hot.png")
+
+            summary = sweeper.sweep()
+            assert (summary["files_evicted"], summary["bytes_reclaimed"], summary["bytes_tracked"]) == (2, 2000, 1000)
+            assert sorted(path.name for path in root.glob("*.png")) == ["hot.png"]
+
+            # The persisted index survives a restart; untracked files are picked up by a sweep
+            (root / "uploads" / "new.jpg").write_bytes(b"\0" * 10)
+            restarted = ImageSweeper(root, root / ".image_index.json")
+            assert restarted.sweep()["files_tracked"] == 2
+            assert set(restarted._entries) == {"hot.png", "uploads/new.jpg"}
+    finally:
+        settings.image_max_age_hours, settings.image_store_max_mb = original
+    print("✅ Sweep evicts idle, then least recently used images")
+
+
+def test_touch_not_blocked_by_sweep():
+    """touch() completes while a sweep is busy with the filesystem"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sweeper = _sweeper(Path(temp_dir))
+        list_files = sweeper._list_files
+        touched = threading.Event()
+
+        def slow_list_files():
+            # Simulates a slow directory listing: an image read arrives meanwhile
+            reader = threading.Thread(target=lambda: (sweeper.touch("hot.png"), touched.set()))
+            reader.start()
+            reader.join(timeout=2)
+            return list_files()
+
+        sweeper._list_files = slow_list_files
+        sweeper.sweep()
+        assert touched.is_set()
+    print("✅ touch() does not wait for a running sweep")
+
+
+if __name__ == "__main__":
+    test_sweep_evicts_by_age_then_lru()
+    test_touch_not_blocked_by_sweep()
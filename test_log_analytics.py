@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Streaming Log Analytics Test
+Checks that monitor_logs_enhanced.py parses loguru text and JSON-lines logs (including
+rotated .zip archives), derives per-endpoint and per-stage rates, error rates and latency
+from access lines and [ID: ...] markers within a rolling window, and follows a log
+directory across appends and a day rotation.
+"""
+
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from monitor_logs_enhanced import LogAnalytics, LogFollower, parse_line, read_lines
+
+TEXT_LOG = """\
+2025-08-26 08:18:09 | INFO     | app.services.brief_orchestrator:extract_and_autofill:48 | 🎬 Starting extraction workflow [ID: 42]
+2025-08-26 08:18:09 | INFO     | app.services.ai_client:extract_wizard_data:46 | 🔍 Starting wizard data extraction [ID: 5477]
+2025-08-26 08:18:10 | ERROR    | app.services.ai_client:extract_wizard_data:209 | 💥 Critical error in wizard data extraction [ID: 5477]
+Traceback (most recent call last):
+2025-08-26 08:18:12 | INFO     | app.services.brief_orchestrator:extract_and_autofill:90 | 🎉 Extraction workflow completed successfully [ID: 42]
+2025-08-26 08:18:12 | INFO     | app.main:account_usage:147 | 🌐 POST /api/v1/extract-and-fill → 200 in 3012ms [ID: 9f2c]
+2025-08-26 08:18:20 | INFO     | app.main:account_usage:147 | 🌐 POST /api/v1/extract-and-fill → 503 in 40ms [ID: 9f2d]
+2025-08-26 08:30:00 | INFO     | app.main:account_usage:147 | 🌐 GET /api/v1/briefs/{brief_id} → 200 in 3ms [ID: 9f2e]
+"""
+
+JSON_LINE = ('{"ts": "2026-10-18T21:52:51.445+00:00", "level": "INFO", "logger": "app.main", "function": "account_usage", '
+             '"line": 147, "message": "🌐 GET /api/v1/health → 200 in 2ms [ID: ab12]", "endpoint": "/api/v1/health", '
+             '"method": "GET", "status_code": 200, "duration_ms": 1.6}')
+
+
+def test_parse_and_analyze():
+    """Text, JSON and zipped logs give rolling endpoint and stage statistics"""
+    assert parse_line("Traceback (most recent call last):") is None
+    event = parse_line(JSON_LINE)
+    assert event["endpoint"] == "/api/v1/health" and event["duration_ms"] == 1.6 and event["request_id"] == "ab12"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = os.path.join(tmp, "photoeai_2025-08-26.log.zip")
+        with zipfile.ZipFile(archive, "w") as z:
+            z.writestr("photoeai_2025-08-26.log", TEXT_LOG)
+        events = [e for e in (parse_line(line) for line in read_lines(archive)) if e is not None]
+    assert len(events) == 7
+
+    analytics = LogAnalytics(window_seconds=300)
+    for event in events:
+        analytics.feed(event)
+    totals = analytics.snapshot(totals=True)
+    endpoint = totals["endpoints"]["POST /api/v1/extract-and-fill"]
+    assert endpoint["count"] == 2 and endpoint["error_rate"] == 0.5 and endpoint["p99_ms"] == 5000
+    assert totals["stages"]["brief_orchestrator:extract_and_autofill"]["p50_ms"] == 5000  # 3 s → ≤5000 ms bucket
+    assert totals["stages"]["ai_client:extract_wizard_data"]["error_rate"] == 1.0
+    assert totals["levels"] == {"INFO": 6, "ERROR": 1}
+
+    window = analytics.snapshot()  # last 5 minutes before 08:30:00 only hold the brief read
+    assert list(window["endpoints"]) == ["GET /api/v1/briefs/{brief_id}"] and window["stages"] == {}
+
+    idle = LogAnalytics(span_timeout=60)
+    idle.feed(parse_line(TEXT_LOG.splitlines()[0]))
+    idle.feed(parse_line("2025-08-26 08:30:00 | INFO     | app.services.prompt_composer:autofill_wizard_input:20 | 🔧 Starting autofill process [ID: 7]"))
+    assert idle.snapshot()["abandoned_spans"] == 1 and idle.snapshot()["open_spans"] == 1
+    print("✅ Log analytics derive endpoint and stage statistics from text, JSON and zipped logs")
+
+
+def test_follow_across_rotation():
+    """The follower tails appended lines and moves to the next day's file"""
+    with tempfile.TemporaryDirectory() as tmp:
+        first = os.path.join(tmp, "photoeai_2026-10-17.jsonl")
+        with open(first, "w", encoding="utf-8") as f:
+            f.write("old line\n")
+        follower = LogFollower(tmp, poll_interval=0.05)
+        lines = []
+
+        def collect():
+            for line in follower.follow(idle_timeout=1.0):
+                if line is not None:
+                    lines.append(line)
+
+        reader = threading.Thread(target=collect)
+        reader.start()
+        time.sleep(0.2)
+        with open(first, "a", encoding="utf-8") as f:
+            f.write(JSON_LINE + "\npartial")
+        time.sleep(0.2)
+        with open(first, "a", encoding="utf-8") as f:
+            f.write(" line\n")
+        time.sleep(0.2)
+        with open(os.path.join(tmp, "photoeai_2026-10-18.jsonl"), "w", encoding="utf-8") as f:
+            f.write(JSON_LINE + "\n")
+        reader.join(timeout=5)
+        assert lines == [JSON_LINE + "\n", "partial line\n", JSON_LINE + "\n"]
+    print("✅ Follower tails appends and follows rotation")
+
+
+if __name__ == "__main__":
+    test_parse_and_analyze()
+    test_follow_across_rotation()
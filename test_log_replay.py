@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Log Replay Test
+Checks that benchmark_replay.py turns text logs (router entry lines) and JSON-lines logs
+(access lines joined with entry lines by request_id) into a workload with the original
+arrival offsets, endpoint mix and prompt lengths, schedules it with capped and compressed
+gaps, and replays it offline against the app backed by the mock upstream.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from benchmark_replay import build_workload, schedule, summarize_workload, synthesize_prompt
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+TEXT_LOG = """\
+2025-08-23 22:50:34 | INFO     | app.routers.generator:generate_image:308 | 🌟 [FRONTEND REQUEST] Generate image - Prompt length: 630 chars
+2025-08-23 22:50:40 | INFO     | app.routers.generator:extract_and_fill:55 | 🌟 [FRONTEND REQUEST] Extract and fill: 'foto botol air Bisleri besar...'
+2025-08-23 22:50:41 | INFO     | app.services.brief_orchestrator:extract_and_autofill:48 | 🎬 Starting extraction workflow [ID: 2260727658320]
+2025-08-23 22:51:00 | INFO     | app.routers.generator:generate_brief_and_image:817 | 🚀 [UNIFIED] Starting brief + image generation
+2025-08-23 22:51:05 | INFO     | app.routers.generator:generate_image:541 | 🌟 [FRONTEND REQUEST] Generate image - Prompt length: 120 chars
+2025-08-23 22:52:00 | INFO     | app.routers.generator:generate_image:541 | 🌟 [FRONTEND REQUEST] Generate image - Prompt length: 11173 chars
+"""
+
+
+def _json_line(ts: str, function: str, message: str, **fields) -> str:
+    return json.dumps({"ts": ts, "level": "INFO", "logger": f"app.routers.{'generator' if function != 'account_usage' else 'main'}",
+                       "function": function, "line": 1, "message": message, **fields}, ensure_ascii=False)
+
+
+JSON_LOG = "\n".join([
+    _json_line("2026-10-18T10:00:00.500+00:00", "extract_and_fill",
+               "🌟 [FRONTEND REQUEST] Extract and fill (57 chars): 'mug...'", request_id="r-0001"),
+    _json_line("2026-10-18T10:00:01.000+00:00", "account_usage", "🌐 POST /api/v1/extract-and-fill → 200 in 800ms [ID: r-0001]",
+               request_id="r-0001", endpoint="/api/v1/extract-and-fill", method="POST", status_code=200, duration_ms=800.0),
+    _json_line("2026-10-18T10:00:03.000+00:00", "account_usage", "🌐 GET /api/v1/health → 200 in 2ms [ID: r-0002]",
+               request_id="r-0002", endpoint="/api/v1/health", method="GET", status_code=200, duration_ms=2.0),
+]) + "\n"
+
+
+def test_workload_from_text_and_json_logs():
+    """Entry lines and access lines become requests with offsets, mix and prompt lengths"""
+    with tempfile.TemporaryDirectory() as tmp:
+        text_path = os.path.join(tmp, "photoeai_2025-08-23.log")
+        json_path = os.path.join(tmp, "photoeai_2026-10-18.jsonl")
+        with open(text_path, "w", encoding="utf-8") as f:
+            f.write(TEXT_LOG)
+        with open(json_path, "w", encoding="utf-8") as f:
+            f.write(JSON_LOG)
+
+        legacy = build_workload([text_path])["requests"]
+        assert [(r["path"], r["prompt_chars"], r["at"]) for r in legacy] == [
+            ("/api/v1/generate-image", 630, 0.0),
+            ("/api/v1/extract-and-fill", 28, 6.0),           # older lines only show a preview
+            ("/api/v1/generate-brief-and-image", None, 26.0),  # its nested generate_image line is not a request
+            ("/api/v1/generate-image", 11173, 86.0),
+        ]
+
+        access = build_workload([json_path])["requests"]
+        assert [(r["method"], r["path"], r["prompt_chars"], r["at"], r["status"]) for r in access] == [
+            ("POST", "/api/v1/extract-and-fill", 57, 0.0, 200),  # arrival = access line time - duration
+            ("GET", "/api/v1/health", None, 2.798, 200),
+        ]
+
+        summary = summarize_workload(build_workload([json_path, text_path]))
+        assert summary["requests"] == 6
+        assert summary["endpoints"]["POST /api/v1/generate-image"]["count"] == 2
+        assert summary["endpoints"]["POST /api/v1/generate-image"]["prompt_chars"]["max"] == 11173
+
+    assert schedule([{"at": 0}, {"at": 6}, {"at": 3606}], speed=2, max_gap=60) == [0.0, 3.0, 33.0]
+    assert [len(synthesize_prompt(chars, 3)) for chars in (0, 1, 630, 11173)] == [0, 1, 630, 11173]
+    assert synthesize_prompt(80, 0) != synthesize_prompt(80, 1)
+    print("✅ Text and JSON logs become a replay workload")
+
+
+def test_replay_offline():
+    """A recorded workload replays against the app and the mock upstream"""
+    tmp = tempfile.mkdtemp()
+    workload_path = os.path.join(tmp, "workload.json")
+    report_path = os.path.join(tmp, "replay.json")
+    workload = {"source": ["test"], "requests": [
+        {"at": 0.0, "method": "POST", "path": "/api/v1/extract-and-fill", "prompt_chars": 57, "status": 200, "duration_ms": 800.0},
+        {"at": 0.5, "method": "POST", "path": "/api/v1/generate-image", "prompt_chars": 630},
+        {"at": 0.5, "method": "GET", "path": "/api/v1/health", "prompt_chars": None},
+        {"at": 9.0, "method": "POST", "path": "/api/v1/generate-brief-from-prompt", "prompt_chars": 100},
+        {"at": 9.2, "method": "GET", "path": "/static/app.js", "prompt_chars": None},
+    ]}
+    with open(workload_path, "w", encoding="utf-8") as f:
+        json.dump(workload, f)
+
+    env = {k: v for k, v in os.environ.items() if not k.startswith(("OPENAI_", "IMAGE_API_"))}
+    result = subprocess.run(
+        [sys.executable, "benchmark_replay.py", "--workload", workload_path, "--max-gap", "1", "--speed", "4",
+         "--latency-scale", "0", "--seed", "1", "--json", report_path],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, timeout=600,
+    )
+    print(result.stdout)
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    with open(report_path, encoding="utf-8") as f:
+        report = json.load(f)
+    assert report["replay"]["sent"] == 4 and report["skipped"] == {"GET /static/app.js": 1}
+    assert report["replay"]["scheduled_seconds"] == 0.425  # gaps 0.5 + 0 + 1 (capped) + 0.2, at 4x
+    assert all(r["succeeded"] == r["requests"] for r in report["results"]), report["results"]
+    extract = next(r for r in report["results"] if r["endpoint"] == "POST /api/v1/extract-and-fill")
+    assert extract["original_p50_ms"] == 800.0
+    assert report["mock"]["requests"]["chat"] > 0 and report["mock"]["images"] > 0
+    print("✅ Workload replayed offline")
+
+
+if __name__ == "__main__":
+    test_workload_from_text_and_json_logs()
+    test_replay_offline()
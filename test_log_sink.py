@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Queued Log Sink Test & Throughput Benchmark
+Checks that log records reach the daily JSON-lines file with extra fields flattened and
+oversized fields capped, that verbose events are sampled while warnings never are, that
+a full queue drops instead of blocking, and compares log-call cost with logging off,
+synchronous and queued (benchmark_logging.py).
+"""
+
+import json
+import tempfile
+from pathlib import Path
+from loguru import logger
+from app.services.log_sink import LogSink
+from benchmark_logging import format_report, run_benchmark
+
+
+def test_log_sink_writes_capped_sampled_json():
+    """JSON lines carry flattened extras; caps, sampling and load shedding apply"""
+    with tempfile.TemporaryDirectory() as tmp:
+        sink = LogSink(directory=tmp, console=None, field_max_chars=100, sample_rate=0.0)
+        sink.install(level="DEBUG")
+        logger.info("🎉 Brief generation completed [ID: abc]", extra={"request_id": "abc", "status": "success"})
+        logger.bind(verbose=True).info("📝 ENHANCED BRIEF PREVIEW: " + "x" * 800)
+        logger.debug("🔧 sampled away")
+        logger.warning("⚠️ " + "w" * 500)
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("💥 failed")
+        logger.remove()  # stops the writer thread after draining
+
+        events = [json.loads(line) for path in Path(tmp).glob("photoeai_*.jsonl") for line in path.read_text(encoding="utf-8").splitlines()]
+        assert [event["level"] for event in events] == ["INFO", "WARNING", "ERROR"]
+        assert events[0]["request_id"] == "abc" and events[0]["status"] == "success"
+        assert events[0]["function"] == "test_log_sink_writes_capped_sampled_json"
+        assert events[1]["message"].endswith("[+403 chars]")
+        assert "ValueError: boom" in events[2]["exception"]
+        assert sink.stats()["sampled_out"] == 2 and sink.stats()["fields_truncated"] == 1
+
+        full = LogSink(directory=tmp, console=None, queue_size=3, flush_interval=60)
+        full.install()
+        for index in range(10):
+            logger.info(f"event {index}")
+        assert full.stats()["dropped"] == 7
+        logger.remove()
+        assert full.stats()["written"] == 3
+    print("✅ Queued sink writes capped JSON lines, samples verbose events and sheds load")
+
+
+def test_logging_throughput_benchmark():
+    """Queued log calls cost the event loop less than synchronous sinks"""
+    results = [run_benchmark(mode, requests=500) for mode in ("off", "sync", "queued")]
+    print(format_report(results))
+    off, sync, queued = results
+    assert queued["log_calls"] == sync["log_calls"] == off["log_calls"]
+    assert queued["sink"]["written"] + queued["sink"]["sampled_out"] >= 500 * 4
+    assert queued["requests_per_second"] > sync["requests_per_second"]
+
+
+if __name__ == "__main__":
+    test_log_sink_writes_capped_sampled_json()
+    test_logging_throughput_benchmark()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Offline Benchmark Harness Test
+Runs every endpoint against mock_openai_server.py (no network, no API key) and checks
+that each one succeeds and that the mock's error injection is retried or surfaced.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from fastapi.testclient import TestClient
+from mock_openai_server import MockConfig, create_mock_app, parse_latency
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_mock_error_injection():
+    """Injected 429s carry Retry-After; latency specs are validated"""
+    client = TestClient(create_mock_app(MockConfig(latency_scale=0, error_rate=1.0, error_statuses="429")))
+    response = client.post("/v1/images/generations", json={"prompt": "mug", "n": 2})
+    assert response.status_code == 429 and response.headers["Retry-After"] == "1"
+
+    client = TestClient(create_mock_app(MockConfig(latency_scale=0)))
+    images = client.post("/v1/images/generations", json={"prompt": "mug", "n": 2}).json()["data"]
+    assert len(images) == 2 and images[0]["b64_json"]
+    assert client.get("/mock/stats").json()["images"] == 2
+
+    assert parse_latency("chat=fixed:5")["chat"] == ("fixed", (5.0,))
+    try:
+        parse_latency("chat=gaussian:5")
+        raise AssertionError("invalid latency spec accepted")
+    except ValueError:
+        pass
+    print("✅ Mock error injection and latency specs OK")
+
+
+def test_benchmark_all_endpoints_offline():
+    """Every endpoint in app/routers has a scenario and succeeds against the mock"""
+    report_path = os.path.join(tempfile.mkdtemp(), "report.json")
+    env = {k: v for k, v in os.environ.items() if not k.startswith(("OPENAI_", "IMAGE_API_"))}
+    result = subprocess.run(
+        [sys.executable, "benchmark_endpoints.py", "--requests", "3", "--concurrency", "2",
+         "--latency-scale", "0", "--seed", "1", "--json", report_path],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, timeout=600,
+    )
+    print(result.stdout)
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    with open(report_path, encoding="utf-8") as f:
+        report = json.load(f)
+    assert report["uncovered"] == [], f"Endpoints without a scenario: {report['uncovered']}"
+    failed = [r["endpoint"] for r in report["results"] if r["succeeded"] != r["requests"]]
+    assert failed == [], f"Endpoints failing against the mock: {failed}"
+    assert all(r["p99_ms"] >= r["p50_ms"] > 0 for r in report["results"])
+    assert report["mock"]["requests"]["chat"] > 0 and report["mock"]["images"] > 0
+    print(f"✅ {len(report['results'])} endpoints benchmarked offline")
+
+
+if __name__ == "__main__":
+    test_mock_error_injection()
+    test_benchmark_all_endpoints_offline()
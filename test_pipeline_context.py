@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Pipeline Context Test
+Against the mock upstream: a brief from /generate-brief-from-prompt is referenced by its
+brief_id in /generate-image, which then sends no chat requests (extraction and enhancement
+are reused, compression runs at most once per brief), while a plain brief_prompt still pays
+for both stages. Unknown brief ids are answered with 404.
+"""
+
+import tempfile
+from fastapi.testclient import TestClient
+from mock_openai_server import MockConfig, MockServer
+from app.config.settings import settings
+from app.main import app
+from app.routers.generator import openai_service, orchestrator
+from app.services.image_store import LocalDiskBackend, image_store
+from app.services.pipeline_context import pipeline_contexts
+
+PROMPT = "A ceramic mug on a marble counter"
+
+
+def test_brief_id_skips_extraction_and_enhancement():
+    """/generate-image with a brief_id reuses the brief's artifacts instead of calling the chat API"""
+    server = MockServer(MockConfig(latency_scale=0)).start()
+    original = (settings.openai_base_url, settings.brief_store_dir, openai_service.api_base_url, image_store._backend)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        settings.openai_base_url = openai_service.api_base_url = server.base_url
+        settings.brief_store_dir, image_store._backend = temp_dir, LocalDiskBackend(temp_dir)
+        orchestrator.ai_client._client = None
+        try:
+            client = TestClient(app)
+
+            def chat_calls():
+                return server.stats.snapshot()["requests"]["chat"]
+
+            brief = client.post("/api/v1/generate-brief-from-prompt", json={"user_request": PROMPT})
+            assert brief.status_code == 200, brief.text
+            brief_id = brief.json()["brief_id"]
+            assert client.get(f"/api/v1/briefs/{brief_id}").text == brief.json()["final_prompt"]
+
+            skipped, calls = pipeline_contexts.stats()["stages_skipped"], chat_calls()
+            for _ in range(2):
+                image = client.post("/api/v1/generate-image", json={"brief_id": brief_id, "user_api_key": "sk-test"})
+                assert image.status_code == 200, image.text
+                assert image.json()["final_enhanced_prompt"] == brief.json()["final_prompt"]
+            after = pipeline_contexts.stats()["stages_skipped"]
+            assert chat_calls() == calls
+            assert (after["extract"] - skipped["extract"], after["brief"] - skipped["brief"]) == (2, 2)
+            assert after["compress"] - skipped["compress"] == 1  # the second request reuses the generation prompt
+
+            # Without a brief_id the same request extracts and enhances again
+            image = client.post("/api/v1/generate-image", json={"brief_prompt": PROMPT, "user_api_key": "sk-test"})
+            assert image.status_code == 200, image.text
+            assert chat_calls() >= calls + 2
+
+            unknown = client.post("/api/v1/generate-image", json={"brief_id": "brief_0000000000000000", "user_api_key": "sk-test"})
+            assert unknown.status_code == 404
+        finally:
+            settings.openai_base_url, settings.brief_store_dir, openai_service.api_base_url, image_store._backend = original
+            orchestrator.ai_client._client = None
+            server.stop()
+    print("✅ brief_id reuse skips extraction and enhancement")
+
+
+if __name__ == "__main__":
+    test_brief_id_skips_extraction_and_enhancement()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Upstream Rate Limiter Test
+Checks the fair scheduler behind the upstream rate limiter: calls that wait too long time
+out and leave the queue, a caller cancelled right as its call is admitted hands the slot
+back instead of leaking it, a heavy client's backlog does not delay a light client, and
+backlogged flows are served in proportion to their weights (batch jobs get a lower share).
+"""
+
+import asyncio
+import pytest
+from app.config.settings import settings
+from app.services.rate_limiter import FairScheduler, UpstreamRateLimiter
+
+
+def _scheduler(concurrency: int = 1) -> FairScheduler:
+    return FairScheduler("chat", rpm=6000, tpm=None, concurrency=concurrency, key_share=1.0, key_concurrency=concurrency)
+
+
+def test_queue_timeout():
+    """A call not admitted within the timeout fails and leaves no trace in the queue"""
+    async def scenario():
+        scheduler = _scheduler()
+        held = await scheduler.acquire("a", 1, 1.0, timeout=1)
+        with pytest.raises(asyncio.TimeoutError):
+            await scheduler.acquire("b", 1, 1.0, timeout=0.05)
+        assert (scheduler.queued, scheduler.active, scheduler.rejected_total, scheduler.cancelled_total) == (0, 1, 1, 0)
+        scheduler.release(held)
+        assert scheduler.active == 0
+
+    asyncio.run(scenario())
+    print("✅ Queue timeouts are rejected and dequeued")
+
+
+def test_cancel_during_handoff_releases_slot():
+    """Cancelling a caller whose call was just admitted frees the slot again"""
+    async def scenario():
+        scheduler = _scheduler()
+        held = await scheduler.acquire("a", 1, 1.0, timeout=None)
+        waiter = asyncio.create_task(scheduler.acquire("b", 1, 1.0, timeout=None))
+        await asyncio.sleep(0)
+        assert scheduler.queued == 1
+
+        scheduler.release(held)  # dispatches the waiting call: its lease is resolved ...
+        assert scheduler.active == 1 and scheduler.queued == 0
+        waiter.cancel()          # ... but its caller goes away before it resumes
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert (scheduler.active, scheduler.cancelled_total, scheduler.rejected_total) == (0, 1, 0)
+
+        held = await scheduler.acquire("a", 1, 1.0, timeout=None)
+        queued = asyncio.create_task(scheduler.acquire("c", 1, 1.0, timeout=None))
+        await asyncio.sleep(0)
+        queued.cancel()          # cancelled while still queued: only dequeued
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert (scheduler.active, scheduler.queued, scheduler.cancelled_total) == (1, 0, 2)
+        scheduler.release(held)
+        lease = await scheduler.acquire("d", 1, 1.0, timeout=1)  # the slot is usable again
+        assert scheduler.active == 1
+        scheduler.release(lease)
+
+    asyncio.run(scenario())
+    print("✅ Cancellation during handoff does not leak concurrency slots")
+
+
+def test_fair_order_between_clients():
+    """A light client is served between the calls of a heavy client's backlog"""
+    async def scenario():
+        scheduler = _scheduler()
+        order = []
+
+        async def call(key: str):
+            lease = await scheduler.acquire(key, 1, 1.0, timeout=5)
+            order.append(key)
+            await asyncio.sleep(0)
+            scheduler.release(lease)
+
+        held = await scheduler.acquire("warmup", 1, 1.0, timeout=1)
+        tasks = [asyncio.create_task(call(key)) for key in ("heavy", "heavy", "heavy", "light")]
+        await asyncio.sleep(0)
+        scheduler.release(held)
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["heavy", "light", "heavy", "heavy"]
+    print("✅ Start-time fair queuing interleaves clients")
+
+
+def test_weighted_share_between_flows():
+    """With both flows backlogged, a flow of weight 0.25 gets one call for every four of a weight-1 flow"""
+    async def scenario():
+        scheduler = _scheduler()
+        order = []
+
+        async def call(key: str, weight: float):
+            lease = await scheduler.acquire(key, 1, weight, timeout=5)
+            order.append(key)
+            await asyncio.sleep(0)
+            scheduler.release(lease)
+
+        held = await scheduler.acquire("warmup", 1, 1.0, timeout=1)
+        tasks = [asyncio.create_task(call("interactive", 1.0)) for _ in range(10)]
+        tasks += [asyncio.create_task(call("batch", 0.25)) for _ in range(10)]
+        await asyncio.sleep(0)
+        scheduler.release(held)
+        await asyncio.gather(*tasks)
+        return order
+
+    order = asyncio.run(scenario())
+    assert order[:10].count("interactive") == 8 and order[:10].count("batch") == 2
+    assert order.count("batch") == 10  # a lower weight slows a flow down, it never starves it
+    print("✅ Flows are served in proportion to their weights")
+
+
+def test_client_scope_sets_flow_weight():
+    """Calls made in a weighted client_scope advance their flow by cost/weight"""
+    async def scenario():
+        limiter = UpstreamRateLimiter()
+        with limiter.client_scope("batch_0123456789ab", weight=0.25):
+            scheduler, lease = await limiter.acquire("chat", None, 100)
+        limiter.release((scheduler, lease))
+        with limiter.client_scope("203.0.113.7"):
+            _, interactive = await limiter.acquire("chat", None, 100)
+        return lease, interactive
+
+    original = settings.rate_limit_enabled
+    settings.rate_limit_enabled = True
+    try:
+        batch, interactive = asyncio.run(scenario())
+    finally:
+        settings.rate_limit_enabled = original
+    assert batch.flow.last_finish - batch.start_tag == 400
+    assert interactive.flow.last_finish - interactive.start_tag == 100
+    print("✅ client_scope weights reach the fair scheduler")
+
+
+if __name__ == "__main__":
+    test_queue_timeout()
+    test_cancel_during_handoff_releases_slot()
+    test_fair_order_between_clients()
+    test_weighted_share_between_flows()
+    test_client_scope_sets_flow_weight()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Upstream Resilience Test
+Checks that upstream failures are classified correctly, that only transient ones are
+retried (honoring Retry-After and giving up when it is too long), that the retry budget
+caps retries per upstream, and that circuit breakers open after repeated infrastructure
+failures, admit a single half-open probe and close again once it succeeds. Against the
+mock upstream, API requests retry 5xx answers and map failures to 503/502, an open
+circuit is answered with 503 and Retry-After, and a silent images API times out.
+"""
+
+import asyncio
+import time
+from email.utils import formatdate
+from types import SimpleNamespace
+import pytest
+import app.services.resilience as resilience_module
+from app.config.settings import settings
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakerRegistry
+from app.services.resilience import (
+    CLIENT_ERROR, CONNECTION, QUOTA_EXHAUSTED, RATE_LIMITED, SERVER_ERROR, TIMEOUT, UNKNOWN,
+    RETRY_POLICIES, CircuitOpenError, ResilienceService, RetryBudget, UpstreamError,
+    classify_error, retry_after_seconds,
+)
+
+
+class FakeStatusError(Exception):
+    """Shaped like openai.APIStatusError: a status code and the raw response."""
+
+    def __init__(self, status_code: int, headers: dict = None, code: str = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {}, json=lambda: {"error": {"code": code}})
+
+
+class APITimeoutError(Exception):
+    pass
+
+
+def _flaky(*failures):
+    """Blocking callable that raises the given exceptions in turn, then returns "ok"."""
+    calls = []
+
+    def func():
+        calls.append(len(calls))
+        if len(calls) <= len(failures):
+            raise failures[len(calls) - 1]
+        return "ok"
+    return func, calls
+
+
+def _run(service: ResilienceService, func, upstream: str = "chat"):
+    """Run a call with no backoff sleeps, rate limiting off and fresh circuit breakers."""
+    original = settings.rate_limit_enabled, resilience_module.circuit_breakers
+    settings.rate_limit_enabled, resilience_module.circuit_breakers = False, CircuitBreakerRegistry()
+    service.backoff_delay = lambda policy, attempt, retry_after=None: 0
+    try:
+        return asyncio.run(service.call(upstream, func))
+    finally:
+        settings.rate_limit_enabled, resilience_module.circuit_breakers = original
+
+
+def test_error_classification_and_retry_after():
+    """Status codes, OpenAI error codes and exception types map to error classes"""
+    assert classify_error(FakeStatusError(429)) == RATE_LIMITED
+    assert classify_error(FakeStatusError(429, code="insufficient_quota")) == QUOTA_EXHAUSTED
+    assert classify_error(FakeStatusError(503)) == SERVER_ERROR
+    assert classify_error(FakeStatusError(408)) == SERVER_ERROR
+    assert classify_error(FakeStatusError(400)) == CLIENT_ERROR
+    assert classify_error(APITimeoutError()) == TIMEOUT
+    assert classify_error(ConnectionResetError()) == CONNECTION
+    assert classify_error(ValueError("bad json")) == UNKNOWN
+
+    assert retry_after_seconds(FakeStatusError(429, {"retry-after-ms": "1500"})) == 1.5
+    assert retry_after_seconds(FakeStatusError(429, {"retry-after": "2"})) == 2.0
+    http_date = retry_after_seconds(FakeStatusError(429, {"retry-after": formatdate(time.time() + 20, usegmt=True)}))
+    assert 18 <= http_date <= 20
+    assert retry_after_seconds(FakeStatusError(429, {"retry-after": "soon"})) is None
+    assert retry_after_seconds(ValueError()) is None
+
+    # Retry-After is a floor for the backoff, spread by up to 20%
+    assert 2.0 <= ResilienceService.backoff_delay(RETRY_POLICIES[RATE_LIMITED], 1, 2.0) <= 2.4
+    assert 0 <= ResilienceService.backoff_delay(RETRY_POLICIES[SERVER_ERROR], 10) <= RETRY_POLICIES[SERVER_ERROR].max_delay
+    print("✅ Errors classified and Retry-After parsed")
+
+
+def test_call_retries_only_transient_failures():
+    """Transient failures are retried until success; permanent ones fail on the first attempt"""
+    service = ResilienceService()
+    func, calls = _flaky(FakeStatusError(503), ConnectionError())
+    assert _run(service, func) == "ok" and len(calls) == 3
+    assert service._retries == {("chat", SERVER_ERROR): 1, ("chat", CONNECTION): 1}
+
+    func, calls = _flaky(FakeStatusError(400))
+    with pytest.raises(UpstreamError) as error:
+        _run(service, func)
+    assert len(calls) == 1 and error.value.error_class == CLIENT_ERROR and not error.value.transient
+    assert (error.value.attempts, error.value.status_code) == (1, 400)
+
+    func, calls = _flaky(*[FakeStatusError(503)] * 5)
+    with pytest.raises(UpstreamError) as error:
+        _run(service, func)
+    assert len(calls) == RETRY_POLICIES[SERVER_ERROR].max_attempts and error.value.transient
+
+    # A Retry-After longer than RETRY_MAX_DELAY is not waited out: the client is told to come back
+    func, calls = _flaky(FakeStatusError(429, {"retry-after": str(settings.retry_max_delay + 30)}))
+    with pytest.raises(UpstreamError) as error:
+        _run(service, func)
+    assert len(calls) == 1 and error.value.retry_after == settings.retry_max_delay + 30
+    assert service._failures[("chat", RATE_LIMITED)] == 1
+    print("✅ Only transient failures are retried")
+
+
+def test_retry_budget():
+    """Retries stop once they exceed the budget's share of requests"""
+    budget = RetryBudget(ratio=0.2, min_per_second=0, window=10)
+    for _ in range(10):
+        budget.record_request()
+    assert [budget.try_spend() for _ in range(3)] == [True, True, False]
+    assert RetryBudget(ratio=0.2, min_per_second=0.5, window=10).try_spend()  # floor for quiet periods
+
+    original = settings.retry_budget_ratio, settings.retry_budget_min_per_second
+    settings.retry_budget_ratio, settings.retry_budget_min_per_second = 0.0, 0.0
+    try:
+        service = ResilienceService()
+        func, calls = _flaky(FakeStatusError(503))
+        with pytest.raises(UpstreamError) as error:
+            _run(service, func)
+    finally:
+        settings.retry_budget_ratio, settings.retry_budget_min_per_second = original
+    assert len(calls) == 1 and error.value.error_class == SERVER_ERROR
+    assert service._budget_exhausted == {"chat": 1}
+    print("✅ Retry budget caps retries")
+
+
+def test_circuit_breaker_transitions():
+    """closed → open after the threshold → half-open after the timeout → closed or re-opened by the probe"""
+    breaker = CircuitBreaker("test", failure_threshold=2, open_seconds=0.05)
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure("server_error HTTP 503")
+    assert breaker.state == CLOSED
+    breaker.record_failure("server_error HTTP 503")
+    assert breaker.state == OPEN and not breaker.allow() and breaker.retry_after() > 0
+
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN and breaker.retry_after() == 0
+    assert breaker.allow() and not breaker.allow()  # a single probe at a time
+    breaker.release_probe()                          # the probe was cancelled: admit another
+    assert breaker.allow()
+    breaker.record_failure("timeout")                # the probe failed: open again
+    assert breaker.state == OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+    snapshot = breaker.snapshot()
+    assert (snapshot["opened_total"], snapshot["rejected_total"], snapshot["consecutive_failures"]) == (2, 2, 0)
+
+    # A call to an upstream whose circuit is open fails fast without being sent
+    original = settings.rate_limit_enabled, resilience_module.circuit_breakers
+    settings.rate_limit_enabled, resilience_module.circuit_breakers = False, CircuitBreakerRegistry()
+    try:
+        open_breaker = resilience_module.circuit_breakers.get("chat")
+        for _ in range(open_breaker.failure_threshold):
+            open_breaker.record_failure("connection")
+        func, calls = _flaky()
+        with pytest.raises(CircuitOpenError) as error:
+            asyncio.run(ResilienceService().call("chat", func))
+    finally:
+        settings.rate_limit_enabled, resilience_module.circuit_breakers = original
+    assert calls == [] and error.value.transient and error.value.retry_after > 0
+    print("✅ Circuit breaker opens, probes and closes")
+
+
+def test_upstream_failures_through_the_api():
+    """A 5xx upstream is retried then answered with 503; a 4xx fails at once with 502"""
+    from fastapi.testclient import TestClient
+    from mock_openai_server import MockConfig, MockServer
+    from app.main import app
+    from app.routers.generator import orchestrator
+    from app.services.circuit_breaker import circuit_breakers
+
+    outcomes = {}
+    for status in ("503", "400"):
+        server = MockServer(MockConfig(latency_scale=0, error_rate=1.0, error_statuses=status)).start()
+        client_ai = orchestrator.ai_client
+        original_base_url, settings.openai_base_url, client_ai._client = settings.openai_base_url, server.base_url, None
+        try:
+            response = TestClient(app).post("/api/v1/extract-and-fill", json={"user_request": "A ceramic mug on marble"})
+            outcomes[status] = (response.status_code, response.json()["error_class"], server.stats.snapshot()["requests"]["chat"])
+        finally:
+            settings.openai_base_url, client_ai._client = original_base_url, None
+            server.stop()
+            circuit_breakers.get("chat").record_success()  # leave the shared breaker closed
+    assert outcomes == {
+        "503": (503, SERVER_ERROR, RETRY_POLICIES[SERVER_ERROR].max_attempts),
+        "400": (502, CLIENT_ERROR, 1),
+    }
+    print("✅ API requests retry transient upstream failures only")
+
+
+def test_open_circuit_answers_503_with_retry_after():
+    """Enhancement behind an open chat circuit fails fast with 503 and Retry-After"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.circuit_breaker import circuit_breakers
+
+    breaker = circuit_breakers.get("chat")
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure("server_error HTTP 503")
+    try:
+        response = TestClient(app).post("/api/v1/generate-brief", json={"product_name": "Ceramic mug", "user_request": "A ceramic mug on marble"})
+    finally:
+        breaker.record_success()  # leave the shared breaker closed
+    assert response.status_code == 503, response.text
+    assert int(response.headers["retry-after"]) > 0
+    print("✅ Open circuit on /generate-brief maps to 503 with Retry-After")
+
+
+def test_images_read_timeout():
+    """A silent images upstream fails after IMAGE_API_READ_TIMEOUT and counts as a timeout"""
+    from mock_openai_server import MockConfig, MockServer
+    from app.services.multi_provider_image_generator import OpenAIImageService
+
+    server = MockServer(MockConfig(latency="images=fixed:2000")).start()
+    original, settings.image_api_read_timeout = settings.image_api_read_timeout, 0.2
+    started = time.perf_counter()
+    try:
+        with pytest.raises(Exception) as error:
+            OpenAIImageService._post(f"{server.base_url}/images/generations", {"Authorization": "Bearer sk-test"},
+                                              json={"model": "gpt-image-1", "prompt": "A mug"})
+        elapsed = time.perf_counter() - started
+    finally:
+        settings.image_api_read_timeout = original
+        server.stop()
+    assert elapsed < 1.5
+    assert classify_error(error.value) == TIMEOUT
+    print("✅ Images API calls time out after IMAGE_API_READ_TIMEOUT")
+
+
+if __name__ == "__main__":
+    test_error_classification_and_retry_after()
+    test_call_retries_only_transient_failures()
+    test_retry_budget()
+    test_circuit_breaker_transitions()
+    test_upstream_failures_through_the_api()
+    test_open_circuit_answers_503_with_retry_after()
+    test_images_read_timeout()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Rule Extractor Test
+Checks that the local rule extractor reads labeled segments, client-sent fields, camera
+specifications and the defaults.json vocabulary with the right confidence, flags
+conflicting phrases as ambiguous, and that /extract-and-fill skips the extraction LLM call
+for fully structured requests and otherwise sends a partial schema with only the fields
+the rules could not settle (checked against the mock upstream).
+"""
+
+from app.services.ai_client import EXTRACTION_FIELDS, build_extraction_prompt
+from app.services.rule_extractor import FIELD_CONFIDENCE_FLOOR, rule_extractor
+
+STRUCTURED_REQUEST = (
+    "product_name: Aurora Desk Lamp; shot: low angle; framing: close-up; lighting: softbox; "
+    "background: white seamless; color: brushed brass"
+)
+
+
+def test_rules_vocabulary_and_confidence():
+    """Labels, specs and vocabulary phrases become fields; conflicts stay open for the LLM"""
+    rules = rule_extractor.extract(
+        "A matte black ceramic coffee mug on marble, shot on Canon EOS R5 with an 85mm f/1.4 at f/2.8, "
+        "ISO 100, 1/125, golden hour, for Instagram"
+    )
+    assert rules.values["product_name"] == "matte black ceramic coffee mug"
+    assert rules.confidence["product_name"] < FIELD_CONFIDENCE_FLOOR  # a guess: the LLM is still asked
+    assert {name: rules.values[name] for name in ("camera_type", "lens_type", "aperture_value", "iso_value",
+                                                  "shutter_speed_value", "lighting_style", "environment",
+                                                  "usage_purpose")} == {
+        "camera_type": "Canon EOS R5", "lens_type": "85mm f/1.4 lens", "aperture_value": 2.8, "iso_value": 100,
+        "shutter_speed_value": 125, "lighting_style": "Golden hour glow", "environment": "Textured surface",
+        "usage_purpose": "social media",
+    }
+    missing = rules.missing()
+    assert "product_name" in missing and "shot_type" in missing and "lighting_style" not in missing
+    assert len(missing) == len(EXTRACTION_FIELDS) - len(rules.confident())
+
+    ambiguous = rule_extractor.extract("a mug in a kitchen on a marble counter")
+    assert "environment" not in ambiguous.values
+    assert ambiguous.ambiguous["environment"] == ["Indoor setting", "Textured surface"]
+
+    structured = rule_extractor.extract(STRUCTURED_REQUEST, {"iso_value": "ISO 200", "mood": None})
+    assert structured.score == 1.0
+    assert structured.values["shot_type"] == "Low-angle" and structured.values["framing"] == "Close-Up"
+    assert structured.values["dominant_colors"] == "brushed brass" and structured.values["iso_value"] == 200
+    assert "mood" not in structured.values
+
+    # Confident rule values win over the LLM; uncertain ones only fill what the LLM left empty
+    merged = rules.merge({"product_name": "Coffee Mug", "lighting_style": "Hard light", "shot_type": "Eye-level"})
+    assert merged["product_name"] == "Coffee Mug" and merged["lighting_style"] == "Golden hour glow"
+    assert rules.merge({"product_name": ""})["product_name"] == "matte black ceramic coffee mug"
+
+    partial = build_extraction_prompt("a mug", fields=["framing", "iso_value"], known={"shot_type": "Low-angle"})
+    assert "ALL 2 fields" in partial and "- shot_type: Low-angle" in partial and "\nproduct_name:" not in partial
+    assert f"ALL {len(EXTRACTION_FIELDS)} fields" in build_extraction_prompt("a mug")
+    print("✅ Rules, vocabulary, confidence and partial schema prompts")
+
+
+def test_extract_and_fill_skips_or_narrows_llm():
+    """Structured requests skip the LLM; free text asks only for the unresolved fields"""
+    from fastapi.testclient import TestClient
+    from mock_openai_server import MockConfig, MockServer
+    from app.config.settings import settings
+    from app.main import app
+    from app.routers.generator import orchestrator
+
+    server = MockServer(MockConfig(latency_scale=0)).start()
+    client_ai = orchestrator.ai_client
+    original_base_url, settings.openai_base_url, client_ai._client = settings.openai_base_url, server.base_url, None
+    try:
+        client = TestClient(app)
+        before = rule_extractor.stats()
+        structured = client.post("/api/v1/extract-and-fill", json={"user_request": STRUCTURED_REQUEST})
+        assert structured.status_code == 200, structured.text
+        assert server.stats.snapshot()["requests"]["chat"] == 0  # no LLM call at all
+        assert structured.json()["product_name"] == "Aurora Desk Lamp"
+        assert structured.json()["environment"] == "Seamless studio backdrop"
+
+        free_text = client.post("/api/v1/extract-and-fill", json={
+            "user_request": "A matte black ceramic mug on marble, golden hour, 85mm",
+            "fields": {"shot_type": "High-angle"},
+        })
+        assert free_text.status_code == 200, free_text.text
+        assert server.stats.snapshot()["requests"]["chat"] == 1
+        data = free_text.json()
+        assert data["shot_type"] == "High-angle"               # client field, never re-extracted
+        assert data["lighting_style"] == "Golden hour glow"    # vocabulary beats the mock's fixed answer
+        assert data["framing"] == "Medium Shot"                # asked from the (mock) LLM
+        after = rule_extractor.stats()
+    finally:
+        settings.openai_base_url, client_ai._client = original_base_url, None
+        server.stop()
+
+    assert after["llm_skipped"] == before["llm_skipped"] + 1
+    assert after["partial_llm"] == before["partial_llm"] + 1
+    assert after["fields_from_llm"] - before["fields_from_llm"] < len(EXTRACTION_FIELDS)
+    print("✅ LLM skipped for structured requests and narrowed for free text")
+
+
+if __name__ == "__main__":
+    test_rules_vocabulary_and_confidence()
+    test_extract_and_fill_skips_or_narrows_llm()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Static Image Caching Test & Conditional-Request Benchmark
+Verifies strong ETags, 304 revalidation, immutable Cache-Control, byte ranges and
+precompressed siblings on the /static mount, checks that negotiated /api/v1/images
+responses vary on Accept and revalidate without being immutable, then compares bytes
+transferred for repeat views with and without conditional requests.
+"""
+
+import asyncio
+import base64
+import gzip
+import io
+import os
+import shutil
+import tempfile
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.static_files import CachedStaticFiles, DEFAULT_CACHE_CONTROL, IMMUTABLE_CACHE_CONTROL
+
+
+def _make_client(static_root: str) -> TestClient:
+    app = FastAPI()
+    app.mount("/static", CachedStaticFiles(directory=static_root), name="static")
+    return TestClient(app)
+
+
+def _make_static_root() -> str:
+    static_root = tempfile.mkdtemp()
+    os.makedirs(os.path.join(static_root, "images"))
+    with open(os.path.join(static_root, "images", "img_0123456789abcdef.png"), "wb") as f:
+        f.write(os.urandom(256 * 1024))
+    with open(os.path.join(static_root, "images", ".image_index.json"), "w") as f:
+        f.write("{}")
+    brief = ("Professional product photography brief with studio lighting. " * 400).encode()
+    with open(os.path.join(static_root, "brief.txt"), "wb") as f:
+        f.write(brief)
+    with open(os.path.join(static_root, "brief.txt.gz"), "wb") as f:
+        f.write(gzip.compress(brief))
+    return static_root
+
+
+def test_static_caching():
+    """ETag/304, immutable caching, Range and .gz siblings"""
+    print("🗄️ Testing cache-friendly static serving...")
+    static_root = _make_static_root()
+    try:
+        client = _make_client(static_root)
+        url = "/static/images/img_0123456789abcdef.png"
+
+        first = client.get(url)
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        assert etag.startswith('"') and not etag.startswith("W/"), "ETag must be strong"
+        assert first.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        assert len(first.content) == 256 * 1024
+        print(f"   200 OK, ETag {etag}, Cache-Control: {first.headers['cache-control']}")
+
+        revalidated = client.get(url, headers={"If-None-Match": etag})
+        assert revalidated.status_code == 304 and revalidated.content == b""
+        assert revalidated.headers["etag"] == etag
+        print("   304 Not Modified on matching If-None-Match")
+
+        partial = client.get(url, headers={"Range": "bytes=100-1123"})
+        assert partial.status_code == 206
+        assert partial.headers["content-range"] == f"bytes 100-1123/{256 * 1024}"
+        assert partial.content == first.content[100:1124]
+        suffix = client.get(url, headers={"Range": "bytes=-10"})
+        assert suffix.status_code == 206 and suffix.content == first.content[-10:]
+        stale_if_range = client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+        assert stale_if_range.status_code == 200
+        unsatisfiable = client.get(url, headers={"Range": f"bytes={256 * 1024}-"})
+        assert unsatisfiable.status_code == 416
+        print("   206 Partial Content for byte ranges, 416 when unsatisfiable")
+
+        compressed = client.get("/static/brief.txt", headers={"Accept-Encoding": "gzip"})
+        assert compressed.status_code == 200
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in compressed.headers["vary"]
+        assert compressed.content.startswith(b"Professional product photography")  # client decodes gzip
+        refused = client.get("/static/brief.txt", headers={"Accept-Encoding": "gzip;q=0, br"})
+        assert "content-encoding" not in refused.headers and refused.headers["etag"] != compressed.headers["etag"]
+        print("   .gz sibling served with Content-Encoding: gzip (not when gzip;q=0)")
+
+        assert client.get("/static/images/.image_index.json").status_code == 404
+        print("✅ Static caching behaves as expected")
+    finally:
+        shutil.rmtree(static_root)
+
+
+def test_negotiated_image_caching():
+    """/api/v1/images responses vary on Accept, carry a strong ETag and are revalidated, not immutable"""
+    from PIL import Image
+    from app.main import app
+    from app.services.image_store import LocalDiskBackend, image_store
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (800, 600), (40, 120, 200)).save(buffer, "PNG")
+
+    async def store_render() -> str:
+        url = await image_store.save_base64(base64.b64encode(buffer.getvalue()).decode("ascii"))
+        await asyncio.gather(*image_store._derivative_tasks)
+        return url
+
+    original_backend = image_store._backend
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_store._backend = LocalDiskBackend(temp_dir)
+        try:
+            image_id = os.path.splitext(os.path.basename(asyncio.run(store_render())))[0]
+            client = TestClient(app)
+            url = f"/api/v1/images/{image_id}?variant=thumb"
+            for accept in ("image/avif,image/webp,*/*", "image/webp,*/*", "*/*"):
+                response = client.get(url, headers={"Accept": accept})
+                assert response.status_code == 200 and response.headers["vary"] == "Accept"
+                # The chosen format changes once derivatives are ready, so these URLs are not immutable
+                assert response.headers["cache-control"] == DEFAULT_CACHE_CONTROL
+                etag = response.headers["etag"]
+                assert etag.startswith('"') and not etag.startswith("W/")
+                revalidated = client.get(url, headers={"Accept": accept, "If-None-Match": etag})
+                assert revalidated.status_code == 304 and revalidated.content == b""
+        finally:
+            image_store._backend = original_backend
+    print("✅ Negotiated images vary on Accept and revalidate")
+
+
+def benchmark_conditional_requests(repeat_views: int = 50):
+    """Compare bytes transferred for repeat views with and without ETag revalidation."""
+    static_root = _make_static_root()
+    try:
+        client = _make_client(static_root)
+        url = "/static/images/img_0123456789abcdef.png"
+
+        unconditional_bytes = sum(len(client.get(url).content) for _ in range(repeat_views))
+
+        first = client.get(url)
+        conditional_bytes = len(first.content)
+        not_modified = 0
+        for _ in range(repeat_views - 1):
+            response = client.get(url, headers={"If-None-Match": first.headers["etag"]})
+            conditional_bytes += len(response.content)
+            not_modified += response.status_code == 304
+
+        saved = 1 - conditional_bytes / unconditional_bytes
+        print(f"📊 {repeat_views} views: {unconditional_bytes / 1024:.0f} KB unconditional vs "
+              f"{conditional_bytes / 1024:.0f} KB with If-None-Match ({not_modified} × 304, {saved:.1%} saved)")
+        return {"unconditional_bytes": unconditional_bytes, "conditional_bytes": conditional_bytes, "not_modified": not_modified}
+    finally:
+        shutil.rmtree(static_root)
+
+
+def test_conditional_request_benchmark():
+    """Revalidation answers every repeat view with a 304"""
+    result = benchmark_conditional_requests(repeat_views=20)
+    assert result["not_modified"] == 19
+    assert result["conditional_bytes"] * 10 < result["unconditional_bytes"]
+
+
+if __name__ == "__main__":
+    test_static_caching()
+    test_negotiated_image_caching()
+    benchmark_conditional_requests()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Telemetry Test
+Checks that spans opened inside other spans (directly, through telemetry.traced on sync
+and async functions, and across asyncio tasks) join the parent's trace, that failures mark
+the span as an error, that the OTLP/JSON payload has the ExportTraceServiceRequest shape
+collectors expect, and that the trace/stage JSON endpoints require the admin token.
+"""
+
+import asyncio
+import pytest
+from app.services.telemetry import SERVICE_NAME, telemetry
+
+
+@telemetry.traced("test.sync_stage")
+def _sync_stage():
+    with telemetry.span("test.leaf", items=3) as leaf:
+        return leaf
+
+
+@telemetry.traced("test.async_stage")
+async def _async_stage():
+    await asyncio.sleep(0)
+    return _sync_stage()
+
+
+def test_span_nesting():
+    """Child spans share the root's trace id and point at their parent"""
+    async def scenario():
+        with telemetry.span("test.root", endpoint="generate_image") as root:
+            leaf = await _async_stage()
+            sibling = await asyncio.create_task(_async_stage())  # tasks inherit the current span
+        return root, leaf, sibling
+
+    root, leaf, sibling = asyncio.run(scenario())
+    spans = {span["spanId"]: span for span in telemetry.otlp_payload(limit=50)["resourceSpans"][0]["scopeSpans"][0]["spans"]}
+    chain = []
+    span = spans[leaf.span_id]
+    while "parentSpanId" in span:
+        chain.append(span["name"])
+        span = spans[span["parentSpanId"]]
+    chain.append(span["name"])
+    assert chain == ["test.leaf", "test.sync_stage", "test.async_stage", "test.root"]
+    assert leaf.trace_id == sibling.trace_id == root.trace_id and root.parent_id is None
+    assert leaf.span_id != sibling.span_id
+
+    with telemetry.span("test.other_root") as other:
+        pass
+    assert other.trace_id != root.trace_id and other.parent_id is None
+    print("✅ Spans nest across traced functions and tasks")
+
+
+def test_span_errors_and_otlp_shape():
+    """The OTLP payload is a valid ExportTraceServiceRequest with typed attributes and status"""
+    with pytest.raises(ValueError):
+        with telemetry.span("test.failing", attempt=2, cached=False, ratio=0.5, model="gpt-4o"):
+            raise ValueError("bad json")
+    failing = telemetry.otlp_payload(limit=1)
+
+    resource_spans = failing["resourceSpans"]
+    assert len(resource_spans) == 1
+    assert resource_spans[0]["resource"]["attributes"] == [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]
+    span = resource_spans[0]["scopeSpans"][0]["spans"][0]
+    assert span["name"] == "test.failing" and span["kind"] == 1
+    assert len(span["traceId"]) == 32 and len(span["spanId"]) == 16 and "parentSpanId" not in span
+    assert isinstance(span["startTimeUnixNano"], str) and int(span["endTimeUnixNano"]) >= int(span["startTimeUnixNano"])
+    assert span["attributes"] == [
+        {"key": "attempt", "value": {"intValue": "2"}},
+        {"key": "cached", "value": {"boolValue": False}},
+        {"key": "ratio", "value": {"doubleValue": 0.5}},
+        {"key": "model", "value": {"stringValue": "gpt-4o"}},
+    ]
+    assert span["status"] == {"code": 2, "message": "ValueError: bad json"}
+    assert telemetry.stage_summary()["test.failing"]["errors"] >= 1
+
+    with telemetry.span("test.ok"):
+        pass
+    assert telemetry.otlp_payload(limit=1)["resourceSpans"][0]["scopeSpans"][0]["spans"][0]["status"] == {"code": 1}
+    print("✅ OTLP/JSON payload shape and error status")
+
+
+def test_trace_endpoints_require_admin():
+    """/api/v1/traces and /api/v1/metrics/stages need the admin token; /metrics stays open"""
+    from fastapi.testclient import TestClient
+    from app.config.settings import settings
+    from app.main import app
+
+    client = TestClient(app)
+    original_token, settings.admin_token = settings.admin_token, "test-admin-token"
+    try:
+        for path in ("/api/v1/traces", "/api/v1/metrics/stages"):
+            assert client.get(path).status_code == 401
+            assert client.get(path, headers={"Authorization": "Bearer test-admin-token"}).status_code == 200
+        traces = client.get("/api/v1/traces?limit=5", headers={"X-Admin-Token": "test-admin-token"}).json()
+        assert len(traces["resourceSpans"][0]["scopeSpans"][0]["spans"]) <= 5
+        assert client.get("/metrics").status_code == 200
+    finally:
+        settings.admin_token = original_token
+    print("✅ Trace endpoints are admin-only")
+
+
+if __name__ == "__main__":
+    test_span_nesting()
+    test_span_errors_and_otlp_shape()
+    test_trace_endpoints_require_admin()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Usage Ledger Test
+Checks that OpenAI usage is booked per route template (set once routing is done) rather
+than per raw path, that calls outside a request go to "background", and that /metrics
+series carry endpoint and model labels but never the hashed client key, which stays in
+the admin report.
+"""
+
+from types import SimpleNamespace
+from app.services.usage_ledger import UsageLedger, hash_api_key, usage_ledger
+
+
+def _completion(model: str = "gpt-4o-mini", prompt_tokens: int = 1200, completion_tokens: int = 300):
+    usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    return SimpleNamespace(model=model, usage=usage)
+
+
+def test_usage_booked_per_route_template():
+    """Calls are booked under the endpoint set before the request scope closes"""
+    ledger = UsageLedger()
+    for image_id in ("img_a", "img_b"):
+        booked = ledger.summary("endpoint")
+        with ledger.request_scope() as request:
+            ledger.record_chat(_completion(), "sk-client-one", "vision.analyze")
+            assert ledger.summary("endpoint") == booked  # not booked until the scope exits
+            request.endpoint = "/api/v1/images/{image_id}"
+    ledger.record_chat(_completion("gpt-4.1"), None, "batch")
+
+    summary = ledger.summary()
+    assert list(summary["endpoint"]) == ["/api/v1/images/{image_id}", "background"]
+    assert summary["endpoint"]["/api/v1/images/{image_id}"]["requests"] == 2
+    assert summary["endpoint"]["/api/v1/images/{image_id}"]["prompt_tokens"] == 2400
+    assert summary["key"][hash_api_key("sk-client-one")]["requests"] == 2
+    assert summary["model"]["gpt-4.1"]["calls"] == 1
+    assert ledger.recent_requests(key=hash_api_key("sk-client-one"))[0]["endpoint"] == "/api/v1/images/{image_id}"
+
+    names = [name for name, _, _, _ in ledger.prometheus_metrics()]
+    assert 'photoeai_usage_tokens_total{endpoint="/api/v1/images/{image_id}",model="gpt-4o-mini",type="prompt"}' in names
+    assert not any("key=" in name for name in names)
+    print("✅ Usage booked per route template, no key labels on /metrics")
+
+
+def test_middleware_books_route_template():
+    """An API request's usage lands under its route template"""
+    from fastapi.testclient import TestClient
+    from mock_openai_server import MockConfig, MockServer
+    from app.config.settings import settings
+    from app.main import app
+    from app.routers.generator import orchestrator
+
+    server = MockServer(MockConfig(latency_scale=0)).start()
+    client_ai = orchestrator.ai_client
+    original_base_url, settings.openai_base_url, client_ai._client = settings.openai_base_url, server.base_url, None
+    before = usage_ledger.summary("endpoint")["endpoint"].get("/api/v1/extract-and-fill", {}).get("requests", 0)
+    try:
+        response = TestClient(app).post("/api/v1/extract-and-fill", json={"user_request": "A ceramic mug on marble"})
+        assert response.status_code == 200, response.text
+    finally:
+        settings.openai_base_url, client_ai._client = original_base_url, None
+        server.stop()
+
+    after = usage_ledger.summary("endpoint")["endpoint"]["/api/v1/extract-and-fill"]["requests"]
+    assert after == before + 1
+    assert usage_ledger.recent_requests(limit=1)[0]["endpoint"] == "/api/v1/extract-and-fill"
+    print("✅ Middleware books usage under the route template")
+
+
+if __name__ == "__main__":
+    test_usage_booked_per_route_template()
+    test_middleware_books_route_template()